@@ -1,7 +1,6 @@
 from fastapi import HTTPException, Request
-from datetime import datetime, timezone
 from .database import db, client
-from .utils import MODERATOR_EMAILS, ADMIN_EMAILS
+from .utils import MODERATOR_EMAILS, ADMIN_EMAILS, is_expired
 import os
 
 IS_PRODUCTION = os.getenv("ENVIRONMENT", "production").lower() == "production"
@@ -41,12 +40,8 @@ async def get_current_user(request: Request) -> dict:
     if not session_doc:
         raise HTTPException(status_code=401, detail="Invalid session")
 
-    expires_at = session_doc["expires_at"]
-    if isinstance(expires_at, str):
-        expires_at = datetime.fromisoformat(expires_at)
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-    if expires_at < datetime.now(timezone.utc):
+    # L'index TTL supprime les sessions expirées avec un délai (~60 s) : on revérifie
+    if is_expired(session_doc.get("expires_at")):
         raise HTTPException(status_code=401, detail="Session expired")
 
     user_doc = await db.users.find_one(
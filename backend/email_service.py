@@ -6,6 +6,7 @@ Variables d'environnement requises sur Render :
   FROM_EMAIL       = noreply@topkit.fr   (ou onboarding@resend.dev en dev)
   FRONTEND_URL     = https://tp-emergent-1.onrender.com
 """
+import asyncio
 import os
 import logging
 
@@ -33,7 +34,8 @@ async def send_email(to: str, subject: str, html: str) -> None:
         logger.debug(f"[email] skipped (no key): {subject} → {to}")
         return
     try:
-        _resend.Emails.send({
+        # Client HTTP synchrone : hors de la boucle pour ne pas bloquer les requêtes
+        await asyncio.to_thread(_resend.Emails.send, {
             "from":    f"Topkit <{FROM_EMAIL}>",
             "to":      [to],
             "subject": subject,
@@ -156,6 +158,31 @@ async def send_report_result(
     await send_email(to, subject, html)
 
 
+async def send_moderation_digest(
+    to: str,
+    name: str,
+    approved: list[str],
+    rejected: list[str],
+) -> None:
+    """Récapitulatif unique après une modération en masse."""
+    def _items(names: list[str], color: str) -> str:
+        return "".join(f'<li style="color:{color};">{n}</li>' for n in names)
+
+    sections = ""
+    if approved:
+        sections += f"<p><strong>Approuvées ✅ ({len(approved)})</strong></p><ul>{_items(approved, '#22c55e')}</ul>"
+    if rejected:
+        sections += f"<p><strong>Refusées ❌ ({len(rejected)})</strong></p><ul>{_items(rejected, '#ef4444')}</ul>"
+    html = _wrap(f"""
+      <h2 style="margin-top:0;">Tes soumissions ont été modérées</h2>
+      <p>Bonjour {name},</p>
+      {sections}
+      <a href="{FRONTEND_URL}" style="{_BTN_STYLE}">Voir sur Topkit</a>
+    """)
+    total = len(approved) + len(rejected)
+    await send_email(to, f"Topkit — {total} soumission(s) modérée(s)", html)
+
+
 async def send_email_verification(to: str, name: str, token: str) -> None:
     url = f"{FRONTEND_URL}/verify-email?token={token}"
     html = _wrap(f"""
@@ -280,18 +307,21 @@ async def send_offer_reminder(
     seller_name: str,
     listing_url: str,
     offer_count: int,
+    listing_count: int = 1,
 ) -> None:
-    """M8 — Rappel au vendeur : offre(s) en attente depuis +72h."""
+    """M8 — Rappel au vendeur : offre(s) en attente depuis +72h (toutes annonces confondues)."""
     plural = "offres en attente" if offer_count > 1 else "offre en attente"
+    where = "Ton annonce a reçu" if listing_count == 1 else f"Tes {listing_count} annonces ont reçu"
     html = _wrap(f"""
       <h2 style="margin-top:0;">Tu as {offer_count} {plural} ⏳</h2>
       <p>Bonjour {seller_name},</p>
-      <p>Ton annonce a reçu <strong>{offer_count} {plural}</strong> depuis plus de 72 heures
+      <p>{where} <strong>{offer_count} {plural}</strong> depuis plus de 72 heures
          sans réponse de ta part.</p>
       <p>Connecte-toi pour accepter ou refuser ces offres avant qu'elles ne expirent.</p>
       <a href="{listing_url}" style="{_BTN_STYLE}">Voir les offres</a>
     """)
-    await send_email(to, f"Topkit — {offer_count} offre(s) en attente sur ton annonce", html)
+    subject_where = "ton annonce" if listing_count == 1 else "tes annonces"
+    await send_email(to, f"Topkit — {offer_count} offre(s) en attente sur {subject_where}", html)
 
 
 async def send_account_deleted(to: str, name: str) -> None:
@@ -4,6 +4,8 @@ import re
 import httpx
 from pathlib import Path
 
+from .services.file_cleanup import cancel_file_deletions
+
 RECEIVER_URL    = os.getenv("RECEIVER_URL",    "http://receiver:8001")
 RECEIVER_SECRET = os.getenv("RECEIVER_SECRET", "changeme")
 
@@ -77,7 +79,10 @@ async def mirror_image(
                 files={"file": (fname, dl.content, content_type)},
             )
             resp.raise_for_status()
-            raw_url = resp.json().get("url", source_url)
+            data = resp.json()
+            if data.get("deduplicated"):
+                await cancel_file_deletions([data.get("relative_path")])
+            raw_url = data.get("url", source_url)
             # Convertir http://IP/... → /api/images/... pour éviter Mixed Content
             return _to_relative_path(raw_url)
     except Exception as exc:
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import List, Optional
 
 
@@ -111,11 +111,13 @@ class CollectionAdd(BaseModel):
     signed_proof: Optional[str] = "none"
     signed_type: Optional[str] = ""
     signed_other_detail: Optional[str] = ""
+    signed_personal_message: Optional[bool] = False
     patch: Optional[bool] = False
     is_rare: Optional[bool] = False
     rare_reason: Optional[str] = ""
     condition: Optional[str] = ""
     printing: Optional[str] = ""
+    estimation_mode: Optional[str] = None
 
 
 class CollectionUpdate(BaseModel):
@@ -139,11 +141,13 @@ class CollectionUpdate(BaseModel):
     signed_proof: Optional[str] = None
     signed_type: Optional[str] = None
     signed_other_detail: Optional[str] = None
+    signed_personal_message: Optional[bool] = None
     patch: Optional[bool] = None
     is_rare: Optional[bool] = None
     rare_reason: Optional[str] = None
     condition: Optional[str] = None
     printing: Optional[str] = None
+    estimation_mode: Optional[str] = None
 
 
 class CollectionOut(BaseModel):
@@ -246,6 +250,45 @@ class EstimationRequest(BaseModel):
     rare_reason: Optional[str] = ""
 
 
+ESTIMATION_BATCH_MAX_ITEMS = 10_000
+
+
+class EstimationBatchRequest(BaseModel):
+    items: List[EstimationRequest]
+
+    @field_validator("items")
+    @classmethod
+    def check_batch_size(cls, v):
+        if len(v) > ESTIMATION_BATCH_MAX_ITEMS:
+            raise ValueError(f"Maximum {ESTIMATION_BATCH_MAX_ITEMS} items par lot")
+        return v
+
+
+BULK_MODERATION_MAX_IDS = 200
+
+
+class BulkModerationRequest(BaseModel):
+    submission_ids: List[str]
+    action: str                # "approve" | "reject"
+    notify: bool = True
+
+    @field_validator("submission_ids")
+    @classmethod
+    def check_ids(cls, v):
+        if not v:
+            raise ValueError("Au moins une soumission requise")
+        if len(v) > BULK_MODERATION_MAX_IDS:
+            raise ValueError(f"Maximum {BULK_MODERATION_MAX_IDS} soumissions par lot")
+        return list(dict.fromkeys(v))
+
+    @field_validator("action")
+    @classmethod
+    def check_action(cls, v):
+        if v not in ("approve", "reject"):
+            raise ValueError("action doit valoir 'approve' ou 'reject'")
+        return v
+
+
 class TeamCreate(BaseModel):
     name: str
     country: Optional[str] = ""
@@ -480,6 +523,26 @@ class ListingOut(BaseModel):
     created_at: str
     updated_at: str
 
+class SavedSearchCreate(BaseModel):
+    """Filtres de GET /api/marketplace à surveiller (au moins un requis)."""
+    name: Optional[str] = None
+    listing_type: Optional[str] = None
+    min_price: Optional[float] = Field(None, ge=0)
+    max_price: Optional[float] = Field(None, ge=0)
+    version_id: Optional[str] = None
+    search: Optional[str] = None
+    team_type: Optional[str] = None
+    club: Optional[str] = None
+    brand: Optional[str] = None
+    season: Optional[str] = None
+    kit_type: Optional[str] = None
+    league: Optional[str] = None
+    gender: Optional[str] = None
+    physical_state: Optional[str] = None
+    signed: Optional[bool] = None
+    flocking_origin: Optional[str] = None
+    size: Optional[str] = None
+
 class OfferCreate(BaseModel):
     offer_type: str  # "buy" | "trade" | "buy_and_trade"
     offered_price: Optional[float] = None
@@ -525,6 +588,7 @@ class TransactionOut(BaseModel):
     created_at: str
     updated_at: str
     completed_at: Optional[str] = None
+    read_marks: dict[str, str] = {}  # user_id → created_at du dernier message lu
 
 
 class MessageOut(BaseModel):
@@ -534,7 +598,6 @@ class MessageOut(BaseModel):
     sender_id: str
     content: str
     created_at: str
-    read_by: list[str] = []
 
 
 class TransactionReviewCreate(BaseModel):
@@ -106,7 +106,6 @@ async def _create_missing_entity_submissions(
             "status": "pending",
             "votes_up": 0,
             "votes_down": 0,
-            "voters": [],
             "created_at": now,
         })
 
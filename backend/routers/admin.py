@@ -11,6 +11,8 @@ from ..database import db, client
 from ..models import ProfileUpdate
 from ..auth import get_current_user
 from ..utils import slugify, MODERATOR_EMAILS
+from ..services.dashboard_stats import get_dashboard_stats
+from ..services.listing_snapshot import mark_listing_snapshots_stale
 
 logger = logging.getLogger(__name__)
 
@@ -101,11 +103,13 @@ def _normalize_gender(gender: str) -> str:
 
 @router.get("/stats")
 async def get_stats():
-    kits     = await db.master_kits.count_documents({})
-    versions = await db.versions.count_documents({})
-    users    = await db.users.count_documents({})
-    reviews  = await db.reviews.count_documents({})
-    return {"master_kits": kits, "versions": versions, "users": users, "reviews": reviews}
+    totals = (await get_dashboard_stats())["totals"]
+    return {
+        "master_kits": totals["kits"],
+        "versions":    totals["versions"],
+        "users":       totals["users"],
+        "reviews":     totals["reviews"],
+    }
 
 
 # ─── User Profile ─────────────────────────────────────────────────────────────────────────
@@ -146,6 +150,8 @@ async def update_profile(update: ProfileUpdate, request: Request):
         if existing:
             raise HTTPException(status_code=400, detail="Username already taken")
     await db.users.update_one({"user_id": user["user_id"]}, {"$set": update_dict})
+    if "username" in update_dict:
+        await mark_listing_snapshots_stale(user_id=user["user_id"])
     return await db.users.find_one({"user_id": user["user_id"]}, {"_id": 0})
 
 
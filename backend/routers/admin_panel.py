@@ -5,16 +5,33 @@ Routes réservées aux admins/modérateurs :
   GET  /api/admin/users
   POST /api/admin/users/{user_id}/ban|unban|promote|demote
   POST /api/admin/submissions/{submission_id}/approve|reject
+  POST /api/admin/submissions/bulk
   GET  /api/admin/maintenance
   POST /api/admin/maintenance
+  GET  /api/admin/collection-stats
+  POST /api/admin/collection-summaries/rebuild
+  POST /api/admin/reestimation
+  GET  /api/admin/reestimation/{job_id}
 """
-from fastapi import APIRouter, HTTPException, Request
-from datetime import datetime, timezone, timedelta
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from datetime import datetime, timezone
 from typing import Optional
 from ..database import db
 from ..email_service import send_account_banned, send_listing_cancelled_by_admin
 from ..auth import get_current_user
 from ..utils import safe_regex
+from ..models import BulkModerationRequest
+from ..services.approval_engine import force_approve_submission, reject_submission
+from ..services.bulk_moderation import moderate_submissions
+from ..services.collection_summary import (
+    compute_summary,
+    format_category_stats,
+    format_collection_stats,
+    rebuild_all_summaries,
+    rebuild_user_summary,
+)
+from ..services.dashboard_stats import format_admin_stats, get_dashboard_stats
+from ..services.reestimation import create_job, run_job
 
 router = APIRouter(prefix="/api/admin", tags=["admin-panel"])
 
@@ -39,24 +56,7 @@ async def admin_stats(request: Request):
     user = await get_current_user(request)
     _require_admin(user)
 
-    since_24h = (datetime.now(timezone.utc) - timedelta(hours=24)).isoformat()
-    since_7d  = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
-
-    return {
-        "kits_total":            await db.master_kits.count_documents({}),
-        "versions_total":        await db.versions.count_documents({}),
-        "users_total":           await db.users.count_documents({}),
-        "users_banned":          await db.users.count_documents({"is_banned": True}),
-        "moderators_count":      await db.users.count_documents({"role": "moderator"}),
-        "admins_count":          await db.users.count_documents({"role": "admin"}),
-        "users_new_7d":          await db.users.count_documents({"created_at": {"$gte": since_7d}}),
-        "submissions_total":     await db.submissions.count_documents({}),
-        "submissions_pending":   await db.submissions.count_documents({"status": "pending"}),
-        "submissions_today":     await db.submissions.count_documents({"created_at": {"$gte": since_24h}}),
-        "submissions_last_7d":   await db.submissions.count_documents({"created_at": {"$gte": since_7d}}),
-        "reports_total":         await db.reports.count_documents({}),
-        "reports_pending":       await db.reports.count_documents({"status": "pending"}),
-    }
+    return format_admin_stats(await get_dashboard_stats())
 
 
 # ─── Gestion Users ──────────────────────────────────────────────────────────────────
@@ -159,159 +159,29 @@ async def demote_user(user_id: str, request: Request):
 
 # ─── Approve / Reject direct (bypass vote) ──────────────────────────────────────────
 
+@router.post("/submissions/bulk")
+async def admin_bulk_moderate(body: BulkModerationRequest, request: Request):
+    admin = await get_current_user(request)
+    _require_admin(admin)
+    return await moderate_submissions(body.submission_ids, body.action, admin["user_id"], notify=body.notify)
+
+
 @router.post("/submissions/{submission_id}/approve")
 async def admin_approve_submission(submission_id: str, request: Request):
     admin = await get_current_user(request)
     _require_admin(admin)
 
-    sub = await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0})
-    if not sub:
+    # Pas de pré-contrôle du statut : un claim `approving` périmé doit pouvoir être repris
+    try:
+        result = await force_approve_submission(submission_id, admin["user_id"])
+    except Exception:
+        raise HTTPException(status_code=500, detail="Échec de l'approbation, la soumission reste en attente.")
+    if result["status"] == "not_found":
         raise HTTPException(status_code=404, detail="Soumission introuvable.")
-    if sub["status"] != "pending":
+    if result["status"] == "not_pending":
         raise HTTPException(status_code=400, detail="La soumission n'est plus en attente.")
-
-    from ..utils import APPROVAL_THRESHOLD, normalize_season
-    now = datetime.now(timezone.utc).isoformat()
-    await db.submissions.update_one(
-        {"submission_id": submission_id},
-        {
-            "$set":  {"votes_up": APPROVAL_THRESHOLD, "admin_approved_by": admin["user_id"], "admin_approved_at": now},
-            "$push": {"voters": admin["user_id"]},
-        }
-    )
-
-    from .submissions import (
-        _apply_entity_submission,
-        _apply_master_kit_removal,
-        _apply_master_kit_edit,
-        KIT_ID_FIELDS,
-        VERSION_IMAGE_FIELDS,
-    )
-    import uuid
-
-    updated_sub = await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0})
-    data = updated_sub["data"]
-
-    if updated_sub["submission_type"] == "master_kit":
-        master_kit_mode = data.get("mode", "create")
-
-        if master_kit_mode == "removal":
-            # FIX: suppression du kit existant
-            kit_id = data.get("kit_id", "") or data.get("entity_id", "")
-            if kit_id:
-                await _apply_master_kit_removal(kit_id)
-            else:
-                print(f"[ADMIN APPROVE] master_kit removal sans kit_id dans submission {submission_id}")
-
-        elif master_kit_mode == "edit":
-            # FIX: mise à jour du kit existant
-            kit_id = data.get("kit_id", "") or data.get("entity_id", "")
-            if kit_id:
-                await _apply_master_kit_edit(kit_id, data, updated_sub["submitted_by"])
-            else:
-                print(f"[ADMIN APPROVE] master_kit edit sans kit_id dans submission {submission_id}")
-
-        else:
-            # mode create (par défaut)
-            kit_id = f"kit_{uuid.uuid4().hex[:12]}"
-            season = normalize_season(data.get("season", ""))
-            kit_doc = {
-                "kit_id":      kit_id,
-                "club":        data.get("club", ""),
-                "season":      season,
-                "kit_type":    data.get("kit_type", ""),
-                "brand":       data.get("brand", ""),
-                "front_photo": data.get("front_photo", ""),
-                "league":      data.get("league", ""),
-                "design":      data.get("design", ""),
-                "sponsor":     data.get("sponsor", ""),
-                "gender":      data.get("gender", ""),
-                "team_id":     data.get("team_id", ""),
-                "league_id":   data.get("league_id", ""),
-                "brand_id":    data.get("brand_id", ""),
-                "created_by":  updated_sub["submitted_by"],
-                "created_at":  now,
-            }
-            await db.master_kits.insert_one(kit_doc)
-            await db.versions.insert_one({
-                "version_id":  f"ver_{uuid.uuid4().hex[:12]}",
-                "kit_id":      kit_id,
-                "competition": "National Championship",
-                "model":       "Replica",
-                "sku_code":    "", "ean_code": "",
-                "front_photo": data.get("front_photo", ""),
-                "back_photo":  "",
-                "created_by":  updated_sub["submitted_by"],
-                "created_at":  now,
-            })
-            linked = await db.submissions.find(
-                {"submission_type": {"$in": ["team","league","brand","player","sponsor"]},
-                 "status": "pending", "data.parent_submission_id": submission_id},
-                {"_id": 0}
-            ).to_list(50)
-            kit_patch = {}
-            for entity_sub in linked:
-                new_eid = await _apply_entity_submission(entity_sub)
-                await db.submissions.update_one(
-                    {"submission_id": entity_sub["submission_id"]},
-                    {"$set": {"status": "approved", "updated_at": now}}
-                )
-                etype = entity_sub["submission_type"]
-                if etype in KIT_ID_FIELDS and new_eid:
-                    kit_patch[KIT_ID_FIELDS[etype]] = new_eid
-            if kit_patch:
-                await db.master_kits.update_one({"kit_id": kit_id}, {"$set": kit_patch})
-
-    elif updated_sub["submission_type"] == "version":
-        version_mode = data.get("mode", "create")
-        version_id   = data.get("version_id", "")
-
-        if version_mode == "edit" and version_id:
-            old_ver = await db.versions.find_one({"version_id": version_id}, {"_id": 0})
-            update_fields = {k: v for k, v in data.items()
-                             if k not in ("mode", "version_id") and v not in (None, "", [])}
-            update_fields["updated_at"] = now
-            if old_ver:
-                from .submissions import _delete_freebox_file
-                for field in VERSION_IMAGE_FIELDS:
-                    new_url = update_fields.get(field)
-                    old_url = old_ver.get(field, "")
-                    if new_url and old_url and new_url != old_url:
-                        await _delete_freebox_file(old_url)
-            await db.versions.update_one({"version_id": version_id}, {"$set": update_fields})
-
-        elif version_mode == "removal" and version_id:
-            old_ver = await db.versions.find_one({"version_id": version_id}, {"_id": 0})
-            if old_ver:
-                from .submissions import _delete_freebox_file
-                for field in VERSION_IMAGE_FIELDS:
-                    url = old_ver.get(field, "")
-                    if url:
-                        await _delete_freebox_file(url)
-            await db.versions.delete_one({"version_id": version_id})
-
-        else:
-            await db.versions.insert_one({
-                "version_id":  f"ver_{uuid.uuid4().hex[:12]}",
-                "kit_id":      data.get("kit_id", ""),
-                "competition": data.get("competition", ""),
-                "model":       data.get("model", ""),
-                "sku_code":    data.get("sku_code", ""),
-                "ean_code":    data.get("ean_code", ""),
-                "front_photo": data.get("front_photo", ""),
-                "back_photo":  data.get("back_photo", ""),
-                "created_by":  updated_sub["submitted_by"],
-                "created_at":  now,
-            })
-
-    elif updated_sub["submission_type"] in ("team","league","brand","player","sponsor"):
-        if not data.get("parent_submission_id"):
-            await _apply_entity_submission(updated_sub)
-
-    await db.submissions.update_one(
-        {"submission_id": submission_id},
-        {"$set": {"status": "approved"}}
-    )
+    if result["status"] == "in_progress":
+        raise HTTPException(status_code=409, detail="Approbation déjà en cours.")
     return {"message": "Soumission approuvée.", "submission_id": submission_id}
 
 
@@ -326,17 +196,9 @@ async def admin_reject_submission(submission_id: str, request: Request):
     if sub["status"] != "pending":
         raise HTTPException(status_code=400, detail="La soumission n'est plus en attente.")
 
-    now = datetime.now(timezone.utc).isoformat()
-    if sub["submission_type"] == "master_kit":
-        await db.submissions.update_many(
-            {"submission_type": {"$in": ["team","league","brand","player","sponsor"]},
-             "status": "pending", "data.parent_submission_id": submission_id},
-            {"$set": {"status": "rejected", "updated_at": now}}
-        )
-    await db.submissions.update_one(
-        {"submission_id": submission_id},
-        {"$set": {"status": "rejected", "admin_rejected_by": admin["user_id"], "updated_at": now}}
-    )
+    result = await reject_submission(submission_id, {"admin_rejected_by": admin["user_id"]})
+    if result["status"] != "rejected":
+        raise HTTPException(status_code=400, detail="La soumission n'est plus en attente.")
     return {"message": "Soumission rejetée.", "submission_id": submission_id}
 
 
@@ -370,6 +232,59 @@ async def toggle_maintenance(request: Request):
     }
 
 
+# ─── Résumés de collection ──────────────────────────────────────────────────────────
+
+@router.get("/collection-stats")
+async def admin_collection_stats(request: Request):
+    """Valeur de l'ensemble des collections (même formule que /collections/stats)."""
+    admin = await get_current_user(request)
+    _require_admin(admin)
+
+    summary = await compute_summary({})
+    return {**format_collection_stats(summary), "categories": format_category_stats(summary)}
+
+
+@router.post("/collection-summaries/rebuild")
+async def rebuild_collection_summaries(request: Request, user_id: Optional[str] = None):
+    """Répare la dérive des résumés matérialisés (un user ou toute la base)."""
+    admin = await get_current_user(request)
+    _require_superadmin(admin)
+
+    if user_id:
+        await rebuild_user_summary(user_id)
+        return {"rebuilt": 1, "user_id": user_id}
+    rebuilt = await rebuild_all_summaries()
+    return {"rebuilt": rebuilt}
+
+
+# ─── Ré-estimation des prix ─────────────────────────────────────────────────────────
+
+@router.post("/reestimation")
+async def start_reestimation(request: Request, background_tasks: BackgroundTasks, player_id: Optional[str] = None):
+    """Lance une ré-estimation (toute la base, ou les items floqués à un joueur)."""
+    admin = await get_current_user(request)
+    _require_superadmin(admin)
+
+    if player_id:
+        job = await create_job("player", f"manual:{admin['user_id']}", player_id=player_id)
+    else:
+        job = await create_job("all", f"manual:{admin['user_id']}")
+    background_tasks.add_task(run_job, job["job_id"])
+    return job
+
+
+@router.get("/reestimation/{job_id}")
+async def get_reestimation(job_id: str, request: Request):
+    """Avancement d'un job de ré-estimation (total / processed / updated)."""
+    admin = await get_current_user(request)
+    _require_admin(admin)
+
+    job = await db.reestimation_jobs.find_one({"job_id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job introuvable.")
+    return job
+
+
 @router.delete("/master-kits/{kit_id}")
 async def delete_master_kit(kit_id: str, request: Request):
     admin = await get_current_user(request)
@@ -384,7 +299,11 @@ async def delete_master_kit(kit_id: str, request: Request):
 
     await db.versions.delete_many({"kit_id": kit_id})
     if version_ids:
+        owners = await db.collections.distinct("user_id", {"version_id": {"$in": version_ids}})
         await db.collections.delete_many({"version_id": {"$in": version_ids}})
+        await db.version_price_stats.delete_many({"version_id": {"$in": version_ids}})
+        for owner_id in owners:
+            await rebuild_user_summary(owner_id)
     await db.master_kits.delete_one({"kit_id": kit_id})
 
     return {"deleted": True, "kit_id": kit_id, "versions_deleted": len(version_ids)}
@@ -399,7 +318,11 @@ async def delete_version(version_id: str, request: Request):
     if not version:
         raise HTTPException(status_code=404, detail="Version not found")
 
+    owners = await db.collections.distinct("user_id", {"version_id": version_id})
     await db.collections.delete_many({"version_id": version_id})
+    await db.version_price_stats.delete_one({"version_id": version_id})
+    for owner_id in owners:
+        await rebuild_user_summary(owner_id)
     await db.versions.delete_one({"version_id": version_id})
 
     return {"deleted": True, "version_id": version_id}
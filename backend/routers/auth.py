@@ -7,7 +7,7 @@ import os
 import httpx
 from ..database import db, client
 from ..auth import get_current_user
-from ..utils import MODERATOR_EMAILS
+from ..utils import MODERATOR_EMAILS, utcnow, is_expired
 from ..email_service import send_welcome, send_password_reset, send_email_verification, send_login_alert
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
@@ -16,6 +16,11 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 IS_PRODUCTION = os.getenv("ENVIRONMENT", "production").lower() == "production"
 
+# Durées de validité (champs `expires_at` en dates BSON, purgés par index TTL)
+SESSION_TTL            = timedelta(days=7)
+PASSWORD_RESET_TTL     = timedelta(hours=1)
+EMAIL_VERIFICATION_TTL = timedelta(hours=24)
+
 MAX_BCRYPT_BYTES = 72
 
 
@@ -111,9 +116,9 @@ async def register(body: RegisterBody, response: Response):
         {
             "user_id": user_id,
             "session_token": session_token,
-            "expires_at": (datetime.now(timezone.utc) + timedelta(days=7)).isoformat(),
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "last_active": datetime.now(timezone.utc).isoformat(),
+            "expires_at": utcnow() + SESSION_TTL,
+            "created_at": utcnow(),
+            "last_active": utcnow(),
         }
     )
 
@@ -130,8 +135,9 @@ async def register(body: RegisterBody, response: Response):
         "user_id": user_id,
         "token": verification_token,
         "email": body.email,
-        "expires_at": (datetime.now(timezone.utc) + timedelta(hours=24)).isoformat(),
+        "expires_at": utcnow() + EMAIL_VERIFICATION_TTL,
         "used": False,
+        "created_at": utcnow(),
     })
     await send_email_verification(body.email, body.name.strip(), verification_token)
 
@@ -154,9 +160,9 @@ async def login(body: LoginBody, response: Response, request: Request):
         {
             "user_id": user["user_id"],
             "session_token": session_token,
-            "expires_at": (datetime.now(timezone.utc) + timedelta(days=7)).isoformat(),
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "last_active": datetime.now(timezone.utc).isoformat(),
+            "expires_at": utcnow() + SESSION_TTL,
+            "created_at": utcnow(),
+            "last_active": utcnow(),
         }
     )
 
@@ -253,9 +259,9 @@ async def google_auth(body: GoogleAuthBody, response: Response):
     await db.user_sessions.insert_one({
         "user_id": user_id,
         "session_token": session_token,
-        "expires_at": (datetime.now(timezone.utc) + timedelta(days=7)).isoformat(),
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "last_active": datetime.now(timezone.utc).isoformat(),
+        "expires_at": utcnow() + SESSION_TTL,
+        "created_at": utcnow(),
+        "last_active": utcnow(),
     })
 
     set_session_cookie(response, session_token)
@@ -274,15 +280,14 @@ async def forgot_password(body: ForgotPasswordBody):
         await db.password_resets.delete_many({"email": body.email, "used": False})
 
         reset_token = uuid.uuid4().hex
-        expires     = datetime.now(timezone.utc) + timedelta(hours=1)
 
         await db.password_resets.insert_one({
             "token":      reset_token,
             "user_id":    user["user_id"],
             "email":      body.email,
-            "expires_at": expires.isoformat(),
+            "expires_at": utcnow() + PASSWORD_RESET_TTL,
             "used":       False,
-            "created_at": datetime.now(timezone.utc).isoformat(),
+            "created_at": utcnow(),
         })
 
         await send_password_reset(body.email, reset_token)
@@ -297,10 +302,7 @@ async def reset_password(body: ResetPasswordBody):
     if not doc:
         raise HTTPException(status_code=400, detail="Token invalide ou déjà utilisé")
 
-    expires = datetime.fromisoformat(doc["expires_at"])
-    if expires.tzinfo is None:
-        expires = expires.replace(tzinfo=timezone.utc)
-    if expires < datetime.now(timezone.utc):
+    if is_expired(doc.get("expires_at")):
         raise HTTPException(status_code=400, detail="Token expiré (1h max)")
 
     if len(body.new_password) < 8:
@@ -334,10 +336,7 @@ async def verify_email(token: str):
     if not doc:
         raise HTTPException(status_code=400, detail="Lien invalide ou déjà utilisé")
 
-    expires = datetime.fromisoformat(doc["expires_at"])
-    if expires.tzinfo is None:
-        expires = expires.replace(tzinfo=timezone.utc)
-    if expires < datetime.now(timezone.utc):
+    if is_expired(doc.get("expires_at")):
         raise HTTPException(status_code=400, detail="Lien expiré (24h max)")
 
     await db.users.update_one(
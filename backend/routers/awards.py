@@ -10,13 +10,14 @@ Routes :
   DELETE /api/awards/player/{player_id}/{award_id} → retirer un award d'un joueur
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException
 from datetime import datetime, timezone
 import uuid
 
 from ..database import db
 from ..models import AwardCreate, AwardOut
 from ..services.scoring import compute_score_palmares, compute_note
+from ..services.reestimation import note_change_affects_estimation, reestimate_player_items
 
 router = APIRouter(prefix="/api/awards", tags=["awards"])
 
@@ -105,7 +106,7 @@ async def delete_award(award_id: str):
 # ── Awards d'un joueur ────────────────────────────────────────────────────────
 
 @router.post("/player/{player_id}")
-async def add_player_award(player_id: str, body: dict):
+async def add_player_award(player_id: str, body: dict, background_tasks: BackgroundTasks):
     """Ajoute un award individuel à un joueur et recalcule son score.
 
     Body:
@@ -153,6 +154,8 @@ async def add_player_award(player_id: str, body: dict):
             "updated_at": now,
         }}
     )
+    if note_change_affects_estimation(player.get("note", 0.0), note):
+        background_tasks.add_task(reestimate_player_items, player_id)
 
     return {
         "player_id": player_id,
@@ -164,7 +167,7 @@ async def add_player_award(player_id: str, body: dict):
 
 
 @router.delete("/player/{player_id}/{award_id}")
-async def remove_player_award(player_id: str, award_id: str, year: str = ""):
+async def remove_player_award(player_id: str, award_id: str, background_tasks: BackgroundTasks, year: str = ""):
     """Retire un award d'un joueur et recalcule son score."""
     player = await db["players"].find_one({"player_id": player_id})
     if not player:
@@ -194,6 +197,8 @@ async def remove_player_award(player_id: str, award_id: str, year: str = ""):
             "updated_at": now,
         }}
     )
+    if note_change_affects_estimation(player.get("note", 0.0), note):
+        background_tasks.add_task(reestimate_player_items, player_id)
 
     return {
         "player_id": player_id,
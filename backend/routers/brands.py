@@ -107,7 +107,6 @@ async def create_brand_pending(
         "status":          "pending",
         "votes_up":        0,
         "votes_down":      0,
-        "voters":          [],
         "created_at":      now,
     })
 
@@ -3,10 +3,27 @@ from typing import Optional
 from datetime import datetime, timezone
 import uuid
 
+from pymongo import ReturnDocument
+
 from ..database import db, client
 from ..models import CollectionAdd, CollectionUpdate
 from ..auth import get_current_user
+from ..utils import ESTIMATION_VERSION
 from .notifications import create_notification
+from ..services.collection_summary import (
+    apply_item_added,
+    apply_item_removed,
+    apply_item_updated,
+    format_category_stats,
+    format_collection_stats,
+    get_user_summary,
+)
+from ..services.version_price_stats import (
+    apply_version_item_added,
+    apply_version_item_removed,
+    apply_version_item_updated,
+)
+from ..services.listing_snapshot import mark_listing_snapshots_stale
 
 
 router = APIRouter(prefix="/api/collections", tags=["collections"])
@@ -38,48 +55,14 @@ async def get_collection_categories(request: Request):
 @router.get("/stats")
 async def get_collection_stats(request: Request):
     user = await get_current_user(request)
-    items = await db.collections.find({"user_id": user["user_id"]}, {"_id": 0}).to_list(1000)
-    total = len(items)
-    estimates = []
-    for i in items:
-        val = i.get("estimated_price") or i.get("value_estimate") or i.get("price_estimate") or 0
-        if val and val > 0:
-            estimates.append(val)
-    low = min(estimates) * total if estimates else 0
-    avg = sum(estimates) if estimates else 0
-    high = max(estimates) * total if estimates else 0
-    return {
-        "total_jerseys": total,
-        "estimated_value": {"low": round(low, 2), "average": round(avg, 2), "high": round(high, 2)},
-        "items_with_estimates": len(estimates)
-    }
+    summary = await get_user_summary(user["user_id"])
+    return format_collection_stats(summary)
 
 @router.get("/category-stats")
 async def get_category_stats(request: Request):
     user = await get_current_user(request)
-    items = await db.collections.find({"user_id": user["user_id"]}, {"_id": 0}).to_list(1000)
-    categories = {}
-    for item in items:
-        cat = item.get("category", "General")
-        if cat not in categories:
-            categories[cat] = {"count": 0, "estimates": []}
-        categories[cat]["count"] += 1
-        val = item.get("estimated_price") or item.get("value_estimate") or item.get("price_estimate") or 0
-        if val and val > 0:
-            categories[cat]["estimates"].append(val)
-    result = []
-    for cat, data in categories.items():
-        est = data["estimates"]
-        result.append({
-            "category": cat,
-            "count": data["count"],
-            "estimated_value": {
-                "low": round(min(est), 2) if est else 0,
-                "average": round(sum(est) / len(est), 2) if est else 0,
-                "high": round(max(est), 2) if est else 0,
-            }
-        })
-    return result
+    summary = await get_user_summary(user["user_id"])
+    return format_category_stats(summary)
 
 @router.post("")
 async def add_to_collection(item: CollectionAdd, request: Request):
@@ -109,11 +92,21 @@ async def add_to_collection(item: CollectionAdd, request: Request):
         "signed_by": item.signed_by or "",
         "signed_by_player_id": item.signed_by_player_id or "",
         "signed_proof": item.signed_proof or False,
+        "signed_type": item.signed_type or "",
+        "signed_other_detail": item.signed_other_detail or "",
+        "signed_personal_message": item.signed_personal_message or False,
+        "patch": item.patch or False,
+        "is_rare": item.is_rare or False,
+        "rare_reason": item.rare_reason or "",
+        "estimation_mode": item.estimation_mode or "",
+        "estimation_version": ESTIMATION_VERSION if est_price else "",
         "condition": item.condition or "",
         "printing": item.printing or "",
         "added_at": datetime.now(timezone.utc).isoformat()
     }
     await db.collections.insert_one(doc)
+    await apply_item_added(doc)
+    await apply_version_item_added(doc)
 
     # Notifier les followers du joueur flocqué
     flocking_player_id = doc.get("flocking_player_id", "")
@@ -157,9 +150,13 @@ async def get_collection_item(collection_id: str, request: Request):
 @router.delete("/{collection_id}")
 async def remove_from_collection(collection_id: str, request: Request):
     user = await get_current_user(request)
-    result = await db.collections.delete_one({"collection_id": collection_id, "user_id": user["user_id"]})
-    if result.deleted_count == 0:
+    removed = await db.collections.find_one_and_delete(
+        {"collection_id": collection_id, "user_id": user["user_id"]}
+    )
+    if removed is None:
         raise HTTPException(status_code=404, detail="Item not found")
+    await apply_item_removed(removed)
+    await apply_version_item_removed(removed)
     return {"message": "Removed from collection"}
 
 @router.put("/{collection_id}")
@@ -173,11 +170,18 @@ async def update_collection_item(collection_id: str, update: CollectionUpdate, r
         update_dict["estimated_price"] = est_price
         update_dict["price_estimate"] = est_price
         update_dict["value_estimate"] = est_price
-    result = await db.collections.update_one(
+        update_dict["estimation_version"] = ESTIMATION_VERSION
+        # Mode inconnu → critères incomplets : la ré-estimation laissera ce prix tel quel
+        update_dict.setdefault("estimation_mode", "")
+    previous = await db.collections.find_one_and_update(
         {"collection_id": collection_id, "user_id": user["user_id"]},
-        {"$set": update_dict}
+        {"$set": update_dict},
+        return_document=ReturnDocument.BEFORE,
     )
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Item not found")
+    await apply_item_updated(previous, {**previous, **update_dict})
+    await apply_version_item_updated(previous, {**previous, **update_dict})
+    await mark_listing_snapshots_stale(collection_id=collection_id)
     updated = await db.collections.find_one({"collection_id": collection_id}, {"_id": 0})
     return updated
@@ -36,27 +36,28 @@ async def get_all_pending(master_kit_submission_id: Optional[str] = Query(defaul
     Si `master_kit_submission_id` est passé, on filtre sur les entités
     rattachées à ce master_kit (via `data.parent_submission_id` côté submissions).
     """
+    linked_ids: dict[str, list[str]] = {}
+    if master_kit_submission_id:
+        # Une seule requête pour les 5 types (au lieu d'une par type)
+        async for s in db.submissions.find(
+            {
+                "submission_type":             {"$in": list(ENTITY_CONFIG)},
+                "status":                      "pending",
+                "data.parent_submission_id":   master_kit_submission_id,
+                "data.entity_id":              {"$nin": [None, ""]},
+            },
+            {"_id": 0, "submission_type": 1, "data.entity_id": 1},
+        ):
+            linked_ids.setdefault(s["submission_type"], []).append(s["data"]["entity_id"])
+
     results: dict[str, list[dict]] = {}
     for entity_type, config in ENTITY_CONFIG.items():
         query: dict = {"status": "for_review"}
         if master_kit_submission_id:
-            linked_subs = await db.submissions.find(
-                {
-                    "submission_type":             entity_type,
-                    "status":                      "pending",
-                    "data.parent_submission_id":   master_kit_submission_id,
-                },
-                {"_id": 0, "data.entity_id": 1},
-            ).to_list(50)
-            linked_ids = [
-                s["data"]["entity_id"]
-                for s in linked_subs
-                if s.get("data", {}).get("entity_id")
-            ]
-            if not linked_ids:
+            if entity_type not in linked_ids:
                 results[entity_type] = []
                 continue
-            query[config["id_field"]] = {"$in": linked_ids}
+            query[config["id_field"]] = {"$in": linked_ids[entity_type]}
 
         docs = await db[config["collection"]].find(query, {"_id": 0}).to_list(100)
         for d in docs:
@@ -1,20 +1,15 @@
 from fastapi import APIRouter
-from ..models import EstimationRequest
+from ..models import EstimationBatchRequest, EstimationRequest
 from ..utils import calculate_estimation_for_collection_item
-from ..database import db
+from ..services.estimation_batch import estimate_many, estimation_kwargs, get_player_notes
 
 router = APIRouter(prefix="/api", tags=["estimation"])
 
 
 async def _get_player_note(player_id: str) -> float:
     """Récupère la note /100 d'un joueur depuis la DB. Retourne 0.0 si non trouvé."""
-    if not player_id:
-        return 0.0
-    player = await db.players.find_one(
-        {"player_id": player_id},
-        {"_id": 0, "note": 1}
-    )
-    return float(player.get("note") or 0.0) if player else 0.0
+    notes = await get_player_notes([player_id])
+    return notes.get(player_id, 0.0)
 
 
 @router.post("/estimate")
@@ -36,22 +31,21 @@ async def estimate_price(req: EstimationRequest):
     """
     player_note = await _get_player_note(req.flocking_player_id or "")
     result = calculate_estimation_for_collection_item(
-        model_type=req.model_type,
-        competition=req.competition or "",
-        condition_origin=req.condition_origin or "",
-        physical_state=req.physical_state or "",
-        flocking_origin=req.flocking_origin or "",
-        flocking_player_note=player_note,
-        signed=req.signed or False,
-        signed_type=req.signed_type or "",
-        signed_other_detail=req.signed_other_detail or "",
-        signed_proof=req.signed_proof or "none",
-        season_year=req.season_year or 0,
-        patch=req.patch or False,
-        is_rare=req.is_rare or False,
-        rare_reason=req.rare_reason or "",
-        mode=req.mode or "advanced",
+        **estimation_kwargs(req.model_dump(), player_note)
     )
     # Ajouter la note joueur dans la réponse pour info frontend
     result["flocking_player_note"] = player_note
     return result
+
+
+@router.post("/estimate/batch")
+async def estimate_price_batch(req: EstimationBatchRequest):
+    """
+    Estime N maillots en un appel (ré-estimation d'une collection entière).
+
+    Toutes les notes joueurs sont résolues en une requête `$in` ; chaque
+    résultat est identique à celui de POST /estimate pour le même item.
+    """
+    items = [item.model_dump() for item in req.items]
+    notes = await get_player_notes(item.get("flocking_player_id") for item in items)
+    return {"results": estimate_many(items, notes)}
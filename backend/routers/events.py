@@ -0,0 +1,67 @@
+# backend/routers/events.py
+# Flux Server-Sent Events par utilisateur : remplace le polling des
+# notifications et des badges transactions.
+# Routes:
+#   GET /api/events — text/event-stream
+#
+# À la connexion : un instantané (`counters`, `notifications`), puis les
+# événements publiés sur le bus (services/event_bus) pour cet utilisateur.
+# Commentaire `: ping` toutes les SSE_HEARTBEAT_SECONDS ; la connexion est
+# fermée après SSE_MAX_SECONDS, EventSource se reconnecte et se ré-authentifie.
+
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from ..auth import get_current_user
+from ..services.event_bus import bus
+from ..services.notification_inbox import get_unread_count
+from ..services.transaction_counters import counters_payload, get_counters
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+SSE_HEARTBEAT_SECONDS = 25
+SSE_MAX_SECONDS = 3600
+SSE_RETRY_MS = 5000
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str, separators=(',', ':'))}\n\n"
+
+
+async def sse_events(user_id: str, is_disconnected: Callable[[], Awaitable[bool]]):
+    """Générateur du flux d'un utilisateur (s'abonne avant l'instantané : rien n'est perdu)."""
+    queue = bus.subscribe(user_id)
+    started = time.monotonic()
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        counters = await get_counters(user_id)
+        unread = await get_unread_count(user_id)
+        yield format_sse("counters", counters_payload(counters))
+        yield format_sse("notifications", {"unread_count": unread})
+
+        while time.monotonic() - started < SSE_MAX_SECONDS:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            yield format_sse(event, data)
+    finally:
+        bus.unsubscribe(user_id, queue)
+
+
+@router.get("")
+async def event_stream(request: Request):
+    user = await get_current_user(request)
+    return StreamingResponse(
+        sse_events(user["user_id"], request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
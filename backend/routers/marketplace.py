@@ -1,19 +1,27 @@
 # backend/routers/marketplace.py
-from fastapi import APIRouter, HTTPException, Request, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Query
 from typing import Optional
 from datetime import datetime, timezone
 import uuid
 
+from pymongo.errors import DuplicateKeyError
+
 from ..database import db
-from ..models import ListingCreate, ListingOut, OfferCreate, OfferOut
+from ..models import ListingCreate, ListingOut, OfferCreate, OfferOut, SavedSearchCreate
 from ..auth import get_current_user
 from .notifications import create_notification
+from ..services.listing_snapshot import build_snapshot, seller_sales_counts
+from ..services.marketplace_facets import (
+    NO_FLOCKING, VALID_LISTING_TYPES, facet_counts, normalize_filters,
+)
+from ..services.listing_pagination import DEFAULT_SORT, LISTING_SORTS, InvalidCursor, browse_listings
+from ..services.saved_searches import MAX_SAVED_SEARCHES, filters_key, match_key, match_new_listing
+from ..services.wishlist_matches import notify_wishlist_holders
 from ..email_service import send_offer_received, send_offer_accepted, send_offer_refused
 
 router = APIRouter(prefix="/api/marketplace", tags=["marketplace"])
 
 MAX_ACTIVE_LISTINGS = 10
-VALID_LISTING_TYPES = {"sale", "trade", "both"}
 VALID_OFFER_TYPES = {"buy", "trade", "buy_and_trade"}
 
 
@@ -23,8 +31,7 @@ def _now() -> str:
 
 # ─── Browse ─────────────────────────────────────────────────────────────────
 
-@router.get("")
-async def list_listings(
+async def listing_filters(
     listing_type: Optional[str] = None,
     min_price: Optional[float] = Query(None, ge=0),
     max_price: Optional[float] = Query(None, ge=0),
@@ -41,105 +48,45 @@ async def list_listings(
     signed: Optional[bool] = None,
     flocking_origin: Optional[str] = None,
     size: Optional[str] = None,
+) -> dict:
+    """Filtres de navigation communs à la liste et aux facettes, normalisés."""
+    return normalize_filters(
+        listing_type=listing_type, min_price=min_price, max_price=max_price,
+        version_id=version_id, search=search, team_type=team_type,
+        club=club, brand=brand, season=season, kit_type=kit_type, league=league,
+        gender=gender, physical_state=physical_state, signed=signed,
+        flocking_origin=flocking_origin, size=size,
+    )
+
+
+@router.get("")
+async def list_listings(
+    filters: dict = Depends(listing_filters),
+    sort: str = DEFAULT_SORT,
+    cursor: Optional[str] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(48, ge=1, le=100),
 ):
-    query: dict = {"status": "active"}
-    if listing_type and listing_type in VALID_LISTING_TYPES:
-        query["listing_type"] = listing_type
-    if version_id:
-        query["version_id"] = version_id
-    if min_price is not None or max_price is not None:
-        price_filter: dict = {}
-        if min_price is not None:
-            price_filter["$gte"] = min_price
-        if max_price is not None:
-            price_filter["$lte"] = max_price
-        query["asking_price"] = price_filter
-
-    # Kit metadata filters via kit → version → collection chain
-    has_kit_filter = any([search, team_type, club, brand, season, kit_type, league, gender])
-    has_coll_filter = physical_state or signed is not None or flocking_origin or size
-
-    if has_kit_filter or has_coll_filter:
-        matching_versions = None
-        if has_kit_filter:
-            kit_query: dict = {}
-            if team_type == "club":
-                kit_query["entity_type"] = "club"
-            elif team_type == "national":
-                kit_query["entity_type"] = "national"
-            if club:      kit_query["club"] = club
-            if brand:     kit_query["brand"] = brand
-            if season:    kit_query["season"] = season
-            if kit_type:  kit_query["kit_type"] = kit_type
-            if league:    kit_query["league"] = league
-            if gender:    kit_query["gender"] = gender
-            if search:
-                kit_query["$or"] = [
-                    {"club":   {"$regex": search, "$options": "i"}},
-                    {"brand":  {"$regex": search, "$options": "i"}},
-                    {"season": {"$regex": search, "$options": "i"}},
-                ]
-            matching_kits = await db.master_kits.distinct("kit_id", kit_query)
-            matching_versions = await db.versions.distinct("version_id", {"kit_id": {"$in": matching_kits}})
-
-        coll_query: dict = {}
-        if matching_versions is not None:
-            coll_query["version_id"] = {"$in": matching_versions}
-        if physical_state:
-            coll_query["physical_state"] = physical_state
-        if signed is not None:
-            coll_query["signed"] = signed
-        if flocking_origin == "none":
-            coll_query["$or"] = [{"flocking_origin": ""}, {"flocking_origin": "none"}, {"flocking_origin": {"$exists": False}}]
-        elif flocking_origin:
-            coll_query["flocking_origin"] = flocking_origin
-        if size:
-            coll_query["size"] = size
-
-        if coll_query:
-            matching_cols = await db.collections.distinct("collection_id", coll_query)
-            query["collection_id"] = {"$in": matching_cols}
-
-    total = await db.listings.count_documents(query)
-    docs = await db.listings.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-
-    # Enrichit chaque listing avec les infos du maillot
-    for doc in docs:
-        col = await db.collections.find_one({"collection_id": doc["collection_id"]}, {"_id": 0})
-        if col:
-            version = await db.versions.find_one({"version_id": col["version_id"]}, {"_id": 0})
-            kit = await db.master_kits.find_one({"kit_id": (version or {}).get("kit_id", "")}, {"_id": 0}) if version else None
-            doc["kit_snapshot"] = {**(version or {}), **(kit or {})}
-            doc["collection_item"] = {k: col.get(k) for k in ("physical_state", "signed", "signed_by", "size", "flocking_detail")}
-        seller = await db.users.find_one({"user_id": doc["user_id"]}, {"_id": 0, "username": 1, "name": 1, "picture": 1})
-        doc["seller"] = seller or {}
+    if sort not in LISTING_SORTS:
+        raise HTTPException(status_code=422, detail=f"sort must be one of {sorted(LISTING_SORTS)}")
+    try:
+        return await browse_listings(filters, sort=sort, cursor=cursor, skip=skip, limit=limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return {"results": docs, "total": total, "skip": skip, "limit": limit}
+
+@router.get("/facets")
+async def get_marketplace_facets(filters: dict = Depends(listing_filters)):
+    """Comptes par valeur de facette pour les filtres courants (une agrégation, cache court)."""
+    return await facet_counts(filters)
 
 
 @router.get("/filters")
 async def get_marketplace_filters():
-    version_ids = await db.listings.distinct("version_id", {"status": "active"})
-    col_ids     = await db.listings.distinct("collection_id", {"status": "active"})
-    kit_ids = await db.versions.distinct("kit_id", {"version_id": {"$in": version_ids}})
-    base = {"kit_id": {"$in": kit_ids}}
-    coll_base = {"collection_id": {"$in": col_ids}}
-    clubs     = sorted([c for c in await db.master_kits.distinct("club",     base) if c])
-    brands    = sorted([b for b in await db.master_kits.distinct("brand",    base) if b])
-    seasons   = sorted([s for s in await db.master_kits.distinct("season",   base) if s], reverse=True)
-    kit_types = sorted([k for k in await db.master_kits.distinct("kit_type", base) if k])
-    leagues   = sorted([l for l in await db.master_kits.distinct("league",   base) if l])
-    genders   = sorted([g for g in await db.master_kits.distinct("gender",   base) if g])
-    sizes     = [s for s in ["XS", "S", "M", "L", "XL", "XXL", "3XL"]
-                 if s in await db.collections.distinct("size", coll_base)]
-    flockings = sorted([f for f in await db.collections.distinct("flocking_origin", coll_base)
-                        if f and f not in ("", "none")])
+    facets = (await facet_counts({}))["facets"]
     return {
-        "clubs": clubs, "brands": brands, "seasons": seasons,
-        "kit_types": kit_types, "leagues": leagues, "genders": genders,
-        "sizes": sizes, "flocking_origins": flockings,
+        name: [bucket["value"] for bucket in facets[name] if bucket["value"] != NO_FLOCKING]
+        for name in ("clubs", "brands", "seasons", "kit_types", "leagues", "genders", "sizes", "flocking_origins")
     }
 
 
@@ -172,15 +119,62 @@ async def my_offers(request: Request):
 
 @router.get("/user/{user_id}")
 async def user_listings(user_id: str):
-    docs = await db.listings.find(
-        {"user_id": user_id, "status": "active"}, {"_id": 0}
+    return await db.listings.find(
+        {"user_id": user_id, "status": "active"}, {"_id": 0, "snapshot_stale": 0}
     ).sort("created_at", -1).to_list(20)
-    for doc in docs:
-        col = await db.collections.find_one({"collection_id": doc["collection_id"]}, {"_id": 0})
-        if col:
-            version = await db.versions.find_one({"version_id": col.get("version_id", "")}, {"_id": 0})
-            doc["kit_snapshot"] = version or {}
-    return docs
+
+
+# ─── Recherches sauvegardées ────────────────────────────────────────────────
+
+@router.get("/saved-searches")
+async def list_saved_searches(request: Request):
+    user = await get_current_user(request)
+    return await db.saved_searches.find(
+        {"user_id": user["user_id"]}, {"_id": 0, "filters_key": 0, "match_key": 0}
+    ).sort("created_at", -1).to_list(MAX_SAVED_SEARCHES)
+
+
+@router.post("/saved-searches")
+async def create_saved_search(body: SavedSearchCreate, request: Request):
+    user = await get_current_user(request)
+    filters = normalize_filters(**body.model_dump(exclude={"name"}))
+    if not filters:
+        raise HTTPException(status_code=422, detail="At least one filter is required")
+
+    if await db.saved_searches.count_documents({"user_id": user["user_id"]}) >= MAX_SAVED_SEARCHES:
+        raise HTTPException(status_code=400, detail=f"Maximum {MAX_SAVED_SEARCHES} saved searches reached")
+    key = filters_key(filters)
+    if await db.saved_searches.find_one({"user_id": user["user_id"], "filters_key": key}):
+        raise HTTPException(status_code=400, detail="Search already saved")
+
+    doc = {
+        "search_id": f"srch_{uuid.uuid4().hex[:12]}",
+        "user_id": user["user_id"],
+        "name": (body.name or "").strip(),
+        "filters": filters,
+        "filters_key": key,
+        "match_key": match_key(filters),
+        "match_count": 0,
+        "last_match_at": None,
+        "created_at": _now(),
+    }
+    try:
+        await db.saved_searches.insert_one(doc)
+    except DuplicateKeyError:
+        # Même recherche enregistrée en parallèle (index unique user_id + filters_key)
+        raise HTTPException(status_code=400, detail="Search already saved")
+    return await db.saved_searches.find_one(
+        {"search_id": doc["search_id"]}, {"_id": 0, "filters_key": 0, "match_key": 0}
+    )
+
+
+@router.delete("/saved-searches/{search_id}")
+async def delete_saved_search(search_id: str, request: Request):
+    user = await get_current_user(request)
+    result = await db.saved_searches.delete_one({"search_id": search_id, "user_id": user["user_id"]})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    return {"message": "Saved search deleted"}
 
 
 @router.get("/{listing_id}")
@@ -230,7 +224,7 @@ async def get_listing(listing_id: str, request: Request):
 # ─── Créer / modifier / annuler un listing ──────────────────────────────────
 
 @router.post("", response_model=ListingOut)
-async def create_listing(body: ListingCreate, request: Request):
+async def create_listing(body: ListingCreate, request: Request, background_tasks: BackgroundTasks):
     user = await get_current_user(request)
 
     if body.listing_type not in VALID_LISTING_TYPES:
@@ -279,8 +273,15 @@ async def create_listing(body: ListingCreate, request: Request):
         "created_at": now,
         "updated_at": now,
     }
+    version = await db.versions.find_one({"version_id": doc["version_id"]}, {"_id": 0}) if doc["version_id"] else None
+    kit = await db.master_kits.find_one({"kit_id": version["kit_id"]}, {"_id": 0}) if version and version.get("kit_id") else None
+    sales = await seller_sales_counts([user["user_id"]])
+    doc.update(build_snapshot(col, version, kit, {**user, "completed_sales": sales.get(user["user_id"], 0)}))
     await db.listings.insert_one(doc)
     result = await db.listings.find_one({"listing_id": doc["listing_id"]}, {"_id": 0})
+    # Alertes (recherches sauvegardées, wishlists), après la réponse
+    background_tasks.add_task(match_new_listing, result)
+    background_tasks.add_task(notify_wishlist_holders, result)
     return result
 
 
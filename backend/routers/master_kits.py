@@ -294,7 +294,6 @@ async def submit_master_kit(kit: MasterKitCreate, request: Request):
         "status": "pending",
         "votes_up": 0,
         "votes_down": 0,
-        "voters": [],
         "created_at": now,
     }
     await db.submissions.insert_one(sub_doc)
@@ -1,9 +1,15 @@
 # backend/routers/notifications.py
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Query, Request
 from datetime import datetime, timezone
+from typing import Optional
 import uuid
 from ..database import db, client
 from ..auth import get_current_user
+from ..services.event_bus import publish
+from ..services.notification_inbox import (
+    MAX_NOTIFICATION_PAGE_SIZE, NOTIFICATION_PAGE_SIZE, InvalidCursor,
+    decrement_unread, get_unread_count, increment_unread, list_notifications, read_update,
+)
 
 router = APIRouter(prefix="/api/notifications", tags=["notifications"])
 
@@ -22,7 +28,24 @@ async def create_notification(
     submission_id: str = "",
 ):
     """Crée une notification en base pour un utilisateur donné."""
-    doc = {
+    doc = build_notification(user_id, notif_type, title, message, target_type, target_id, submission_id)
+    await db.notifications.insert_one(doc)
+    await increment_unread(user_id)
+    await publish(user_id, "notification", doc)
+    return doc
+
+
+def build_notification(
+    user_id: str,
+    notif_type: str,
+    title: str,
+    message: str,
+    target_type: str = "",
+    target_id: str = "",
+    submission_id: str = "",
+) -> dict:
+    """Document de notification, pour les envois groupés (`insert_many`)."""
+    return {
         "notification_id": f"notif_{uuid.uuid4().hex[:12]}",
         "user_id": user_id,
         "type": notif_type,
@@ -34,8 +57,6 @@ async def create_notification(
         "read": False,
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
-    await db.notifications.insert_one(doc)
-    return doc
 
 
 # ─────────────────────────────────────────────
@@ -43,31 +64,29 @@ async def create_notification(
 # ─────────────────────────────────────────────
 
 @router.get("")
-async def get_notifications(request: Request):
-    """Récupère les notifications de l'utilisateur connecté (les 50 dernières)."""
+async def get_notifications(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(NOTIFICATION_PAGE_SIZE, ge=1, le=MAX_NOTIFICATION_PAGE_SIZE),
+):
+    """Notifications de l'utilisateur connecté, plus récentes d'abord ; `next_cursor` pour la suite."""
     user = await get_current_user(request)
-    notifs = (
-        await db.notifications.find(
-            {"user_id": user["user_id"]}, {"_id": 0}
-        )
-        .sort("created_at", -1)
-        .limit(50)
-        .to_list(50)
-    )
-    unread_count = await db.notifications.count_documents(
-        {"user_id": user["user_id"], "read": False}
-    )
-    return {"notifications": notifs, "unread_count": unread_count}
+    try:
+        page = await list_notifications(user["user_id"], cursor=cursor, limit=limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**page, "unread_count": await get_unread_count(user["user_id"])}
 
 
 @router.patch("/{notification_id}/read")
 async def mark_as_read(notification_id: str, request: Request):
     """Marque une notification comme lue."""
     user = await get_current_user(request)
-    await db.notifications.update_one(
-        {"notification_id": notification_id, "user_id": user["user_id"]},
-        {"$set": {"read": True}},
+    result = await db.notifications.update_one(
+        {"notification_id": notification_id, "user_id": user["user_id"], "read": False},
+        {"$set": read_update()},
     )
+    await decrement_unread(user["user_id"], result.modified_count)
     return {"ok": True}
 
 
@@ -75,10 +94,11 @@ async def mark_as_read(notification_id: str, request: Request):
 async def mark_all_read(request: Request):
     """Marque toutes les notifications de l'utilisateur comme lues."""
     user = await get_current_user(request)
-    await db.notifications.update_many(
+    result = await db.notifications.update_many(
         {"user_id": user["user_id"], "read": False},
-        {"$set": {"read": True}},
+        {"$set": read_update()},
     )
+    await decrement_unread(user["user_id"], result.modified_count)
     return {"ok": True}
 
 
@@ -86,7 +106,10 @@ async def mark_all_read(request: Request):
 async def delete_notification(notification_id: str, request: Request):
     """Supprime une notification."""
     user = await get_current_user(request)
-    await db.notifications.delete_one(
-        {"notification_id": notification_id, "user_id": user["user_id"]}
+    deleted = await db.notifications.find_one_and_delete(
+        {"notification_id": notification_id, "user_id": user["user_id"]},
+        projection={"_id": 0, "read": 1},
     )
+    if deleted and not deleted.get("read"):
+        await decrement_unread(user["user_id"])
     return {"ok": True}
@@ -147,7 +147,6 @@ async def create_player_pending(
         "status":          "pending",
         "votes_up":        0,
         "votes_down":      0,
-        "voters":          [],
         "created_at":      now,
     })
 
@@ -10,7 +10,7 @@ IMPORTANT: les routes statiques sont déclarées AVANT les dynamiques
 (/{player_id}) pour éviter qu'un mot-clé soit interprété comme un player_id.
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
 from datetime import datetime, timezone
 import re
 
@@ -21,6 +21,7 @@ from ..services.scoring import (
     compute_note,
     _dedup_honours,
 )
+from ..services.reestimation import note_change_affects_estimation, reestimate_player_items
 
 router = APIRouter(prefix="/api/scoring/players", tags=["players-scoring"])
 
@@ -206,7 +207,11 @@ async def get_player_scoring(player_id: str):
 
 
 @router.patch("/{player_id}/aura")
-async def update_player_aura(player_id: str, aura: float = Query(..., ge=0, le=100)):
+async def update_player_aura(
+    player_id: str,
+    background_tasks: BackgroundTasks,
+    aura: float = Query(..., ge=0, le=100),
+):
     player = await db["players"].find_one({"player_id": player_id})
     if not player:
         raise HTTPException(status_code=404, detail="Joueur introuvable")
@@ -234,6 +239,8 @@ async def update_player_aura(player_id: str, aura: float = Query(..., ge=0, le=1
             "updated_at": now,
         }},
     )
+    if note_change_affects_estimation(player.get("note", 0.0), note):
+        background_tasks.add_task(reestimate_player_items, player_id)
     return {
         "player_id": player_id,
         "aura": aura,
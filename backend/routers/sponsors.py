@@ -127,7 +127,6 @@ async def create_sponsor_pending(
         "status":          "pending",
         "votes_up":        0,
         "votes_down":      0,
-        "voters":          [],
         "created_at":      now,
     })
     return await db.sponsors.find_one({"sponsor_id": sponsor_id}, {"_id": 0})
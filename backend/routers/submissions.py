@@ -2,36 +2,34 @@ from fastapi import APIRouter, HTTPException, Request
 from typing import Optional
 from datetime import datetime, timezone
 import uuid
-import os
-import httpx
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from ..database import db, client
 from ..models import SubmissionCreate, VoteCreate, ReportCreate
 from ..auth import get_current_user
-from ..utils import slugify, APPROVAL_THRESHOLD, get_or_create_team_by_name, check_user_quota, normalize_season
+from ..utils import (
+    APPROVAL_THRESHOLD, get_or_create_team_by_name, check_user_quota, release_user_quota, normalize_season,
+)
+from ..services.approval_engine import (
+    ENTITY_COLLECTIONS, MASTER_KIT_REQUIRED_CREATE_FIELDS, approve_submission, reject_submission,
+)
+from ..services.listing_snapshot import mark_listing_snapshots_stale
+from ..services.moderation_queue import (
+    SUBMISSION_LIST_PROJECTION, QUEUE_SORT, cursor_filter, get_queue, hydrate_usernames,
+    list_pending_refs,
+)
 from .notifications import create_notification
 from ..email_service import send_submission_result, send_report_result
 
 router = APIRouter(prefix="/api", tags=["submissions"])
 
-ENTITY_COLLECTIONS = {
-    "team":    {"collection": "teams",    "id_field": "team_id",    "name_field": "name"},
-    "league":  {"collection": "leagues",  "id_field": "league_id",  "name_field": "name"},
-    "brand":   {"collection": "brands",   "id_field": "brand_id",   "name_field": "name"},
-    "player":  {"collection": "players",  "id_field": "player_id",  "name_field": "full_name"},
-    "sponsor": {"collection": "sponsors", "id_field": "sponsor_id", "name_field": "name"},
+# Référence d'entité créée avec un kit : approuvée avec son parent, jamais votée directement
+_ENTITY_REFERENCE_FILTER = {
+    "submission_type": {"$in": list(ENTITY_COLLECTIONS)},
+    "data.mode": {"$in": ["create", None]},
+    "data.parent_submission_id": {"$nin": [None, ""]},
 }
 
-KIT_ID_FIELDS = {
-    "team":    "team_id",
-    "brand":   "brand_id",
-    "league":  "league_id",
-    "sponsor": "sponsor_id",
-}
-
-IMAGE_FIELDS = {"logo_url", "crest_url", "photo_url", "stadium_image_url"}
-VERSION_IMAGE_FIELDS = {"front_photo", "back_photo"}
-MASTER_KIT_IMAGE_FIELDS = {"front_photo"}
-
 SUBMISSION_TYPE_LABELS = {
     "master_kit": "maillot",
     "version":    "version de maillot",
@@ -42,46 +40,6 @@ SUBMISSION_TYPE_LABELS = {
     "sponsor":    "sponsor",
 }
 
-# Champs obligatoires pour créer un nouveau master_kit
-MASTER_KIT_REQUIRED_CREATE_FIELDS = ["club", "season", "kit_type", "brand", "front_photo"]
-
-_receiver_url_raw = os.getenv("RECEIVER_URL", "http://172.17.0.1:8001/receive-upload")
-RECEIVER_BASE_URL = os.getenv(
-    "RECEIVER_BASE_URL",
-    _receiver_url_raw.replace("/receive-upload", "").rstrip("/")
-)
-RECEIVER_SECRET = os.getenv("RECEIVER_SECRET", "changeme")
-MEDIA_BASE_URL  = os.getenv("MEDIA_BASE_URL", "https://nas.topkit.app")
-
-
-def _url_to_relative_path(url: str) -> Optional[str]:
-    if url.startswith("/api/images/"):
-        return url[len("/api/images/"):]
-    for prefix in (MEDIA_BASE_URL.rstrip("/"), "https://82.67.103.45", "http://82.67.103.45"):
-        if url.startswith(prefix + "/"):
-            return url[len(prefix) + 1:]
-    return None
-
-
-async def _delete_freebox_file(old_url: str) -> None:
-    if not old_url:
-        return
-    relative = _url_to_relative_path(old_url)
-    if not relative:
-        print(f"[DELETE FILE] URL non reconnue, skip: {old_url}")
-        return
-    try:
-        async with httpx.AsyncClient(timeout=5.0, verify=False) as client:
-            resp = await client.delete(
-                f"{RECEIVER_BASE_URL}/delete-file",
-                params={"relative_path": relative},
-                headers={"x-secret": RECEIVER_SECRET},
-            )
-            print(f"[DELETE FILE] {relative} -> {resp.status_code}")
-    except Exception as e:
-        print(f"[DELETE FILE] Erreur suppression {relative}: {e}")
-
-
 def _submission_name(sub: dict) -> str:
     data = sub.get("data", {})
     return (
@@ -102,42 +60,46 @@ async def _get_user_email_and_name(user_id: str) -> tuple[str, str]:
     return "", ""
 
 
-async def _apply_master_kit_removal(kit_id: str) -> None:
-    """Supprime un master_kit et toutes ses versions + photos associées."""
-    old_kit = await db.master_kits.find_one({"kit_id": kit_id}, {"_id": 0})
-    if old_kit:
-        for field in MASTER_KIT_IMAGE_FIELDS:
-            url = old_kit.get(field, "")
-            if url:
-                await _delete_freebox_file(url)
-    versions = await db.versions.find({"kit_id": kit_id}, {"_id": 0}).to_list(200)
-    for ver in versions:
-        for field in VERSION_IMAGE_FIELDS:
-            url = ver.get(field, "")
-            if url:
-                await _delete_freebox_file(url)
-    await db.versions.delete_many({"kit_id": kit_id})
-    await db.master_kits.delete_one({"kit_id": kit_id})
-    print(f"[MASTER KIT REMOVAL] kit_id={kit_id} supprimé avec {len(versions)} version(s)")
-
-
-async def _apply_master_kit_edit(kit_id: str, data: dict, submitted_by: str) -> None:
-    """Met à jour un master_kit existant."""
-    now_iso = datetime.now(timezone.utc).isoformat()
-    old_kit = await db.master_kits.find_one({"kit_id": kit_id}, {"_id": 0})
-    update_fields = {k: v for k, v in data.items()
-                     if k not in ("mode", "kit_id", "entity_id") and v not in (None, "", [])}
-    if "season" in update_fields:
-        update_fields["season"] = normalize_season(update_fields["season"])
-    update_fields["updated_at"] = now_iso
-    if old_kit:
-        for field in MASTER_KIT_IMAGE_FIELDS:
-            new_url = update_fields.get(field)
-            old_url = old_kit.get(field, "")
-            if new_url and old_url and new_url != old_url:
-                await _delete_freebox_file(old_url)
-    await db.master_kits.update_one({"kit_id": kit_id}, {"$set": update_fields})
-    print(f"[MASTER KIT EDIT] kit_id={kit_id} mis à jour")
+async def _attach_viewer_votes(request: Request, subs: list[dict]) -> None:
+    """Ajoute `my_vote` ("up" | "down" | None) et `has_voted` pour l'utilisateur connecté, en une requête.
+
+    `has_voted` est vrai dès qu'un vote existe : les votes migrés depuis
+    `voters` n'ont pas de sens connu (`vote` = None).
+    """
+    try:
+        viewer = await get_current_user(request)
+    except HTTPException:
+        return
+    ids = [s["submission_id"] for s in subs]
+    votes = {
+        v["submission_id"]: v.get("vote")
+        async for v in db.submission_votes.find(
+            {"submission_id": {"$in": ids}, "user_id": viewer["user_id"]},
+            {"_id": 0, "submission_id": 1, "vote": 1},
+        )
+    }
+    for s in subs:
+        s["my_vote"] = votes.get(s["submission_id"])
+        s["has_voted"] = s["submission_id"] in votes
+
+
+async def _raise_vote_refused(submission_id: str, user_id: str) -> None:
+    """Le vote atomique n'a rien modifié : relit la soumission pour expliquer pourquoi."""
+    sub = await db.submissions.find_one(
+        {"submission_id": submission_id},
+        {"_id": 0, "submission_type": 1, "status": 1, "data.mode": 1, "data.parent_submission_id": 1},
+    )
+    if not sub:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    if sub["submission_type"] in ENTITY_COLLECTIONS:
+        if sub["data"].get("mode", "create") == "create" and sub["data"].get("parent_submission_id"):
+            raise HTTPException(
+                status_code=400,
+                detail="Entity reference submissions are approved automatically when their parent kit is approved."
+            )
+    if sub["status"] != "pending":
+        raise HTTPException(status_code=400, detail="Submission is no longer pending")
+    raise HTTPException(status_code=400, detail="Already voted")
 
 
 # ─────────────────────────────────────────────
@@ -150,9 +112,25 @@ async def create_submission(sub: SubmissionCreate, request: Request):
     if sub.submission_type not in ("master_kit", "version", "team", "league", "brand", "player", "sponsor"):
         raise HTTPException(status_code=400, detail="Invalid submission type")
 
-    if user.get("role", "user") == "user":
-        await check_user_quota(db, user["user_id"], sub.submission_type)
+    if user.get("role", "user") != "user":
+        submission, _ = await _create_submission(sub, user)
+        return submission
 
+    quota_hour = await check_user_quota(db, user["user_id"], sub.submission_type)
+    try:
+        submission, created = await _create_submission(sub, user)
+    except HTTPException:
+        await release_user_quota(db, user["user_id"], sub.submission_type, quota_hour)
+        raise
+    if not created:
+        # Mise à jour d'une soumission déjà en attente : ne consomme pas de quota
+        await release_user_quota(db, user["user_id"], sub.submission_type, quota_hour)
+    return submission
+
+
+async def _create_submission(sub: SubmissionCreate, user: dict) -> tuple[dict, bool]:
+    """Crée la soumission ; retourne (soumission, créée) — créée=False si un
+    upsert edit/removal a mis à jour une soumission en attente existante."""
     data = sub.data
     if isinstance(data, dict) and data.get("season"):
         data["season"] = normalize_season(data["season"])
@@ -171,7 +149,7 @@ async def create_submission(sub: SubmissionCreate, request: Request):
         data["kit_id"] = kit_id
 
         submission_id = f"sub_{uuid.uuid4().hex[:12]}"
-        await db.submissions.update_one(
+        upsert = await db.submissions.update_one(
             {
                 "data.kit_id": kit_id,
                 "submission_type": "master_kit",
@@ -189,7 +167,6 @@ async def create_submission(sub: SubmissionCreate, request: Request):
                 "status": "pending",
                 "votes_up": 0,
                 "votes_down": 0,
-                "voters": [],
                 "created_at": now,
             }},
             upsert=True
@@ -198,7 +175,7 @@ async def create_submission(sub: SubmissionCreate, request: Request):
             {"data.kit_id": kit_id, "submission_type": "master_kit", "data.mode": mode, "status": "pending"},
             {"_id": 0}
         )
-        return result
+        return result, upsert.upserted_id is not None
 
     # GUARD: Pour master_kit sans mode explicite "create", vérifier les champs obligatoires
     # avant de tomber dans l'insert_one générique. Cela empêche qu'un removal/edit mal formé
@@ -220,7 +197,7 @@ async def create_submission(sub: SubmissionCreate, request: Request):
     # Upsert pour éviter les doublons en mode edit sur les entités
     if entity_id and mode in ("edit", "removal"):
         submission_id = f"sub_{uuid.uuid4().hex[:12]}"
-        await db.submissions.update_one(
+        upsert = await db.submissions.update_one(
             {
                 "data.entity_id": entity_id,
                 "submission_type": sub.submission_type,
@@ -238,7 +215,6 @@ async def create_submission(sub: SubmissionCreate, request: Request):
                 "status": "pending",
                 "votes_up": 0,
                 "votes_down": 0,
-                "voters": [],
                 "created_at": now,
             }},
             upsert=True
@@ -247,7 +223,7 @@ async def create_submission(sub: SubmissionCreate, request: Request):
             {"data.entity_id": entity_id, "submission_type": sub.submission_type, "data.mode": mode, "status": "pending"},
             {"_id": 0}
         )
-        return result
+        return result, upsert.upserted_id is not None
 
     doc = {
         "submission_id": f"sub_{uuid.uuid4().hex[:12]}",
@@ -259,44 +235,16 @@ async def create_submission(sub: SubmissionCreate, request: Request):
         "status": "pending",
         "votes_up": 0,
         "votes_down": 0,
-        "voters": [],
         "created_at": now,
     }
     await db.submissions.insert_one(doc)
     result = await db.submissions.find_one({"submission_id": doc["submission_id"]}, {"_id": 0})
-    return result
+    return result, True
 
 
 @router.get("/pending/refs")
 async def get_pending_refs(master_kit_submission_id: str):
-    refs = {}
-    for etype, cfg in ENTITY_COLLECTIONS.items():
-        subs = await db.submissions.find(
-            {
-                "submission_type": etype,
-                "status": "pending",
-                "data.parent_submission_id": master_kit_submission_id
-            },
-            {"_id": 0}
-        ).to_list(50)
-
-        items = []
-        for s in subs:
-            name = (
-                s.get("data", {}).get("name")
-                or s.get("data", {}).get("full_name")
-                or "—"
-            )
-            items.append({
-                "submission_id": s["submission_id"],
-                "name": name,
-                "status": s["status"],
-                "entity_type": etype,
-            })
-        if items:
-            refs[etype] = items
-
-    return refs
+    return await list_pending_refs(master_kit_submission_id, list(ENTITY_COLLECTIONS))
 
 
 @router.get("/pending/submission-id")
@@ -312,24 +260,47 @@ async def get_submission_for_entity(entity_type: str, entity_id: str):
 
 
 @router.get("/submissions")
-async def list_submissions(status: Optional[str] = "pending", skip: int = 0, limit: int = 50):
-    query = {}
+async def list_submissions(
+    request: Request,
+    status: Optional[str] = "pending",
+    skip: int = 0,
+    limit: int = 50,
+    before: Optional[str] = None,
+    before_id: Optional[str] = None,
+):
+    query = cursor_filter(before, before_id)
     if status:
         query["status"] = status
-    subs = await db.submissions.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    for s in subs:
-        if not s.get("submitter_username") and s.get("submitted_by"):
-            u = await db.users.find_one({"user_id": s["submitted_by"]}, {"_id": 0, "username": 1})
-            if u:
-                s["submitter_username"] = u.get("username", "")
+    subs = await db.submissions.find(query, SUBMISSION_LIST_PROJECTION).sort(list(QUEUE_SORT.items())).skip(skip).limit(limit).to_list(limit)
+    await hydrate_usernames(subs)
+    await _attach_viewer_votes(request, subs)
     return subs
 
 
+@router.get("/submissions/queue")
+async def get_moderation_queue(
+    request: Request,
+    status: Optional[str] = "pending",
+    limit: int = 50,
+    before: Optional[str] = None,
+    before_id: Optional[str] = None,
+    submission_type: Optional[str] = None,
+):
+    """File de modération : page + compteurs par type + curseur suivant."""
+    queue = await get_queue(
+        status=status, limit=limit, before=before, before_id=before_id,
+        submission_types=submission_type.split(",") if submission_type else None,
+    )
+    await _attach_viewer_votes(request, queue["items"])
+    return queue
+
+
 @router.get("/submissions/{submission_id}")
-async def get_submission(submission_id: str):
-    sub = await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0})
+async def get_submission(submission_id: str, request: Request):
+    sub = await db.submissions.find_one({"submission_id": submission_id}, SUBMISSION_LIST_PROJECTION)
     if not sub:
         raise HTTPException(status_code=404, detail="Submission not found")
+    await _attach_viewer_votes(request, [sub])
     return sub
 
 
@@ -344,21 +315,6 @@ async def vote_on_submission(submission_id: str, vote: VoteCreate, request: Requ
         if col_count == 0:
             raise HTTPException(status_code=403, detail="You must have at least 1 jersey in your collection to vote")
 
-    sub = await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0})
-    if not sub:
-        raise HTTPException(status_code=404, detail="Submission not found")
-
-    if sub["submission_type"] in ("team", "league", "brand", "player", "sponsor"):
-        if sub["data"].get("mode", "create") == "create" and sub["data"].get("parent_submission_id"):
-            raise HTTPException(
-                status_code=400,
-                detail="Entity reference submissions are approved automatically when their parent kit is approved."
-            )
-
-    if sub["status"] != "pending":
-        raise HTTPException(status_code=400, detail="Submission is no longer pending")
-    if user["user_id"] in sub.get("voters", []):
-        raise HTTPException(status_code=400, detail="Already voted")
     if vote.vote not in ("up", "down"):
         raise HTTPException(status_code=400, detail="Vote must be 'up' or 'down'")
 
@@ -371,165 +327,45 @@ async def vote_on_submission(submission_id: str, vote: VoteCreate, request: Requ
 
     inc_field = "votes_up" if vote.vote == "up" else "votes_down"
 
-    await db.submissions.update_one(
-        {"submission_id": submission_id},
-        {"$inc": {inc_field: vote_weight}, "$push": {"voters": user["user_id"]}}
-    )
+    # L'index unique (submission_id, user_id) garantit un vote par utilisateur ;
+    # les gardes restantes (en attente, pas une référence d'entité) sont dans
+    # le filtre du $inc, dont le post-image sert au seuil.
+    try:
+        await db.submission_votes.insert_one({
+            "submission_id": submission_id,
+            "user_id": user["user_id"],
+            "vote": vote.vote,
+            "weight": vote_weight,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        })
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Already voted")
 
-    updated_sub = await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0})
+    updated_sub = await db.submissions.find_one_and_update(
+        {
+            "submission_id": submission_id,
+            "status": "pending",
+            "voters": {"$ne": user["user_id"]},  # votes antérieurs à la migration submission_votes
+            "$nor": [_ENTITY_REFERENCE_FILTER],
+        },
+        {"$inc": {inc_field: vote_weight}},
+        projection=SUBMISSION_LIST_PROJECTION | {"_id": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if updated_sub is None:
+        await db.submission_votes.delete_one({"submission_id": submission_id, "user_id": user["user_id"]})
+        await _raise_vote_refused(submission_id, user["user_id"])
+    updated_sub.pop("_id", None)
     submitter_id = updated_sub.get("submitted_by", "")
     sub_name = _submission_name(updated_sub)
     sub_type_label = SUBMISSION_TYPE_LABELS.get(updated_sub["submission_type"], updated_sub["submission_type"])
 
     # ─── APPROBATION ─────────────────────────────────────────────────────────
-    if updated_sub["votes_up"] >= APPROVAL_THRESHOLD:
+    if updated_sub.get("votes_up", 0) >= APPROVAL_THRESHOLD:
         try:
-            data = updated_sub["data"]
-            kit_submission_id = updated_sub["submission_id"]
-            master_kit_mode = data.get("mode", "create") if updated_sub["submission_type"] == "master_kit" else None
-
-            if updated_sub["submission_type"] == "master_kit":
-                now_iso = datetime.now(timezone.utc).isoformat()
-
-                if master_kit_mode == "removal":
-                    kit_id = data.get("kit_id", "") or data.get("entity_id", "")
-                    if kit_id:
-                        await _apply_master_kit_removal(kit_id)
-                    else:
-                        print(f"[MASTER KIT REMOVAL] kit_id manquant dans submission {kit_submission_id}, skip")
-
-                elif master_kit_mode == "edit":
-                    kit_id = data.get("kit_id", "") or data.get("entity_id", "")
-                    if kit_id:
-                        await _apply_master_kit_edit(kit_id, data, updated_sub["submitted_by"])
-                    else:
-                        print(f"[MASTER KIT EDIT] kit_id manquant dans submission {kit_submission_id}, skip")
-
-                else:
-                    # mode create — GUARD: vérifier les champs obligatoires avant d'insérer
-                    missing_fields = [f for f in MASTER_KIT_REQUIRED_CREATE_FIELDS if not data.get(f)]
-                    if missing_fields:
-                        print(f"[MASTER KIT CREATE] Création refusée pour submission {kit_submission_id} "
-                              f"— champs manquants : {missing_fields}. "
-                              f"mode='{master_kit_mode}' — possible removal/edit mal routé.")
-                        # On approuve la submission sans créer de kit pour éviter le blocage
-                    else:
-                        kit_id = f"kit_{uuid.uuid4().hex[:12]}"
-                        season = normalize_season(data.get("season", ""))
-                        kit_doc = {
-                            "kit_id":      kit_id,
-                            "club":        data.get("club", ""),
-                            "season":      season,
-                            "kit_type":    data.get("kit_type", ""),
-                            "brand":       data.get("brand", ""),
-                            "front_photo": data.get("front_photo", ""),
-                            "league":      data.get("league", ""),
-                            "design":      data.get("design", ""),
-                            "sponsor":     data.get("sponsor", ""),
-                            "gender":      data.get("gender", ""),
-                            "team_id":     data.get("team_id", ""),
-                            "league_id":   data.get("league_id", ""),
-                            "brand_id":    data.get("brand_id", ""),
-                            "created_by":  updated_sub["submitted_by"],
-                            "created_at":  now_iso,
-                        }
-                        await db.master_kits.insert_one(kit_doc)
-                        await db.versions.insert_one({
-                            "version_id":  f"ver_{uuid.uuid4().hex[:12]}",
-                            "kit_id":      kit_id,
-                            "competition": "National Championship",
-                            "model":       "Replica",
-                            "sku_code":    "",
-                            "ean_code":    "",
-                            "front_photo": data.get("front_photo", ""),
-                            "back_photo":  "",
-                            "created_by":  updated_sub["submitted_by"],
-                            "created_at":  now_iso,
-                        })
-
-                        linked_entity_subs = await db.submissions.find(
-                            {
-                                "submission_type": {"$in": ["team", "league", "brand", "player", "sponsor"]},
-                                "status": "pending",
-                                "data.parent_submission_id": kit_submission_id
-                            },
-                            {"_id": 0}
-                        ).to_list(50)
-
-                        kit_patch = {}
-                        for entity_sub in linked_entity_subs:
-                            new_entity_id = await _apply_entity_submission(entity_sub)
-                            await db.submissions.update_one(
-                                {"submission_id": entity_sub["submission_id"]},
-                                {"$set": {"status": "approved", "updated_at": now_iso}}
-                            )
-                            etype = entity_sub["submission_type"]
-                            if etype in KIT_ID_FIELDS and new_entity_id:
-                                kit_patch[KIT_ID_FIELDS[etype]] = new_entity_id
-
-                        if kit_patch:
-                            await db.master_kits.update_one({"kit_id": kit_id}, {"$set": kit_patch})
-
-                        for cfg in ENTITY_COLLECTIONS.values():
-                            await db[cfg["collection"]].update_many(
-                                {"submission_id": kit_submission_id, "status": "pending"},
-                                {"$set": {"status": "approved", "updated_at": now_iso}}
-                            )
-
-            elif updated_sub["submission_type"] == "version":
-                version_mode = data.get("mode", "create")
-                version_id   = data.get("version_id", "")
-                now_iso      = datetime.now(timezone.utc).isoformat()
-
-                if version_mode == "edit" and version_id:
-                    old_ver = await db.versions.find_one({"version_id": version_id}, {"_id": 0})
-                    update_fields = {k: v for k, v in data.items()
-                                     if k not in ("mode", "version_id") and v not in (None, "", [])}
-                    update_fields["updated_at"] = now_iso
-                    if old_ver:
-                        for field in VERSION_IMAGE_FIELDS:
-                            new_url = update_fields.get(field)
-                            old_url = old_ver.get(field, "")
-                            if new_url and old_url and new_url != old_url:
-                                await _delete_freebox_file(old_url)
-                    await db.versions.update_one(
-                        {"version_id": version_id},
-                        {"$set": update_fields}
-                    )
-                    print(f"[VERSION EDIT] version_id={version_id} mise à jour")
-
-                elif version_mode == "removal" and version_id:
-                    old_ver = await db.versions.find_one({"version_id": version_id}, {"_id": 0})
-                    if old_ver:
-                        for field in VERSION_IMAGE_FIELDS:
-                            url = old_ver.get(field, "")
-                            if url:
-                                await _delete_freebox_file(url)
-                    await db.versions.delete_one({"version_id": version_id})
-                    print(f"[VERSION REMOVAL] version_id={version_id} supprimée")
-
-                else:
-                    await db.versions.insert_one({
-                        "version_id":  f"ver_{uuid.uuid4().hex[:12]}",
-                        "kit_id":      data.get("kit_id", ""),
-                        "competition": data.get("competition", ""),
-                        "model":       data.get("model", ""),
-                        "sku_code":    data.get("sku_code", ""),
-                        "ean_code":    data.get("ean_code", ""),
-                        "front_photo": data.get("front_photo", ""),
-                        "back_photo":  data.get("back_photo", ""),
-                        "created_by":  updated_sub["submitted_by"],
-                        "created_at":  datetime.now(timezone.utc).isoformat()
-                    })
-
-            elif updated_sub["submission_type"] in ("team", "league", "brand", "player", "sponsor"):
-                if not data.get("parent_submission_id"):
-                    await _apply_entity_submission(updated_sub)
-
-            await db.submissions.update_one(
-                {"submission_id": submission_id},
-                {"$set": {"status": "approved"}}
-            )
+            result = await approve_submission(submission_id, approved_by=user["user_id"])
+            if result["status"] != "approved":
+                return await db.submissions.find_one({"submission_id": submission_id}, SUBMISSION_LIST_PROJECTION)
 
             if submitter_id:
                 await create_notification(
@@ -538,7 +374,7 @@ async def vote_on_submission(submission_id: str, vote: VoteCreate, request: Requ
                     title="Soumission approuvée ✅",
                     message=f"Votre {sub_type_label} « {sub_name} » a été approuvé(e) par la communauté.",
                     target_type=updated_sub["submission_type"],
-                    target_id=updated_sub.get("data", {}).get("kit_id", ""),
+                    target_id=updated_sub.get("data", {}).get("kit_id", "") or result.get("kit_id", ""),
                     submission_id=submission_id,
                 )
                 email, name = await _get_user_email_and_name(submitter_id)
@@ -546,46 +382,15 @@ async def vote_on_submission(submission_id: str, vote: VoteCreate, request: Requ
                     await send_submission_result(email, name, sub_name, approved=True)
 
         except Exception as e:
+            # La soumission est remise en `pending` par le moteur : le prochain vote rejoue l'approbation
             print(f"[CASCADE ERROR] {e}")
 
     # ─── REJET ───────────────────────────────────────────────────────────────
-    elif updated_sub["votes_down"] >= APPROVAL_THRESHOLD:
-        now_iso = datetime.now(timezone.utc).isoformat()
-        kit_submission_id = updated_sub["submission_id"]
-
-        if updated_sub["submission_type"] == "master_kit":
-            await db.submissions.update_many(
-                {
-                    "submission_type": {"$in": ["team", "league", "brand", "player", "sponsor"]},
-                    "status": "pending",
-                    "data.parent_submission_id": kit_submission_id
-                },
-                {"$set": {"status": "rejected", "updated_at": now_iso}}
-            )
-            for cfg in ENTITY_COLLECTIONS.values():
-                await db[cfg["collection"]].update_many(
-                    {"submission_id": kit_submission_id, "status": "pending"},
-                    {"$set": {"status": "rejected", "updated_at": now_iso}}
-                )
-
-        await db.submissions.update_one(
-            {"submission_id": submission_id},
-            {"$set": {"status": "rejected"}}
-        )
-
-        # Supprime les images orphelines si rejet d'un edit
-        data_rej = updated_sub.get("data", {})
-        mode_rej = data_rej.get("mode", "create")
-        if mode_rej == "edit":
-            orphan_fields = (
-                VERSION_IMAGE_FIELDS
-                if updated_sub["submission_type"] == "version"
-                else MASTER_KIT_IMAGE_FIELDS
-            )
-            for field in orphan_fields:
-                orphan_url = data_rej.get(field)
-                if orphan_url:
-                    await _delete_freebox_file(orphan_url)
+    elif updated_sub.get("votes_down", 0) >= APPROVAL_THRESHOLD:
+        # Transition pending → rejected réclamée atomiquement : un seul vote déclenche la cascade
+        result = await reject_submission(submission_id)
+        if result["status"] != "rejected":
+            return await db.submissions.find_one({"submission_id": submission_id}, SUBMISSION_LIST_PROJECTION)
 
         if submitter_id:
             await create_notification(
@@ -600,110 +405,7 @@ async def vote_on_submission(submission_id: str, vote: VoteCreate, request: Requ
             if email:
                 await send_report_result(email, name, sub_type_label, sub_name, approved=False, report_type="error")
 
-    return await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0})
-
-
-# ─────────────────────────────────────────────
-# Helper interne
-# ─────────────────────────────────────────────
-
-async def _apply_entity_submission(updated_sub: dict) -> Optional[str]:
-    entity_type = updated_sub["submission_type"]
-    data = updated_sub["data"]
-    mode = data.get("mode", "create")
-    now = datetime.now(timezone.utc).isoformat()
-    config = ENTITY_COLLECTIONS.get(entity_type)
-    if not config:
-        return None
-
-    sub_id = updated_sub.get("submission_id")
-
-    if mode == "create":
-        entity_id = data.get("entity_id")
-        if entity_id:
-            update_doc = {k: v for k, v in data.items() if k not in ("mode", "parent_submission_id", "entity_id", "entity_type")}
-            update_doc["status"] = "approved"
-            update_doc["updated_at"] = now
-            await db[config["collection"]].update_one(
-                {config["id_field"]: entity_id},
-                {"$set": update_doc}
-            )
-            return entity_id
-        else:
-            name = data.get("name") or data.get("full_name", "")
-            slug = slugify(name)
-            new_id = f"{entity_type}_{uuid.uuid4().hex[:12]}"
-            doc = {k: v for k, v in data.items() if k not in ("mode", "parent_submission_id")}
-            doc[config["id_field"]] = new_id
-            doc["slug"]       = slug
-            doc["status"]     = "approved"
-            doc["created_at"] = now
-            doc["updated_at"] = now
-            if sub_id:
-                doc["submission_id"] = sub_id
-            await db[config["collection"]].insert_one(doc)
-            return new_id
-
-    elif mode == "edit":
-        entity_id = data.get("entity_id", "")
-        if not entity_id:
-            print(f"[APPLY ENTITY] mode=edit mais entity_id vide pour submission {sub_id} ({entity_type}), skip")
-            return None
-
-        old_doc = await db[config["collection"]].find_one(
-            {config["id_field"]: entity_id},
-            {"_id": 0}
-        )
-
-        update_fields = {}
-        for k, v in data.items():
-            if k in ("mode", "entity_id", "entity_type", "parent_submission_id"):
-                continue
-            if k in IMAGE_FIELDS:
-                if v and isinstance(v, str):
-                    update_fields[k] = v
-            else:
-                if v is not None and v != [] and v != "":
-                    update_fields[k] = v
-
-        update_fields["updated_at"] = now
-        update_fields["status"]     = "approved"
-
-        name_key = "full_name" if entity_type == "player" else "name"
-        if name_key in update_fields:
-            update_fields["slug"] = slugify(update_fields[name_key])
-
-        if old_doc:
-            for field in IMAGE_FIELDS:
-                new_url = update_fields.get(field)
-                old_url = old_doc.get(field, "")
-                if new_url and old_url and new_url != old_url:
-                    await _delete_freebox_file(old_url)
-
-        await db[config["collection"]].update_one(
-            {config["id_field"]: entity_id},
-            {"$set": update_fields}
-        )
-        return entity_id
-
-    elif mode == "removal":
-        entity_id = data.get("entity_id", "")
-        if entity_id:
-            old_doc = await db[config["collection"]].find_one(
-                {config["id_field"]: entity_id},
-                {"_id": 0}
-            )
-            if old_doc:
-                for field in IMAGE_FIELDS:
-                    url = old_doc.get(field, "")
-                    if url:
-                        await _delete_freebox_file(url)
-            await db[config["collection"]].delete_one(
-                {config["id_field"]: entity_id}
-            )
-        return None
-
-    return None
+    return await db.submissions.find_one({"submission_id": submission_id}, SUBMISSION_LIST_PROJECTION)
 
 
 # ─────────────────────────────────────────────
@@ -823,10 +525,12 @@ async def vote_on_report(report_id: str, vote: VoteCreate, request: Request):
                     update_fields["team_id"] = team_id
                 if update_fields:
                     await db.master_kits.update_one({"kit_id": updated["target_id"]}, {"$set": update_fields})
+                    await mark_listing_snapshots_stale(kit_id=updated["target_id"])
             elif updated["target_type"] == "version":
                 update_fields = {k: v for k, v in corrections.items() if k not in ("version_id", "_id")}
                 if update_fields:
                     await db.versions.update_one({"version_id": updated["target_id"]}, {"$set": update_fields})
+                    await mark_listing_snapshots_stale(version_id=updated["target_id"])
         await db.reports.update_one({"report_id": report_id}, {"$set": {"status": "approved"}})
 
         if reporter_id:
@@ -113,7 +113,6 @@ async def create_team_pending(
         "status":          "pending",
         "votes_up":        0,
         "votes_down":      0,
-        "voters":          [],
         "created_at":      now,
     })
 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request
 from typing import Optional
 from datetime import datetime, timezone
 import uuid
@@ -8,6 +8,15 @@ from ..database import db
 from ..auth import get_current_user
 from .notifications import create_notification
 from .. import email_service
+from ..services.collection_summary import apply_item_added, apply_item_removed
+from ..services.listing_snapshot import mark_listing_snapshots_stale
+from ..services.transaction_counters import (
+    counters_payload, get_counters, increment_unread, sync_pending_actions, sync_unread,
+)
+from ..services.event_bus import publish
+from ..services.transaction_messages import (
+    MAX_MESSAGE_PAGE_SIZE, MESSAGE_PAGE_SIZE, InvalidCursor, latest_message_at, list_message_page, mark_read,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +31,21 @@ def _event(name: str, user_id: str) -> dict:
     return {"event": name, "at": _now(), "by": user_id}
 
 
+async def _publish_state(txn: dict) -> None:
+    """Changement d'état : compteurs des deux parties + événement `transaction`."""
+    await sync_pending_actions(txn)
+    event = {"transaction_id": txn["transaction_id"], "status": txn["status"], "updated_at": txn.get("updated_at")}
+    for user_id in {txn["seller_id"], txn["buyer_id"]}:
+        await publish(user_id, "transaction", event)
+
+
+async def _sync_counters(transaction_id: str) -> None:
+    """Actions en attente des deux parties, d'après la transaction à jour."""
+    txn = await db.transactions.find_one({"transaction_id": transaction_id}, {"_id": 0})
+    if txn:
+        await _publish_state(txn)
+
+
 async def create_transaction(listing: dict, offer: dict) -> dict:
     """Internal helper called by marketplace router on offer acceptance."""
     is_trade = offer.get("offer_type") in ("trade", "buy_and_trade")
@@ -52,6 +76,7 @@ async def create_transaction(listing: dict, offer: dict) -> dict:
         "completed_at": None,
     }
     await db.transactions.insert_one(doc)
+    await _publish_state(doc)
     # Lock collection items so they can't be re-listed during escrow
     await db.collections.update_one(
         {"collection_id": listing["collection_id"]},
@@ -82,6 +107,8 @@ async def _complete_transaction(txn: dict):
                       "added_at": _now()}
         await db.collections.insert_one(buyer_copy)
         await db.collections.delete_one({"collection_id": txn["seller_collection_id"]})
+        await apply_item_removed(seller_item)
+        await apply_item_added(buyer_copy)
 
     if is_trade and txn.get("buyer_collection_id"):
         buyer_item = await db.collections.find_one(
@@ -95,6 +122,8 @@ async def _complete_transaction(txn: dict):
                            "added_at": _now()}
             await db.collections.insert_one(seller_copy)
             await db.collections.delete_one({"collection_id": txn["buyer_collection_id"]})
+            await apply_item_removed(buyer_item)
+            await apply_item_added(seller_copy)
 
     # Finalise listing and transaction
     await db.listings.update_one(
@@ -107,6 +136,9 @@ async def _complete_transaction(txn: dict):
         {"$set": {"status": "completed", "completed_at": now, "updated_at": now},
          "$push": {"timeline": _event("completed", "system")}}
     )
+    await _sync_counters(txn_id)
+    # Compteur de ventes du vendeur dans l'instantané de ses annonces ouvertes
+    await mark_listing_snapshots_stale(user_id=txn["seller_id"])
     # Notify both parties
     await create_notification(
         user_id=txn["buyer_id"], notif_type="transaction_completed",
@@ -154,62 +186,16 @@ async def list_transactions(request: Request, role: Optional[str] = None):
 async def unread_messages_count(request: Request):
     """Returns total unread message count and breakdown by transaction."""
     user = await get_current_user(request)
-    uid = user["user_id"]
-
-    # Get all transactions where current user is a party
-    txns = await db.transactions.find(
-        {"$or": [{"seller_id": uid}, {"buyer_id": uid}]},
-        {"_id": 0, "transaction_id": 1}
-    ).to_list(200)
-    txn_ids = [t["transaction_id"] for t in txns]
-
-    if not txn_ids:
-        return {"total": 0, "by_transaction": {}}
-
-    # Messages where user is NOT the sender and user NOT in read_by
-    messages = await db.transaction_messages.find(
-        {
-            "transaction_id": {"$in": txn_ids},
-            "sender_id": {"$ne": uid},
-            "read_by": {"$nin": [uid]},
-        },
-        {"_id": 0, "transaction_id": 1}
-    ).to_list(2000)
-
-    by_transaction: dict = {}
-    for msg in messages:
-        tid = msg["transaction_id"]
-        by_transaction[tid] = by_transaction.get(tid, 0) + 1
-
-    return {"total": len(messages), "by_transaction": by_transaction}
+    counts = counters_payload(await get_counters(user["user_id"]))
+    return {"total": counts["unread_total"], "by_transaction": counts["unread_by_transaction"]}
 
 
 @router.get("/pending-action")
 async def pending_action_count(request: Request):
     """Returns count of transactions where the caller has a pending action."""
     user = await get_current_user(request)
-    uid = user["user_id"]
-    txns = await db.transactions.find(
-        {"$or": [{"seller_id": uid}, {"buyer_id": uid}],
-         "status": {"$nin": ["completed", "disputed"]}},
-        {"_id": 0}
-    ).to_list(200)
-    count = 0
-    for t in txns:
-        is_seller = t["seller_id"] == uid
-        is_trade  = t["transaction_type"] == "trade"
-        s = t["status"]
-        if is_seller and s == "awaiting_shipment" and not t["seller_shipped"]:
-            count += 1
-        elif not is_seller and s == "shipped" and not t["buyer_received"]:
-            count += 1
-        elif not is_seller and s == "delivered" and not t["buyer_approved"]:
-            count += 1
-        elif is_trade and is_seller and s == "delivered" and not t["seller_approved"]:
-            count += 1
-        elif is_trade and not is_seller and s == "awaiting_shipment" and not t["buyer_shipped"]:
-            count += 1
-    return {"count": count}
+    counts = counters_payload(await get_counters(user["user_id"]))
+    return {"count": counts["pending_count"]}
 
 
 @router.get("/{transaction_id}")
@@ -279,6 +265,7 @@ async def mark_shipped(transaction_id: str, request: Request):
         {"transaction_id": transaction_id},
         {"$set": update, "$push": {"timeline": _event(event_name, uid)}}
     )
+    await _sync_counters(transaction_id)
 
     # Notify counterpart
     counterpart_id = txn["buyer_id"] if is_seller else txn["seller_id"]
@@ -330,6 +317,7 @@ async def confirm_receipt(transaction_id: str, request: Request):
         {"transaction_id": transaction_id},
         {"$set": update, "$push": {"timeline": _event(event_name, uid)}}
     )
+    await _sync_counters(transaction_id)
 
     counterpart_id = txn["buyer_id"] if is_seller else txn["seller_id"]
     await create_notification(
@@ -377,6 +365,7 @@ async def approve_transaction(transaction_id: str, request: Request):
         {"transaction_id": transaction_id},
         {"$set": update, "$push": {"timeline": _event("approved", uid)}}
     )
+    await _sync_counters(transaction_id)
 
     if both_approved:
         refreshed = await db.transactions.find_one({"transaction_id": transaction_id}, {"_id": 0})
@@ -420,6 +409,7 @@ async def open_dispute(transaction_id: str, request: Request):
         },
          "$push": {"timeline": _event("dispute_opened", uid)}}
     )
+    await _sync_counters(transaction_id)
     # Notify counterpart and moderators
     counterpart_id = txn["buyer_id"] if role == "seller" else txn["seller_id"]
     await create_notification(
@@ -469,12 +459,13 @@ async def send_message(transaction_id: str, request: Request):
         "sender_id": uid,
         "content": content,
         "created_at": now,
-        "read_by": [uid],
     }
     await db.transaction_messages.insert_one(doc)
 
     # Send email to the other party
     other_id = txn["buyer_id"] if txn["seller_id"] == uid else txn["seller_id"]
+    await increment_unread(other_id, transaction_id)
+    await publish(other_id, "message", doc)
     other_user = await db.users.find_one({"user_id": other_id}, {"_id": 0, "email": 1, "name": 1, "username": 1})
     sender_user = await db.users.find_one({"user_id": uid}, {"_id": 0, "username": 1, "name": 1})
     if other_user and other_user.get("email"):
@@ -495,7 +486,16 @@ async def send_message(transaction_id: str, request: Request):
 
 
 @router.get("/{transaction_id}/messages")
-async def list_messages(transaction_id: str, request: Request):
+async def list_messages(
+    transaction_id: str,
+    request: Request,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    since: Optional[str] = None,
+    limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MAX_MESSAGE_PAGE_SIZE),
+):
+    """Page de l'historique (cf. services/transaction_messages). Les pages vers
+    le présent (défaut, `after`, `since`) avancent le filigrane de lecture."""
     user = await get_current_user(request)
     uid = user["user_id"]
 
@@ -504,23 +504,21 @@ async def list_messages(transaction_id: str, request: Request):
         raise HTTPException(status_code=404, detail="Transaction not found")
     if txn["seller_id"] != uid and txn["buyer_id"] != uid:
         raise HTTPException(status_code=403, detail="Not your transaction")
+    if sum(p is not None for p in (before, after, since)) > 1:
+        raise HTTPException(status_code=400, detail="Use only one of before, after, since")
 
-    messages = await db.transaction_messages.find(
-        {"transaction_id": transaction_id},
-        {"_id": 0}
-    ).sort("created_at", 1).to_list(1000)
-
-    # Auto-mark messages from the other party as read
-    await db.transaction_messages.update_many(
-        {
-            "transaction_id": transaction_id,
-            "sender_id": {"$ne": uid},
-            "read_by": {"$nin": [uid]},
-        },
-        {"$addToSet": {"read_by": uid}}
-    )
+    try:
+        page = await list_message_page(transaction_id, before=before, after=after, since=since, limit=limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    read_marks = dict(txn.get("read_marks") or {})
+    newest = page["messages"][-1]["created_at"] if page["messages"] else None
+    if before is None and newest and newest > read_marks.get(uid, ""):
+        read_marks[uid] = await mark_read(transaction_id, uid, newest)
+        await sync_unread(uid, transaction_id, read_marks[uid])
 
-    return messages
+    return {**page, "read_marks": read_marks}
 
 
 @router.post("/{transaction_id}/messages/read")
@@ -534,12 +532,6 @@ async def mark_messages_read(transaction_id: str, request: Request):
     if txn["seller_id"] != uid and txn["buyer_id"] != uid:
         raise HTTPException(status_code=403, detail="Not your transaction")
 
-    await db.transaction_messages.update_many(
-        {
-            "transaction_id": transaction_id,
-            "sender_id": {"$ne": uid},
-            "read_by": {"$nin": [uid]},
-        },
-        {"$addToSet": {"read_by": uid}}
-    )
+    last_read = await mark_read(transaction_id, uid, await latest_message_at(transaction_id))
+    await sync_unread(uid, transaction_id, last_read)
     return {"ok": True}
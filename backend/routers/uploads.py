@@ -4,6 +4,7 @@ from pathlib import Path
 import os
 import re
 import httpx
+from ..services.file_cleanup import cancel_file_deletions
 from ..utils import ALLOWED_EXTENSIONS, MAX_FILE_SIZE
 
 # URL du serveur récepteur sur la Freebox VM
@@ -84,6 +85,9 @@ async def _forward_to_receiver(
         if resp.status_code != 200:
             raise HTTPException(status_code=resp.status_code, detail=f"Receiver error: {resp.text}")
         data = resp.json()
+        if data.get("deduplicated"):
+            # Fichier existant redonné : une suppression en file ne doit plus partir
+            await cancel_file_deletions([data.get("relative_path")])
         return {
             "url": _to_relative_path(data["url"]),
             "relative_path": data.get("relative_path"),
@@ -24,6 +24,8 @@ from ..email_service import send_email_changed, send_account_deleted
 from ..database import db, client
 from ..auth import get_current_user
 from .notifications import create_notification
+from ..services.version_price_stats import rebuild_versions_stats
+from ..services.listing_snapshot import mark_listing_snapshots_stale
 import uuid
 
 router = APIRouter(prefix="/api", tags=["users"])
@@ -163,6 +165,8 @@ async def update_profile(update: ProfileUpdate, request: Request):
             raise HTTPException(status_code=400, detail="Username already taken")
     data["updated_at"] = datetime.now(timezone.utc).isoformat()
     await db.users.update_one({"user_id": uid}, {"$set": data})
+    if "username" in data:
+        await mark_listing_snapshots_stale(user_id=uid)
     return await db.users.find_one({"user_id": uid}, {"_id": 0, "password_hash": 0})
 
 
@@ -242,9 +246,13 @@ async def delete_account(body: DeleteAccountBody, request: Request):
     )
 
     # Suppression des données personnelles
+    owned_versions = await db.collections.distinct("version_id", {"user_id": uid})
     await db.collections.delete_many({"user_id": uid})
+    await db.collection_summaries.delete_one({"user_id": uid})
+    await rebuild_versions_stats(owned_versions)
     await db.offers.delete_many({"offerer_id": uid})
     await db.notifications.delete_many({"user_id": uid})
+    await db.user_counters.delete_one({"user_id": uid})
     await db.user_sessions.delete_many({"user_id": uid})
     await db.email_verifications.delete_many({"user_id": uid})
     await db.users.delete_one({"user_id": uid})
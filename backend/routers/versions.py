@@ -9,6 +9,11 @@ from ..models import VersionCreate, VersionOut
 from ..auth import get_current_user
 from ..utils import safe_regex
 from ._kit_utils import master_kit_image_url, local_image_url
+from ..services.version_price_stats import (
+    format_version_estimates,
+    get_version_stats,
+    list_version_estimates,
+)
 
 router = APIRouter(prefix="/api", tags=["versions"])
 
@@ -96,28 +101,18 @@ async def list_versions(
 
 
 @router.get("/versions/{version_id}/estimates")
-async def get_version_estimates(version_id: str):
-    items = await db.collections.find(
-        {"version_id": version_id},
-        {"_id": 0, "estimated_price": 1, "value_estimate": 1, "price_estimate": 1},
-    ).to_list(1000)
-    estimates = []
-    for i in items:
-        val = (
-            i.get("estimated_price") or i.get("value_estimate")
-            or i.get("price_estimate") or 0
-        )
-        if val and val > 0:
-            estimates.append(val)
-    if not estimates:
-        return {"low": 0, "average": 0, "high": 0, "count": 0}
-    return {
-        "low": round(min(estimates), 2),
-        "average": round(sum(estimates) / len(estimates), 2),
-        "high": round(max(estimates), 2),
-        "count": len(estimates),
-        "estimates": sorted(estimates),
-    }
+async def get_version_estimates(version_id: str, raw: bool = False, skip: int = 0, limit: int = 50):
+    """Distribution précalculée des prix (low / average / high / count / p25 / p50 / p75).
+
+    `raw=true` ajoute une page de la liste triée des estimations (`skip` / `limit`).
+    """
+    result = format_version_estimates(await get_version_stats(version_id))
+    if raw:
+        capped_limit = max(1, min(limit, 200))
+        result["estimates"] = await list_version_estimates(version_id, max(0, skip), capped_limit)
+        result["skip"] = max(0, skip)
+        result["limit"] = capped_limit
+    return result
 
 
 @router.get("/versions/{version_id}/worn-by")
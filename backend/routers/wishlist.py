@@ -4,6 +4,7 @@ import uuid
 from ..database import db, client
 from ..models import WishlistAdd
 from ..auth import get_current_user
+from ..services.wishlist_matches import wishlist_listing_matches
 
 router = APIRouter(prefix="/api/wishlist", tags=["wishlist"])
 
@@ -23,6 +24,13 @@ async def get_wishlist(request: Request):
     return enriched
 
 
+@router.get("/matches")
+async def get_wishlist_matches(request: Request):
+    """Annonces actives correspondant aux versions de ma wishlist."""
+    user = await get_current_user(request)
+    return await wishlist_listing_matches(user["user_id"])
+
+
 @router.post("")
 async def add_to_wishlist(item: WishlistAdd, request: Request):
     user = await get_current_user(request)
@@ -0,0 +1,73 @@
+"""
+Rétention des notifications — date d'expiration des notifications déjà lues
+
+Les notifications lues avant la mise en place de la rétention n'ont pas de
+champ `expires_at` et ne seraient jamais purgées par l'index TTL. Ce script leur
+donne `expires_at` = created_at + NOTIFICATION_READ_RETENTION (au plus tôt
+maintenant + 1 jour, pour ne pas purger d'un coup tout l'historique au passage
+du moniteur TTL). Les notifications non lues ne sont pas touchées.
+
+Usage :
+    python -m backend.scripts.backfill_notification_expiry          # dry-run
+    python -m backend.scripts.backfill_notification_expiry --apply  # applique en base
+
+Idempotent : seules les notifications lues sans `expires_at` sont traitées.
+"""
+
+import asyncio
+import sys
+from datetime import timedelta
+
+import motor.motor_asyncio
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+import os
+
+load_dotenv()
+
+from backend.services.notification_inbox import NOTIFICATION_READ_RETENTION  # noqa: E402
+from backend.utils import as_utc_datetime, utcnow  # noqa: E402
+
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME    = os.getenv("DB_NAME", "topkit")
+
+BATCH_SIZE = 500
+MIN_DELAY  = timedelta(days=1)
+
+
+async def backfill_expiry(db, apply: bool = False) -> dict:
+    query = {"read": True, "expires_at": {"$exists": False}}
+    floor = utcnow() + MIN_DELAY
+
+    count = await db.notifications.count_documents(query)
+    print(f"notifications lues sans expires_at : {count}")
+    if not apply:
+        print(f"[DRY-RUN] {count} notifications recevraient une date d'expiration.")
+        return {"notifications": count}
+
+    updated, ops = 0, []
+    async for notif in db.notifications.find(query, {"_id": 1, "created_at": 1}):
+        created = as_utc_datetime(notif.get("created_at")) or utcnow()
+        ops.append(UpdateOne(
+            {"_id": notif["_id"]},
+            {"$set": {"expires_at": max(created + NOTIFICATION_READ_RETENTION, floor)}},
+        ))
+        if len(ops) >= BATCH_SIZE:
+            updated += (await db.notifications.bulk_write(ops, ordered=False)).modified_count
+            ops = []
+    if ops:
+        updated += (await db.notifications.bulk_write(ops, ordered=False)).modified_count
+    print(f"✅ {updated} notifications lues expireront désormais.")
+    return {"notifications": updated}
+
+
+async def migrate(apply: bool = False):
+    client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
+    db     = client[DB_NAME]
+    await backfill_expiry(db, apply=apply)
+    client.close()
+
+
+if __name__ == "__main__":
+    apply = "--apply" in sys.argv
+    asyncio.run(migrate(apply=apply))
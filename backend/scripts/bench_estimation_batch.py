@@ -0,0 +1,78 @@
+"""
+Benchmark estimation — appels unitaires vs lot (services/estimation_batch).
+
+Génère N items aléatoires (graine fixe) couvrant toutes les valeurs des grilles
+de coefficients, puis mesure :
+  - N appels à `calculate_estimation`
+  - un appel à `estimate_many` sur les mêmes N items
+et vérifie que les deux produisent des résultats identiques.
+
+Usage :
+    python -m backend.scripts.bench_estimation_batch            # 10 000 items
+    python -m backend.scripts.bench_estimation_batch 50000
+"""
+
+import random
+import sys
+import time
+
+from backend.services.estimation_batch import estimate_many, estimation_kwargs
+from backend.utils import (
+    calculate_estimation,
+    ESTIMATION_BASE_PRICES,
+    ESTIMATION_COMPETITION_COEFF,
+    ESTIMATION_FLOCKING_COEFF,
+    ESTIMATION_ORIGIN_COEFF,
+    ESTIMATION_SIGNED_PROOF_COEFF,
+    ESTIMATION_SIGNED_TYPE_COEFF,
+    ESTIMATION_STATE_COEFF,
+)
+
+
+def make_items(n: int, seed: int = 42) -> tuple[list[dict], dict[str, float]]:
+    rng = random.Random(seed)
+    players = {f"player_{i}": float(rng.randint(0, 100)) for i in range(200)}
+    items = []
+    for _ in range(n):
+        items.append({
+            "model_type": rng.choice(list(ESTIMATION_BASE_PRICES) + ["Bootleg"]),
+            "competition": rng.choice(list(ESTIMATION_COMPETITION_COEFF) + [""]),
+            "condition_origin": rng.choice(list(ESTIMATION_ORIGIN_COEFF) + [""]),
+            "physical_state": rng.choice(list(ESTIMATION_STATE_COEFF) + [""]),
+            "flocking_origin": rng.choice(list(ESTIMATION_FLOCKING_COEFF) + [""]),
+            "flocking_player_id": rng.choice(list(players) + [""] * 50),
+            "signed": rng.random() < 0.2,
+            "signed_type": rng.choice(list(ESTIMATION_SIGNED_TYPE_COEFF)),
+            "signed_personal_message": rng.random() < 0.1,
+            "signed_proof": rng.choice(list(ESTIMATION_SIGNED_PROOF_COEFF)),
+            "season_year": rng.choice([0] + list(range(1970, 2027))),
+            "patch": rng.random() < 0.3,
+            "is_rare": rng.random() < 0.05,
+            "mode": rng.choice(["advanced", "advanced", "basic"]),
+        })
+    return items, players
+
+
+def main(n: int):
+    items, notes = make_items(n)
+
+    t0 = time.perf_counter()
+    single = []
+    for item in items:
+        note = notes.get(item["flocking_player_id"], 0.0)
+        single.append({**calculate_estimation(**estimation_kwargs(item, note)), "flocking_player_note": note})
+    t_single = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = estimate_many(items, notes)
+    t_batch = time.perf_counter() - t0
+
+    assert batch == single, "résultats divergents entre unitaire et lot"
+    print(f"{n} items")
+    print(f"  unitaire : {t_single * 1000:8.1f} ms  ({n / t_single:,.0f} items/s)")
+    print(f"  lot      : {t_batch * 1000:8.1f} ms  ({n / t_batch:,.0f} items/s)")
+    print(f"  gain     : x{t_single / t_batch:.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,87 @@
+"""
+Benchmark facettes marketplace — latence sous charge (services/marketplace_facets).
+
+Tire des jeux de filtres aléatoires (graine fixe) parmi les valeurs de facettes
+réellement présentes, puis lance N requêtes avec C requêtes concurrentes :
+  - à froid : cache vidé, chaque jeu de filtres déclenche l'agrégation `$facet`
+  - à chaud : mêmes requêtes, servies par le cache / l'agrégation partagée
+et affiche p50 / p95 / max. Code de sortie 1 si le p95 à froid dépasse la cible.
+
+Lecture seule sur `listings` (MONGO_URL / DB_NAME du .env).
+
+Usage :
+    python -m backend.scripts.bench_marketplace_facets              # 500 requêtes, 20 concurrentes
+    python -m backend.scripts.bench_marketplace_facets 2000 50
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from backend.services import marketplace_facets  # noqa: E402  (MONGO_URL requis à l'import)
+
+P95_TARGET_MS = 150
+DRAWN_FACETS = ("clubs", "brands", "seasons", "kit_types", "sizes", "listing_types")
+
+
+def make_filter_sets(facets: dict, n: int, seed: int = 42) -> list[dict]:
+    rng = random.Random(seed)
+    filter_sets = []
+    for _ in range(n):
+        filters = {}
+        for facet in rng.sample(DRAWN_FACETS, k=rng.randint(0, 3)):
+            values = facets[facet]
+            if values:
+                param = marketplace_facets.FACET_FIELDS[facet][0]
+                filters[param] = rng.choice(values)["value"]
+        filter_sets.append(marketplace_facets.normalize_filters(**filters))
+    return filter_sets
+
+
+async def run(filter_sets: list[dict], concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def _one(filters: dict):
+        async with semaphore:
+            t0 = time.perf_counter()
+            await marketplace_facets.facet_counts(filters)
+            timings.append((time.perf_counter() - t0) * 1000)
+
+    await asyncio.gather(*(_one(f) for f in filter_sets))
+    return sorted(timings)
+
+
+def _report(label: str, timings: list[float]) -> float:
+    p50 = timings[len(timings) // 2]
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"  {label:6s}: p50 {p50:7.1f} ms   p95 {p95:7.1f} ms   max {timings[-1]:7.1f} ms")
+    return p95
+
+
+async def main(n: int, concurrency: int) -> int:
+    facets = (await marketplace_facets.facet_counts({}))["facets"]
+    filter_sets = make_filter_sets(facets, n)
+    print(f"{n} requêtes, {concurrency} concurrentes, {len(set(map(marketplace_facets._cache_key, filter_sets)))} jeux de filtres distincts")
+
+    marketplace_facets.clear_facet_cache()
+    p95_cold = _report("froid", await run(filter_sets, concurrency))
+    _report("chaud", await run(filter_sets, concurrency))
+    print(f"  cache : {marketplace_facets.facet_cache_stats()}")
+
+    ok = p95_cold <= P95_TARGET_MS
+    print(f"{'✅' if ok else '❌'} p95 à froid {p95_cold:.1f} ms (cible {P95_TARGET_MS} ms)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(asyncio.run(main(
+        int(args[0]) if len(args) > 0 else 500,
+        int(args[1]) if len(args) > 1 else 20,
+    )))
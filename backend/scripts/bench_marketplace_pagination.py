@@ -0,0 +1,103 @@
+"""
+Benchmark pagination marketplace — curseur vs skip (services/listing_pagination).
+
+Remplit une base jetable (`<DB_NAME>_bench_listings`, supprimée à la fin) avec
+N annonces synthétiques (graine fixe), crée les index de tri, puis pour chaque
+tri parcourt toutes les pages par curseur et mesure la latence de quelques
+profondeurs de page, comparée à la même page lue avec `skip`.
+
+Attendu : latence par page stable avec le curseur, croissante avec `skip`.
+
+Usage :
+    python -m backend.scripts.bench_marketplace_pagination            # 100 000 annonces
+    python -m backend.scripts.bench_marketplace_pagination 20000
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from backend import database  # noqa: E402  (MONGO_URL requis à l'import)
+from backend.services import listing_pagination  # noqa: E402
+
+PAGE_SIZE = 48
+PROBED_PAGES = (1, 10, 100, 1000)
+INSERT_BATCH = 10_000
+
+
+def make_listings(n: int, seed: int = 42) -> list[dict]:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    listings = []
+    for i in range(n):
+        listing_type = rng.choice(["sale", "sale", "both", "trade"])
+        listings.append({
+            "listing_id": f"lst_{i:012x}",
+            "status": rng.choice(["active"] * 8 + ["reserved", "cancelled"]),
+            "listing_type": listing_type,
+            "asking_price": None if listing_type == "trade" else float(rng.randint(10, 40) * 5),
+            "created_at": (start + timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60))).isoformat(),
+            "seller": {"username": f"user_{i % 2000}", "completed_sales": rng.choice([0] * 5 + list(range(1, 40)))},
+        })
+    return listings
+
+
+async def _timed(coro) -> float:
+    t0 = time.perf_counter()
+    await coro
+    return (time.perf_counter() - t0) * 1000
+
+
+async def bench_sort(db, sort: str):
+    query = {"status": "active"}
+    if sort in ("price_asc", "price_desc"):
+        query["asking_price"] = {"$ne": None}
+    keys = listing_pagination.LISTING_SORTS[sort]
+
+    cursor_ms, cursor, page = {}, None, 0
+    while True:
+        page += 1
+        t0 = time.perf_counter()
+        body = await listing_pagination.browse_listings({}, sort=sort, cursor=cursor, limit=PAGE_SIZE)
+        if page in PROBED_PAGES:
+            cursor_ms[page] = (time.perf_counter() - t0) * 1000
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    print(f"  {sort:12s} ({page} pages)")
+    for probe in PROBED_PAGES:
+        if probe not in cursor_ms:
+            continue
+        skip_ms = await _timed(
+            db.listings.find(query, {"_id": 0}).sort(keys).skip((probe - 1) * PAGE_SIZE).limit(PAGE_SIZE).to_list(PAGE_SIZE)
+        )
+        print(f"    page {probe:5d} : curseur {cursor_ms[probe]:7.1f} ms   skip {skip_ms:7.1f} ms")
+
+
+async def main(n: int):
+    bench_db = database.client[f"{os.environ.get('DB_NAME', 'topkit')}_bench_listings"]
+    listing_pagination.db = bench_db
+    await bench_db.listings.drop()
+    try:
+        listings = make_listings(n)
+        for i in range(0, n, INSERT_BATCH):
+            await bench_db.listings.insert_many(listings[i:i + INSERT_BATCH], ordered=False)
+        for keys in listing_pagination.LISTING_SORT_INDEXES:
+            await bench_db.listings.create_index(keys)
+        print(f"{n} annonces, pages de {PAGE_SIZE}")
+        for sort in listing_pagination.LISTING_SORTS:
+            await bench_sort(bench_db, sort)
+    finally:
+        await database.client.drop_database(bench_db.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
@@ -0,0 +1,84 @@
+"""
+Migration dates BSON — sessions, reset de mot de passe, vérifications email
+
+Convertit les champs date stockés en chaînes ISO (`datetime.isoformat()`) en
+dates BSON, puis remplace l'index simple sur `expires_at` par un index TTL :
+Mongo supprime alors lui-même les documents expirés (plus de `delete_many`
+au démarrage).
+
+Usage :
+    python -m backend.scripts.migrate_dates_to_bson          # dry-run
+    python -m backend.scripts.migrate_dates_to_bson --apply  # applique en base
+
+Idempotent : seuls les champs encore de type string sont convertis.
+"""
+
+import asyncio
+import sys
+
+import motor.motor_asyncio
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+import os
+
+load_dotenv()
+
+from backend.utils import as_utc_datetime, ensure_ttl_index  # noqa: E402  (MONGO_URL requis à l'import)
+
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME    = os.getenv("DB_NAME", "topkit")
+
+BATCH_SIZE = 500
+
+DATE_FIELDS = {
+    "user_sessions":       ["expires_at", "created_at", "last_active"],
+    "password_resets":     ["expires_at", "created_at"],
+    "email_verifications": ["expires_at", "created_at"],
+}
+
+
+async def _migrate_collection(db, name: str, fields: list[str], apply: bool) -> int:
+    query = {"$or": [{f: {"$type": "string"}} for f in fields]}
+    converted = 0
+    ops = []
+    async for doc in db[name].find(query, {f: 1 for f in fields}):
+        update = {
+            f: as_utc_datetime(doc[f])
+            for f in fields
+            if isinstance(doc.get(f), str) and doc[f]
+        }
+        if not update:
+            continue
+        converted += 1
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+        if apply and len(ops) >= BATCH_SIZE:
+            await db[name].bulk_write(ops, ordered=False)
+            ops = []
+    if apply and ops:
+        await db[name].bulk_write(ops, ordered=False)
+    return converted
+
+
+async def migrate_dates(db, apply: bool = False) -> dict[str, int]:
+    counts = {}
+    for name, fields in DATE_FIELDS.items():
+        counts[name] = await _migrate_collection(db, name, fields, apply)
+        prefix = "✅" if apply else "[DRY-RUN]"
+        print(f"{prefix} {name} : {counts[name]} documents {'convertis' if apply else 'à convertir'}")
+    if apply:
+        for name in DATE_FIELDS:
+            await ensure_ttl_index(db[name])
+        print("✅ Index TTL posés sur expires_at")
+    return counts
+
+
+async def migrate(apply: bool = False):
+    client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
+    db     = client[DB_NAME]
+    await migrate_dates(db, apply=apply)
+    client.close()
+
+
+if __name__ == "__main__":
+    apply = "--apply" in sys.argv
+    asyncio.run(migrate(apply=apply))
@@ -0,0 +1,73 @@
+"""
+Migration accusés de lecture — tableaux `read_by` des messages → filigranes
+
+Pour chaque transaction et chaque partie, le filigrane
+`transactions.read_marks.{user_id}` prend le created_at du dernier message de
+l'autre partie présent dans son `read_by` (la lecture marquait toujours toute la
+conversation d'un coup). Les tableaux `read_by` sont ensuite retirés des messages.
+
+Usage :
+    python -m backend.scripts.migrate_message_read_marks          # dry-run
+    python -m backend.scripts.migrate_message_read_marks --apply  # applique en base
+
+Idempotent : `$max` sur les filigranes ; les messages migrés n'ont plus de `read_by`.
+"""
+
+import asyncio
+import sys
+
+import motor.motor_asyncio
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+import os
+
+load_dotenv()
+
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME    = os.getenv("DB_NAME", "topkit")
+
+BATCH_SIZE = 500
+
+
+async def migrate_read_marks(db, apply: bool = False) -> dict:
+    query = {"read_by": {"$exists": True}}
+
+    count = await db.transaction_messages.count_documents(query)
+    print(f"messages avec tableau read_by : {count}")
+
+    marks: dict[tuple[str, str], str] = {}
+    async for msg in db.transaction_messages.find(
+        query, {"_id": 0, "transaction_id": 1, "sender_id": 1, "created_at": 1, "read_by": 1}
+    ):
+        for user_id in msg.get("read_by") or []:
+            if user_id == msg["sender_id"]:
+                continue
+            key = (msg["transaction_id"], user_id)
+            marks[key] = max(marks.get(key, ""), msg["created_at"])
+
+    transactions = len({txn_id for txn_id, _ in marks})
+    if not apply:
+        print(f"[DRY-RUN] {len(marks)} filigranes seraient posés sur {transactions} transactions.")
+        return {"messages": count, "read_marks": len(marks), "transactions": transactions}
+
+    ops = [
+        UpdateOne({"transaction_id": txn_id}, {"$max": {f"read_marks.{user_id}": created_at}})
+        for (txn_id, user_id), created_at in marks.items()
+    ]
+    for i in range(0, len(ops), BATCH_SIZE):
+        await db.transactions.bulk_write(ops[i:i + BATCH_SIZE], ordered=False)
+    await db.transaction_messages.update_many(query, {"$unset": {"read_by": ""}})
+    print(f"✅ {len(marks)} filigranes posés sur {transactions} transactions, {count} messages nettoyés.")
+    return {"messages": count, "read_marks": len(marks), "transactions": transactions}
+
+
+async def migrate(apply: bool = False):
+    client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
+    db     = client[DB_NAME]
+    await migrate_read_marks(db, apply=apply)
+    client.close()
+
+
+if __name__ == "__main__":
+    apply = "--apply" in sys.argv
+    asyncio.run(migrate(apply=apply))
@@ -0,0 +1,83 @@
+"""
+Migration submission_votes — sort les tableaux `voters` des soumissions
+
+Chaque user présent dans `submission.voters` devient un document
+`submission_votes` {submission_id, user_id, vote, weight, created_at, migrated},
+puis le tableau est retiré de la soumission. Le sens et le poids des votes
+historiques ne sont pas connus (seuls les compteurs votes_up / votes_down
+existaient) : `vote` et `weight` valent None.
+
+Usage :
+    python -m backend.scripts.migrate_submission_voters          # dry-run
+    python -m backend.scripts.migrate_submission_voters --apply  # applique en base
+
+Idempotent : upsert sur (submission_id, user_id) ; les soumissions déjà
+migrées n'ont plus de champ `voters`.
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timezone
+
+import motor.motor_asyncio
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+import os
+
+load_dotenv()
+
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME    = os.getenv("DB_NAME", "topkit")
+
+BATCH_SIZE = 500
+
+
+async def migrate_voters(db, apply: bool = False) -> dict:
+    now   = datetime.now(timezone.utc).isoformat()
+    query = {"voters": {"$exists": True}}
+
+    count = await db.submissions.count_documents(query)
+    print(f"submissions avec tableau voters : {count}")
+
+    submissions = votes = 0
+    ops, migrated_ids = [], []
+    async for sub in db.submissions.find(query, {"_id": 0, "submission_id": 1, "voters": 1}):
+        submissions += 1
+        migrated_ids.append(sub["submission_id"])
+        for user_id in set(sub.get("voters") or []):
+            votes += 1
+            ops.append(UpdateOne(
+                {"submission_id": sub["submission_id"], "user_id": user_id},
+                {"$setOnInsert": {"vote": None, "weight": None, "created_at": now, "migrated": True}},
+                upsert=True,
+            ))
+        if apply and len(ops) >= BATCH_SIZE:
+            await db.submission_votes.bulk_write(ops, ordered=False)
+            ops = []
+
+    if not apply:
+        print(f"[DRY-RUN] {votes} votes seraient copiés depuis {submissions} soumissions.")
+        return {"submissions": submissions, "votes": votes}
+
+    if ops:
+        await db.submission_votes.bulk_write(ops, ordered=False)
+    if migrated_ids:
+        await db.submissions.update_many(
+            {"submission_id": {"$in": migrated_ids}},
+            {"$unset": {"voters": ""}},
+        )
+    print(f"✅ {votes} votes copiés dans submission_votes, {submissions} soumissions nettoyées.")
+    return {"submissions": submissions, "votes": votes}
+
+
+async def migrate(apply: bool = False):
+    client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
+    db     = client[DB_NAME]
+    await db.submission_votes.create_index([("submission_id", 1), ("user_id", 1)], unique=True)
+    await migrate_voters(db, apply=apply)
+    client.close()
+
+
+if __name__ == "__main__":
+    apply = "--apply" in sys.argv
+    asyncio.run(migrate(apply=apply))
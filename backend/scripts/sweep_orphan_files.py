@@ -0,0 +1,50 @@
+"""
+Balayage des images orphelines du receiver Freebox
+
+Lit l'inventaire du receiver (`GET /inventory`, fichiers stockés depuis plus
+de `--min-age-hours`, 48 h par défaut) et le compare aux URLs d'images
+référencées en base. Avec `--apply`,
+les orphelins sont mis dans la file `file_deletions` puis la file est vidée
+par lots (`DELETE /delete-files`).
+
+Usage :
+    python -m backend.scripts.sweep_orphan_files                    # dry-run
+    python -m backend.scripts.sweep_orphan_files --apply            # supprime
+    python -m backend.scripts.sweep_orphan_files --min-age-hours 72
+
+Idempotent : un chemin déjà en file n'est ajouté qu'une fois.
+"""
+
+import asyncio
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from backend.services import file_cleanup  # noqa: E402  (MONGO_URL requis à l'import)
+
+
+def _min_age_hours() -> int:
+    if "--min-age-hours" in sys.argv:
+        return int(sys.argv[sys.argv.index("--min-age-hours") + 1])
+    return file_cleanup.ORPHAN_MIN_AGE_HOURS
+
+
+async def sweep(apply: bool = False):
+    report = await file_cleanup.sweep_orphan_files(apply=apply, min_age_hours=_min_age_hours())
+    for path in report["orphans"]:
+        print(f"  {path}")
+    prefix = "✅" if apply else "[DRY-RUN]"
+    print(
+        f"{prefix} {len(report['orphans'])} orphelin(s) sur {report['files']} fichier(s), "
+        f"{report['reclaimable_bytes'] / 1_048_576:.1f} Mo récupérables"
+    )
+    if apply:
+        totals = await file_cleanup.drain_file_deletions()
+        print(f"✅ {totals['deleted']} supprimé(s), {totals['missing']} déjà absent(s), {totals['kept']} encore référencé(s), {totals['failed']} en échec")
+
+
+if __name__ == "__main__":
+    apply = "--apply" in sys.argv
+    asyncio.run(sweep(apply=apply))
@@ -20,6 +20,7 @@ if _IS_PROD and _RECEIVER_SECRET in ("", "changeme"):
     )
 
 from .database import db, client
+from .utils import ensure_ttl_index
 
 from .routers.beta import router as beta_router
 from .routers.auth import router as auth_router
@@ -49,7 +50,19 @@ from .routers.awards import router as awards_router
 from .routers.marketplace import router as marketplace_router
 from .routers.transactions import router as transactions_router
 from .routers.transaction_reviews import router as transaction_reviews_router
+from .routers.events import router as events_router
 from .middleware import maintenance_middleware
+from .services.event_bus import bus as event_bus
+from .services.dashboard_stats import refresh_loop as dashboard_stats_refresh_loop
+from .services.file_cleanup import file_deletion_loop, orphan_sweep_loop
+from .services.listing_snapshot import snapshot_refresh_loop as listing_snapshot_refresh_loop
+from .services.listing_pagination import LISTING_SORT_INDEXES
+from .services.transaction_messages import MESSAGE_INDEX
+from .services.notification_inbox import NOTIFICATION_INDEX
+from .services.reestimation import reestimate_if_tables_changed
+from .services.offer_reminders import OFFER_REMINDER_INTERVAL, send_offer_reminders
+from .services.scheduled_jobs import scheduled_loop
+from .services.approval_engine import APPROVAL_STALE_AFTER, recover_stale_approvals
 
 
 ROOT_DIR = Path(__file__).parent
@@ -229,6 +242,7 @@ app.include_router(awards_router)
 app.include_router(marketplace_router)
 app.include_router(transactions_router)
 app.include_router(transaction_reviews_router)
+app.include_router(events_router)
 
 
 async def _purge_rate_limit_store():
@@ -244,52 +258,28 @@ async def _purge_rate_limit_store():
             logger.info(f"Rate-limit store purgé : {len(stale)} clés supprimées")
 
 
-async def _remind_pending_offers():
-    """Toutes les 24h : envoie un rappel au vendeur pour les offres pending depuis +72h."""
-    from datetime import datetime, timezone, timedelta
-    from .email_service import send_offer_reminder, FRONTEND_URL
+# Références fortes : la boucle asyncio ne garde que des références faibles aux tâches
+_background_tasks: set[asyncio.Task] = set()
 
-    while True:
-        await asyncio.sleep(24 * 3600)
-        try:
-            cutoff = (datetime.now(timezone.utc) - timedelta(hours=72)).isoformat()
-            # Offres pending > 72h sans rappel déjà envoyé
-            offers = await db.offers.find(
-                {"status": "pending", "created_at": {"$lt": cutoff}, "reminder_sent": {"$ne": True}},
-                {"_id": 0, "offer_id": 1, "listing_id": 1}
-            ).to_list(500)
-
-            # Regroupe par listing pour envoyer un seul email par vendeur
-            listing_offer_count: dict[str, int] = {}
-            for o in offers:
-                listing_offer_count[o["listing_id"]] = listing_offer_count.get(o["listing_id"], 0) + 1
-
-            for listing_id, count in listing_offer_count.items():
-                listing = await db.listings.find_one({"listing_id": listing_id, "status": "active"}, {"_id": 0})
-                if not listing:
-                    continue
-                seller = await db.users.find_one({"user_id": listing["user_id"]}, {"_id": 0, "email": 1, "name": 1})
-                if seller and seller.get("email"):
-                    listing_url = f"{FRONTEND_URL}/marketplace/{listing_id}"
-                    await send_offer_reminder(seller["email"], seller.get("name", ""), listing_url, count)
-
-            # Marque les offres comme rappelées
-            offer_ids = [o["offer_id"] for o in offers]
-            if offer_ids:
-                await db.offers.update_many(
-                    {"offer_id": {"$in": offer_ids}},
-                    {"$set": {"reminder_sent": True}}
-                )
-                logger.info(f"M8 rappel offres : {len(offer_ids)} offres notifiées sur {len(listing_offer_count)} annonces")
-        except Exception as e:
-            logger.error(f"M8 _remind_pending_offers error: {e}")
+
+def _spawn(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
 
 @app.on_event("startup")
 async def create_indexes():
     if _ENV != "test":
-        asyncio.create_task(_purge_rate_limit_store())
-        asyncio.create_task(_remind_pending_offers())
+        _spawn(_purge_rate_limit_store())
+        _spawn(scheduled_loop("offer_reminders", OFFER_REMINDER_INTERVAL, send_offer_reminders))
+        _spawn(scheduled_loop("approval_recovery", APPROVAL_STALE_AFTER, recover_stale_approvals))
+        _spawn(reestimate_if_tables_changed())
+        _spawn(dashboard_stats_refresh_loop())
+        _spawn(file_deletion_loop())
+        _spawn(orphan_sweep_loop())
+        _spawn(listing_snapshot_refresh_loop())
+        _spawn(event_bus.run())
 
     await db.teams.create_index("team_id", unique=True, sparse=True)
     await db.teams.create_index("slug", unique=True)
@@ -310,36 +300,67 @@ async def create_indexes():
     await db.notifications.create_index("user_id")
     await db.notifications.create_index([("user_id", 1), ("read", 1)])
     await db.notifications.create_index("created_at")
+    await db.notifications.create_index(NOTIFICATION_INDEX)
+    # Rétention : notifications lues purgées NOTIFICATION_READ_RETENTION après lecture
+    await ensure_ttl_index(db.notifications)
     await db.submissions.create_index([("submitted_by", 1), ("submission_type", 1), ("created_at", 1)])
+    await db.submissions.create_index([("status", 1), ("created_at", -1), ("submission_id", -1)])
+    await db.submission_votes.create_index([("submission_id", 1), ("user_id", 1)], unique=True)
+    await db.submission_votes.create_index("user_id")
     await db.users.create_index("is_banned")
     await db.users.create_index("role")
     await db.password_resets.create_index("token", unique=True)
     await db.password_resets.create_index("email")
     await db.password_resets.create_index("user_id")
-    await db.password_resets.create_index("expires_at")
+    await ensure_ttl_index(db.password_resets)
     await db.user_sessions.create_index("session_token", unique=True, sparse=True)
     await db.user_sessions.create_index("user_id")
-    await db.user_sessions.create_index("expires_at")
+    await ensure_ttl_index(db.user_sessions)
     await db.listings.create_index("listing_id", unique=True, sparse=True)
-    await db.listings.create_index([("status", 1), ("created_at", -1)])
+    for keys in LISTING_SORT_INDEXES:
+        await db.listings.create_index(keys)
     await db.listings.create_index("user_id")
     await db.listings.create_index("version_id")
+    await db.listings.create_index("collection_id")
+    await db.listings.create_index("kit_snapshot.kit_id")
+    await db.listings.create_index("snapshot_stale", sparse=True)
+    for field in ("club", "brand", "season", "league"):
+        await db.listings.create_index([("status", 1), (f"kit_snapshot.{field}", 1), ("created_at", -1)])
+    await db.listings.create_index([("status", 1), ("collection_item.size", 1), ("created_at", -1)])
+    await db.wishlists.create_index([("user_id", 1), ("added_at", -1)])
+    await db.wishlists.create_index("version_id")
+    await db.saved_searches.create_index("search_id", unique=True)
+    await db.saved_searches.create_index([("user_id", 1), ("filters_key", 1)], unique=True)
+    await db.saved_searches.create_index("match_key")
     await db.offers.create_index("offer_id", unique=True, sparse=True)
     await db.offers.create_index([("listing_id", 1), ("status", 1)])
     await db.offers.create_index("offerer_id")
+    await db.offers.create_index([("status", 1), ("created_at", 1)])
+    await db.transactions.create_index("transaction_id", unique=True, sparse=True)
+    await db.transactions.create_index([("seller_id", 1), ("status", 1)])
+    await db.transactions.create_index([("buyer_id", 1), ("status", 1)])
+    await db.transaction_messages.create_index(MESSAGE_INDEX)
+    await db.user_counters.create_index("user_id", unique=True)
+    # Relais SSE entre workers (EVENT_BUS=mongo)
+    await ensure_ttl_index(db.events)
     await db.email_verifications.create_index("token", unique=True, sparse=True)
     await db.email_verifications.create_index("user_id")
-    await db.email_verifications.create_index("expires_at")
+    await ensure_ttl_index(db.email_verifications)
     await db.reports.create_index([("reported_by", 1), ("target_id", 1), ("status", 1)])
     await db.reports.create_index("status")
     await db.reports.create_index("created_at")
+    await db.collection_summaries.create_index("user_id", unique=True)
+    await db.version_price_stats.create_index("version_id", unique=True)
+    await db.collections.create_index("flocking_player_id", sparse=True)
+    await db.collections.create_index("version_id")
+    await db.reestimation_jobs.create_index("job_id", unique=True)
+    await db.dashboard_stats.create_index("key", unique=True)
+    await db.config.create_index("key", unique=True)
+    await db.file_deletions.create_index("relative_path", unique=True)
+    await db.file_deletions.create_index([("attempts", 1), ("enqueued_at", 1)])
+    await db.submission_quotas.create_index([("user_id", 1), ("submission_type", 1)], unique=True)
+    await ensure_ttl_index(db.submission_quotas)
+    await db.users.create_index("created_at")
+    await db.submissions.create_index("created_at")
 
-    from datetime import datetime, timezone
-    now_iso = datetime.now(timezone.utc).isoformat()
-    deleted_sessions = await db.user_sessions.delete_many({"expires_at": {"$lt": now_iso}})
-    deleted_resets   = await db.password_resets.delete_many({"expires_at": {"$lt": now_iso}})
-    logger.info(
-        f"Startup cleanup: {deleted_sessions.deleted_count} sessions expirées, "
-        f"{deleted_resets.deleted_count} reset tokens expirés supprimés"
-    )
     logger.info("Indexes created successfully")
@@ -0,0 +1,538 @@
+"""Moteur d'approbation des soumissions — cascade unique pour le vote
+communautaire (`submissions.vote_on_submission`), l'approbation admin
+(`admin_panel.admin_approve_submission`) et la modération en masse.
+Le rejet (`reject_submission`) est partagé de la même façon.
+
+Étapes (durées en ms enregistrées dans `submission.approval.stages_ms`) :
+  1. claim   : `pending` → `approving` de façon atomique ; un second appel
+               concurrent obtient `in_progress`, un appel sur une soumission
+               déjà approuvée obtient `already_approved`.
+  2. plan    : lectures seules → liste d'écritures groupées par collection
+               (master kit, version par défaut, entités liées, FK, statuts)
+               + fichiers média à supprimer.
+  3. write   : un `bulk_write` par collection, dans une transaction
+               multi-documents si le déploiement Mongo le permet (replica
+               set) ; sinon exécution directe (standalone, mongomock).
+               La soumission passe à `approved` dans la même unité.
+  4. cleanup : mise en file des fichiers remplacés / orphelins
+               (`file_cleanup.enqueue_file_deletions`, supprimés par lots
+               en arrière-plan) ; annonces marketplace du kit / de la version
+               édité(e) marquées à rafraîchir (`listing_snapshot`).
+
+Idempotence : tous les identifiants créés sont dérivés de l'id de
+soumission (`stable_id`) et les créations sont des upserts `$setOnInsert`.
+Un échec remet la soumission en `pending` (`approval.last_error`) ; rejouer
+l'approbation ne duplique rien, même sans transaction. Un worker qui meurt
+entre le claim et l'écriture laisse la soumission en `approving` : le claim
+pose `approving_since`, et une soumission en `approving` depuis plus de
+`APPROVAL_STALE_AFTER` peut être réclamée de nouveau (`approve_submission`,
+approbation admin, ou le job `recover_stale_approvals`). La finalisation est
+conditionnée au claim du worker : un worker dont le claim a été repris
+n'approuve pas (transaction annulée), ne touche ni aux fichiers ni aux
+annonces et renvoie `in_progress`.
+"""
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import DeleteMany, DeleteOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import OperationFailure
+
+from ..database import db, client
+from ..utils import normalize_season, slugify
+from .file_cleanup import enqueue_file_deletions
+from .listing_snapshot import mark_listing_snapshots_stale
+
+logger = logging.getLogger(__name__)
+
+ENTITY_COLLECTIONS = {
+    "team":    {"collection": "teams",    "id_field": "team_id",    "name_field": "name"},
+    "league":  {"collection": "leagues",  "id_field": "league_id",  "name_field": "name"},
+    "brand":   {"collection": "brands",   "id_field": "brand_id",   "name_field": "name"},
+    "player":  {"collection": "players",  "id_field": "player_id",  "name_field": "full_name"},
+    "sponsor": {"collection": "sponsors", "id_field": "sponsor_id", "name_field": "name"},
+}
+
+KIT_ID_FIELDS = {
+    "team":    "team_id",
+    "brand":   "brand_id",
+    "league":  "league_id",
+    "sponsor": "sponsor_id",
+}
+
+APPROVAL_STALE_AFTER = timedelta(minutes=10)
+
+IMAGE_FIELDS = {"logo_url", "crest_url", "photo_url", "stadium_image_url"}
+VERSION_IMAGE_FIELDS = {"front_photo", "back_photo"}
+MASTER_KIT_IMAGE_FIELDS = {"front_photo"}
+
+# Champs obligatoires pour créer un nouveau master_kit
+MASTER_KIT_REQUIRED_CREATE_FIELDS = ["club", "season", "kit_type", "brand", "front_photo"]
+
+# Code Mongo « IllegalOperation » : transactions refusées hors replica set
+_NO_TRANSACTION_CODES = {20}
+_transactions_supported: Optional[bool] = None
+
+
+class ApprovalClaimLost(Exception):
+    """Le claim `approving` de ce worker a été repris par un autre entre-temps."""
+
+
+def stable_id(prefix: str, key: str) -> str:
+    """Identifiant déterministe : le même `key` donne toujours le même id."""
+    return f"{prefix}_{uuid.uuid5(uuid.NAMESPACE_URL, f'topkit:{key}').hex[:12]}"
+
+
+class ApprovalPlan:
+    """Écritures à exécuter, groupées par collection (ordre d'insertion conservé)."""
+
+    def __init__(self):
+        self.writes: dict[str, list] = {}
+        self.files_to_delete: list[str] = []
+        self.result: dict = {}
+
+    def add(self, collection: str, op) -> None:
+        self.writes.setdefault(collection, []).append(op)
+
+    def delete_files(self, doc: Optional[dict], fields, only_if_replaced_by: Optional[dict] = None) -> None:
+        """Programme la suppression des fichiers de `doc` (remplacés ou supprimés)."""
+        if not doc:
+            return
+        for field in fields:
+            old_url = doc.get(field, "")
+            if not old_url:
+                continue
+            if only_if_replaced_by is None:
+                self.files_to_delete.append(old_url)
+            else:
+                new_url = only_if_replaced_by.get(field)
+                if new_url and new_url != old_url:
+                    self.files_to_delete.append(old_url)
+
+
+# ─── Planification (lectures seules) ────────────────────────────────────────
+
+async def plan_entity_submission(plan: ApprovalPlan, sub: dict, now: str) -> Optional[str]:
+    """Planifie l'application d'une soumission d'entité ; retourne l'id de l'entité."""
+    entity_type = sub["submission_type"]
+    config = ENTITY_COLLECTIONS.get(entity_type)
+    if not config:
+        return None
+    data = sub["data"]
+    mode = data.get("mode", "create")
+    sub_id = sub.get("submission_id")
+    collection, id_field = config["collection"], config["id_field"]
+
+    if mode == "create":
+        entity_id = data.get("entity_id")
+        if entity_id:
+            update_doc = {k: v for k, v in data.items()
+                          if k not in ("mode", "parent_submission_id", "entity_id", "entity_type")}
+            update_doc["status"] = "approved"
+            update_doc["updated_at"] = now
+            plan.add(collection, UpdateOne({id_field: entity_id}, {"$set": update_doc}))
+            return entity_id
+
+        name = data.get("name") or data.get("full_name", "")
+        new_id = stable_id(entity_type, sub_id) if sub_id else f"{entity_type}_{uuid.uuid4().hex[:12]}"
+        doc = {k: v for k, v in data.items() if k not in ("mode", "parent_submission_id")}
+        doc[id_field] = new_id
+        doc["slug"] = slugify(name)
+        doc["status"] = "approved"
+        doc["created_at"] = now
+        doc["updated_at"] = now
+        if sub_id:
+            doc["submission_id"] = sub_id
+        plan.add(collection, UpdateOne({id_field: new_id}, {"$setOnInsert": doc}, upsert=True))
+        return new_id
+
+    entity_id = data.get("entity_id", "")
+    if mode == "edit":
+        if not entity_id:
+            logger.warning(f"[APPROVAL] mode=edit sans entity_id pour {sub_id} ({entity_type}), skip")
+            return None
+        old_doc = await db[collection].find_one({id_field: entity_id}, {"_id": 0})
+        update_fields = {}
+        for k, v in data.items():
+            if k in ("mode", "entity_id", "entity_type", "parent_submission_id"):
+                continue
+            if k in IMAGE_FIELDS:
+                if v and isinstance(v, str):
+                    update_fields[k] = v
+            elif v is not None and v != [] and v != "":
+                update_fields[k] = v
+        update_fields["updated_at"] = now
+        update_fields["status"] = "approved"
+        name_key = "full_name" if entity_type == "player" else "name"
+        if name_key in update_fields:
+            update_fields["slug"] = slugify(update_fields[name_key])
+        plan.delete_files(old_doc, IMAGE_FIELDS, only_if_replaced_by=update_fields)
+        plan.add(collection, UpdateOne({id_field: entity_id}, {"$set": update_fields}))
+        return entity_id
+
+    if mode == "removal" and entity_id:
+        old_doc = await db[collection].find_one({id_field: entity_id}, {"_id": 0})
+        plan.delete_files(old_doc, IMAGE_FIELDS)
+        plan.add(collection, DeleteOne({id_field: entity_id}))
+    return None
+
+
+async def _plan_master_kit(plan: ApprovalPlan, sub: dict, now: str) -> None:
+    data = sub["data"]
+    sub_id = sub["submission_id"]
+    mode = data.get("mode", "create")
+
+    if mode in ("removal", "edit"):
+        kit_id = data.get("kit_id", "") or data.get("entity_id", "")
+        if not kit_id:
+            logger.warning(f"[APPROVAL] master_kit {mode} sans kit_id dans {sub_id}, skip")
+            return
+        old_kit = await db.master_kits.find_one({"kit_id": kit_id}, {"_id": 0})
+        if mode == "removal":
+            plan.delete_files(old_kit, MASTER_KIT_IMAGE_FIELDS)
+            async for ver in db.versions.find({"kit_id": kit_id}, {"_id": 0, "front_photo": 1, "back_photo": 1}):
+                plan.delete_files(ver, VERSION_IMAGE_FIELDS)
+            plan.add("versions", DeleteMany({"kit_id": kit_id}))
+            plan.add("master_kits", DeleteOne({"kit_id": kit_id}))
+        else:
+            update_fields = {k: v for k, v in data.items()
+                             if k not in ("mode", "kit_id", "entity_id") and v not in (None, "", [])}
+            if "season" in update_fields:
+                update_fields["season"] = normalize_season(update_fields["season"])
+            update_fields["updated_at"] = now
+            plan.delete_files(old_kit, MASTER_KIT_IMAGE_FIELDS, only_if_replaced_by=update_fields)
+            plan.add("master_kits", UpdateOne({"kit_id": kit_id}, {"$set": update_fields}))
+        plan.result["kit_id"] = kit_id
+        return
+
+    # mode create — GUARD : champs obligatoires (sinon on approuve sans créer de kit)
+    missing_fields = [f for f in MASTER_KIT_REQUIRED_CREATE_FIELDS if not data.get(f)]
+    if missing_fields:
+        logger.warning(f"[APPROVAL] création master_kit refusée pour {sub_id} — champs manquants : {missing_fields}")
+        return
+
+    kit_id = stable_id("kit", sub_id)
+    kit_doc = {
+        "kit_id":      kit_id,
+        "club":        data.get("club", ""),
+        "season":      normalize_season(data.get("season", "")),
+        "kit_type":    data.get("kit_type", ""),
+        "brand":       data.get("brand", ""),
+        "front_photo": data.get("front_photo", ""),
+        "league":      data.get("league", ""),
+        "design":      data.get("design", ""),
+        "sponsor":     data.get("sponsor", ""),
+        "gender":      data.get("gender", ""),
+        "team_id":     data.get("team_id", ""),
+        "league_id":   data.get("league_id", ""),
+        "brand_id":    data.get("brand_id", ""),
+        "created_by":  sub["submitted_by"],
+        "created_at":  now,
+    }
+
+    # Entités liées (créées avec le kit) : leurs ids patchent directement le kit
+    linked = db.submissions.find(
+        {"submission_type": {"$in": list(ENTITY_COLLECTIONS)},
+         "status": "pending", "data.parent_submission_id": sub_id},
+        {"_id": 0},
+    )
+    linked_ids = []
+    async for entity_sub in linked:
+        new_entity_id = await plan_entity_submission(plan, entity_sub, now)
+        linked_ids.append(entity_sub["submission_id"])
+        etype = entity_sub["submission_type"]
+        if etype in KIT_ID_FIELDS and new_entity_id:
+            kit_doc[KIT_ID_FIELDS[etype]] = new_entity_id
+
+    version_id = stable_id("ver", f"{sub_id}:default")
+    plan.add("master_kits", UpdateOne({"kit_id": kit_id}, {"$setOnInsert": kit_doc}, upsert=True))
+    plan.add("versions", UpdateOne({"version_id": version_id}, {"$setOnInsert": {
+        "version_id":  version_id,
+        "kit_id":      kit_id,
+        "competition": "National Championship",
+        "model":       "Replica",
+        "sku_code":    "",
+        "ean_code":    "",
+        "front_photo": data.get("front_photo", ""),
+        "back_photo":  "",
+        "created_by":  sub["submitted_by"],
+        "created_at":  now,
+    }}, upsert=True))
+    if linked_ids:
+        plan.add("submissions", UpdateMany(
+            {"submission_id": {"$in": linked_ids}},
+            {"$set": {"status": "approved", "updated_at": now}},
+        ))
+    for cfg in ENTITY_COLLECTIONS.values():
+        plan.add(cfg["collection"], UpdateMany(
+            {"submission_id": sub_id, "status": "pending"},
+            {"$set": {"status": "approved", "updated_at": now}},
+        ))
+    plan.result.update({"kit_id": kit_id, "version_id": version_id})
+
+
+async def _plan_version(plan: ApprovalPlan, sub: dict, now: str) -> None:
+    data = sub["data"]
+    mode = data.get("mode", "create")
+    version_id = data.get("version_id", "")
+
+    if mode in ("edit", "removal") and version_id:
+        old_ver = await db.versions.find_one({"version_id": version_id}, {"_id": 0})
+        if mode == "edit":
+            update_fields = {k: v for k, v in data.items()
+                             if k not in ("mode", "version_id") and v not in (None, "", [])}
+            update_fields["updated_at"] = now
+            plan.delete_files(old_ver, VERSION_IMAGE_FIELDS, only_if_replaced_by=update_fields)
+            plan.add("versions", UpdateOne({"version_id": version_id}, {"$set": update_fields}))
+        else:
+            plan.delete_files(old_ver, VERSION_IMAGE_FIELDS)
+            plan.add("versions", DeleteOne({"version_id": version_id}))
+        plan.result["version_id"] = version_id
+        return
+
+    new_version_id = stable_id("ver", sub["submission_id"])
+    plan.add("versions", UpdateOne({"version_id": new_version_id}, {"$setOnInsert": {
+        "version_id":  new_version_id,
+        "kit_id":      data.get("kit_id", ""),
+        "competition": data.get("competition", ""),
+        "model":       data.get("model", ""),
+        "sku_code":    data.get("sku_code", ""),
+        "ean_code":    data.get("ean_code", ""),
+        "front_photo": data.get("front_photo", ""),
+        "back_photo":  data.get("back_photo", ""),
+        "created_by":  sub["submitted_by"],
+        "created_at":  now,
+    }}, upsert=True))
+    plan.result["version_id"] = new_version_id
+
+
+async def build_plan(sub: dict, now: str) -> ApprovalPlan:
+    plan = ApprovalPlan()
+    sub_type = sub["submission_type"]
+    if sub_type == "master_kit":
+        await _plan_master_kit(plan, sub, now)
+    elif sub_type == "version":
+        await _plan_version(plan, sub, now)
+    elif sub_type in ENTITY_COLLECTIONS and not sub["data"].get("parent_submission_id"):
+        entity_id = await plan_entity_submission(plan, sub, now)
+        if entity_id:
+            plan.result["entity_id"] = entity_id
+    return plan
+
+
+# ─── Exécution ──────────────────────────────────────────────────────────────
+
+async def _execute(plan: ApprovalPlan, finalize: UpdateOne, session=None) -> None:
+    """Un bulk_write par collection ; la soumission est finalisée en dernier.
+
+    Lève ApprovalClaimLost si la finalisation ne trouve plus le claim de ce
+    worker (annule la transaction le cas échéant).
+    """
+    for collection, ops in plan.writes.items():
+        if collection != "submissions":
+            await db[collection].bulk_write(ops, ordered=True, session=session)
+    if plan.writes.get("submissions"):
+        await db.submissions.bulk_write(plan.writes["submissions"], ordered=True, session=session)
+    result = await db.submissions.bulk_write([finalize], session=session)
+    if not result.matched_count:
+        raise ApprovalClaimLost()
+
+
+async def _execute_atomically(plan: ApprovalPlan, finalize: UpdateOne) -> bool:
+    """Exécute le plan dans une transaction si possible. Retourne True si transactionnel."""
+    global _transactions_supported
+    if _transactions_supported is not False:
+        try:
+            session = await client.start_session()
+        except NotImplementedError:
+            _transactions_supported = False
+        else:
+            async with session:
+                try:
+                    await session.with_transaction(lambda s: _execute(plan, finalize, session=s))
+                    _transactions_supported = True
+                    return True
+                except OperationFailure as e:
+                    if e.code not in _NO_TRANSACTION_CODES:
+                        raise
+                    _transactions_supported = False
+    await _execute(plan, finalize)
+    return False
+
+
+async def _delete_files(urls: list[str]) -> None:
+    await enqueue_file_deletions(urls)
+
+
+def _claimable(submission_id: str) -> dict:
+    """Filtre : soumission en attente, ou claim `approving` abandonné (worker mort)."""
+    stale = (datetime.now(timezone.utc) - APPROVAL_STALE_AFTER).isoformat()
+    return {"submission_id": submission_id, "$or": [
+        {"status": "pending"},
+        {"status": "approving", "approving_since": {"$lt": stale}},
+        {"status": "approving", "approving_since": {"$exists": False}},  # bloquées avant `approving_since`
+    ]}
+
+
+async def approve_submission(submission_id: str, approved_by: Optional[str] = None) -> dict:
+    """Applique la cascade d'approbation d'une soumission (idempotent).
+
+    Retourne {status: "approved" | "already_approved" | "in_progress" | "not_found",
+    submission_id, transactional, stages_ms, + ids créés / modifiés}.
+    Lève l'exception d'origine si l'écriture échoue (soumission remise en `pending`).
+    """
+    stages: dict[str, float] = {}
+    t0 = time.perf_counter()
+    now = datetime.now(timezone.utc).isoformat()
+
+    sub = await db.submissions.find_one_and_update(
+        _claimable(submission_id),
+        {"$set": {"status": "approving", "approving_since": now, "approval.started_at": now},
+         "$inc": {"approval.attempts": 1}},
+        return_document=ReturnDocument.AFTER,
+    )
+    stages["claim"] = round((time.perf_counter() - t0) * 1000, 2)
+    if sub is None:
+        current = await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0, "status": 1})
+        if not current:
+            return {"status": "not_found", "submission_id": submission_id}
+        status = "already_approved" if current["status"] == "approved" else "in_progress"
+        return {"status": status, "submission_id": submission_id}
+    sub.pop("_id", None)
+
+    try:
+        t = time.perf_counter()
+        plan = await build_plan(sub, now)
+        stages["plan"] = round((time.perf_counter() - t) * 1000, 2)
+
+        t = time.perf_counter()
+        # `approving_since` = ce claim : un claim repris entre-temps n'est pas finalisé ici
+        finalize = UpdateOne(
+            {"submission_id": submission_id, "status": "approving", "approving_since": now},
+            {"$set": {
+                "status": "approved",
+                "updated_at": now,
+                "approval.approved_by": approved_by,
+                "approval.finished_at": datetime.now(timezone.utc).isoformat(),
+                "approval.result": plan.result,
+            }, "$unset": {"approval.last_error": "", "approving_since": ""}},
+        )
+        transactional = await _execute_atomically(plan, finalize)
+        stages["write"] = round((time.perf_counter() - t) * 1000, 2)
+    except ApprovalClaimLost:
+        # Un autre worker a repris le claim : c'est lui qui finalise, notifie et nettoie
+        logger.warning(f"[APPROVAL] claim perdu pour {submission_id}, approbation laissée au nouveau détenteur")
+        current = await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0, "status": 1})
+        status = "already_approved" if current and current["status"] == "approved" else "in_progress"
+        return {"status": status, "submission_id": submission_id}
+    except Exception as e:
+        logger.exception(f"[APPROVAL] échec pour {submission_id}")
+        await db.submissions.update_one(
+            {"submission_id": submission_id, "status": "approving", "approving_since": now},
+            {"$set": {"status": "pending", "approval.last_error": str(e)}, "$unset": {"approving_since": ""}},
+        )
+        raise
+
+    t = time.perf_counter()
+    await _delete_files(plan.files_to_delete)
+    if sub["submission_type"] in ("master_kit", "version") and sub.get("data", {}).get("mode", "create") != "create":
+        await mark_listing_snapshots_stale(kit_id=plan.result.get("kit_id"), version_id=plan.result.get("version_id"))
+    stages["cleanup"] = round((time.perf_counter() - t) * 1000, 2)
+    stages["total"] = round((time.perf_counter() - t0) * 1000, 2)
+
+    await db.submissions.update_one(
+        {"submission_id": submission_id},
+        {"$set": {"approval.stages_ms": stages, "approval.transactional": transactional}},
+    )
+    logger.info(f"[APPROVAL] {submission_id} approuvée en {stages['total']} ms "
+                f"(transaction={transactional}, étapes={stages})")
+    return {
+        "status": "approved",
+        "submission_id": submission_id,
+        "transactional": transactional,
+        "stages_ms": stages,
+        **plan.result,
+    }
+
+
+async def force_approve_submission(submission_id: str, admin_id: str) -> dict:
+    """Approbation admin (bypass vote) : marque la soumission comme votée par
+    l'admin puis lance la cascade. Statut "in_progress" si une approbation récente
+    est en cours, "not_pending" si elle n'est plus en attente, "not_found" sinon.
+    Un claim `approving` périmé est repris comme une soumission en attente."""
+    from ..utils import APPROVAL_THRESHOLD
+    now = datetime.now(timezone.utc).isoformat()
+    marked = await db.submissions.update_one(
+        _claimable(submission_id),
+        {"$set": {"votes_up": APPROVAL_THRESHOLD, "admin_approved_by": admin_id, "admin_approved_at": now}},
+    )
+    if not marked.matched_count:
+        current = await db.submissions.find_one({"submission_id": submission_id}, {"_id": 0, "status": 1})
+        if not current:
+            return {"status": "not_found", "submission_id": submission_id}
+        status = "in_progress" if current["status"] == "approving" else "not_pending"
+        return {"status": status, "submission_id": submission_id}
+    await db.submission_votes.update_one(
+        {"submission_id": submission_id, "user_id": admin_id},
+        {"$setOnInsert": {"vote": "up", "weight": APPROVAL_THRESHOLD, "created_at": now}},
+        upsert=True,
+    )
+    return await approve_submission(submission_id, approved_by=admin_id)
+
+
+async def recover_stale_approvals() -> dict:
+    """Relance les approbations restées en `approving` au-delà de APPROVAL_STALE_AFTER."""
+    stale = (datetime.now(timezone.utc) - APPROVAL_STALE_AFTER).isoformat()
+    ids = await db.submissions.distinct("submission_id", {"status": "approving", "$or": [
+        {"approving_since": {"$lt": stale}}, {"approving_since": {"$exists": False}},
+    ]})
+    counts = {"stale": len(ids), "approved": 0, "failed": 0}
+    for submission_id in ids:
+        try:
+            result = await approve_submission(submission_id)
+        except Exception:
+            counts["failed"] += 1  # remise en `pending` par approve_submission
+            continue
+        if result["status"] == "approved":
+            counts["approved"] += 1
+    return counts
+
+
+async def reject_submission(submission_id: str, set_fields: Optional[dict] = None) -> dict:
+    """Rejette une soumission en attente (transition atomique pending → rejected).
+
+    Rejette aussi les références d'entités d'un master kit et supprime les
+    images orphelines d'un edit. Retourne {status: "rejected" | "not_pending" |
+    "not_found", submission_id}.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    sub = await db.submissions.find_one_and_update(
+        {"submission_id": submission_id, "status": "pending"},
+        {"$set": {"status": "rejected", "updated_at": now, **(set_fields or {})}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if sub is None:
+        exists = await db.submissions.count_documents({"submission_id": submission_id}, limit=1)
+        return {"status": "not_pending" if exists else "not_found", "submission_id": submission_id}
+
+    if sub["submission_type"] == "master_kit":
+        await db.submissions.update_many(
+            {"submission_type": {"$in": list(ENTITY_COLLECTIONS)},
+             "status": "pending", "data.parent_submission_id": submission_id},
+            {"$set": {"status": "rejected", "updated_at": now}},
+        )
+        for cfg in ENTITY_COLLECTIONS.values():
+            await db[cfg["collection"]].update_many(
+                {"submission_id": submission_id, "status": "pending"},
+                {"$set": {"status": "rejected", "updated_at": now}},
+            )
+
+    # Images uploadées pour un edit refusé : plus référencées nulle part
+    data = sub.get("data", {})
+    if data.get("mode", "create") == "edit":
+        fields = VERSION_IMAGE_FIELDS if sub["submission_type"] == "version" else MASTER_KIT_IMAGE_FIELDS
+        await _delete_files([data[f] for f in fields if data.get(f)])
+
+    return {"status": "rejected", "submission_id": submission_id}
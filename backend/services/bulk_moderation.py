@@ -0,0 +1,138 @@
+"""Modération en masse — POST /api/admin/submissions/bulk.
+
+Chaque soumission passe par le moteur d'approbation (`force_approve_submission`
+/ `reject_submission`), au plus `BULK_CONCURRENCY` à la fois. Les soumissions
+sont préchargées en une requête `$in` (statut, auteur, nom pour le récapitulatif).
+
+Les notifications sont regroupées par auteur : une notification
+`submissions_moderated` et un email récapitulatif par personne, au lieu d'un
+par soumission.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Optional
+
+from ..database import db
+from ..email_service import send_moderation_digest
+from ..routers.notifications import create_notification
+from ..routers.submissions import SUBMISSION_TYPE_LABELS, _submission_name
+from .approval_engine import force_approve_submission, reject_submission
+
+logger = logging.getLogger(__name__)
+
+BULK_CONCURRENCY = 8
+DIGEST_MAX_NAMES = 10
+
+_DONE_STATUS = {"approve": "approved", "reject": "rejected"}
+
+
+def _ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 1)
+
+
+async def _moderate_one(sub_id: str, sub: Optional[dict], action: str, admin_id: str, sem: asyncio.Semaphore) -> dict:
+    started = time.perf_counter()
+    result = {"submission_id": sub_id}
+    if sub is None:
+        return result | {"status": "not_found", "ms": 0.0}
+    # `approving` : le moteur décide (claim périmé repris, sinon in_progress)
+    if sub["status"] != "pending" and not (action == "approve" and sub["status"] == "approving"):
+        return result | {"status": "not_pending", "ms": 0.0}
+    async with sem:
+        try:
+            if action == "approve":
+                outcome = await force_approve_submission(sub_id, admin_id)
+            else:
+                outcome = await reject_submission(sub_id, {"admin_rejected_by": admin_id})
+            result["status"] = outcome["status"]
+            if outcome.get("stages_ms"):
+                result["stages_ms"] = outcome["stages_ms"]
+        except Exception as e:
+            # Le moteur a remis la soumission en `pending` : elle pourra être rejouée
+            logger.error(f"Modération en masse — {sub_id} : {e}")
+            result |= {"status": "error", "error": str(e)}
+    result["ms"] = _ms(started)
+    return result
+
+
+async def _notify_submitters(subs: dict[str, dict], results: list[dict]) -> int:
+    """Une notification + un email récapitulatif par auteur. Retourne le nombre d'auteurs notifiés."""
+    per_user: dict[str, dict[str, list[str]]] = {}
+    for r in results:
+        if r["status"] not in ("approved", "rejected"):
+            continue
+        sub = subs[r["submission_id"]]
+        if not sub.get("submitted_by"):
+            continue
+        label = SUBMISSION_TYPE_LABELS.get(sub["submission_type"], sub["submission_type"])
+        bucket = per_user.setdefault(sub["submitted_by"], {"approved": [], "rejected": []})
+        bucket[r["status"]].append(f"{label} « {_submission_name(sub)} »")
+    if not per_user:
+        return 0
+
+    users = {
+        u["user_id"]: u
+        async for u in db.users.find(
+            {"user_id": {"$in": list(per_user)}}, {"_id": 0, "user_id": 1, "email": 1, "name": 1}
+        )
+    }
+    for user_id, bucket in per_user.items():
+        approved, rejected = bucket["approved"], bucket["rejected"]
+        parts = []
+        if approved:
+            parts.append(f"{len(approved)} approuvée(s)")
+        if rejected:
+            parts.append(f"{len(rejected)} refusée(s)")
+        names = (approved + rejected)[:DIGEST_MAX_NAMES]
+        await create_notification(
+            user_id=user_id,
+            notif_type="submissions_moderated",
+            title="Soumissions modérées 🗂️",
+            message=f"{', '.join(parts).capitalize()} par la modération : {', '.join(names)}"
+                    + (" …" if len(approved) + len(rejected) > DIGEST_MAX_NAMES else ""),
+        )
+        user = users.get(user_id, {})
+        if user.get("email"):
+            await send_moderation_digest(user["email"], user.get("name", ""), approved, rejected)
+    return len(per_user)
+
+
+async def moderate_submissions(submission_ids: list[str], action: str, admin_id: str, notify: bool = True) -> dict:
+    """Approuve ou rejette un lot : {action, results, summary, notified, timings_ms}."""
+    started = time.perf_counter()
+    subs = {
+        s["submission_id"]: s
+        async for s in db.submissions.find(
+            {"submission_id": {"$in": submission_ids}},
+            {"_id": 0, "submission_id": 1, "submission_type": 1, "status": 1, "submitted_by": 1, "data": 1},
+        )
+    }
+    preload_ms = _ms(started)
+
+    sem = asyncio.Semaphore(BULK_CONCURRENCY)
+    moderate_started = time.perf_counter()
+    results = await asyncio.gather(*(
+        _moderate_one(sub_id, subs.get(sub_id), action, admin_id, sem) for sub_id in submission_ids
+    ))
+    moderate_ms = _ms(moderate_started)
+
+    notify_started = time.perf_counter()
+    notified = await _notify_submitters(subs, results) if notify else 0
+    notify_ms = _ms(notify_started)
+
+    summary = Counter(r["status"] for r in results)
+    return {
+        "action": action,
+        "results": results,
+        "summary": dict(summary),
+        "done": summary.get(_DONE_STATUS[action], 0),
+        "notified": notified,
+        "timings_ms": {
+            "preload": preload_ms,
+            "moderate": moderate_ms,
+            "notify": notify_ms,
+            "total": _ms(started),
+        },
+    }
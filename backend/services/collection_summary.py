@@ -0,0 +1,282 @@
+"""Résumé matérialisé de la valeur des collections — un document par utilisateur.
+
+Collection `collection_summaries` :
+  {
+    user_id, total_count, items_with_estimates,
+    value_sum, value_min, value_max,
+    categories: {<clé>: {name, count, items_with_estimates, value_sum, value_min, value_max}},
+    updated_at,
+  }
+
+Mis à jour de façon atomique ($inc / $min / $max, un seul update_one) à chaque
+ajout / modification / suppression d'item, et lors du transfert de propriété
+en fin de transaction. Les endpoints /collections/stats et /category-stats
+deviennent une simple lecture.
+
+Un $min / $max ne se « décrémente » pas : si l'item retiré portait un extrême,
+le résumé de l'utilisateur est reconstruit depuis `collections`. Le même
+rebuild sert de job de réparation en cas de dérive (suppressions en masse,
+écritures hors de ces helpers).
+"""
+from datetime import datetime, timezone
+
+from pymongo import ReturnDocument
+
+from ..database import db
+
+
+PRICE_FIELDS = ("estimated_price", "value_estimate", "price_estimate")
+DEFAULT_CATEGORY = "General"
+# Une catégorie "" reste un groupe distinct (comme `item.get("category", "General")`)
+# mais "" n'est pas un nom de champ utilisable
+EMPTY_CATEGORY_KEY = "∅"
+
+
+def item_value(item: dict) -> float:
+    """Valeur retenue pour un item — même priorité que l'ancien calcul Python."""
+    return (
+        item.get("estimated_price")
+        or item.get("value_estimate")
+        or item.get("price_estimate")
+        or 0
+    )
+
+
+def item_category(item: dict) -> str:
+    """Catégorie d'un item : "General" si absente ou nulle, "" conservé tel quel."""
+    category = item.get("category")
+    return DEFAULT_CATEGORY if category is None else category
+
+
+def category_key(name: str) -> str:
+    """Encode un nom de catégorie en clé de sous-document Mongo valide.
+
+    `.` et `$` initial sont interdits dans les noms de champs : on les remplace
+    par leurs équivalents pleine chasse (le nom d'origine reste dans `name`).
+    """
+    if name == "":
+        return EMPTY_CATEGORY_KEY
+    key = (name or DEFAULT_CATEGORY).replace(".", "．")
+    if key.startswith("$"):
+        key = "＄" + key[1:]
+    return key
+
+
+def _delta_update(item: dict, sign: int) -> tuple[dict, float]:
+    """Construit l'update atomique correspondant à l'ajout (+1) / retrait (-1) d'un item."""
+    category = item_category(item)
+    prefix = f"categories.{category_key(category)}"
+    value = item_value(item)
+    has_estimate = bool(value and value > 0)
+
+    inc = {"total_count": sign, f"{prefix}.count": sign}
+    if has_estimate:
+        inc["items_with_estimates"] = sign
+        inc["value_sum"] = sign * value
+        inc[f"{prefix}.items_with_estimates"] = sign
+        inc[f"{prefix}.value_sum"] = sign * value
+
+    update: dict = {
+        "$inc": inc,
+        "$set": {f"{prefix}.name": category, "updated_at": datetime.now(timezone.utc).isoformat()},
+    }
+    if has_estimate and sign > 0:
+        update["$min"] = {"value_min": value, f"{prefix}.value_min": value}
+        update["$max"] = {"value_max": value, f"{prefix}.value_max": value}
+    return update, (value if has_estimate else 0)
+
+
+async def apply_item_added(item: dict) -> None:
+    """Répercute l'ajout d'un item dans le résumé de son propriétaire."""
+    if not item.get("user_id"):
+        return
+    update, _ = _delta_update(item, +1)
+    await db.collection_summaries.update_one({"user_id": item["user_id"]}, update, upsert=True)
+
+
+async def apply_item_removed(item: dict) -> bool:
+    """Répercute le retrait d'un item ; reconstruit si un extrême (min/max) est touché.
+
+    À appeler APRÈS l'écriture dans `collections`. Retourne True si le résumé a
+    été reconstruit (il reflète alors déjà l'état courant de la collection).
+    """
+    user_id = item.get("user_id")
+    if not user_id:
+        return False
+    update, value = _delta_update(item, -1)
+    # `_id` conservé dans la projection : sans lui, mongomock relit avec le filtre d'origine.
+    summary = await db.collection_summaries.find_one_and_update(
+        {"user_id": user_id}, update, return_document=ReturnDocument.AFTER,
+    )
+    if summary is None:
+        await rebuild_user_summary(user_id)
+        return True
+
+    category = (summary.get("categories") or {}).get(
+        category_key(item_category(item)), {}
+    )
+    touches_extreme = value > 0 and value in (
+        summary.get("value_min"), summary.get("value_max"),
+        category.get("value_min"), category.get("value_max"),
+    )
+    if touches_extreme or category.get("count", 0) <= 0 or summary.get("total_count", 0) < 0:
+        await rebuild_user_summary(user_id)
+        return True
+    return False
+
+
+async def apply_item_updated(old: dict, new: dict) -> None:
+    """Répercute une modification d'item (valeur, catégorie ou propriétaire)."""
+    if (
+        old.get("user_id") == new.get("user_id")
+        and item_category(old) == item_category(new)
+        and item_value(old) == item_value(new)
+    ):
+        return
+    rebuilt = await apply_item_removed(old)
+    if rebuilt and old.get("user_id") == new.get("user_id"):
+        return  # le rebuild a déjà relu la nouvelle version de l'item
+    await apply_item_added(new)
+
+
+def price_value_expr() -> dict:
+    """Équivalent Mongo de `item_value` : premier champ prix « truthy » sinon 0.
+
+    Un simple `$ifNull` ne suffit pas : côté Python, `0` fait aussi passer au
+    champ suivant (`estimated_price=0, value_estimate=40` → 40). `$cond` a la
+    même sémantique de vérité (null / absent / 0 / false → faux).
+    """
+    expr: object = 0
+    for field in reversed(PRICE_FIELDS):
+        expr = {"$cond": [{"$ifNull": [f"${field}", False]}, f"${field}", expr]}
+    return expr
+
+
+def summary_pipeline(match: dict) -> list[dict]:
+    """Pipeline `$group` par catégorie (une seule passe, côté serveur)."""
+    return [
+        {"$match": match},
+        {"$project": {
+            "_id": 0,
+            # Même règle que `item_category` : seul un champ absent / null devient "General"
+            "category": {"$ifNull": ["$category", DEFAULT_CATEGORY]},
+            "value": price_value_expr(),
+        }},
+        {"$project": {
+            "category": 1,
+            "estimated": {"$cond": [{"$gt": ["$value", 0]}, 1, 0]},
+            # null pour les items sans estimation : ignoré par $min / $max
+            "priced": {"$cond": [{"$gt": ["$value", 0]}, "$value", None]},
+        }},
+        {"$group": {
+            "_id": "$category",
+            "count": {"$sum": 1},
+            "items_with_estimates": {"$sum": "$estimated"},
+            "value_sum": {"$sum": {"$ifNull": ["$priced", 0]}},
+            "value_min": {"$min": "$priced"},
+            "value_max": {"$max": "$priced"},
+        }},
+    ]
+
+
+async def compute_summary(match: dict) -> dict:
+    """Agrège les items correspondant à `match` au format d'un résumé.
+
+    Sert au rebuild d'un utilisateur (`{"user_id": ...}`) comme aux
+    statistiques globales admin (`{}`) — aucun item n'est rapatrié en Python,
+    seulement une ligne par catégorie.
+    """
+    summary: dict = {
+        "total_count": 0,
+        "items_with_estimates": 0,
+        "value_sum": 0,
+        "categories": {},
+    }
+    async for row in db.collections.aggregate(summary_pipeline(match)):
+        cat = {
+            "name": row["_id"],
+            "count": row["count"],
+            "items_with_estimates": row["items_with_estimates"],
+            "value_sum": row["value_sum"],
+        }
+        if row["items_with_estimates"]:
+            cat["value_min"] = row["value_min"]
+            cat["value_max"] = row["value_max"]
+            summary["value_min"] = min(summary.get("value_min", cat["value_min"]), cat["value_min"])
+            summary["value_max"] = max(summary.get("value_max", cat["value_max"]), cat["value_max"])
+        summary["categories"][category_key(row["_id"])] = cat
+        summary["total_count"] += cat["count"]
+        summary["items_with_estimates"] += cat["items_with_estimates"]
+        summary["value_sum"] += cat["value_sum"]
+    summary["updated_at"] = datetime.now(timezone.utc).isoformat()
+    return summary
+
+
+async def compute_user_summary(user_id: str) -> dict:
+    """Recalcule le résumé d'un utilisateur depuis `collections`."""
+    return {"user_id": user_id, **await compute_summary({"user_id": user_id})}
+
+
+async def rebuild_user_summary(user_id: str) -> dict:
+    """Recalcule et persiste le résumé d'un utilisateur (réparation de dérive)."""
+    summary = await compute_user_summary(user_id)
+    await db.collection_summaries.replace_one({"user_id": user_id}, summary, upsert=True)
+    return summary
+
+
+async def rebuild_all_summaries() -> int:
+    """Job de réparation : reconstruit le résumé de chaque collectionneur.
+
+    Les résumés orphelins (plus aucun item en collection) sont supprimés.
+    Retourne le nombre de résumés reconstruits.
+    """
+    user_ids = [u for u in await db.collections.distinct("user_id") if u]
+    for user_id in user_ids:
+        await rebuild_user_summary(user_id)
+    await db.collection_summaries.delete_many({"user_id": {"$nin": user_ids}})
+    return len(user_ids)
+
+
+async def get_user_summary(user_id: str) -> dict:
+    """Lecture O(1) du résumé ; construit à la volée s'il n'existe pas encore."""
+    summary = await db.collection_summaries.find_one({"user_id": user_id}, {"_id": 0})
+    if summary is None:
+        summary = await rebuild_user_summary(user_id)
+        summary.pop("_id", None)
+    return summary
+
+
+def format_collection_stats(summary: dict) -> dict:
+    """Réponse de GET /collections/stats à partir du résumé."""
+    total = summary.get("total_count", 0)
+    with_estimates = summary.get("items_with_estimates", 0)
+    if with_estimates:
+        low = summary["value_min"] * total
+        avg = summary["value_sum"]
+        high = summary["value_max"] * total
+    else:
+        low = avg = high = 0
+    return {
+        "total_jerseys": total,
+        "estimated_value": {"low": round(low, 2), "average": round(avg, 2), "high": round(high, 2)},
+        "items_with_estimates": with_estimates,
+    }
+
+
+def format_category_stats(summary: dict) -> list[dict]:
+    """Réponse de GET /collections/category-stats à partir du résumé."""
+    result = []
+    for cat in (summary.get("categories") or {}).values():
+        if cat.get("count", 0) <= 0:
+            continue
+        n = cat.get("items_with_estimates", 0)
+        result.append({
+            "category": cat.get("name", DEFAULT_CATEGORY),
+            "count": cat["count"],
+            "estimated_value": {
+                "low": round(cat["value_min"], 2) if n else 0,
+                "average": round(cat["value_sum"] / n, 2) if n else 0,
+                "high": round(cat["value_max"], 2) if n else 0,
+            },
+        })
+    return result
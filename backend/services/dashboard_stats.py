@@ -0,0 +1,159 @@
+"""Compteurs du tableau de bord admin — GET /api/admin/stats et GET /api/stats.
+
+Un document unique dans `dashboard_stats` :
+  {
+    key: "global",
+    totals: {kits, versions, users, users_banned, moderators, admins, reviews,
+             submissions, submissions_pending, reports, reports_pending},
+    daily:  {users|submissions|reports: {"YYYY-MM-DD": nb créés ce jour (UTC)}},
+    computed_at,
+  }
+
+Recalculé par un job périodique (`refresh_loop`, toutes les
+`STATS_REFRESH_SECONDS`) sous le bail `scheduled_jobs` "dashboard_stats" : un
+seul worker recalcule par période. Les lectures ne recalculent jamais en ligne
+un document existant : plus vieux que `STATS_MAX_AGE_SECONDS` (2 périodes, le
+job est en retard ou arrêté), il est servi tel quel et un recalcul est lancé en
+fond, à condition de réclamer le même bail. Seul un document absent fait
+attendre le lecteur. Les recalculs sont en vol unique par worker
+(`_refresh_once`) : les lecteurs concurrents partagent le même calcul au lieu
+de l'empiler. Le calcul lance
+toutes ses requêtes en parallèle (`asyncio.gather`) : compteurs + un `$group`
+par jour sur les `DAILY_WINDOW_DAYS` derniers jours pour users / submissions /
+reports (index `created_at`).
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from ..database import db
+from .scheduled_jobs import claim_job_run, scheduled_loop
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "global"
+STATS_JOB = "dashboard_stats"
+STATS_REFRESH_SECONDS = 300
+STATS_REFRESH_INTERVAL = timedelta(seconds=STATS_REFRESH_SECONDS)
+STATS_MAX_AGE_SECONDS = 2 * STATS_REFRESH_SECONDS
+DAILY_WINDOW_DAYS = 30
+
+_TOTAL_QUERIES = {
+    "kits":                ("master_kits", {}),
+    "versions":            ("versions", {}),
+    "users":               ("users", {}),
+    "users_banned":        ("users", {"is_banned": True}),
+    "moderators":          ("users", {"role": "moderator"}),
+    "admins":              ("users", {"role": "admin"}),
+    "reviews":             ("reviews", {}),
+    "submissions":         ("submissions", {}),
+    "submissions_pending": ("submissions", {"status": "pending"}),
+    "reports":             ("reports", {}),
+    "reports_pending":     ("reports", {"status": "pending"}),
+}
+_DAILY_COLLECTIONS = ("users", "submissions", "reports")
+
+_refresh_task: asyncio.Task | None = None
+
+
+async def _daily_counts(collection: str, since_day: str) -> dict[str, int]:
+    """Nombre de documents créés par jour (préfixe YYYY-MM-DD de `created_at` ISO)."""
+    pipeline = [
+        {"$match": {"created_at": {"$gte": since_day}}},
+        {"$group": {"_id": {"$substr": ["$created_at", 0, 10]}, "count": {"$sum": 1}}},
+    ]
+    return {row["_id"]: row["count"] async for row in db[collection].aggregate(pipeline)}
+
+
+async def compute_dashboard_stats() -> dict:
+    now = datetime.now(timezone.utc)
+    since_day = (now - timedelta(days=DAILY_WINDOW_DAYS - 1)).date().isoformat()
+    totals, daily = await asyncio.gather(
+        asyncio.gather(*(db[coll].count_documents(query) for coll, query in _TOTAL_QUERIES.values())),
+        asyncio.gather(*(_daily_counts(coll, since_day) for coll in _DAILY_COLLECTIONS)),
+    )
+    return {
+        "key": STATS_KEY,
+        "totals": dict(zip(_TOTAL_QUERIES, totals)),
+        "daily": dict(zip(_DAILY_COLLECTIONS, daily)),
+        "computed_at": now.isoformat(),
+    }
+
+
+async def refresh_dashboard_stats() -> dict:
+    stats = await compute_dashboard_stats()
+    await db.dashboard_stats.replace_one({"key": STATS_KEY}, stats, upsert=True)
+    stats.pop("_id", None)
+    return stats
+
+
+def _log_refresh_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception():
+        logger.error(f"Rafraîchissement des stats dashboard échoué : {task.exception()}")
+
+
+async def _refresh(claim: bool) -> dict | None:
+    if claim and not await claim_job_run(STATS_JOB, STATS_REFRESH_INTERVAL):
+        return None  # un autre worker recalcule sur cette période
+    return await refresh_dashboard_stats()
+
+
+def _refresh_once(claim: bool = False) -> asyncio.Task:
+    """Recalcul en vol unique : réutilise le recalcul en cours s'il y en a un.
+    `claim` : ne recalcule que si le bail du job est réclamé."""
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(_refresh(claim))
+        _refresh_task.add_done_callback(_log_refresh_failure)
+    return _refresh_task
+
+
+async def get_dashboard_stats(max_age_seconds: int = STATS_MAX_AGE_SECONDS) -> dict:
+    """Lecture du document ; périmé, il est servi et recalculé en fond ; absent, calculé."""
+    stats = await db.dashboard_stats.find_one({"key": STATS_KEY}, {"_id": 0})
+    if stats is None:
+        # shield : un lecteur qui se déconnecte n'annule pas le calcul partagé
+        return await asyncio.shield(_refresh_once())
+    age = datetime.now(timezone.utc) - datetime.fromisoformat(stats["computed_at"])
+    if age.total_seconds() > max_age_seconds:
+        _refresh_once(claim=True)
+    return stats
+
+
+def days_sum(stats: dict, collection: str, days: int) -> int:
+    """Somme des `days` derniers jours calendaires (aujourd'hui inclus, UTC)."""
+    buckets = stats.get("daily", {}).get(collection, {})
+    today = datetime.now(timezone.utc).date()
+    return sum(buckets.get((today - timedelta(days=d)).isoformat(), 0) for d in range(days))
+
+
+def format_admin_stats(stats: dict) -> dict:
+    """Réponse de GET /api/admin/stats (mêmes clés qu'avant le document précalculé)."""
+    totals = stats["totals"]
+    return {
+        "kits_total":          totals["kits"],
+        "versions_total":      totals["versions"],
+        "users_total":         totals["users"],
+        "users_banned":        totals["users_banned"],
+        "moderators_count":    totals["moderators"],
+        "admins_count":        totals["admins"],
+        "users_new_7d":        days_sum(stats, "users", 7),
+        "submissions_total":   totals["submissions"],
+        "submissions_pending": totals["submissions_pending"],
+        "submissions_today":   days_sum(stats, "submissions", 1),
+        "submissions_last_7d": days_sum(stats, "submissions", 7),
+        "reports_total":       totals["reports"],
+        "reports_pending":     totals["reports_pending"],
+        "daily":               stats.get("daily", {}),
+        "computed_at":         stats["computed_at"],
+    }
+
+
+async def _refresh_pass() -> dict:
+    stats = await refresh_dashboard_stats()
+    return {"computed_at": stats["computed_at"]}
+
+
+async def refresh_loop() -> None:
+    """Tâche de fond : recalcule le document toutes les STATS_REFRESH_SECONDS, par un seul worker."""
+    await scheduled_loop(STATS_JOB, STATS_REFRESH_INTERVAL, _refresh_pass, poll_seconds=STATS_REFRESH_SECONDS / 5)
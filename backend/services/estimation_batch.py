@@ -0,0 +1,291 @@
+"""Estimation de prix en lot — POST /api/estimate/batch.
+
+`calculate_estimation` refait pour chaque maillot les mêmes lookups de
+coefficients et surtout reconstruit les mêmes libellés de breakdown
+(f-strings). En lot, chaque critère est résolu via une table
+`valeur → (coeff, entrée de breakdown)` : le coût par item se réduit à
+quelques accès dict et additions. Les tables des critères à valeurs connues
+sont pré-calculées à l'import à partir des grilles ESTIMATION_* elles-mêmes
+(une seule source pour les coefficients) ; les valeurs hors grille et les
+textes libres sont calculés à la volée, une fois par lot.
+
+Les additions se font dans le même ordre que `calculate_estimation` :
+les résultats sont strictement identiques (vérifié par les tests et par
+`python -m backend.scripts.bench_estimation_batch`).
+"""
+from datetime import datetime, timezone
+from typing import Iterable
+
+from ..database import db
+from ..utils import (
+    ESTIMATION_AGE_COEFF_PER_YEAR,
+    ESTIMATION_AGE_DELAY_YEARS,
+    ESTIMATION_AGE_MAX,
+    ESTIMATION_BASE_PRICES,
+    ESTIMATION_COMPETITION_COEFF,
+    ESTIMATION_FLOCKING_COEFF,
+    ESTIMATION_ORIGIN_COEFF,
+    ESTIMATION_PATCH_COEFF,
+    ESTIMATION_RARITY_COEFF,
+    ESTIMATION_SIGNED_PERSONAL_MESSAGE_COEFF,
+    ESTIMATION_SIGNED_PROOF_COEFF,
+    ESTIMATION_SIGNED_TYPE_COEFF,
+    ESTIMATION_STATE_COEFF,
+    _player_note_to_profile,
+)
+
+
+# Critères de `calculate_estimation` (hors note joueur) et leurs valeurs par défaut
+ESTIMATION_FIELDS = (
+    "model_type",
+    "competition",
+    "condition_origin",
+    "physical_state",
+    "flocking_origin",
+    "signed",
+    "signed_proof",
+    "season_year",
+    "signed_type",
+    "signed_other_detail",
+    "signed_personal_message",
+    "patch",
+    "is_rare",
+    "rare_reason",
+    "mode",
+)
+
+ESTIMATION_DEFAULTS = {
+    "competition": "",
+    "condition_origin": "",
+    "physical_state": "",
+    "flocking_origin": "",
+    "signed": False,
+    "signed_proof": "none",
+    "season_year": 0,
+    "signed_type": "",
+    "signed_other_detail": "",
+    "signed_personal_message": False,
+    "patch": False,
+    "is_rare": False,
+    "rare_reason": "",
+    "mode": "advanced",
+}
+
+
+def estimation_kwargs(item: dict, player_note: float = 0.0) -> dict:
+    """Normalise un item (champs Optional à None → valeur par défaut)."""
+    kwargs = {
+        field: item.get(field) or ESTIMATION_DEFAULTS.get(field)
+        for field in ESTIMATION_FIELDS
+    }
+    kwargs["flocking_player_note"] = player_note
+    return kwargs
+
+
+async def get_player_notes(player_ids: Iterable[str]) -> dict[str, float]:
+    """Notes /100 des joueurs en une seule requête `$in` (0.0 si introuvable)."""
+    ids = sorted({pid for pid in player_ids if pid})
+    if not ids:
+        return {}
+    notes = {pid: 0.0 for pid in ids}
+    async for player in db.players.find(
+        {"player_id": {"$in": ids}}, {"_id": 0, "player_id": 1, "note": 1}
+    ):
+        notes[player["player_id"]] = float(player.get("note") or 0.0)
+    return notes
+
+
+class _LookupTable(dict):
+    """Dict complété à la volée : `table[clé]` calcule `build(clé)` une seule fois.
+    `seed` : entrées pré-calculées (copiées, la table du lot ne les modifie pas)."""
+
+    def __init__(self, build, seed=()):
+        super().__init__(seed)
+        self._build = build
+
+    def __missing__(self, key):
+        value = self[key] = self._build(key)
+        return value
+
+
+def _criterion_entry(coeffs: dict, prefix: str, hidden=("",)):
+    """Construit valeur → (coeff, entrée de breakdown | None) pour un critère simple."""
+    def build(value):
+        coeff = coeffs.get(value, 0.0)
+        if value in hidden:
+            return coeff, None
+        return coeff, {"label": f"{prefix}: {value}", "coeff": coeff}
+    return build
+
+
+def _seed(build, keys) -> dict:
+    return {key: build(key) for key in keys}
+
+
+_SIGNED_TYPE_LABELS = {
+    "player_flocked": "Signed by flocked player",
+    "team": "Signed by entire team",
+    "printed_sign": "Printed sign (marketing)",
+    "handsigned": "Handsigned autograph",
+}
+
+_PROOF_LABELS = {
+    "light": "Certificate (light proof)",
+    "strong": "Certificate (strong proof + COA)",
+}
+
+_PROFILE_LABELS = {
+    "football_legend": "Football legend",
+    "world_star": "World star",
+    "club_star": "Club star",
+    "good_player": "Good player",
+}
+
+
+def _signed_type_entry(key: tuple[str, str]) -> tuple[float, dict]:
+    signed_type, other_detail = key
+    coeff = ESTIMATION_SIGNED_TYPE_COEFF.get(signed_type, 0.40)
+    if signed_type == "other":
+        label = f"Signed (other{': ' + other_detail if other_detail else ''})"
+    else:
+        label = _SIGNED_TYPE_LABELS.get(signed_type, "Signed")
+    return coeff, {"label": label, "coeff": coeff}
+
+
+def _proof_entry(signed_proof: str) -> tuple[float, dict | None]:
+    coeff = ESTIMATION_SIGNED_PROOF_COEFF.get(signed_proof, 0.0)
+    if coeff > 0:
+        return coeff, {"label": _PROOF_LABELS.get(signed_proof, "Certificate"), "coeff": coeff}
+    return coeff, None
+
+
+def _profile_entry(note: float) -> tuple[str, float, dict | None]:
+    label, coeff = _player_note_to_profile(note)
+    entry = None
+    if note > 0 and coeff > 0:
+        display = _PROFILE_LABELS.get(label)
+        text = (f"Player profile: {display} (note {note:.0f}/100)" if display
+                else f"Player profile (note {note:.0f}/100)")
+        entry = {"label": text, "coeff": coeff}
+    return label, coeff, entry
+
+
+def _rare_entry(rare_reason: str) -> dict:
+    return {"label": f"Rare shirt{': ' + rare_reason if rare_reason else ''}", "coeff": ESTIMATION_RARITY_COEFF}
+
+
+def _age_table(current_year: int) -> _LookupTable:
+    def build(season_year: int) -> tuple[float, dict | None]:
+        age = max(0, current_year - season_year) if season_year else 0
+        effective_age = max(0, age - ESTIMATION_AGE_DELAY_YEARS)
+        coeff = min(effective_age * ESTIMATION_AGE_COEFF_PER_YEAR, ESTIMATION_AGE_MAX)
+        if coeff > 0:
+            return coeff, {"label": f"Age: {age} years (effective: {effective_age} yrs)", "coeff": round(coeff, 2)}
+        return coeff, None
+    return _LookupTable(build)
+
+
+_competition_entry = _criterion_entry(ESTIMATION_COMPETITION_COEFF, "Competition")
+_state_entry = _criterion_entry(ESTIMATION_STATE_COEFF, "State")
+_origin_entry = _criterion_entry(ESTIMATION_ORIGIN_COEFF, "Origin")
+_flocking_entry = _criterion_entry(ESTIMATION_FLOCKING_COEFF, "Flocking", hidden=("", "None"))
+
+# Entrées des valeurs connues, calculées une fois à l'import depuis les grilles
+_COMPETITION_SEED = _seed(_competition_entry, ["", *ESTIMATION_COMPETITION_COEFF])
+_STATE_SEED = _seed(_state_entry, ["", *ESTIMATION_STATE_COEFF])
+_ORIGIN_SEED = _seed(_origin_entry, ["", *ESTIMATION_ORIGIN_COEFF])
+_FLOCKING_SEED = _seed(_flocking_entry, ["", "None", *ESTIMATION_FLOCKING_COEFF])
+_SIGNED_TYPE_SEED = _seed(_signed_type_entry, [("", "")] + [(t, "") for t in ESTIMATION_SIGNED_TYPE_COEFF])
+_PROOF_SEED = _seed(_proof_entry, ["none", *ESTIMATION_SIGNED_PROOF_COEFF])
+
+
+def estimate_many(items: list[dict], player_notes: dict[str, float]) -> list[dict]:
+    """Estime chaque item — même résultat que `calculate_estimation` + `flocking_player_note`.
+
+    Les tables sont propres au lot : les valeurs libres saisies par les
+    utilisateurs (rare_reason, signed_other_detail…) ne s'accumulent pas
+    d'une requête à l'autre. Les entrées de breakdown sont partagées entre
+    items identiques (lecture seule).
+    """
+    competition_t = _LookupTable(_competition_entry, _COMPETITION_SEED)
+    state_t = _LookupTable(_state_entry, _STATE_SEED)
+    origin_t = _LookupTable(_origin_entry, _ORIGIN_SEED)
+    flocking_t = _LookupTable(_flocking_entry, _FLOCKING_SEED)
+    signed_type_t = _LookupTable(_signed_type_entry, _SIGNED_TYPE_SEED)
+    proof_t = _LookupTable(_proof_entry, _PROOF_SEED)
+    profile_t = _LookupTable(_profile_entry)
+    rare_t = _LookupTable(_rare_entry)
+    age_t = _age_table(datetime.now(timezone.utc).year)
+    patch_entry = {"label": "Official competition patch", "coeff": ESTIMATION_PATCH_COEFF}
+    message_entry = {"label": "Personal message with signature", "coeff": ESTIMATION_SIGNED_PERSONAL_MESSAGE_COEFF}
+
+    results = []
+    for item in items:
+        get = item.get
+        model_type = get("model_type")
+        mode = get("mode") or "advanced"
+        note = player_notes.get(get("flocking_player_id") or "", 0.0)
+        base = ESTIMATION_BASE_PRICES.get(model_type, 60)
+        breakdown = []
+
+        coeff_sum, entry = competition_t[get("competition") or ""]
+        if entry:
+            breakdown.append(entry)
+        c, entry = state_t[get("physical_state") or ""]
+        coeff_sum += c
+        if entry:
+            breakdown.append(entry)
+
+        if mode == "advanced":
+            flocking_origin = get("flocking_origin") or ""
+            c, entry = origin_t[get("condition_origin") or ""]
+            coeff_sum += c
+            if entry:
+                breakdown.append(entry)
+            c, entry = flocking_t[flocking_origin]
+            coeff_sum += c
+            if entry:
+                breakdown.append(entry)
+
+            if get("patch"):
+                coeff_sum += ESTIMATION_PATCH_COEFF
+                breakdown.append(patch_entry)
+
+            if get("signed"):
+                signed_type = get("signed_type") or ""
+                c, entry = signed_type_t[(signed_type, get("signed_other_detail") or "")]
+                coeff_sum += c
+                breakdown.append(entry)
+                if get("signed_personal_message"):
+                    coeff_sum += ESTIMATION_SIGNED_PERSONAL_MESSAGE_COEFF
+                    breakdown.append(message_entry)
+                c, entry = proof_t[get("signed_proof") or "none"]
+                coeff_sum += c
+                if entry:
+                    breakdown.append(entry)
+                if signed_type == "player_flocked" and flocking_origin == "Official":
+                    _, c, entry = profile_t[note]
+                    if entry:
+                        coeff_sum += c
+                        breakdown.append(entry)
+
+            if get("is_rare"):
+                coeff_sum += ESTIMATION_RARITY_COEFF
+                breakdown.append(rare_t[get("rare_reason") or ""])
+
+            c, entry = age_t[get("season_year") or 0]
+            coeff_sum += c
+            if entry:
+                breakdown.append(entry)
+
+        results.append({
+            "base_price": base,
+            "model_type": model_type,
+            "coeff_sum": round(coeff_sum, 2),
+            "estimated_price": round(base * (1 + coeff_sum), 2),
+            "breakdown": breakdown,
+            "mode": mode,
+            "flocking_player_profile": profile_t[note][0],
+            "flocking_player_note": note,
+        })
+    return results
@@ -0,0 +1,115 @@
+"""Bus d'événements par utilisateur, consommé par le flux SSE GET /api/events.
+
+Les écritures publient (`publish(user_id, event, data)`) ; chaque connexion
+SSE ouverte est une file asyncio abonnée à son utilisateur. Un utilisateur
+connecté mais inactif ne coûte aucune requête : sa connexion attend sur la file.
+
+Deux implémentations, choisies par EVENT_BUS :
+  - `local` (défaut, tests, un seul worker) : distribution en mémoire du process.
+  - `mongo` (plusieurs workers) : l'événement est distribué localement puis
+    inséré dans la collection `events` (TTL court). Chaque worker suit le change
+    stream de la collection (`run`, tâche de fond) et distribue les événements
+    des autres workers à ses propres abonnés. Change streams : replica set requis.
+
+Événements : notification, notification_updated, message, transaction, counters.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from ..database import db
+from ..utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+EVENT_BUS = os.environ.get("EVENT_BUS", "local").lower()
+SUBSCRIBER_QUEUE_SIZE = 100
+EVENT_TTL = timedelta(minutes=5)
+CHANGE_STREAM_RETRY_SECONDS = 5
+
+
+class LocalEventBus:
+    """Abonnements en mémoire du process."""
+
+    def __init__(self):
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def subscriber_count(self, user_id: str) -> int:
+        return len(self._subscribers.get(user_id, ()))
+
+    def dispatch(self, user_id: str, event: str, data: dict) -> int:
+        """Remet l'événement aux connexions locales de l'utilisateur."""
+        queues = self._subscribers.get(user_id, ())
+        for queue in queues:
+            if queue.full():
+                # Client trop lent : on sacrifie l'événement le plus ancien
+                queue.get_nowait()
+            queue.put_nowait((event, data))
+        return len(queues)
+
+    async def publish(self, user_id: str, event: str, data: dict) -> None:
+        self.dispatch(user_id, event, data)
+
+    async def run(self) -> None:
+        return None
+
+
+class MongoChangeStreamBus(LocalEventBus):
+    """Relais entre workers par la collection `events` et son change stream."""
+
+    def __init__(self):
+        super().__init__()
+        self.worker_id = uuid.uuid4().hex
+
+    async def publish(self, user_id: str, event: str, data: dict) -> None:
+        self.dispatch(user_id, event, data)
+        try:
+            await db.events.insert_one({
+                "user_id": user_id, "event": event, "data": data,
+                "origin": self.worker_id, "expires_at": utcnow() + EVENT_TTL,
+            })
+        except Exception as e:
+            logger.error(f"Publication de l'événement {event} échouée : {e}")
+
+    def handle_change(self, change: dict) -> None:
+        doc = change.get("fullDocument") or {}
+        if not doc or doc.get("origin") == self.worker_id:
+            return
+        self.dispatch(doc["user_id"], doc["event"], doc.get("data") or {})
+
+    async def run(self) -> None:
+        """Tâche de fond : suit les insertions de `events` (reprise après erreur)."""
+        while True:
+            try:
+                async with db.events.watch([{"$match": {"operationType": "insert"}}]) as stream:
+                    async for change in stream:
+                        self.handle_change(change)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Change stream `events` interrompu : {e}")
+                await asyncio.sleep(CHANGE_STREAM_RETRY_SECONDS)
+
+
+bus: LocalEventBus = MongoChangeStreamBus() if EVENT_BUS == "mongo" else LocalEventBus()
+
+
+async def publish(user_id: str, event: str, data: dict) -> None:
+    """Publie un événement pour un utilisateur (sans `_id` Mongo)."""
+    await bus.publish(user_id, event, {k: v for k, v in data.items() if k != "_id"})
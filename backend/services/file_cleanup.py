@@ -0,0 +1,299 @@
+"""Nettoyage des images du receiver Freebox.
+
+File de suppression : les images devenues orphelines (remplacées par un edit,
+kit ou version supprimé, edit rejeté) sont enregistrées dans `file_deletions`
+(une entrée par `relative_path`, index unique) au lieu d'être supprimées
+une à une pendant la requête. `file_deletion_loop` vide la file par lots de
+`FILE_DELETION_BATCH` via `DELETE /delete-files` (un seul appel HTTP par lot).
+Un lot en échec reste en file (`attempts` incrémenté, abandonné après
+`FILE_DELETION_MAX_ATTEMPTS`).
+
+Le receiver déduplique les uploads par contenu : deux documents peuvent
+pointer vers le même fichier. Avant de vider la file, les chemins encore
+référencés sont retirés de la file sans être supprimés ; « référencé » a une
+seule définition, partagée avec le balayage des orphelins
+(`collect_media_references` : toute chaîne des `MEDIA_REFERENCE_COLLECTIONS`,
+chemin ou nom de fichier seul). Les références sont relevées une fois par
+vidage, et seulement quand la file n'est pas vide. Un upload servi par déduplication
+retire aussi son chemin de la file (`cancel_file_deletions`) : la soumission
+qui va le référencer n'existe peut-être pas encore.
+
+Réconciliation : `sweep_orphan_files` lit l'index du receiver
+(`GET /inventory`, NDJSON, fichiers stockés depuis plus de
+`ORPHAN_MIN_AGE_HOURS` pour ne pas toucher un upload dont la soumission n'est
+pas encore créée) et le compare aux URLs référencées en base. Un fichier est
+conservé si son chemin relatif OU son nom de fichier seul (références legacy)
+apparaît dans un document.
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import httpx
+from pymongo import UpdateOne
+
+from ..database import db
+from .scheduled_jobs import scheduled_loop
+
+logger = logging.getLogger(__name__)
+
+_receiver_url_raw = os.getenv("RECEIVER_URL", "http://172.17.0.1:8001/receive-upload")
+RECEIVER_BASE_URL = os.getenv(
+    "RECEIVER_BASE_URL",
+    _receiver_url_raw.replace("/receive-upload", "").rstrip("/")
+)
+RECEIVER_SECRET = os.getenv("RECEIVER_SECRET", "changeme")
+MEDIA_BASE_URL  = os.getenv("MEDIA_BASE_URL", "https://nas.topkit.app")
+
+_MEDIA_PREFIXES = (
+    MEDIA_BASE_URL.rstrip("/"),
+    "https://media.topkit.app",
+    "https://82.67.103.45",
+    "http://82.67.103.45",
+)
+
+FILE_DELETION_BATCH = 200
+FILE_DELETION_FLUSH_SECONDS = 30
+FILE_DELETION_MAX_ATTEMPTS = 5
+
+ORPHAN_MIN_AGE_HOURS = 48
+ORPHAN_SWEEP_SECONDS = 24 * 3600
+ORPHAN_SWEEP_APPLY = os.getenv("ORPHAN_SWEEP_APPLY", "").lower() in ("1", "true", "yes")
+
+# Collections pouvant contenir une URL d'image (champ simple, liste ou sous-document)
+MEDIA_REFERENCE_COLLECTIONS = (
+    "master_kits", "versions", "teams", "leagues", "brands", "sponsors", "players",
+    "awards", "users", "submissions", "reports", "collections", "listings", "offers",
+    "transactions", "transaction_messages", "user_lists",
+)
+
+# Historique des soumissions / signalements : seules les entrées en attente (ou en cours
+# d'approbation) retiennent leurs images
+_REFERENCE_FILTERS = {
+    "submissions": {"status": {"$in": ["pending", "approving"]}},
+    "reports":     {"status": "pending"},
+}
+
+_flush_wakeup: Optional[asyncio.Event] = None
+
+
+def media_relative_path(url: str) -> Optional[str]:
+    """Chemin relatif sous la racine médias du receiver, ou None si l'URL n'y pointe pas."""
+    if not url:
+        return None
+    if url.startswith("/api/images/"):
+        return url[len("/api/images/"):]
+    for prefix in _MEDIA_PREFIXES:
+        if url.startswith(prefix + "/"):
+            return url[len(prefix) + 1:]
+    return None
+
+
+# ─── File de suppression ──────────────────────────────────────────────────────
+
+async def enqueue_file_deletions(urls, reason: str = "replaced") -> int:
+    """Ajoute les URLs à la file (dédoublonnées). Retourne le nombre de chemins retenus."""
+    now = datetime.now(timezone.utc).isoformat()
+    paths = {}
+    for url in urls:
+        relative = media_relative_path(url)
+        if relative:
+            paths[relative] = url
+        elif url:
+            logger.info(f"[file_cleanup] URL non reconnue, ignorée : {url}")
+    if not paths:
+        return 0
+    await db.file_deletions.bulk_write([
+        UpdateOne(
+            {"relative_path": relative},
+            {"$setOnInsert": {"url": url, "reason": reason, "enqueued_at": now, "attempts": 0}},
+            upsert=True,
+        )
+        for relative, url in paths.items()
+    ], ordered=False)
+    if _flush_wakeup is not None:
+        _flush_wakeup.set()
+    return len(paths)
+
+
+async def cancel_file_deletions(relative_paths: list[str]) -> int:
+    """Retire des chemins de la file (fichier de nouveau servi). Retourne le nombre retiré."""
+    if not relative_paths:
+        return 0
+    result = await db.file_deletions.delete_many({"relative_path": {"$in": list(relative_paths)}})
+    return result.deleted_count
+
+
+async def _receiver_delete(relative_paths: list[str]) -> dict:
+    async with httpx.AsyncClient(timeout=30.0, verify=False) as client:
+        resp = await client.request(
+            "DELETE",
+            f"{RECEIVER_BASE_URL}/delete-files",
+            json={"relative_paths": relative_paths},
+            headers={"x-secret": RECEIVER_SECRET},
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+
+def _is_referenced(relative_path: str, refs: set[str]) -> bool:
+    """Chemin relatif OU nom de fichier seul (références legacy) présent dans `refs`."""
+    return relative_path in refs or relative_path.rsplit("/", 1)[-1] in refs
+
+
+async def still_referenced(relative_paths: list[str], refs: Optional[set[str]] = None) -> set[str]:
+    """Chemins encore référencés en base (fichier partagé après déduplication).
+
+    Même définition que le balayage des orphelins : `refs` vaut
+    `collect_media_references()` (relevé ici s'il n'est pas fourni).
+    """
+    if refs is None:
+        refs = await collect_media_references()
+    return {p for p in relative_paths if _is_referenced(p, refs)}
+
+
+async def flush_file_deletions(limit: Optional[int] = None, refs: Optional[set[str]] = None) -> dict:
+    """Envoie un lot au receiver : {batch, kept, deleted, missing, invalid, failed}.
+    `refs` : références relevées par l'appelant (`drain_file_deletions`), sinon relevées ici."""
+    limit = limit or FILE_DELETION_BATCH
+    batch = await db.file_deletions.find(
+        {"attempts": {"$lt": FILE_DELETION_MAX_ATTEMPTS}},
+        {"_id": 0, "relative_path": 1},
+    ).sort("enqueued_at", 1).limit(limit).to_list(limit)
+    paths = [doc["relative_path"] for doc in batch]
+    counts = {"batch": len(paths), "kept": 0, "deleted": 0, "missing": 0, "invalid": 0, "failed": 0}
+    if not paths:
+        return counts
+
+    kept = await still_referenced(paths, refs)
+    if kept:
+        await db.file_deletions.delete_many({"relative_path": {"$in": list(kept)}})
+        counts["kept"] = len(kept)
+        paths = [p for p in paths if p not in kept]
+        if not paths:
+            return counts
+
+    try:
+        result = await _receiver_delete(paths)
+    except Exception as e:
+        logger.error(f"[file_cleanup] Lot de {len(paths)} suppressions en échec : {e}")
+        await db.file_deletions.update_many(
+            {"relative_path": {"$in": paths}},
+            {"$inc": {"attempts": 1}, "$set": {"last_error": str(e)}},
+        )
+        counts["failed"] = len(paths)
+        return counts
+
+    # Déjà absent ou chemin refusé : rien à rejouer
+    done = [p for key in ("deleted", "missing", "invalid") for p in result.get(key, [])]
+    await db.file_deletions.delete_many({"relative_path": {"$in": done}})
+    for key in ("deleted", "missing", "invalid"):
+        counts[key] = len(result.get(key, []))
+    return counts
+
+
+async def drain_file_deletions() -> dict:
+    """Vide la file lot par lot (s'arrête au premier lot en échec).
+    Les références en base sont relevées une seule fois pour tout le vidage."""
+    totals = {"batch": 0, "kept": 0, "deleted": 0, "missing": 0, "invalid": 0, "failed": 0}
+    if not await db.file_deletions.count_documents({"attempts": {"$lt": FILE_DELETION_MAX_ATTEMPTS}}, limit=1):
+        return totals
+    refs = await collect_media_references()
+    while True:
+        counts = await flush_file_deletions(refs=refs)
+        for key, value in counts.items():
+            totals[key] += value
+        if counts["failed"] or counts["batch"] < FILE_DELETION_BATCH:
+            return totals
+
+
+async def file_deletion_loop() -> None:
+    """Tâche de fond : vide la file dès qu'elle est alimentée, au plus un vidage
+    par FILE_DELETION_FLUSH_SECONDS tous workers confondus (bail `scheduled_jobs`)."""
+    global _flush_wakeup
+    _flush_wakeup = asyncio.Event()
+    await scheduled_loop(
+        "file_deletions", timedelta(seconds=FILE_DELETION_FLUSH_SECONDS), drain_file_deletions,
+        poll_seconds=FILE_DELETION_FLUSH_SECONDS, wakeup=_flush_wakeup,
+    )
+
+
+# ─── Balayage des orphelins ───────────────────────────────────────────────────
+
+def _collect_strings(value, out: set) -> None:
+    if isinstance(value, str):
+        relative = media_relative_path(value)
+        if relative:
+            out.add(relative)
+            out.add(relative.rsplit("/", 1)[-1])
+        elif "/" not in value and "." in value:
+            out.add(value)   # nom de fichier seul (legacy)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _collect_strings(v, out)
+    elif isinstance(value, list):
+        for v in value:
+            _collect_strings(v, out)
+
+
+async def collect_media_references() -> set[str]:
+    """Chemins relatifs et noms de fichiers référencés dans les collections médias."""
+    refs: set[str] = set()
+    for name in MEDIA_REFERENCE_COLLECTIONS:
+        async for doc in db[name].find(_REFERENCE_FILTERS.get(name, {}), {"_id": 0}):
+            _collect_strings(doc, refs)
+    return refs
+
+
+async def _receiver_inventory(older_than_seconds: int) -> list[dict]:
+    """Index du receiver (GET /inventory, NDJSON) : {relative_path, folder, size, sha256, created_at}."""
+    files = []
+    async with httpx.AsyncClient(timeout=120.0, verify=False) as client:
+        async with client.stream(
+            "GET",
+            f"{RECEIVER_BASE_URL}/inventory",
+            params={"older_than": older_than_seconds},
+            headers={"x-secret": RECEIVER_SECRET},
+        ) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if line.strip():
+                    files.append(json.loads(line))
+    return files
+
+
+async def sweep_orphan_files(apply: bool = False, min_age_hours: int = ORPHAN_MIN_AGE_HOURS) -> dict:
+    """Réconciliation index receiver ↔ base : fichiers non référencés et octets
+    récupérables ; `apply` les met en file de suppression."""
+    files = await _receiver_inventory(min_age_hours * 3600)
+    refs = await collect_media_references()
+    if not refs:
+        # Base vide ou illisible : on ne supprime surtout pas tout le stockage
+        logger.warning("[file_cleanup] Aucune référence média trouvée, balayage annulé")
+        return {"files": len(files), "orphans": [], "reclaimable_bytes": 0, "enqueued": 0}
+
+    orphan_files = [f for f in files if not _is_referenced(f["relative_path"], refs)]
+    orphans = [f["relative_path"] for f in orphan_files]
+    enqueued = 0
+    if apply and orphans:
+        enqueued = await enqueue_file_deletions([f"/api/images/{p}" for p in orphans], reason="orphan")
+    return {
+        "files": len(files),
+        "orphans": orphans,
+        "reclaimable_bytes": sum(f.get("size", 0) for f in orphan_files),
+        "enqueued": enqueued,
+    }
+
+
+async def _orphan_sweep_pass() -> dict:
+    report = await sweep_orphan_files(apply=ORPHAN_SWEEP_APPLY)
+    return {"files": report["files"], "orphans": len(report["orphans"]), "enqueued": report["enqueued"]}
+
+
+async def orphan_sweep_loop() -> None:
+    """Tâche de fond : balayage quotidien, par un seul worker (bail `scheduled_jobs`).
+    Rapport seul sauf si ORPHAN_SWEEP_APPLY est activé."""
+    await scheduled_loop("orphan_sweep", timedelta(seconds=ORPHAN_SWEEP_SECONDS), _orphan_sweep_pass)
@@ -0,0 +1,102 @@
+"""Tris et pagination par curseur de GET /api/marketplace.
+
+Chaque tri est une liste de clés terminée par `listing_id` (ordre total) et
+s'appuie sur un index composé qui commence par `status` (LISTING_SORT_INDEXES,
+créés au démarrage). La page suivante se lit « après » la dernière annonce
+reçue (keyset) : le coût d'une page ne dépend pas de sa profondeur, contrairement
+à `skip` qui parcourt toutes les entrées précédentes.
+
+Le curseur est opaque (base64 JSON : tri + valeurs des clés de la dernière
+annonce). Avec un curseur, le total n'est pas recompté (`total: null`).
+"""
+import base64
+import binascii
+import json
+from typing import Optional
+
+from ..database import db
+from .marketplace_facets import listing_query
+
+LISTING_SORTS = {
+    "newest":      [("created_at", -1), ("listing_id", -1)],
+    "price_asc":   [("asking_price", 1), ("listing_id", 1)],
+    "price_desc":  [("asking_price", -1), ("listing_id", -1)],
+    "best_seller": [("seller.completed_sales", -1), ("created_at", -1), ("listing_id", -1)],
+}
+DEFAULT_SORT = "newest"
+
+# price_desc parcourt l'index de price_asc à l'envers
+LISTING_SORT_INDEXES = [
+    [("status", 1), *LISTING_SORTS["newest"]],
+    [("status", 1), *LISTING_SORTS["price_asc"]],
+    [("status", 1), *LISTING_SORTS["best_seller"]],
+]
+
+_PRICE_SORTS = {"price_asc", "price_desc"}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _field_value(doc: dict, path: str):
+    for part in path.split("."):
+        doc = (doc or {}).get(part)
+    return doc
+
+
+def encode_cursor(sort: str, doc: dict) -> str:
+    values = [_field_value(doc, field) for field, _ in LISTING_SORTS[sort]]
+    raw = json.dumps({"s": sort, "v": values}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(sort: str, cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = payload["v"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor("Curseur illisible") from e
+    if payload.get("s") != sort or not isinstance(values, list) or len(values) != len(LISTING_SORTS[sort]):
+        raise InvalidCursor("Curseur d'un autre tri")
+    return values
+
+
+def keyset_clause(sort: str, values: list) -> dict:
+    """Annonces strictement après `values` dans l'ordre du tri :
+    (k1 > v1) OU (k1 = v1 ET k2 > v2) OU …"""
+    keys = LISTING_SORTS[sort]
+    branches = []
+    for i, (field, direction) in enumerate(keys):
+        branch = {f: v for (f, _), v in zip(keys[:i], values[:i])}
+        branch[field] = {"$gt" if direction == 1 else "$lt": values[i]}
+        branches.append(branch)
+    return {"$or": branches}
+
+
+async def browse_listings(
+    filters: dict,
+    sort: str = DEFAULT_SORT,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 48,
+) -> dict:
+    """Une page d'annonces actives. `cursor` prime sur `skip`."""
+    query = listing_query(filters)
+    if sort in _PRICE_SORTS:
+        # Échanges sans prix : hors des tris par prix
+        query["asking_price"] = {**query.get("asking_price", {}), "$ne": None}
+
+    total = None
+    page_query = query
+    if cursor:
+        page_query = {"$and": [query, keyset_clause(sort, decode_cursor(sort, cursor))]}
+        skip = 0
+    else:
+        total = await db.listings.count_documents(query)
+
+    docs = await db.listings.find(page_query, {"_id": 0, "snapshot_stale": 0}) \
+        .sort(LISTING_SORTS[sort]).skip(skip).limit(limit).to_list(limit)
+    next_cursor = encode_cursor(sort, docs[-1]) if len(docs) == limit else None
+    return {"results": docs, "total": total, "skip": skip, "limit": limit, "sort": sort, "next_cursor": next_cursor}
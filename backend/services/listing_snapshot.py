@@ -0,0 +1,177 @@
+"""Instantané dénormalisé des annonces marketplace.
+
+Chaque listing porte, en plus de ses propres champs :
+  kit_snapshot:    {kit_id, version_id, club, brand, season, kit_type, league,
+                    gender, entity_type, model, front_photo}
+  collection_item: {physical_state, signed, signed_by, size, flocking_detail, flocking_origin}
+  seller:          {username, name, picture, completed_sales}
+  snapshot_updated_at
+
+Écrit à la création de l'annonce ; GET /api/marketplace filtre et trie
+directement sur ces champs (une requête indexée, plus de chaîne
+kit → version → collection ni d'enrichissement par annonce).
+
+Propagation : quand un kit, une version, un item de collection ou un profil
+vendeur change (profil ou vente finalisée), `mark_listing_snapshots_stale` pose `snapshot_stale` (date du
+marquage) sur les annonces ouvertes concernées ; `refresh_stale_snapshots`
+les reconstruit par lots (5 requêtes `$in` par lot). La reconstruction ne
+retire le marqueur que s'il n'a pas été reposé entre-temps. Les annonces
+antérieures à l'instantané (sans `kit_snapshot` ou sans `seller.completed_sales`)
+sont traitées de la même façon.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from ..database import db
+from .scheduled_jobs import scheduled_loop
+
+logger = logging.getLogger(__name__)
+
+KIT_SNAPSHOT_FIELDS = ("club", "brand", "season", "kit_type", "league", "gender", "entity_type")
+COLLECTION_SNAPSHOT_FIELDS = ("physical_state", "signed", "signed_by", "size", "flocking_detail", "flocking_origin")
+SELLER_FIELDS = ("username", "name", "picture")
+
+OPEN_LISTING_STATUSES = ["active", "reserved"]
+SNAPSHOT_REFRESH_BATCH = 200
+SNAPSHOT_REFRESH_SECONDS = 60
+
+_refresh_wakeup: Optional[asyncio.Event] = None
+
+
+def build_snapshot(col: Optional[dict], version: Optional[dict], kit: Optional[dict], seller: Optional[dict]) -> dict:
+    """Champs dénormalisés d'une annonce (mêmes priorités que l'ancien enrichissement : kit > version)."""
+    col, version, kit, seller = col or {}, version or {}, kit or {}, seller or {}
+    kit_snapshot = {
+        "kit_id": version.get("kit_id") or kit.get("kit_id", ""),
+        "version_id": col.get("version_id", ""),
+        "model": version.get("model", ""),
+        "front_photo": kit.get("front_photo") or version.get("front_photo", ""),
+    }
+    kit_snapshot.update({f: kit.get(f) or version.get(f) or "" for f in KIT_SNAPSHOT_FIELDS})
+    return {
+        "kit_snapshot": kit_snapshot,
+        "collection_item": {f: col.get(f) for f in COLLECTION_SNAPSHOT_FIELDS},
+        "seller": {
+            **{f: seller.get(f) for f in SELLER_FIELDS if seller.get(f) is not None},
+            "completed_sales": seller.get("completed_sales") or 0,
+        },
+        "snapshot_updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+async def _find_in(collection: str, key: str, ids) -> dict[str, dict]:
+    ids = [i for i in set(ids) if i]
+    if not ids:
+        return {}
+    return {d[key]: d async for d in db[collection].find({key: {"$in": ids}}, {"_id": 0})}
+
+
+async def seller_sales_counts(user_ids) -> dict[str, int]:
+    """Ventes finalisées par vendeur (tri « meilleurs vendeurs »)."""
+    user_ids = [u for u in set(user_ids) if u]
+    if not user_ids:
+        return {}
+    rows = await db.transactions.aggregate([
+        {"$match": {"seller_id": {"$in": user_ids}, "status": "completed"}},
+        {"$group": {"_id": "$seller_id", "n": {"$sum": 1}}},
+    ]).to_list(None)
+    return {r["_id"]: r["n"] for r in rows}
+
+
+async def build_snapshots(listings: list[dict]) -> dict[str, dict]:
+    """Instantanés de plusieurs annonces en 5 requêtes : {listing_id: champs}."""
+    cols = await _find_in("collections", "collection_id", (l["collection_id"] for l in listings))
+    versions = await _find_in("versions", "version_id", (c.get("version_id") for c in cols.values()))
+    kits = await _find_in("master_kits", "kit_id", (v.get("kit_id") for v in versions.values()))
+    sellers = await _find_in("users", "user_id", (l["user_id"] for l in listings))
+    sales = await seller_sales_counts(sellers)
+    for user_id, seller in sellers.items():
+        seller["completed_sales"] = sales.get(user_id, 0)
+    snapshots = {}
+    for listing in listings:
+        col = cols.get(listing["collection_id"])
+        version = versions.get((col or {}).get("version_id"))
+        kit = kits.get((version or {}).get("kit_id"))
+        snapshots[listing["listing_id"]] = build_snapshot(col, version, kit, sellers.get(listing["user_id"]))
+    return snapshots
+
+
+async def mark_listing_snapshots_stale(
+    kit_id: Optional[str] = None,
+    version_id: Optional[str] = None,
+    collection_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> int:
+    """Marque à reconstruire les annonces ouvertes liées à l'objet modifié."""
+    clauses = []
+    if kit_id:
+        clauses.append({"kit_snapshot.kit_id": kit_id})
+    if version_id:
+        clauses.append({"version_id": version_id})
+    if collection_id:
+        clauses.append({"collection_id": collection_id})
+    if user_id:
+        clauses.append({"user_id": user_id})
+    if not clauses:
+        return 0
+    result = await db.listings.update_many(
+        {"status": {"$in": OPEN_LISTING_STATUSES}, "$or": clauses},
+        {"$set": {"snapshot_stale": datetime.now(timezone.utc).isoformat()}},
+    )
+    if result.modified_count and _refresh_wakeup is not None:
+        _refresh_wakeup.set()
+    return result.modified_count
+
+
+async def refresh_stale_snapshots(limit: Optional[int] = None) -> int:
+    """Reconstruit un lot d'annonces marquées (ou sans instantané). Retourne le nombre mis à jour."""
+    limit = limit or SNAPSHOT_REFRESH_BATCH
+    listings = await db.listings.find(
+        {"$or": [
+            {"snapshot_stale": {"$exists": True}},
+            {"kit_snapshot": {"$exists": False}},
+            {"seller.completed_sales": {"$exists": False}},
+        ]},
+        {"_id": 0, "listing_id": 1, "collection_id": 1, "user_id": 1, "snapshot_stale": 1},
+    ).limit(limit).to_list(limit)
+    if not listings:
+        return 0
+    snapshots = await build_snapshots(listings)
+    result = await db.listings.bulk_write([
+        UpdateOne(
+            # Marqueur reposé pendant la reconstruction : l'annonce reste à traiter
+            {"listing_id": l["listing_id"], "snapshot_stale": l.get("snapshot_stale", {"$exists": False})},
+            {"$set": snapshots[l["listing_id"]], "$unset": {"snapshot_stale": ""}},
+        )
+        for l in listings
+    ], ordered=False)
+    return result.modified_count
+
+
+async def refresh_all_stale_snapshots() -> int:
+    total = 0
+    while True:
+        refreshed = await refresh_stale_snapshots()
+        total += refreshed
+        if refreshed < SNAPSHOT_REFRESH_BATCH:
+            return total
+
+
+async def _snapshot_refresh_pass() -> dict:
+    return {"refreshed": await refresh_all_stale_snapshots()}
+
+
+async def snapshot_refresh_loop() -> None:
+    """Tâche de fond : reconstruit les instantanés dès qu'un marquage a lieu, au
+    plus une passe par SNAPSHOT_REFRESH_SECONDS tous workers confondus (bail
+    `scheduled_jobs`)."""
+    global _refresh_wakeup
+    _refresh_wakeup = asyncio.Event()
+    await scheduled_loop(
+        "listing_snapshots", timedelta(seconds=SNAPSHOT_REFRESH_SECONDS), _snapshot_refresh_pass,
+        poll_seconds=SNAPSHOT_REFRESH_SECONDS, wakeup=_refresh_wakeup,
+    )
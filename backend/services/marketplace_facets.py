@@ -0,0 +1,209 @@
+"""Recherche à facettes de la marketplace.
+
+Les filtres de GET /api/marketplace et les comptes par valeur de facette
+(« Nike (132) ») partagent la même construction de requête, sur l'instantané
+dénormalisé des annonces (voir listing_snapshot).
+
+`facet_counts` calcule toutes les facettes en une seule agrégation `$facet` :
+  - `$match` commun : statut actif + filtres qui ne sont pas des facettes
+    (recherche, prix, signé, type d'équipe, version) ;
+  - une branche par facette, qui applique tous les filtres de facette sauf le
+    sien (comptes disjonctifs : choisir « Nike » ne fait pas disparaître Adidas) ;
+  - une branche `total` avec tous les filtres.
+
+Résultat mis en cache en mémoire (FACET_CACHE_TTL secondes, clé = jeu de
+filtres normalisé) ; les requêtes identiques concurrentes partagent la même
+agrégation en cours.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from ..database import db
+
+logger = logging.getLogger(__name__)
+
+VALID_LISTING_TYPES = {"sale", "trade", "both"}
+SIZE_ORDER = ["XS", "S", "M", "L", "XL", "XXL", "3XL"]
+NO_FLOCKING = "none"
+
+# Facette → (paramètre de filtre, champ de l'annonce)
+FACET_FIELDS = {
+    "clubs":            ("club",            "kit_snapshot.club"),
+    "brands":           ("brand",           "kit_snapshot.brand"),
+    "seasons":          ("season",          "kit_snapshot.season"),
+    "kit_types":        ("kit_type",        "kit_snapshot.kit_type"),
+    "leagues":          ("league",          "kit_snapshot.league"),
+    "genders":          ("gender",          "kit_snapshot.gender"),
+    "sizes":            ("size",            "collection_item.size"),
+    "physical_states":  ("physical_state",  "collection_item.physical_state"),
+    "flocking_origins": ("flocking_origin", "collection_item.flocking_origin"),
+    "listing_types":    ("listing_type",    "listing_type"),
+}
+FILTER_PARAMS = (
+    "version_id", "search", "team_type", "min_price", "max_price", "signed",
+    *(param for param, _ in FACET_FIELDS.values()),
+)
+
+FACET_CACHE_TTL = 30
+FACET_CACHE_MAX_ENTRIES = 512
+
+_cache: dict[tuple, tuple[float, dict]] = {}
+_inflight: dict[tuple, asyncio.Future] = {}
+_stats = {"hits": 0, "misses": 0, "shared": 0}
+
+
+def normalize_filters(**params) -> dict:
+    """Ne garde que les filtres effectifs (valeurs vides et types inconnus écartés)."""
+    filters = {}
+    for name in FILTER_PARAMS:
+        value = params.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            continue
+        if name == "listing_type" and value not in VALID_LISTING_TYPES:
+            continue
+        if name == "team_type" and value not in ("club", "national"):
+            continue
+        filters[name] = value
+    return filters
+
+
+def _facet_clause(facet: str, value) -> dict:
+    param, field = FACET_FIELDS[facet]
+    if param == "flocking_origin" and value == NO_FLOCKING:
+        return {field: {"$in": ["", NO_FLOCKING, None]}}
+    return {field: value}
+
+
+def _base_clauses(filters: dict) -> dict:
+    """Filtres hors facettes, toujours appliqués."""
+    query: dict = {"status": "active"}
+    if filters.get("version_id"):
+        query["version_id"] = filters["version_id"]
+    if "min_price" in filters or "max_price" in filters:
+        price_filter: dict = {}
+        if "min_price" in filters:
+            price_filter["$gte"] = filters["min_price"]
+        if "max_price" in filters:
+            price_filter["$lte"] = filters["max_price"]
+        query["asking_price"] = price_filter
+    if filters.get("team_type"):
+        query["kit_snapshot.entity_type"] = filters["team_type"]
+    if filters.get("search"):
+        search = filters["search"]
+        query["$or"] = [
+            {"kit_snapshot.club":   {"$regex": search, "$options": "i"}},
+            {"kit_snapshot.brand":  {"$regex": search, "$options": "i"}},
+            {"kit_snapshot.season": {"$regex": search, "$options": "i"}},
+        ]
+    if "signed" in filters:
+        query["collection_item.signed"] = filters["signed"]
+    return query
+
+
+def _facet_clauses(filters: dict, exclude: Optional[str] = None) -> dict:
+    query: dict = {}
+    for facet, (param, _) in FACET_FIELDS.items():
+        if facet != exclude and param in filters:
+            query.update(_facet_clause(facet, filters[param]))
+    return query
+
+
+def listing_query(filters: dict) -> dict:
+    """Requête Mongo complète d'un jeu de filtres normalisé."""
+    return {**_base_clauses(filters), **_facet_clauses(filters)}
+
+
+def _facet_pipeline(filters: dict) -> list[dict]:
+    branches = {
+        facet: [
+            {"$match": _facet_clauses(filters, exclude=facet)},
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        ]
+        for facet, (_, field) in FACET_FIELDS.items()
+    }
+    branches["total"] = [{"$match": _facet_clauses(filters)}, {"$count": "n"}]
+    return [{"$match": _base_clauses(filters)}, {"$facet": branches}]
+
+
+def _sorted_counts(facet: str, buckets: list[dict]) -> list[dict]:
+    counts: dict = {}
+    for bucket in buckets:
+        value = bucket["_id"]
+        if facet == "flocking_origins" and value in ("", None, NO_FLOCKING):
+            value = NO_FLOCKING
+        elif value in ("", None, NO_FLOCKING):
+            continue
+        counts[value] = counts.get(value, 0) + bucket["count"]
+    if facet == "sizes":
+        rank = {s: i for i, s in enumerate(SIZE_ORDER)}
+        keys = sorted(counts, key=lambda s: (rank.get(s, len(rank)), str(s)))
+    else:
+        keys = sorted(counts, key=str, reverse=(facet == "seasons"))
+    return [{"value": k, "count": counts[k]} for k in keys]
+
+
+async def _aggregate(filters: dict) -> dict:
+    t0 = time.perf_counter()
+    rows = await db.listings.aggregate(_facet_pipeline(filters)).to_list(1)
+    row = rows[0] if rows else {}
+    total = row.get("total") or [{"n": 0}]
+    result = {
+        "facets": {facet: _sorted_counts(facet, row.get(facet, [])) for facet in FACET_FIELDS},
+        "total": total[0]["n"],
+    }
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    logger.debug(f"Facettes marketplace calculées en {elapsed_ms:.1f} ms ({filters})")
+    return result
+
+
+def _cache_key(filters: dict) -> tuple:
+    return tuple(sorted(filters.items()))
+
+
+async def facet_counts(filters: dict) -> dict:
+    """Comptes par valeur de facette pour un jeu de filtres normalisé (avec cache)."""
+    key = _cache_key(filters)
+    now = time.monotonic()
+    cached = _cache.get(key)
+    if cached and now - cached[0] < FACET_CACHE_TTL:
+        _stats["hits"] += 1
+        return {**cached[1], "cached": True}
+
+    pending = _inflight.get(key)
+    if pending is not None:
+        _stats["shared"] += 1
+        return {**await asyncio.shield(pending), "cached": True}
+
+    _stats["misses"] += 1
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        result = await _aggregate(filters)
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # évite l'avertissement « exception never retrieved »
+        raise
+    finally:
+        _inflight.pop(key, None)
+    future.set_result(result)
+
+    _cache.pop(key, None)
+    if len(_cache) >= FACET_CACHE_MAX_ENTRIES:
+        # Entrées insérées dans l'ordre : la première est la plus ancienne
+        _cache.pop(next(iter(_cache)))
+    _cache[key] = (time.monotonic(), result)
+    return {**result, "cached": False}
+
+
+def facet_cache_stats() -> dict:
+    return {**_stats, "entries": len(_cache)}
+
+
+def clear_facet_cache() -> None:
+    _cache.clear()
+    for name in _stats:
+        _stats[name] = 0
@@ -0,0 +1,120 @@
+"""File de modération — lecture des soumissions pour le tableau de bord.
+
+Une page = une agrégation `$facet` sur `submissions` (items de la page +
+compteurs par type sur tout le statut) + une requête `$in` sur `users` pour
+les soumissions sans `submitter_username`.
+
+Pagination par curseur sur `created_at` (tri décroissant), départagé par
+`submission_id` : la page suivante est demandée avec
+`before=<created_at>&before_id=<submission_id>` du dernier item, ce qui reste
+stable quand de nouvelles soumissions arrivent (contrairement à `skip`).
+"""
+from typing import Optional
+
+from ..database import db
+
+# Champs exposés par les listes / le détail (les votes vivent dans `submission_votes`)
+SUBMISSION_LIST_PROJECTION = {
+    "_id": 0, "submission_id": 1, "submission_type": 1, "status": 1, "data": 1,
+    "submitted_by": 1, "submitter_name": 1, "submitter_username": 1,
+    "votes_up": 1, "votes_down": 1, "created_at": 1, "updated_at": 1,
+}
+
+QUEUE_SORT = {"created_at": -1, "submission_id": -1}
+QUEUE_MAX_LIMIT = 200
+
+
+def cursor_filter(before: Optional[str], before_id: Optional[str] = None) -> dict:
+    """Filtre « strictement après le curseur » pour un tri (created_at, submission_id) décroissant."""
+    if not before:
+        return {}
+    if not before_id:
+        return {"created_at": {"$lt": before}}
+    return {"$or": [
+        {"created_at": {"$lt": before}},
+        {"created_at": before, "submission_id": {"$lt": before_id}},
+    ]}
+
+
+def next_cursor(items: list[dict], limit: int) -> Optional[dict]:
+    if len(items) < limit or not items:
+        return None
+    last = items[-1]
+    return {"before": last.get("created_at"), "before_id": last.get("submission_id")}
+
+
+async def hydrate_usernames(subs: list[dict]) -> None:
+    """Complète `submitter_username` manquant en une requête `$in`."""
+    missing = {s["submitted_by"] for s in subs if not s.get("submitter_username") and s.get("submitted_by")}
+    if not missing:
+        return
+    usernames = {
+        u["user_id"]: u.get("username", "")
+        async for u in db.users.find({"user_id": {"$in": list(missing)}}, {"_id": 0, "user_id": 1, "username": 1})
+    }
+    for s in subs:
+        if not s.get("submitter_username") and s.get("submitted_by") in usernames:
+            s["submitter_username"] = usernames[s["submitted_by"]]
+
+
+async def get_queue(
+    status: Optional[str] = "pending",
+    limit: int = 50,
+    before: Optional[str] = None,
+    before_id: Optional[str] = None,
+    submission_types: Optional[list[str]] = None,
+) -> dict:
+    """Page de la file + compteurs par type : {items, counts, total, next_cursor}."""
+    limit = max(1, min(limit, QUEUE_MAX_LIMIT))
+    match: dict = {}
+    if status:
+        match["status"] = status
+    if submission_types:
+        match["submission_type"] = {"$in": submission_types}
+
+    pipeline = [
+        {"$match": match},
+        {"$facet": {
+            "items": [
+                {"$match": cursor_filter(before, before_id)},
+                {"$sort": QUEUE_SORT},
+                {"$limit": limit},
+                {"$project": SUBMISSION_LIST_PROJECTION},
+            ],
+            "counts": [{"$group": {"_id": "$submission_type", "count": {"$sum": 1}}}],
+        }},
+    ]
+    rows = await db.submissions.aggregate(pipeline).to_list(1)
+    facet = rows[0] if rows else {"items": [], "counts": []}
+    items = facet["items"]
+    await hydrate_usernames(items)
+    counts = {row["_id"]: row["count"] for row in facet["counts"]}
+    return {
+        "items": items,
+        "counts": counts,
+        "total": sum(counts.values()),
+        "next_cursor": next_cursor(items, limit),
+    }
+
+
+async def list_pending_refs(master_kit_submission_id: str, entity_types: list[str]) -> dict[str, list[dict]]:
+    """Références d'entités en attente rattachées à un master kit, groupées par type (1 requête)."""
+    refs: dict[str, list[dict]] = {}
+    cursor = db.submissions.find(
+        {
+            "submission_type": {"$in": entity_types},
+            "status": "pending",
+            "data.parent_submission_id": master_kit_submission_id,
+        },
+        {"_id": 0, "submission_id": 1, "submission_type": 1, "status": 1, "data.name": 1, "data.full_name": 1},
+    ).sort("created_at", 1)
+    async for s in cursor:
+        data = s.get("data", {})
+        refs.setdefault(s["submission_type"], []).append({
+            "submission_id": s["submission_id"],
+            "name": data.get("name") or data.get("full_name") or "—",
+            "status": s["status"],
+            "entity_type": s["submission_type"],
+        })
+    # Ordre des types identique à l'ancienne boucle
+    return {t: refs[t] for t in entity_types if t in refs}
@@ -0,0 +1,122 @@
+"""Boîte de notifications : compteur de non lues, pagination, rétention.
+
+Compteur : `user_counters.notifications_unread`, tenu à l'écriture par des
+`$inc` atomiques, un par passage non lu → lu (ou suppression d'une non lue) :
+  - création               → +1 (`increment_unread`, `increment_unread_many`)
+  - lecture / suppression  → -1 si la notification était non lue
+  - tout marquer comme lu  → -n, n = documents réellement modifiés
+Un compteur absent (utilisateur antérieur) n'est jamais incrémenté à l'aveugle :
+il est initialisé par un `count_documents` à la première lecture.
+
+Pagination : ordre (created_at, notification_id) décroissant, curseur opaque,
+index (user_id, created_at, notification_id).
+
+Rétention : une notification lue reçoit `expires_at` = maintenant +
+NOTIFICATION_READ_RETENTION ; l'index TTL la supprime ensuite. Les non lues
+ne sont jamais purgées.
+"""
+import base64
+import binascii
+import json
+from datetime import timedelta
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from ..database import db
+from ..utils import utcnow
+from .event_bus import publish
+
+NOTIFICATION_PAGE_SIZE = 50
+MAX_NOTIFICATION_PAGE_SIZE = 100
+NOTIFICATION_READ_RETENTION = timedelta(days=90)
+NOTIFICATION_INDEX = [("user_id", 1), ("created_at", -1), ("notification_id", -1)]
+
+_COUNTER = "notifications_unread"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def read_update() -> dict:
+    """`$set` d'une notification qui passe à l'état lu (programme sa purge)."""
+    return {"read": True, "expires_at": utcnow() + NOTIFICATION_READ_RETENTION}
+
+
+# ─── Compteur ────────────────────────────────────────────────────────────────
+
+async def increment_unread(user_id: str) -> None:
+    await db.user_counters.update_one(
+        {"user_id": user_id, _COUNTER: {"$exists": True}}, {"$inc": {_COUNTER: 1}},
+    )
+
+
+async def increment_unread_many(user_ids: list[str]) -> None:
+    """+1 pour chacun (envoi groupé : une notification par utilisateur)."""
+    await db.user_counters.update_many(
+        {"user_id": {"$in": user_ids}, _COUNTER: {"$exists": True}}, {"$inc": {_COUNTER: 1}},
+    )
+
+
+async def decrement_unread(user_id: str, n: int = 1) -> int:
+    """Retire `n` non lues et publie la nouvelle valeur. Retourne le compteur à jour."""
+    if n:
+        await db.user_counters.update_one(
+            {"user_id": user_id, _COUNTER: {"$exists": True}}, {"$inc": {_COUNTER: -n}},
+        )
+    unread = await get_unread_count(user_id)
+    await publish(user_id, "notifications", {"unread_count": unread})
+    return unread
+
+
+async def get_unread_count(user_id: str) -> int:
+    """Non lues de l'utilisateur (une lecture ; initialisé au premier appel)."""
+    doc = await db.user_counters.find_one({"user_id": user_id}, {"_id": 0, _COUNTER: 1})
+    if doc and _COUNTER in doc:
+        return max(doc[_COUNTER], 0)
+    n = await db.notifications.count_documents({"user_id": user_id, "read": False})
+    try:
+        await db.user_counters.update_one(
+            {"user_id": user_id, _COUNTER: {"$exists": False}}, {"$set": {_COUNTER: n}}, upsert=True,
+        )
+    except DuplicateKeyError:
+        pass  # initialisé entre-temps par une autre requête
+    return n
+
+
+# ─── Pagination ──────────────────────────────────────────────────────────────
+
+def encode_cursor(notif: dict) -> str:
+    raw = json.dumps([notif["created_at"], notif["notification_id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        created_at, notification_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor("Curseur illisible") from e
+    if not isinstance(created_at, str) or not isinstance(notification_id, str):
+        raise InvalidCursor("Curseur illisible")
+    return created_at, notification_id
+
+
+async def list_notifications(user_id: str, cursor: Optional[str] = None, limit: int = NOTIFICATION_PAGE_SIZE) -> dict:
+    """{notifications, next_cursor} — plus récentes d'abord ; `cursor` lit la page suivante."""
+    limit = max(1, min(limit, MAX_NOTIFICATION_PAGE_SIZE))
+    query: dict = {"user_id": user_id}
+    if cursor:
+        created_at, notification_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "notification_id": {"$lt": notification_id}},
+        ]
+    rows = await db.notifications.find(query, {"_id": 0, "expires_at": 0}).sort(
+        [("created_at", -1), ("notification_id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    notifs = rows[:limit]
+    return {
+        "notifications": notifs,
+        "next_cursor": encode_cursor(notifs[-1]) if len(rows) > limit else None,
+    }
@@ -0,0 +1,145 @@
+"""Rappels au vendeur des offres en attente depuis plus de OFFER_REMINDER_AFTER.
+
+Job quotidien (`scheduled_jobs.scheduled_loop`, un seul worker par passage) :
+  1. une agrégation sur `offers` (index status + created_at) regroupe les offres
+     éligibles par annonce, joint l'annonce puis le vendeur, et regroupe par
+     vendeur et par annonce active / inactive ; le curseur est parcouru en
+     flux, sans plafond ;
+  2. un email par vendeur, toutes annonces confondues, envoyé par un
+     `RateLimitedSender` (REMINDER_CONCURRENCY envois simultanés, au plus
+     REMINDER_RATE_PER_SECOND démarrages par seconde) ;
+  3. les offres des vendeurs prévenus sont marquées `reminder_sent` par lots
+     de REMINDER_BATCH vendeurs, au fil de l'eau : un passage interrompu ne
+     renvoie pas les rappels déjà partis, un envoi en échec est retenté au
+     passage suivant. Les offres d'annonces inactives (ou de vendeurs sans
+     email) sont marquées `reminder_skipped` et ne sont plus réexaminées.
+"""
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional
+
+from ..database import db
+from ..email_service import FRONTEND_URL, send_offer_reminder
+from ..utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+OFFER_REMINDER_AFTER = timedelta(hours=72)
+OFFER_REMINDER_INTERVAL = timedelta(hours=24)
+REMINDER_CONCURRENCY = 4
+REMINDER_RATE_PER_SECOND = 2
+REMINDER_BATCH = 200
+
+
+class RateLimitedSender:
+    """Envois concurrents bornés en nombre et en débit (démarrages espacés)."""
+
+    def __init__(self, concurrency: int, per_second: float):
+        self._sem = asyncio.Semaphore(concurrency)
+        self._interval = 1 / per_second
+        self._next_slot = 0.0
+        self._slot_lock = asyncio.Lock()
+
+    async def _wait_slot(self) -> None:
+        async with self._slot_lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+    async def send(self, fn: Callable[..., Awaitable], *args, **kwargs) -> bool:
+        async with self._sem:
+            await self._wait_slot()
+            try:
+                await fn(*args, **kwargs)
+                return True
+            except Exception as e:
+                logger.error(f"Envoi de rappel échoué : {e}")
+                return False
+
+
+def _reminder_pipeline(cutoff: str) -> list[dict]:
+    return [
+        {"$match": {
+            "status": "pending", "created_at": {"$lt": cutoff},
+            "reminder_sent": {"$ne": True}, "reminder_skipped": {"$ne": True},
+        }},
+        {"$group": {"_id": "$listing_id", "offer_ids": {"$push": "$offer_id"}}},
+        {"$lookup": {"from": "listings", "localField": "_id", "foreignField": "listing_id", "as": "listing"}},
+        {"$unwind": {"path": "$listing", "preserveNullAndEmptyArrays": True}},
+        # Annonces inactives ou disparues regroupées à part : leurs offres sont écartées, sans email
+        {"$group": {
+            "_id": {"seller": "$listing.user_id", "active": {"$eq": ["$listing.status", "active"]}},
+            "listing_ids": {"$push": "$_id"},
+            "offer_ids": {"$push": "$offer_ids"},
+        }},
+        {"$lookup": {"from": "users", "localField": "_id.seller", "foreignField": "user_id", "as": "seller"}},
+    ]
+
+
+def _reminder_url(listing_ids: list[str]) -> str:
+    if len(listing_ids) == 1:
+        return f"{FRONTEND_URL}/marketplace/{listing_ids[0]}"
+    return f"{FRONTEND_URL}/collection"
+
+
+def _reachable(row: dict) -> bool:
+    """Annonce active et vendeur joignable par email."""
+    return bool(row["_id"].get("active") and row.get("email"))
+
+
+async def _flush(batch: list[dict], sender: RateLimitedSender) -> tuple[int, int, int]:
+    """Envoie les rappels d'un lot de vendeurs puis marque leurs offres. → (emails, offres, écartées).
+
+    Seules les offres des vendeurs effectivement prévenus passent à
+    `reminder_sent` : un envoi en échec est retenté au passage suivant. Les
+    offres sans destinataire possible (annonce inactive, vendeur sans email)
+    passent à `reminder_skipped` pour ne plus être réexaminées.
+    """
+    targets = [row for row in batch if _reachable(row)]
+    sends = [
+        sender.send(
+            send_offer_reminder, row["email"], row.get("name") or "",
+            _reminder_url(row["listing_ids"]), len(row["offer_ids"]), len(row["listing_ids"]),
+        )
+        for row in targets
+    ]
+    results = await asyncio.gather(*sends)
+    sent_ids = [offer_id for row, ok in zip(targets, results) if ok for offer_id in row["offer_ids"]]
+    skipped_ids = [offer_id for row in batch if not _reachable(row) for offer_id in row["offer_ids"]]
+    if sent_ids:
+        await db.offers.update_many({"offer_id": {"$in": sent_ids}}, {"$set": {"reminder_sent": True}})
+    if skipped_ids:
+        await db.offers.update_many({"offer_id": {"$in": skipped_ids}}, {"$set": {"reminder_skipped": True}})
+    return sum(results), len(sent_ids), len(skipped_ids)
+
+
+async def send_offer_reminders(sender: Optional[RateLimitedSender] = None) -> dict:
+    """Un passage du job : {sellers, offers, emails, skipped}."""
+    sender = sender or RateLimitedSender(REMINDER_CONCURRENCY, REMINDER_RATE_PER_SECOND)
+    cutoff = (utcnow() - OFFER_REMINDER_AFTER).isoformat()
+    totals = {"sellers": 0, "offers": 0, "emails": 0, "skipped": 0}
+    batch: list[dict] = []
+
+    async def flush() -> None:
+        sent, offers, skipped = await _flush(batch, sender)
+        totals["sellers"] += sum(1 for row in batch if _reachable(row))
+        totals["offers"] += offers
+        totals["emails"] += sent
+        totals["skipped"] += skipped
+        batch.clear()
+
+    async for row in db.offers.aggregate(_reminder_pipeline(cutoff)):
+        row["offer_ids"] = [offer_id for ids in row["offer_ids"] for offer_id in ids]
+        sellers = row.pop("seller", [])
+        seller = sellers[0] if sellers else {}
+        row["email"], row["name"] = seller.get("email"), seller.get("name")
+        batch.append(row)
+        if len(batch) >= REMINDER_BATCH:
+            await flush()
+    if batch:
+        await flush()
+    return totals
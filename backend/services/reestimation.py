@@ -0,0 +1,280 @@
+"""Ré-estimation des prix stockés dans `collections`.
+
+Le prix d'un item est calculé à l'ajout / à la modification puis figé. Il
+devient obsolète quand :
+  - une grille ESTIMATION_* change (→ `ESTIMATION_VERSION` change) : tous les
+    items sont ré-estimés ;
+  - la note d'un joueur change de palier de profil : seuls les items
+    `flocking_player_id = X` sont ré-estimés.
+
+Seuls les items estimables sont ré-estimés : prix stocké, `estimation_version`
+renseignée et `estimation_mode` connu ("basic" / "advanced"), version portant
+un `model`. Les autres (jamais estimés, données antérieures aux critères) sont
+laissés tels quels et comptés dans `skipped`.
+
+Un job parcourt les items en streaming par lots de `REESTIMATION_BATCH_SIZE`,
+résout versions / master kits / notes joueurs en une requête `$in` par lot,
+recalcule via `estimate_many` et n'écrit (un `bulk_write` par lot) que les
+items dont le prix ou la version de grille diffère. L'avancement est
+persisté dans `reestimation_jobs` :
+
+  {job_id, scope: "all"|"player", player_id, reason, status: "running"|"done"|"failed",
+   estimation_version, total, processed, updated, skipped, started_at, finished_at, error}
+
+Critères d'estimation d'un item :
+  - model_type / competition : version (`model`, `competition`)
+  - season_year             : 1re année à 4 chiffres de `master_kit.season`
+  - reste                   : champs de l'item, dont `estimation_mode`
+"""
+import logging
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from ..database import db
+from ..utils import ESTIMATION_VERSION, _player_note_to_profile
+from .collection_summary import rebuild_user_summary
+from .estimation_batch import estimate_many, get_player_notes
+from .version_price_stats import rebuild_versions_stats
+
+logger = logging.getLogger(__name__)
+
+REESTIMATION_BATCH_SIZE = 500
+REESTIMATION_CLAIM_TTL = timedelta(hours=1)
+ESTIMATION_MODES = ("basic", "advanced")
+
+# Items dont le prix stocké a été calculé avec des critères connus
+_ESTIMABLE = {
+    "estimated_price": {"$ne": None},
+    "estimation_version": {"$nin": [None, ""]},
+    "estimation_mode": {"$in": list(ESTIMATION_MODES)},
+}
+
+_ITEM_PROJECTION = {
+    "_id": 0, "collection_id": 1, "user_id": 1, "version_id": 1,
+    "estimated_price": 1, "estimation_version": 1, "estimation_mode": 1,
+    "condition_origin": 1, "physical_state": 1, "flocking_origin": 1, "flocking_player_id": 1,
+    "signed": 1, "signed_type": 1, "signed_other_detail": 1, "signed_personal_message": 1,
+    "signed_proof": 1, "patch": 1, "is_rare": 1, "rare_reason": 1,
+}
+
+
+def season_year(season: str) -> int:
+    """Même règle que le front (`parseSeasonYear`) : 1re année à 4 chiffres."""
+    match = re.search(r"(\d{4})", season or "")
+    return int(match.group(1)) if match else 0
+
+
+def note_change_affects_estimation(old_note: float, new_note: float) -> bool:
+    """Seul le palier de profil joueur entre dans la formule."""
+    return _player_note_to_profile(old_note or 0.0)[1] != _player_note_to_profile(new_note or 0.0)[1]
+
+
+async def _estimation_inputs(items: list[dict]) -> list[dict | None]:
+    """Complète les items d'un lot avec les critères portés par version / master kit.
+
+    None pour un item dont la version n'a pas de `model` (critères incomplets).
+    """
+    version_ids = list({i["version_id"] for i in items if i.get("version_id")})
+    versions = {
+        v["version_id"]: v
+        async for v in db.versions.find(
+            {"version_id": {"$in": version_ids}},
+            {"_id": 0, "version_id": 1, "kit_id": 1, "model": 1, "competition": 1},
+        )
+    }
+    kit_ids = list({v["kit_id"] for v in versions.values() if v.get("kit_id")})
+    kits = {
+        k["kit_id"]: k
+        async for k in db.master_kits.find({"kit_id": {"$in": kit_ids}}, {"_id": 0, "kit_id": 1, "season": 1})
+    }
+    inputs = []
+    for item in items:
+        version = versions.get(item.get("version_id"), {})
+        if not version.get("model"):
+            inputs.append(None)
+            continue
+        kit = kits.get(version.get("kit_id"), {})
+        inputs.append({
+            **item,
+            "model_type": version["model"],
+            "competition": version.get("competition") or "",
+            "season_year": season_year(kit.get("season", "")),
+            "mode": item["estimation_mode"],
+        })
+    return inputs
+
+
+async def _process_batch(items: list[dict], now: str) -> tuple[int, int, set[str], set[str]]:
+    """Ré-estime un lot ; retourne (réécrits, ignorés, users impactés, versions impactées)."""
+    inputs = [i for i in await _estimation_inputs(items) if i is not None]
+    skipped = len(items) - len(inputs)
+    notes = await get_player_notes(i.get("flocking_player_id") for i in inputs)
+    ops, users, versions = [], set(), set()
+    for item, result in zip(inputs, estimate_many(inputs, notes)):
+        price = result["estimated_price"]
+        if item.get("estimated_price") == price and item.get("estimation_version") == ESTIMATION_VERSION:
+            continue
+        ops.append(UpdateOne(
+            {"collection_id": item["collection_id"]},
+            {"$set": {
+                "estimated_price": price,
+                "price_estimate": price,
+                "value_estimate": price,
+                "estimation_version": ESTIMATION_VERSION,
+                "estimated_at": now,
+            }},
+        ))
+        if item.get("estimated_price") != price:
+            users.add(item["user_id"])
+            versions.add(item.get("version_id"))
+    if ops:
+        await db.collections.bulk_write(ops, ordered=False)
+    return len(ops), skipped, users, versions
+
+
+async def create_job(scope: str, reason: str, player_id: str | None = None) -> dict:
+    """Enregistre un job en attente d'exécution (`run_job`)."""
+    job = {
+        "job_id": f"reest_{uuid.uuid4().hex[:12]}",
+        "scope": scope,
+        "player_id": player_id,
+        "reason": reason,
+        "status": "running",
+        "estimation_version": ESTIMATION_VERSION,
+        "total": 0,
+        "processed": 0,
+        "updated": 0,
+        "skipped": 0,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": None,
+        "error": None,
+    }
+    await db.reestimation_jobs.insert_one(job)
+    job.pop("_id", None)
+    return job
+
+
+async def run_job(job_id: str) -> dict | None:
+    """Exécute un job créé par `create_job` (appelé en tâche de fond)."""
+    job = await db.reestimation_jobs.find_one({"job_id": job_id}, {"_id": 0})
+    if not job:
+        return None
+    scope = {"flocking_player_id": job["player_id"]} if job["scope"] == "player" else {}
+    query = {**scope, **_ESTIMABLE}
+    now = datetime.now(timezone.utc).isoformat()
+    processed = updated = skipped = 0
+    affected_users: set[str] = set()
+    affected_versions: set[str] = set()
+    try:
+        total = await db.collections.count_documents(scope)
+        skipped = total - await db.collections.count_documents(query)
+        await db.reestimation_jobs.update_one(
+            {"job_id": job_id}, {"$set": {"total": total, "skipped": skipped}}
+        )
+
+        batch: list[dict] = []
+        async for item in db.collections.find(query, _ITEM_PROJECTION):
+            batch.append(item)
+            if len(batch) < REESTIMATION_BATCH_SIZE:
+                continue
+            written, ignored, users, versions = await _process_batch(batch, now)
+            processed, updated, skipped = processed + len(batch), updated + written, skipped + ignored
+            affected_users |= users
+            affected_versions |= versions
+            batch = []
+            await db.reestimation_jobs.update_one(
+                {"job_id": job_id},
+                {"$set": {"processed": processed, "updated": updated, "skipped": skipped}},
+            )
+        if batch:
+            written, ignored, users, versions = await _process_batch(batch, now)
+            processed, updated, skipped = processed + len(batch), updated + written, skipped + ignored
+            affected_users |= users
+            affected_versions |= versions
+
+        # Les prix ont bougé : résumés de collection et distributions par version doivent suivre
+        for user_id in affected_users:
+            await rebuild_user_summary(user_id)
+        await rebuild_versions_stats(affected_versions)
+
+        status = {"status": "done", "error": None}
+    except Exception as e:
+        logger.error(f"Ré-estimation {job_id} échouée : {e}")
+        status = {"status": "failed", "error": str(e)}
+
+    await db.reestimation_jobs.update_one(
+        {"job_id": job_id},
+        {"$set": {
+            **status,
+            "processed": processed,
+            "updated": updated,
+            "skipped": skipped,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+        }},
+    )
+    logger.info(f"Ré-estimation {job_id} ({job['reason']}) : {updated}/{processed} items mis à jour, {skipped} ignorés")
+    return await db.reestimation_jobs.find_one({"job_id": job_id}, {"_id": 0})
+
+
+async def reestimate_player_items(player_id: str, reason: str = "player_note") -> dict | None:
+    """Ré-estime les items floqués au joueur (note modifiée)."""
+    job = await create_job("player", reason, player_id=player_id)
+    return await run_job(job["job_id"])
+
+
+async def reestimate_if_tables_changed() -> dict | None:
+    """Au boot : relance une ré-estimation complète si les grilles ont changé.
+
+    Premier démarrage (aucune version enregistrée) : on enregistre la version
+    courante sans toucher aux prix existants.
+
+    Tous les workers appellent cette fonction : le changement de version est
+    réclamé de façon atomique (`claim` sur le document config, conditionné à
+    `value` = version précédente) et un seul worker lance le job. La nouvelle
+    version n'est enregistrée qu'une fois le job terminé (`done`) ; en cas
+    d'échec la réclamation est relâchée et le boot suivant relance le job. Une
+    réclamation plus vieille que REESTIMATION_CLAIM_TTL (worker tué en cours
+    de job) peut être reprise.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        config = await db.config.find_one_and_update(
+            {"key": "estimation_version"},
+            {"$setOnInsert": {"value": ESTIMATION_VERSION, "updated_at": now.isoformat()}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return None  # premier boot : document créé au même instant par un autre worker
+    previous = config.get("value") if config else None
+    if previous is None or previous == ESTIMATION_VERSION:
+        return None
+
+    claim_id = uuid.uuid4().hex
+    stale = (now - REESTIMATION_CLAIM_TTL).isoformat()
+    claimed = await db.config.find_one_and_update(
+        {"key": "estimation_version", "value": previous, "$or": [
+            {"claim": {"$exists": False}},
+            {"claim.version": {"$ne": ESTIMATION_VERSION}},
+            {"claim.claimed_at": {"$lt": stale}},
+        ]},
+        {"$set": {"claim": {"id": claim_id, "version": ESTIMATION_VERSION, "claimed_at": now.isoformat()}}},
+    )
+    if claimed is None:
+        return None  # ré-estimation déjà en cours sur un autre worker
+
+    result = None
+    try:
+        job = await create_job("all", f"coefficients {previous} → {ESTIMATION_VERSION}")
+        result = await run_job(job["job_id"])
+    except Exception as e:
+        logger.error(f"Ré-estimation au boot échouée : {e}")
+    done = bool(result) and result["status"] == "done"
+    update = {"$unset": {"claim": ""}}
+    if done:
+        update["$set"] = {"value": ESTIMATION_VERSION, "updated_at": datetime.now(timezone.utc).isoformat()}
+    await db.config.update_one({"key": "estimation_version", "claim.id": claim_id}, update)
+    return result
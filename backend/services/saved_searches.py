@@ -0,0 +1,156 @@
+"""Recherches marketplace sauvegardées et alertes sur nouvelles annonces.
+
+Une recherche sauvegardée stocke le jeu de filtres normalisé
+(`marketplace_facets.normalize_filters`) et une clé d'appariement tirée de
+son filtre le plus sélectif : `version_id:<id>` > `club:<nom>` > `brand:<nom>`,
+sinon `*`. À la création d'une annonce, `match_new_listing` ne charge que les
+recherches dont la clé correspond à l'annonce (requête indexée sur
+`match_key`) puis évalue leurs filtres en mémoire, avec la même sémantique
+que `listing_query`.
+
+Chaque correspondance produit une notification `saved_search_match` ; tant
+qu'elle n'est pas lue, les nouvelles correspondances de la même recherche
+l'incrémentent au lieu d'en créer une autre.
+"""
+import json
+import logging
+import re
+from datetime import datetime, timezone
+
+from pymongo import ReturnDocument
+
+from ..database import db
+from ..routers.notifications import create_notification
+from .event_bus import publish
+from .marketplace_facets import FACET_FIELDS, NO_FLOCKING
+
+logger = logging.getLogger(__name__)
+
+MAX_SAVED_SEARCHES = 20
+MATCH_KEY_FIELDS = (
+    ("version_id", "version_id"),
+    ("club", "kit_snapshot.club"),
+    ("brand", "kit_snapshot.brand"),
+)
+ANY_MATCH_KEY = "*"
+_SEARCH_FIELDS = ("kit_snapshot.club", "kit_snapshot.brand", "kit_snapshot.season")
+
+
+def _field_value(doc: dict, path: str):
+    for part in path.split("."):
+        doc = (doc or {}).get(part)
+    return doc
+
+
+def filters_key(filters: dict) -> str:
+    """Forme canonique d'un jeu de filtres (détection des doublons)."""
+    return json.dumps(filters, sort_keys=True, separators=(",", ":"))
+
+
+def match_key(filters: dict) -> str:
+    for param, _ in MATCH_KEY_FIELDS:
+        if filters.get(param):
+            return f"{param}:{filters[param]}"
+    return ANY_MATCH_KEY
+
+
+def listing_match_keys(listing: dict) -> list[str]:
+    keys = [ANY_MATCH_KEY]
+    for param, path in MATCH_KEY_FIELDS:
+        value = _field_value(listing, path)
+        if value:
+            keys.append(f"{param}:{value}")
+    return keys
+
+
+def _search_regex(search: str) -> re.Pattern:
+    try:
+        return re.compile(search, re.IGNORECASE)
+    except re.error:
+        return re.compile(re.escape(search), re.IGNORECASE)
+
+
+def listing_matches(filters: dict, listing: dict) -> bool:
+    """Évalue un jeu de filtres normalisé sur une annonce (miroir de `listing_query`)."""
+    if listing.get("status") != "active":
+        return False
+    if "version_id" in filters and listing.get("version_id") != filters["version_id"]:
+        return False
+    price = listing.get("asking_price")
+    if "min_price" in filters and (price is None or price < filters["min_price"]):
+        return False
+    if "max_price" in filters and (price is None or price > filters["max_price"]):
+        return False
+    if "team_type" in filters and _field_value(listing, "kit_snapshot.entity_type") != filters["team_type"]:
+        return False
+    if "search" in filters:
+        pattern = _search_regex(filters["search"])
+        if not any(pattern.search(str(_field_value(listing, f) or "")) for f in _SEARCH_FIELDS):
+            return False
+    if "signed" in filters and _field_value(listing, "collection_item.signed") != filters["signed"]:
+        return False
+    for param, path in FACET_FIELDS.values():
+        if param not in filters:
+            continue
+        value = _field_value(listing, path)
+        if param == "flocking_origin" and filters[param] == NO_FLOCKING:
+            if value not in ("", NO_FLOCKING, None):
+                return False
+        elif value != filters[param]:
+            return False
+    return True
+
+
+async def _notify_match(search: dict, listing: dict) -> None:
+    kit = listing.get("kit_snapshot") or {}
+    label = " ".join(v for v in (kit.get("club"), kit.get("season")) if v) or "Nouvelle annonce"
+    name = search.get("name") or "votre recherche"
+    coalesced = await db.notifications.find_one_and_update(
+        {"user_id": search["user_id"], "type": "saved_search_match",
+         "search_id": search["search_id"], "read": False},
+        {"$inc": {"match_count": 1},
+         "$set": {"target_id": listing["listing_id"],
+                  "created_at": datetime.now(timezone.utc).isoformat()}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if coalesced:
+        coalesced["message"] = f"{coalesced['match_count']} nouvelles annonces pour « {name} » (dernière : {label})."
+        await db.notifications.update_one(
+            {"notification_id": coalesced["notification_id"]}, {"$set": {"message": coalesced["message"]}},
+        )
+        await publish(search["user_id"], "notification_updated", coalesced)
+        return
+    notif = await create_notification(
+        user_id=search["user_id"],
+        notif_type="saved_search_match",
+        title="Nouvelle annonce pour votre recherche",
+        message=f"{label} correspond à « {name} ».",
+        target_type="listing",
+        target_id=listing["listing_id"],
+    )
+    await db.notifications.update_one(
+        {"notification_id": notif["notification_id"]},
+        {"$set": {"search_id": search["search_id"], "match_count": 1}},
+    )
+
+
+async def match_new_listing(listing: dict) -> int:
+    """Alerte les recherches sauvegardées auxquelles correspond une nouvelle annonce.
+    Retourne le nombre de recherches notifiées."""
+    candidates = await db.saved_searches.find(
+        {"match_key": {"$in": listing_match_keys(listing)}, "user_id": {"$ne": listing["user_id"]}},
+        {"_id": 0},
+    ).to_list(None)
+    matched = [s for s in candidates if listing_matches(s["filters"], listing)]
+    now = datetime.now(timezone.utc).isoformat()
+    for search in matched:
+        try:
+            await _notify_match(search, listing)
+        except Exception as e:
+            logger.error(f"Alerte recherche {search['search_id']} échouée : {e}")
+            continue
+        await db.saved_searches.update_one(
+            {"search_id": search["search_id"]},
+            {"$inc": {"match_count": 1}, "$set": {"last_match_at": now}},
+        )
+    return len(matched)
@@ -0,0 +1,76 @@
+"""Jobs périodiques exécutés par un seul worker à la fois.
+
+Chaque worker lance `scheduled_loop` au démarrage, mais un passage n'est
+exécuté que par le worker qui réclame le bail de la période : un document par
+job dans `scheduled_jobs` {job, next_run_at, holder, started_at}, réclamé par un
+`find_one_and_update` atomique conditionné à `next_run_at <= maintenant`. Le
+gagnant repousse `next_run_at` d'un intervalle ; les autres échouent sur le
+filtre (ou sur l'index unique `job` pour une création concurrente) et
+réessaient au prochain sondage. La planification survit aux redémarrages.
+
+Un job peut sonder plus souvent que JOB_POLL_SECONDS (`poll_seconds`) et être
+réveillé localement (`wakeup`, ex. dès qu'une file est alimentée) : le passage
+reste soumis au bail, donc au plus un passage par `interval` tous workers
+confondus.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from ..database import db
+from ..utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+JOB_POLL_SECONDS = 300
+WORKER_ID = uuid.uuid4().hex
+
+
+async def claim_job_run(job: str, interval: timedelta) -> bool:
+    """Réclame le passage courant de `job`. Vrai si ce worker doit l'exécuter."""
+    now = utcnow()
+    try:
+        await db.scheduled_jobs.find_one_and_update(
+            {"job": job, "next_run_at": {"$lte": now}},
+            {"$set": {"next_run_at": now + interval, "holder": WORKER_ID, "started_at": now}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False  # document existant, passage pas encore dû (ou réclamé par un autre worker)
+    return True
+
+
+async def _wait(poll_seconds: float, wakeup: Optional[asyncio.Event]) -> None:
+    if wakeup is None:
+        await asyncio.sleep(poll_seconds)
+        return
+    try:
+        await asyncio.wait_for(wakeup.wait(), timeout=poll_seconds)
+        await asyncio.sleep(1)  # les réveils rapprochés partent dans le même passage
+    except asyncio.TimeoutError:
+        pass
+    wakeup.clear()
+
+
+async def scheduled_loop(
+    job: str,
+    interval: timedelta,
+    run: Callable[[], Awaitable[dict]],
+    poll_seconds: float = JOB_POLL_SECONDS,
+    wakeup: Optional[asyncio.Event] = None,
+) -> None:
+    """Tâche de fond : exécute `run` une fois par `interval`, tous workers confondus."""
+    # Ici plutôt qu'au démarrage : l'index unique doit exister avant la première réclamation
+    await db.scheduled_jobs.create_index("job", unique=True)
+    while True:
+        try:
+            if await claim_job_run(job, interval):
+                result = await run()
+                logger.info(f"Job {job} : {result}")
+        except Exception as e:
+            logger.error(f"Job {job} échoué : {e}")
+        await _wait(poll_seconds, wakeup)
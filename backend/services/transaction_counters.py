@@ -0,0 +1,130 @@
+"""Compteurs par utilisateur des badges transactions (messages non lus, actions en attente).
+
+Le frontend interroge les deux à chaque page : la lecture doit être une seule
+requête. Un document `user_counters` par utilisateur :
+  {user_id, unread: {transaction_id: n}, pending: [transaction_id, …]}
+maintenu à l'écriture :
+  - envoi de message           → `increment_unread` (destinataire)
+  - lecture des messages       → `sync_unread` (recompte la transaction
+    depuis le filigrane de lecture, cf. transaction_messages)
+  - toute écriture de transaction → `sync_pending_actions` (recalcule les
+    deux parties depuis le document à jour ; idempotent)
+
+Les règles « action en attente » sont décrites une fois (PENDING_ACTION_RULES)
+et servent à la fois au calcul en Python et au filtre Mongo `$or` de
+`rebuild_counters`, qui reconstruit le document en deux agrégations
+(utilisateur sans document, ou réparation).
+
+Chaque mise à jour publie les nouvelles valeurs (événement `counters`) sur le
+bus SSE, une fois le document reconstruit.
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from ..database import db
+from .event_bus import publish
+from .transaction_messages import unread_filter
+
+# (rôle qui doit agir, statut, drapeau encore à False, échange uniquement)
+PENDING_ACTION_RULES = (
+    ("seller", "awaiting_shipment", "seller_shipped", False),
+    ("buyer", "shipped", "buyer_received", False),
+    ("buyer", "delivered", "buyer_approved", False),
+    ("seller", "delivered", "seller_approved", True),
+    ("buyer", "awaiting_shipment", "buyer_shipped", True),
+)
+
+
+def pending_action_filter(user_id: str) -> dict:
+    """Transactions où `user_id` a une action à faire (filtre Mongo)."""
+    clauses = []
+    for role, status, flag, trade_only in PENDING_ACTION_RULES:
+        clause = {f"{role}_id": user_id, "status": status, flag: False}
+        if trade_only:
+            clause["transaction_type"] = "trade"
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+def pending_parties(txn: dict) -> set[str]:
+    """Parties de la transaction qui ont une action à faire."""
+    parties = set()
+    for role, status, flag, trade_only in PENDING_ACTION_RULES:
+        if trade_only and txn.get("transaction_type") != "trade":
+            continue
+        if txn.get("status") == status and txn.get(flag) is False:
+            parties.add(txn[f"{role}_id"])
+    return parties
+
+
+def counters_payload(doc: dict) -> dict:
+    """Valeurs des badges telles que renvoyées par les endpoints de comptage."""
+    by_transaction = {tid: n for tid, n in (doc.get("unread") or {}).items() if n > 0}
+    return {
+        "unread_total": sum(by_transaction.values()),
+        "unread_by_transaction": by_transaction,
+        "pending_count": len(doc.get("pending") or []),
+    }
+
+
+async def _update_counters(user_id: str, update: dict) -> None:
+    doc = await db.user_counters.find_one_and_update(
+        {"user_id": user_id}, update, upsert=True, return_document=ReturnDocument.AFTER,
+    )
+    # Document partiel tant qu'il n'a pas été reconstruit : rien à annoncer
+    if doc and "rebuilt_at" in doc:
+        await publish(user_id, "counters", counters_payload(doc))
+
+
+async def sync_pending_actions(txn: dict) -> None:
+    """Met à jour la liste `pending` des deux parties d'après l'état de la transaction."""
+    pending = pending_parties(txn)
+    txn_id = txn["transaction_id"]
+    for user_id in {txn["seller_id"], txn["buyer_id"]}:
+        op = "$addToSet" if user_id in pending else "$pull"
+        await _update_counters(user_id, {op: {"pending": txn_id}})
+
+
+async def increment_unread(user_id: str, transaction_id: str) -> None:
+    await _update_counters(user_id, {"$inc": {f"unread.{transaction_id}": 1}})
+
+
+async def sync_unread(user_id: str, transaction_id: str, last_read: Optional[str]) -> None:
+    """Recompte les messages non lus d'une transaction (après avancée du filigrane)."""
+    n = await db.transaction_messages.count_documents(
+        {"transaction_id": transaction_id, **unread_filter(user_id, last_read)}
+    )
+    update = {"$set": {f"unread.{transaction_id}": n}} if n else {"$unset": {f"unread.{transaction_id}": ""}}
+    await _update_counters(user_id, update)
+
+
+async def rebuild_counters(user_id: str) -> dict:
+    """Recalcule le document de compteurs depuis les transactions et messages."""
+    party = {"$or": [{"seller_id": user_id}, {"buyer_id": user_id}]}
+    txns = await db.transactions.find(party, {"_id": 0, "transaction_id": 1, "read_marks": 1}).to_list(None)
+    unread = {}
+    if txns:
+        per_txn = [
+            {"transaction_id": t["transaction_id"], **unread_filter(user_id, (t.get("read_marks") or {}).get(user_id))}
+            for t in txns
+        ]
+        rows = await db.transaction_messages.aggregate([
+            {"$match": {"$or": per_txn}},
+            {"$group": {"_id": "$transaction_id", "n": {"$sum": 1}}},
+        ]).to_list(None)
+        unread = {r["_id"]: r["n"] for r in rows}
+    pending = await db.transactions.distinct("transaction_id", pending_action_filter(user_id))
+
+    doc = {"unread": unread, "pending": pending, "rebuilt_at": datetime.now(timezone.utc).isoformat()}
+    await db.user_counters.update_one({"user_id": user_id}, {"$set": doc}, upsert=True)
+    return {"user_id": user_id, **doc}
+
+
+async def get_counters(user_id: str) -> dict:
+    """Compteurs de l'utilisateur (une lecture ; reconstruits au premier appel)."""
+    doc = await db.user_counters.find_one({"user_id": user_id}, {"_id": 0})
+    if doc is None or "rebuilt_at" not in doc:
+        doc = await rebuild_counters(user_id)
+    return doc
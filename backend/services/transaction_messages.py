@@ -0,0 +1,119 @@
+"""Historique paginé des messages d'une transaction et accusés de lecture.
+
+Ordre total (created_at, message_id), couvert par l'index
+(transaction_id, created_at, message_id). Une page se lit par keyset :
+  - sans paramètre : les MESSAGE_PAGE_SIZE derniers messages ;
+  - `before` (curseur) : messages plus anciens, pour remonter l'historique ;
+  - `after` (curseur) ou `since` (date ISO) : messages plus récents seulement,
+    pour le rafraîchissement incrémental d'une conversation ouverte.
+Les messages sont toujours renvoyés du plus ancien au plus récent.
+
+Lecture : un filigrane par utilisateur sur la transaction,
+`read_marks.{user_id}` = created_at du dernier message lu. Un message de l'autre
+partie est non lu s'il est postérieur au filigrane. Marquer comme lu est une
+seule écriture conditionnelle, quel que soit le nombre de messages.
+"""
+import base64
+import binascii
+import json
+from typing import Optional
+
+from ..database import db
+
+MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
+MESSAGE_SORT = [("created_at", 1), ("message_id", 1)]
+MESSAGE_INDEX = [("transaction_id", 1), *MESSAGE_SORT]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(message: dict) -> str:
+    raw = json.dumps([message["created_at"], message["message_id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        created_at, message_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor("Curseur illisible") from e
+    if not isinstance(created_at, str) or not isinstance(message_id, str):
+        raise InvalidCursor("Curseur illisible")
+    return created_at, message_id
+
+
+def _keyset(cursor: str, op: str) -> dict:
+    created_at, message_id = decode_cursor(cursor)
+    return {"$or": [
+        {"created_at": {op: created_at}},
+        {"created_at": created_at, "message_id": {op: message_id}},
+    ]}
+
+
+def unread_filter(user_id: str, last_read: Optional[str]) -> dict:
+    """Messages de l'autre partie postérieurs au filigrane (hors transaction_id)."""
+    query = {"sender_id": {"$ne": user_id}}
+    if last_read:
+        query["created_at"] = {"$gt": last_read}
+    return query
+
+
+async def list_message_page(
+    transaction_id: str,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    since: Optional[str] = None,
+    limit: int = MESSAGE_PAGE_SIZE,
+) -> dict:
+    """{messages, has_more, prev_cursor, next_cursor}.
+
+    `has_more` porte sur le sens demandé (plus anciens pour `before` et la
+    page par défaut, plus récents pour `after` / `since`)."""
+    limit = max(1, min(limit, MAX_MESSAGE_PAGE_SIZE))
+    query: dict = {"transaction_id": transaction_id}
+    forward = after is not None or since is not None
+    if before is not None:
+        query.update(_keyset(before, "$lt"))
+    elif after is not None:
+        query.update(_keyset(after, "$gt"))
+    elif since is not None:
+        query["created_at"] = {"$gt": since}
+
+    direction = 1 if forward else -1
+    rows = await db.transaction_messages.find(query, {"_id": 0}).sort(
+        [(field, direction) for field, _ in MESSAGE_SORT]
+    ).limit(limit + 1).to_list(limit + 1)
+    has_more = len(rows) > limit
+    messages = rows[:limit] if forward else rows[:limit][::-1]
+
+    return {
+        "messages": messages,
+        "has_more": has_more,
+        "prev_cursor": encode_cursor(messages[0]) if messages and has_more and not forward else None,
+        "next_cursor": encode_cursor(messages[-1]) if messages else after,
+    }
+
+
+async def latest_message_at(transaction_id: str) -> Optional[str]:
+    last = await db.transaction_messages.find_one(
+        {"transaction_id": transaction_id}, {"_id": 0, "created_at": 1}, sort=[("created_at", -1)],
+    )
+    return last["created_at"] if last else None
+
+
+async def mark_read(transaction_id: str, user_id: str, up_to: Optional[str]) -> Optional[str]:
+    """Avance le filigrane de lecture (jamais en arrière). Retourne le filigrane à jour."""
+    if not up_to:
+        return None
+    field = f"read_marks.{user_id}"
+    result = await db.transactions.update_one(
+        {"transaction_id": transaction_id, "$or": [{field: {"$lt": up_to}}, {field: {"$exists": False}}]},
+        {"$set": {field: up_to}},
+    )
+    if result.modified_count:
+        return up_to
+    txn = await db.transactions.find_one({"transaction_id": transaction_id}, {"_id": 0, "read_marks": 1})
+    return ((txn or {}).get("read_marks") or {}).get(user_id)
@@ -0,0 +1,167 @@
+"""Distribution des prix estimés par version — GET /api/versions/{id}/estimates.
+
+Collection `version_price_stats`, un document par version :
+  {
+    version_id, count, value_sum, value_min, value_max,
+    histogram: {<index de bucket>: nb d'items},
+    updated_at,
+  }
+
+Seuls les items avec une estimation > 0 sont comptés (même règle que
+`collection_summary.item_value`). L'histogramme est logarithmique : le bucket
+`i` couvre [HISTOGRAM_RATIO**i, HISTOGRAM_RATIO**(i+1)[, soit une erreur
+relative d'au plus ~2,5 % sur les quantiles p25/p50/p75, pour quelques
+dizaines de clés quelle que soit la popularité de la version.
+
+Maintenu de façon atomique ($inc / $min / $max) à l'ajout / modification /
+suppression d'un item ; un retrait qui touche un extrême déclenche un
+rebuild de la version, comme pour les résumés de collection.
+"""
+import math
+from datetime import datetime, timezone
+from typing import Iterable
+
+from pymongo import ReturnDocument
+
+from ..database import db
+from .collection_summary import item_value, price_value_expr
+
+
+HISTOGRAM_RATIO = 1.05
+QUANTILES = {"p25": 0.25, "p50": 0.50, "p75": 0.75}
+
+
+def bucket_index(value: float) -> int:
+    return math.floor(math.log(value) / math.log(HISTOGRAM_RATIO))
+
+
+def _delta_update(value: float, sign: int) -> dict:
+    update: dict = {
+        "$inc": {"count": sign, "value_sum": sign * value, f"histogram.{bucket_index(value)}": sign},
+        "$set": {"updated_at": datetime.now(timezone.utc).isoformat()},
+    }
+    if sign > 0:
+        update["$min"] = {"value_min": value}
+        update["$max"] = {"value_max": value}
+    return update
+
+
+async def apply_version_item_added(item: dict) -> None:
+    """Ajoute la valeur d'un item à la distribution de sa version."""
+    value = item_value(item)
+    if not item.get("version_id") or not value or value <= 0:
+        return
+    await db.version_price_stats.update_one(
+        {"version_id": item["version_id"]}, _delta_update(value, +1), upsert=True,
+    )
+
+
+async def apply_version_item_removed(item: dict) -> bool:
+    """Retire la valeur d'un item ; reconstruit si un extrême est touché.
+
+    À appeler APRÈS l'écriture dans `collections`. Retourne True en cas de rebuild.
+    """
+    version_id = item.get("version_id")
+    value = item_value(item)
+    if not version_id or not value or value <= 0:
+        return False
+    stats = await db.version_price_stats.find_one_and_update(
+        {"version_id": version_id}, _delta_update(value, -1), return_document=ReturnDocument.AFTER,
+    )
+    if stats is None or value in (stats.get("value_min"), stats.get("value_max")) or stats.get("count", 0) <= 0:
+        await rebuild_version_stats(version_id)
+        return True
+    return False
+
+
+async def apply_version_item_updated(old: dict, new: dict) -> None:
+    """Répercute un changement de valeur (ou de version) d'un item."""
+    if old.get("version_id") == new.get("version_id") and item_value(old) == item_value(new):
+        return
+    rebuilt = await apply_version_item_removed(old)
+    if rebuilt and old.get("version_id") == new.get("version_id"):
+        return  # le rebuild a déjà relu la nouvelle valeur
+    await apply_version_item_added(new)
+
+
+async def compute_version_stats(version_id: str) -> dict:
+    """Recalcule la distribution d'une version depuis `collections`."""
+    stats: dict = {"version_id": version_id, "count": 0, "value_sum": 0, "histogram": {}}
+    cursor = db.collections.find(
+        {"version_id": version_id},
+        {"_id": 0, "estimated_price": 1, "value_estimate": 1, "price_estimate": 1},
+    )
+    async for item in cursor:
+        value = item_value(item)
+        if not value or value <= 0:
+            continue
+        key = str(bucket_index(value))
+        stats["count"] += 1
+        stats["value_sum"] += value
+        stats["value_min"] = min(stats.get("value_min", value), value)
+        stats["value_max"] = max(stats.get("value_max", value), value)
+        stats["histogram"][key] = stats["histogram"].get(key, 0) + 1
+    stats["updated_at"] = datetime.now(timezone.utc).isoformat()
+    return stats
+
+
+async def rebuild_version_stats(version_id: str) -> dict:
+    stats = await compute_version_stats(version_id)
+    await db.version_price_stats.replace_one({"version_id": version_id}, stats, upsert=True)
+    return stats
+
+
+async def rebuild_versions_stats(version_ids: Iterable[str]) -> None:
+    for version_id in {v for v in version_ids if v}:
+        await rebuild_version_stats(version_id)
+
+
+async def get_version_stats(version_id: str) -> dict:
+    """Lecture du document de stats ; construit à la volée s'il n'existe pas encore."""
+    stats = await db.version_price_stats.find_one({"version_id": version_id}, {"_id": 0})
+    if stats is None:
+        stats = await rebuild_version_stats(version_id)
+        stats.pop("_id", None)
+    return stats
+
+
+def histogram_quantile(stats: dict, q: float) -> float:
+    """Quantile approché : centre géométrique du bucket contenant le rang visé."""
+    count = stats.get("count", 0)
+    if count <= 0:
+        return 0
+    rank = q * (count - 1)
+    seen = 0
+    for idx, n in sorted((int(k), n) for k, n in (stats.get("histogram") or {}).items() if n > 0):
+        seen += n
+        if seen > rank:
+            estimate = HISTOGRAM_RATIO ** (idx + 0.5)
+            return round(min(max(estimate, stats["value_min"]), stats["value_max"]), 2)
+    return round(stats["value_max"], 2)
+
+
+def format_version_estimates(stats: dict) -> dict:
+    """Réponse de GET /versions/{id}/estimates (résumé, sans la liste brute)."""
+    count = stats.get("count", 0)
+    if count <= 0:
+        return {"low": 0, "average": 0, "high": 0, "count": 0}
+    return {
+        "low": round(stats["value_min"], 2),
+        "average": round(stats["value_sum"] / count, 2),
+        "high": round(stats["value_max"], 2),
+        "count": count,
+        **{name: histogram_quantile(stats, q) for name, q in QUANTILES.items()},
+    }
+
+
+async def list_version_estimates(version_id: str, skip: int = 0, limit: int = 50) -> list[float]:
+    """Page de la liste triée des estimations d'une version (tri côté serveur)."""
+    pipeline = [
+        {"$match": {"version_id": version_id}},
+        {"$project": {"_id": 0, "value": price_value_expr()}},
+        {"$match": {"value": {"$gt": 0}}},
+        {"$sort": {"value": 1}},
+        {"$skip": skip},
+        {"$limit": limit},
+    ]
+    return [row["value"] async for row in db.collections.aggregate(pipeline)]
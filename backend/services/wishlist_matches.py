@@ -0,0 +1,83 @@
+"""Rapprochement wishlist ↔ marketplace.
+
+  - `wishlist_listing_matches` : annonces actives correspondant aux versions de
+    la wishlist d'un utilisateur, en une agrégation (`$lookup` sur
+    `listings.version_id`, moins chères d'abord, ses propres annonces exclues).
+  - `notify_wishlist_holders` : à la création d'une annonce, notifie tous les
+    utilisateurs qui ont cette version en wishlist. Lecture par l'index
+    `wishlists.version_id`, notifications insérées par lots de
+    WISHLIST_FANOUT_BATCH (`insert_many`).
+"""
+import logging
+
+from ..database import db
+from ..routers.notifications import build_notification
+from .event_bus import publish
+from .notification_inbox import increment_unread_many
+
+logger = logging.getLogger(__name__)
+
+WISHLIST_FANOUT_BATCH = 500
+
+
+async def wishlist_listing_matches(user_id: str) -> list[dict]:
+    """[{wishlist_id, version_id, listings: [...]}] pour les items qui ont au moins une annonce."""
+    return await db.wishlists.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$lookup": {"from": "listings", "localField": "version_id", "foreignField": "version_id", "as": "listing"}},
+        {"$unwind": "$listing"},
+        {"$match": {"listing.status": "active", "listing.user_id": {"$ne": user_id}}},
+        {"$sort": {"listing.asking_price": 1}},
+        {"$group": {
+            "_id": "$wishlist_id",
+            "version_id": {"$first": "$version_id"},
+            "added_at": {"$first": "$added_at"},
+            "listings": {"$push": "$listing"},
+        }},
+        {"$sort": {"added_at": -1}},
+        {"$project": {"_id": 0, "wishlist_id": "$_id", "version_id": 1, "listings": 1}},
+        {"$project": {"listings._id": 0, "listings.snapshot_stale": 0}},
+    ]).to_list(None)
+
+
+async def notify_wishlist_holders(listing: dict) -> int:
+    """Notifie les détenteurs de la version en wishlist. Retourne le nombre de notifications."""
+    version_id = listing.get("version_id")
+    if not version_id:
+        return 0
+    kit = listing.get("kit_snapshot") or {}
+    label = " ".join(v for v in (kit.get("club"), kit.get("season"), kit.get("kit_type")) if v) or "Un maillot de votre wishlist"
+    price = listing.get("asking_price")
+    message = f"{label} est en vente" + (f" à {price:g} €." if price else ".")
+
+    sent, batch = 0, []
+    holders = db.wishlists.find(
+        {"version_id": version_id, "user_id": {"$ne": listing["user_id"]}}, {"_id": 0, "user_id": 1}
+    )
+    async for holder in holders:
+        batch.append(build_notification(
+            user_id=holder["user_id"],
+            notif_type="wishlist_listing",
+            title="Maillot de votre wishlist en vente",
+            message=message,
+            target_type="listing",
+            target_id=listing["listing_id"],
+        ))
+        if len(batch) >= WISHLIST_FANOUT_BATCH:
+            sent += await _flush(batch)
+            batch = []
+    if batch:
+        sent += await _flush(batch)
+    return sent
+
+
+async def _flush(batch: list[dict]) -> int:
+    try:
+        result = await db.notifications.insert_many(batch, ordered=False)
+    except Exception as e:
+        logger.error(f"Notifications wishlist ({len(batch)}) échouées : {e}")
+        return 0
+    await increment_unread_many([doc["user_id"] for doc in batch])
+    for doc in batch:
+        await publish(doc["user_id"], "notification", doc)
+    return len(result.inserted_ids)
@@ -56,6 +56,44 @@ def safe_regex(value: str) -> str:
     return re.escape(value.strip())
 
 
+# ─── Dates ────────────────────────────────────────────────────────────────────
+# Les champs d'expiration (sessions, reset, vérification email) sont stockés en
+# dates BSON (index TTL) ; les documents plus anciens peuvent encore contenir
+# des chaînes ISO, d'où des lecteurs qui acceptent les deux.
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def as_utc_datetime(value) -> Optional[datetime]:
+    """datetime BSON (naïf = UTC côté pymongo) ou chaîne ISO → datetime aware UTC."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def is_expired(expires_at, now: Optional[datetime] = None) -> bool:
+    """Vrai si `expires_at` (date ou chaîne ISO) est passé ; absent = expiré."""
+    expires = as_utc_datetime(expires_at)
+    return expires is None or expires < (now or utcnow())
+
+
+async def ensure_ttl_index(collection, field: str = "expires_at") -> None:
+    """Index TTL (expiration à la date du champ) ; remplace un ancien index simple sur le même champ."""
+    from pymongo.errors import OperationFailure
+    try:
+        await collection.create_index(field, expireAfterSeconds=0)
+    except OperationFailure as e:
+        if e.code not in (85, 86):  # IndexOptionsConflict / IndexKeySpecsConflict
+            raise
+        await collection.drop_index(f"{field}_1")
+        await collection.create_index(field, expireAfterSeconds=0)
+
+
 # ─── Slug ─────────────────────────────────────────────────────────────────────
 def slugify(text: str) -> str:
     text = text.lower().strip()
@@ -110,21 +148,70 @@ async def get_or_create_team_by_name(name: str) -> str:
 
 
 # ─── Quota check ───────────────────────────────────────────────────────────────
-async def check_user_quota(db, user_id: str, sub_type: str) -> None:
+# Compteur glissant par (user, type) dans `submission_quotas` :
+#   {user_id, submission_type, hours: {"YYYYMMDDHH": nb}, expires_at}
+# Réservation = un find_one_and_update ($inc sur l'heure courante, post-image) :
+# deux soumissions concurrentes se voient mutuellement, aucune ne passe sous
+# la limite à tort. Les heures sorties de la fenêtre sont purgées au passage,
+# le document entier par TTL après QUOTA_WINDOW_HOURS d'inactivité.
+QUOTA_WINDOW_HOURS = 24
+
+
+def _quota_hour(moment: datetime) -> str:
+    return moment.strftime("%Y%m%d%H")
+
+
+async def check_user_quota(db, user_id: str, sub_type: str) -> Optional[str]:
+    """Réserve une soumission dans le quota 24h ; 429 si dépassé.
+
+    Retourne la clé d'heure réservée (à passer à `release_user_quota` si la
+    soumission n'est finalement pas créée), None si le type n'a pas de quota.
+    """
+    from pymongo import ReturnDocument
+
     limit = QUOTA_PER_TYPE.get(sub_type)
     if not limit:
-        return
-    since = (datetime.now(timezone.utc) - timedelta(hours=24)).isoformat()
-    count = await db.submissions.count_documents({
-        "submitted_by": user_id,
-        "submission_type": sub_type,
-        "created_at": {"$gte": since},
-    })
-    if count >= limit:
+        return None
+    now = utcnow()
+    hour = _quota_hour(now)
+    key = {"user_id": user_id, "submission_type": sub_type}
+    doc = await db.submission_quotas.find_one_and_update(
+        key,
+        {
+            "$inc": {f"hours.{hour}": 1},
+            "$set": {"expires_at": now + timedelta(hours=QUOTA_WINDOW_HOURS + 1)},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    oldest = _quota_hour(now - timedelta(hours=QUOTA_WINDOW_HOURS - 1))
+    hours = doc.get("hours", {})
+    used = sum(n for h, n in hours.items() if h >= oldest)
+    stale = [h for h in hours if h < oldest]
+
+    cleanup: dict = {}
+    if used > limit:
+        cleanup["$inc"] = {f"hours.{hour}": -1}
+    if stale:
+        cleanup["$unset"] = {f"hours.{h}": "" for h in stale}
+    if cleanup:
+        await db.submission_quotas.update_one(key, cleanup)
+    if used > limit:
         raise HTTPException(
             status_code=429,
             detail=f"Quota dépassé : max {limit} soumissions de type '{sub_type}' par 24h."
         )
+    return hour
+
+
+async def release_user_quota(db, user_id: str, sub_type: str, hour: Optional[str]) -> None:
+    """Rend une réservation de `check_user_quota` (soumission refusée après coup)."""
+    if not hour:
+        return
+    await db.submission_quotas.update_one(
+        {"user_id": user_id, "submission_type": sub_type, f"hours.{hour}": {"$gt": 0}},
+        {"$inc": {f"hours.{hour}": -1}},
+    )
 
 
 # ─── Estimation ──────────────────────────────────────────────────────────────────
@@ -225,6 +312,31 @@ def _player_note_to_profile(note: float) -> tuple[str, float]:
         return "none", 0.0
 
 
+# ─── VERSION DES GRILLES ────────────────────────────────────────────────────────
+# Empreinte des tables ci-dessus : stockée sur chaque item estimé et comparée
+# au boot pour relancer la ré-estimation des collections (services/reestimation).
+# Incrémenter ESTIMATION_FORMULA_REVISION si la FORMULE (code) change sans
+# toucher aux tables (ex. barème de `_player_note_to_profile`).
+ESTIMATION_FORMULA_REVISION = 1
+
+
+def _estimation_tables_version() -> str:
+    import hashlib
+    import json
+    payload = json.dumps([
+        ESTIMATION_FORMULA_REVISION,
+        ESTIMATION_BASE_PRICES, ESTIMATION_COMPETITION_COEFF, ESTIMATION_ORIGIN_COEFF,
+        ESTIMATION_STATE_COEFF, ESTIMATION_FLOCKING_COEFF, ESTIMATION_PATCH_COEFF,
+        ESTIMATION_SIGNED_TYPE_COEFF, ESTIMATION_SIGNED_PERSONAL_MESSAGE_COEFF,
+        ESTIMATION_SIGNED_PROOF_COEFF, ESTIMATION_RARITY_COEFF,
+        ESTIMATION_AGE_DELAY_YEARS, ESTIMATION_AGE_COEFF_PER_YEAR, ESTIMATION_AGE_MAX,
+    ], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+ESTIMATION_VERSION = _estimation_tables_version()
+
+
 def calculate_estimation(
     model_type: str,
     competition: str,
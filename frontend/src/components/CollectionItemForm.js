@@ -110,6 +110,7 @@ export function formToPayload(form, estimation) {
     rare_reason: form.is_rare && form.rare_reason ? form.rare_reason : undefined,
     notes: form.notes || undefined,
     estimated_price: estimation?.estimatedPrice ?? estimation?.estimated_price,
+    estimation_mode: estimation?.mode || undefined,
   };
 }
 
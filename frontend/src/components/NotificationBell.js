@@ -16,6 +16,9 @@ import { ScrollArea } from '@/components/ui/scroll-area';
 const NOTIF_ICONS = {
   submission_approved: '✅',
   submission_rejected: '❌',
+  submissions_moderated: '🗂️',
+  saved_search_match: '🔔',
+  wishlist_listing: '❤️',
   report_approved: '✅',
   report_rejected: '❌',
 };
@@ -32,7 +35,10 @@ function timeAgo(iso) {
 }
 
 export default function NotificationBell() {
-  const { notifications, unreadCount, loading, markAsRead, markAllRead, deleteNotification } = useNotifications();
+  const {
+    notifications, unreadCount, loading, markAsRead, markAllRead, deleteNotification,
+    hasMoreNotifications, loadMoreNotifications,
+  } = useNotifications();
   const [open, setOpen] = useState(false);
   const navigate = useNavigate();
 
@@ -44,6 +50,8 @@ export default function NotificationBell() {
       navigate('/contributions');
     } else if (notif.target_type === 'master_kit' && notif.target_id) {
       navigate(`/kit/${notif.target_id}`);
+    } else if (notif.target_type === 'listing' && notif.target_id) {
+      navigate(`/marketplace/${notif.target_id}`);
     }
     setOpen(false);
   };
@@ -158,6 +166,14 @@ export default function NotificationBell() {
                   </div>
                 </div>
               ))}
+              {hasMoreNotifications && (
+                <button
+                  onClick={loadMoreNotifications}
+                  className="w-full py-2 text-xs text-muted-foreground hover:text-foreground transition-colors"
+                >
+                  Voir les notifications plus anciennes
+                </button>
+              )}
             </div>
           )}
         </ScrollArea>
@@ -4,6 +4,7 @@ import { Button } from "@/components/ui/button";
 import { Textarea } from "@/components/ui/textarea";
 import { toast } from "sonner";
 import { getTransactionMessages, sendTransactionMessage, markMessagesRead } from "@/lib/api";
+import { useNotifications } from "@/contexts/NotificationContext";
 import { X, Send } from "lucide-react";
 
 function formatTime(isoStr) {
@@ -26,34 +27,98 @@ export default function TransactionMessaging({
 }) {
   const [messages, setMessages] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [loadingOlder, setLoadingOlder] = useState(false);
+  const [prevCursor, setPrevCursor] = useState(null);
   const [sending, setSending] = useState(false);
   const [input, setInput] = useState("");
   const bottomRef = useRef(null);
   const textareaRef = useRef(null);
+  const nextCursorRef = useRef(null);
+  const prependedRef = useRef(false);
+  const { streaming } = useNotifications();
+
+  // Ajoute en fin de liste sans doublon (réponse d'envoi, SSE et polling peuvent se croiser)
+  const appendMessages = (incoming) => {
+    if (!incoming.length) return;
+    setMessages((prev) => {
+      const known = new Set(prev.map((m) => m.message_id));
+      const fresh = incoming.filter((m) => !known.has(m.message_id));
+      return fresh.length ? [...prev, ...fresh] : prev;
+    });
+  };
 
   useEffect(() => {
     if (!open || !transactionId) return;
     let cancelled = false;
 
-    const fetchMessages = () => {
-      getTransactionMessages(transactionId)
-        .then((r) => { if (!cancelled) setMessages(r.data || []); })
-        .catch(() => {});
-    };
-
     setLoading(true);
+    setMessages([]);
+    setPrevCursor(null);
+    nextCursorRef.current = null;
     getTransactionMessages(transactionId)
-      .then((r) => { if (!cancelled) setMessages(r.data || []); })
+      .then((r) => {
+        if (cancelled) return;
+        setMessages(r.data.messages || []);
+        setPrevCursor(r.data.prev_cursor || null);
+        nextCursorRef.current = r.data.next_cursor || null;
+      })
       .catch(() => {})
       .finally(() => { if (!cancelled) setLoading(false); });
-    markMessagesRead(transactionId).catch(() => {});
+    return () => { cancelled = true; };
+  }, [open, transactionId]);
 
-    const interval = setInterval(fetchMessages, 5000);
+  // Sans flux SSE : rafraîchissement incrémental, seulement les messages après le dernier reçu
+  useEffect(() => {
+    if (!open || !transactionId || streaming) return;
+    let cancelled = false;
+    const fetchNewMessages = () => {
+      const params = nextCursorRef.current ? { after: nextCursorRef.current } : {};
+      getTransactionMessages(transactionId, params)
+        .then((r) => {
+          if (cancelled) return;
+          if (r.data.next_cursor) nextCursorRef.current = r.data.next_cursor;
+          appendMessages(r.data.messages || []);
+        })
+        .catch(() => {});
+    };
+    const interval = setInterval(fetchNewMessages, 5000);
     return () => { cancelled = true; clearInterval(interval); };
+  }, [open, transactionId, streaming]);
+
+  // Flux SSE actif : les nouveaux messages arrivent par l'événement `topkit:message`
+  useEffect(() => {
+    if (!open || !transactionId) return;
+    const onMessage = (e) => {
+      const msg = e.detail;
+      if (msg?.transaction_id !== transactionId) return;
+      appendMessages([msg]);
+      markMessagesRead(transactionId).catch(() => {});
+    };
+    window.addEventListener("topkit:message", onMessage);
+    return () => window.removeEventListener("topkit:message", onMessage);
   }, [open, transactionId]);
 
-  // Auto-scroll to bottom when messages change
+  const loadOlder = async () => {
+    if (!prevCursor || loadingOlder) return;
+    setLoadingOlder(true);
+    try {
+      const r = await getTransactionMessages(transactionId, { before: prevCursor });
+      prependedRef.current = true;
+      setMessages((prev) => [...(r.data.messages || []), ...prev]);
+      setPrevCursor(r.data.prev_cursor || null);
+    } catch {
+      toast.error("Impossible de charger les messages précédents");
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
+  // Auto-scroll to bottom when messages change (pas en remontant l'historique)
   useEffect(() => {
+    if (prependedRef.current) {
+      prependedRef.current = false;
+      return;
+    }
     if (bottomRef.current) {
       bottomRef.current.scrollIntoView({ behavior: "smooth" });
     }
@@ -65,7 +130,7 @@ export default function TransactionMessaging({
     setSending(true);
     try {
       const r = await sendTransactionMessage(transactionId, content);
-      setMessages((prev) => [...prev, r.data]);
+      appendMessages([r.data]);
       setInput("");
     } catch (e) {
       toast.error(e.response?.data?.detail || "Erreur lors de l'envoi");
@@ -125,7 +190,20 @@ export default function TransactionMessaging({
               </p>
             </div>
           ) : (
-            messages.map((msg) => {
+            <>
+            {prevCursor && (
+              <div className="flex justify-center">
+                <button
+                  onClick={loadOlder}
+                  disabled={loadingOlder}
+                  className="text-xs text-muted-foreground hover:text-foreground transition-colors"
+                  style={{ fontFamily: "DM Sans" }}
+                >
+                  {loadingOlder ? "Chargement…" : "Messages précédents"}
+                </button>
+              </div>
+            )}
+            {messages.map((msg) => {
               const isMine = msg.sender_id === currentUserId;
               return (
                 <div
@@ -154,7 +232,8 @@ export default function TransactionMessaging({
                   </div>
                 </div>
               );
-            })
+            })}
+            </>
           )}
           <div ref={bottomRef} />
         </div>
@@ -1,15 +1,27 @@
 // frontend/src/contexts/NotificationContext.js
 import React, { createContext, useContext, useState, useEffect, useCallback, useRef } from 'react';
 import { useAuth } from '@/contexts/AuthContext';
-import api from '@/lib/api';
+import api, { BACKEND_URL } from '@/lib/api';
 
 const NotificationContext = createContext(null);
 
+const POLL_INTERVAL = 30_000;
+const EMPTY_COUNTERS = { unread_total: 0, unread_by_transaction: {}, pending_count: 0 };
+
+// Événements `message` et `transaction` du flux SSE, relayés aux composants
+// (TransactionMessaging, MyCollection) via window : `topkit:message`, `topkit:transaction`
+function relay(type, data) {
+  window.dispatchEvent(new CustomEvent(`topkit:${type}`, { detail: data }));
+}
+
 export function NotificationProvider({ children }) {
   const { user } = useAuth();
   const [notifications, setNotifications] = useState([]);
   const [unreadCount, setUnreadCount] = useState(0);
   const [loading, setLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [transactionCounters, setTransactionCounters] = useState(EMPTY_COUNTERS);
+  const [streaming, setStreaming] = useState(false);
   const intervalRef = useRef(null);
 
   const fetchNotifications = useCallback(async () => {
@@ -19,6 +31,7 @@ export function NotificationProvider({ children }) {
       const res = await api.get('/notifications');
       setNotifications(res.data.notifications || []);
       setUnreadCount(res.data.unread_count || 0);
+      setNextCursor(res.data.next_cursor || null);
     } catch {
       // silencieux — pas critique
     } finally {
@@ -26,16 +39,79 @@ export function NotificationProvider({ children }) {
     }
   }, [user]);
 
-  // Polling toutes les 30 secondes quand l'utilisateur est connecté
+  // Page suivante (au-delà des 50 plus récentes)
+  const loadMoreNotifications = useCallback(async () => {
+    if (!user || !nextCursor) return;
+    try {
+      const res = await api.get('/notifications', { params: { cursor: nextCursor } });
+      setNotifications(prev => {
+        const known = new Set(prev.map(n => n.notification_id));
+        return [...prev, ...(res.data.notifications || []).filter(n => !known.has(n.notification_id))];
+      });
+      setNextCursor(res.data.next_cursor || null);
+    } catch { /* ignore */ }
+  }, [user, nextCursor]);
+
+  // Flux SSE /api/events ; repli sur un polling toutes les 30 secondes si le
+  // navigateur ne le supporte pas ou si la connexion échoue
   useEffect(() => {
     if (!user) {
       setNotifications([]);
       setUnreadCount(0);
+      setNextCursor(null);
+      setTransactionCounters(EMPTY_COUNTERS);
       return;
     }
     fetchNotifications();
-    intervalRef.current = setInterval(fetchNotifications, 30_000);
-    return () => clearInterval(intervalRef.current);
+
+    const startPolling = () => {
+      setStreaming(false);
+      if (!intervalRef.current) intervalRef.current = setInterval(fetchNotifications, POLL_INTERVAL);
+    };
+    const stopPolling = () => {
+      clearInterval(intervalRef.current);
+      intervalRef.current = null;
+    };
+
+    if (typeof window.EventSource === 'undefined') {
+      startPolling();
+      return stopPolling;
+    }
+
+    const source = new EventSource(`${BACKEND_URL}/api/events`, { withCredentials: true });
+    const on = (type, handler) => source.addEventListener(type, (e) => {
+      try { handler(JSON.parse(e.data)); } catch { /* ignore */ }
+    });
+
+    source.onopen = () => {
+      stopPolling();
+      setStreaming(true);
+      // Rattrape ce qui a pu être manqué pendant une coupure
+      fetchNotifications();
+    };
+    source.onerror = () => {
+      // EventSource se reconnecte seul tant qu'il n'est pas fermé (CONNECTING)
+      if (source.readyState === EventSource.CLOSED) startPolling();
+      else setStreaming(false);
+    };
+
+    on('notifications', (data) => setUnreadCount(data.unread_count || 0));
+    on('notification', (notif) => {
+      setNotifications(prev => [notif, ...prev.filter(n => n.notification_id !== notif.notification_id)]);
+      setUnreadCount(c => c + 1);
+    });
+    on('notification_updated', (notif) => {
+      setNotifications(prev => [notif, ...prev.filter(n => n.notification_id !== notif.notification_id)]);
+    });
+    on('counters', setTransactionCounters);
+    on('message', (msg) => relay('message', msg));
+    on('transaction', (txn) => relay('transaction', txn));
+
+    return () => {
+      source.close();
+      stopPolling();
+      setStreaming(false);
+    };
   }, [user, fetchNotifications]);
 
   const markAsRead = useCallback(async (notificationId) => {
@@ -72,7 +148,11 @@ export function NotificationProvider({ children }) {
       notifications,
       unreadCount,
       loading,
+      transactionCounters,
+      streaming,
       fetchNotifications,
+      hasMoreNotifications: Boolean(nextCursor),
+      loadMoreNotifications,
       markAsRead,
       markAllRead,
       deleteNotification,
@@ -154,6 +154,7 @@ export const getWishlist = () => api.get('/wishlist');
 export const addToWishlist = (data) => api.post('/wishlist', data);
 export const removeFromWishlist = (id) => api.delete(`/wishlist/${id}`);
 export const checkWishlist = (versionId) => api.get(`/wishlist/check/${versionId}`);
+export const getWishlistMatches = () => api.get('/wishlist/matches');
 
 // Autocomplete
 export const getAutocomplete = (field, q) => api.get('/autocomplete', { params: { field, q } });
@@ -206,6 +207,10 @@ export const estimatePrice = (data) => api.post('/estimate', data);
 // Marketplace
 export const getListings = (params) => api.get('/marketplace', { params });
 export const getMarketplaceFilters = () => api.get('/marketplace/filters');
+export const getMarketplaceFacets = (params) => api.get('/marketplace/facets', { params });
+export const getSavedSearches = () => api.get('/marketplace/saved-searches');
+export const createSavedSearch = (data) => api.post('/marketplace/saved-searches', data);
+export const deleteSavedSearch = (id) => api.delete(`/marketplace/saved-searches/${id}`);
 export const getListing = (id) => api.get(`/marketplace/${id}`);
 export const createListing = (data) => api.post('/marketplace', data);
 export const updateListing = (id, data) => api.put(`/marketplace/${id}`, data);
@@ -226,7 +231,8 @@ export const approveTransaction = (id) => api.post(`/transactions/${id}/approve`
 export const openDispute = (id, reason) => api.post(`/transactions/${id}/dispute`, { reason });
 
 // Transaction Messaging
-export const getTransactionMessages = (txnId) => api.get(`/transactions/${txnId}/messages`);
+// params : { before } (plus anciens) | { after } / { since } (nouveaux seulement), limit
+export const getTransactionMessages = (txnId, params = {}) => api.get(`/transactions/${txnId}/messages`, { params });
 export const sendTransactionMessage = (txnId, content) => api.post(`/transactions/${txnId}/messages`, { content });
 export const markMessagesRead = (txnId) => api.post(`/transactions/${txnId}/messages/read`);
 export const getUnreadMessagesCount = () => api.get('/transactions/unread-messages-count');
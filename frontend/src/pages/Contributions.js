@@ -98,7 +98,8 @@ export default function Contributions() {
 
   // ── computed ───────────────────────────────────────────────────────────────
   const isModerator = user?.role === 'moderator' || user?.role === 'admin';
-  const hasVoted = (item) => item.voters?.includes(user?.user_id);
+  // Soumissions : `has_voted` (votes migrés sans sens connu inclus) ; signalements : tableau `voters`
+  const hasVoted = (item) => item.has_voted ?? Boolean(item.voters?.includes(user?.user_id));
 
   // categorise pending submissions
   const kitSubs = submissions.filter(s =>
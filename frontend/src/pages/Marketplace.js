@@ -1,5 +1,7 @@
-import { useState, useEffect, useCallback } from "react";
-import { getListings, getMarketplaceFilters } from "@/lib/api";
+import { useState, useEffect, useCallback, useMemo } from "react";
+import { getListings, getMarketplaceFacets, createSavedSearch } from "@/lib/api";
+import { useAuth } from "@/contexts/AuthContext";
+import { useToast } from "@/hooks/use-toast";
 import ListingCard from "@/components/ListingCard";
 import { Input } from "@/components/ui/input";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
@@ -8,18 +10,32 @@ import { Badge } from "@/components/ui/badge";
 import { Sheet, SheetContent, SheetHeader, SheetTitle, SheetTrigger } from "@/components/ui/sheet";
 import { Switch } from "@/components/ui/switch";
 import { Label } from "@/components/ui/label";
-import { Loader2, ShoppingBag, SlidersHorizontal, LayoutGrid, List, Search, X } from "lucide-react";
+import { Loader2, ShoppingBag, SlidersHorizontal, LayoutGrid, List, Search, X, BellPlus } from "lucide-react";
 import Pagination from "@/components/Pagination";
 
 const LIMIT = 48;
 const EMPTY = "__all__";
 
 const GENDER_LABELS = { man: "Men", woman: "Women", youth: "Youth" };
+const SORT_OPTIONS = [
+  { value: "newest",      label: "Plus récentes" },
+  { value: "price_asc",   label: "Prix croissant" },
+  { value: "price_desc",  label: "Prix décroissant" },
+  { value: "best_seller", label: "Meilleurs vendeurs" },
+];
 const PHYSICAL_STATES = ["New with tag", "Very good", "Used", "Damaged", "Needs restoration"];
 
 const FLOCKING_LABELS = { Official: "Officiel", Personalized: "Personnalisé", none: "Non flocqué" };
 
-function FiltersPanel({ filters, state, setState, activeFilterCount, clearFilters }) {
+// Facette {value, count}[] → valeurs + comptes (la valeur sélectionnée reste proposée)
+const facetOptions = (buckets = [], selected = "", fallback = []) => {
+  const counts = Object.fromEntries(buckets.map(b => [b.value, b.count]));
+  const options = buckets.length ? buckets.map(b => b.value) : [...fallback];
+  if (selected && !options.includes(selected)) options.push(selected);
+  return { options, counts };
+};
+
+function FiltersPanel({ facets, state, setState, activeFilterCount, clearFilters }) {
   const { search, setSearch, teamType, setTeamType, listingType, setListingType,
     minPrice, setMinPrice, maxPrice, setMaxPrice,
     club, setClub, brand, setBrand, season, setSeason,
@@ -28,16 +44,16 @@ function FiltersPanel({ filters, state, setState, activeFilterCount, clearFilter
     flockingOrigin, setFlockingOrigin, size, setSize } = state;
 
   const selectFilters = [
-    { label: "Club",     value: club,          set: setClub,          options: filters.clubs            ?? [] },
-    { label: "Brand",    value: brand,          set: setBrand,         options: filters.brands           ?? [] },
-    { label: "Season",   value: season,         set: setSeason,        options: filters.seasons          ?? [] },
-    { label: "Kit type", value: kitType,        set: setKitType,       options: filters.kit_types        ?? [] },
-    { label: "League",   value: league,         set: setLeague,        options: filters.leagues          ?? [] },
-    { label: "Gender",   value: gender,         set: setGender,        options: filters.genders          ?? [], labelMap: GENDER_LABELS },
-    { label: "Taille",   value: size,           set: setSize,          options: filters.sizes            ?? [] },
-    { label: "État",     value: physicalState,  set: setPhysicalState, options: PHYSICAL_STATES },
+    { label: "Club",     value: club,          set: setClub,          ...facetOptions(facets.clubs, club) },
+    { label: "Brand",    value: brand,          set: setBrand,         ...facetOptions(facets.brands, brand) },
+    { label: "Season",   value: season,         set: setSeason,        ...facetOptions(facets.seasons, season) },
+    { label: "Kit type", value: kitType,        set: setKitType,       ...facetOptions(facets.kit_types, kitType) },
+    { label: "League",   value: league,         set: setLeague,        ...facetOptions(facets.leagues, league) },
+    { label: "Gender",   value: gender,         set: setGender,        ...facetOptions(facets.genders, gender), labelMap: GENDER_LABELS },
+    { label: "Taille",   value: size,           set: setSize,          ...facetOptions(facets.sizes, size) },
+    { label: "État",     value: physicalState,  set: setPhysicalState, ...facetOptions(facets.physical_states, physicalState, PHYSICAL_STATES) },
     { label: "Flocage",  value: flockingOrigin, set: setFlockingOrigin,
-      options: [...(filters.flocking_origins ?? []), "none"], labelMap: FLOCKING_LABELS },
+      ...facetOptions(facets.flocking_origins, flockingOrigin), labelMap: FLOCKING_LABELS },
   ];
 
   return (
@@ -95,7 +111,7 @@ function FiltersPanel({ filters, state, setState, activeFilterCount, clearFilter
       </div>
 
       {/* Dynamic selects */}
-      {selectFilters.map(({ label, value, set, options, labelMap }) => (
+      {selectFilters.map(({ label, value, set, options, counts, labelMap }) => (
         <div key={label} className="space-y-1.5">
           <label className="text-xs font-medium text-muted-foreground uppercase tracking-wide">{label}</label>
           <Select value={value || EMPTY} onValueChange={v => set(v === EMPTY ? "" : v)}>
@@ -105,7 +121,10 @@ function FiltersPanel({ filters, state, setState, activeFilterCount, clearFilter
             <SelectContent>
               <SelectItem value={EMPTY}>Tous</SelectItem>
               {options.map(o => (
-                <SelectItem key={o} value={o}>{labelMap ? (labelMap[o] ?? o) : o}</SelectItem>
+                <SelectItem key={o} value={o}>
+                  {labelMap ? (labelMap[o] ?? o) : o}
+                  {counts[o] !== undefined && <span className="text-muted-foreground"> ({counts[o]})</span>}
+                </SelectItem>
               ))}
             </SelectContent>
           </Select>
@@ -136,7 +155,10 @@ export default function Marketplace() {
   const [skip, setSkip] = useState(0);
   const [loading, setLoading] = useState(true);
   const [viewMode, setViewMode] = useState("grid");
-  const [filters, setFilters] = useState({ clubs: [], brands: [], seasons: [], kit_types: [], leagues: [], genders: [] });
+  const [sort, setSort] = useState("newest");
+  const { user } = useAuth();
+  const { toast } = useToast();
+  const [facets, setFacets] = useState({});
 
   const [listingType, setListingType] = useState("all");
   const [teamType,    setTeamType]    = useState("");
@@ -168,32 +190,37 @@ export default function Marketplace() {
     setGender(""); setPhysicalState(""); setSigned(null); setFlockingOrigin(""); setSize("");
   };
 
+  const filterParams = useMemo(() => {
+    const params = {};
+    if (listingType && listingType !== "all") params.listing_type = listingType;
+    if (teamType)      params.team_type      = teamType;
+    if (search)        params.search         = search;
+    if (minPrice)      params.min_price      = parseFloat(minPrice);
+    if (maxPrice)      params.max_price      = parseFloat(maxPrice);
+    if (club)          params.club           = club;
+    if (brand)         params.brand          = brand;
+    if (season)        params.season         = season;
+    if (kitType)       params.kit_type       = kitType;
+    if (league)        params.league         = league;
+    if (gender)        params.gender         = gender;
+    if (physicalState)    params.physical_state  = physicalState;
+    if (signed === true)  params.signed          = true;
+    if (flockingOrigin)   params.flocking_origin = flockingOrigin;
+    if (size)             params.size            = size;
+    return params;
+  }, [listingType, teamType, search, minPrice, maxPrice, club, brand, season, kitType, league, gender, physicalState, signed, flockingOrigin, size]);
+
+  // Comptes par facette pour les filtres courants (mis en cache côté serveur)
   useEffect(() => {
-    getMarketplaceFilters()
-      .then(r => setFilters(r.data))
+    getMarketplaceFacets(filterParams)
+      .then(r => setFacets(r.data.facets))
       .catch(() => {});
-  }, []);
+  }, [filterParams]);
 
   const fetchListings = useCallback(async (currentSkip = 0) => {
     setLoading(true);
     try {
-      const params = { skip: currentSkip, limit: LIMIT };
-      if (listingType && listingType !== "all") params.listing_type = listingType;
-      if (teamType)      params.team_type      = teamType;
-      if (search)        params.search         = search;
-      if (minPrice)      params.min_price      = parseFloat(minPrice);
-      if (maxPrice)      params.max_price      = parseFloat(maxPrice);
-      if (club)          params.club           = club;
-      if (brand)         params.brand          = brand;
-      if (season)        params.season         = season;
-      if (kitType)       params.kit_type       = kitType;
-      if (league)        params.league         = league;
-      if (gender)        params.gender         = gender;
-      if (physicalState)    params.physical_state  = physicalState;
-      if (signed === true)  params.signed          = true;
-      if (flockingOrigin)   params.flocking_origin = flockingOrigin;
-      if (size)             params.size            = size;
-      const res = await getListings(params);
+      const res = await getListings({ ...filterParams, sort, skip: currentSkip, limit: LIMIT });
       setListings(res.data.results);
       setTotal(res.data.total);
     } catch {
@@ -201,13 +228,24 @@ export default function Marketplace() {
     } finally {
       setLoading(false);
     }
-  }, [listingType, teamType, search, minPrice, maxPrice, club, brand, season, kitType, league, gender, physicalState, signed, flockingOrigin, size]);
+  }, [filterParams, sort]);
 
   useEffect(() => {
     setSkip(0);
     fetchListings(0);
   }, [fetchListings]);
 
+  // Alerte sur les nouvelles annonces correspondant aux filtres courants
+  const saveSearch = async () => {
+    const name = [club, brand, season, search].filter(Boolean).join(" · ") || "Ma recherche";
+    try {
+      await createSavedSearch({ ...filterParams, name });
+      toast({ title: "Recherche sauvegardée", description: "Vous serez notifié des nouvelles annonces." });
+    } catch (e) {
+      toast({ title: "Erreur", description: e.response?.data?.detail || "Impossible de sauvegarder la recherche", variant: "destructive" });
+    }
+  };
+
   const handlePage = (newSkip) => {
     setSkip(newSkip);
     fetchListings(newSkip);
@@ -244,7 +282,7 @@ export default function Marketplace() {
 
         {/* Sidebar desktop */}
         <aside className="hidden lg:block w-56 shrink-0">
-          <FiltersPanel filters={filters} state={filterState} activeFilterCount={activeFilterCount} clearFilters={clearFilters} />
+          <FiltersPanel facets={facets} state={filterState} activeFilterCount={activeFilterCount} clearFilters={clearFilters} />
         </aside>
 
         <div className="flex-1 min-w-0 space-y-5">
@@ -272,11 +310,25 @@ export default function Marketplace() {
                 <SheetContent side="left" className="w-72">
                   <SheetHeader><SheetTitle>Filtres</SheetTitle></SheetHeader>
                   <div className="mt-4">
-                    <FiltersPanel filters={filters} state={filterState} activeFilterCount={activeFilterCount} clearFilters={clearFilters} />
+                    <FiltersPanel facets={facets} state={filterState} activeFilterCount={activeFilterCount} clearFilters={clearFilters} />
                   </div>
                 </SheetContent>
               </Sheet>
 
+              {user && activeFilterCount > 0 && (
+                <Button variant="outline" size="sm" onClick={saveSearch}>
+                  <BellPlus className="w-4 h-4 mr-2" /> Alerte
+                </Button>
+              )}
+
+              {/* Tri */}
+              <Select value={sort} onValueChange={setSort}>
+                <SelectTrigger className="w-44 h-9"><SelectValue /></SelectTrigger>
+                <SelectContent>
+                  {SORT_OPTIONS.map(o => <SelectItem key={o.value} value={o.value}>{o.label}</SelectItem>)}
+                </SelectContent>
+              </Select>
+
               {/* View toggle */}
               <div className="flex items-center gap-1 border rounded-lg p-1">
                 <button onClick={() => setViewMode("grid")} className={`p-1.5 rounded transition-colors ${viewMode === "grid" ? "bg-muted" : "hover:bg-muted"}`}>
@@ -32,6 +32,7 @@ import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogFooter } from '
 import { Label } from '@/components/ui/label';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { useAuth } from '@/contexts/AuthContext';
+import { useNotifications } from '@/contexts/NotificationContext';
 import { Button } from '@/components/ui/button';
 import { Badge } from '@/components/ui/badge';
 import { Input } from '@/components/ui/input';
@@ -113,6 +114,7 @@ export default function MyCollection() {
   const [unreadCounts,   setUnreadCounts]   = useState({});
   const [messagingOpen,  setMessagingOpen]  = useState(false);
   const [messagingTxn,   setMessagingTxn]   = useState(null);
+  const { transactionCounters, streaming } = useNotifications();
 
   // reviews
   const [reviewTxn,      setReviewTxn]      = useState(null);
@@ -174,6 +176,20 @@ export default function MyCollection() {
     getMyReviewedTransactions().then(r => setReviewedTxnIds(new Set(r.data?.transaction_ids || []))).catch(() => {});
   }, [fetchCollection, fetchLists]);
 
+  // Flux SSE : badges de messages et statuts de transaction tenus à jour en direct
+  useEffect(() => {
+    if (streaming) setUnreadCounts(transactionCounters.unread_by_transaction || {});
+  }, [streaming, transactionCounters]);
+
+  useEffect(() => {
+    // Les cartes dépendent des drapeaux d'étape (expédié, reçu…) : rechargement de la liste
+    const onTransaction = () => {
+      getMyTransactions().then(r => setTransactions(r.data || [])).catch(() => {});
+    };
+    window.addEventListener('topkit:transaction', onTransaction);
+    return () => window.removeEventListener('topkit:transaction', onTransaction);
+  }, []);
+
   // ─── listes handlers ──────────────────────────────────────────────────────
   const handleCreateList = async () => {
     if (!newListName.trim()) return;
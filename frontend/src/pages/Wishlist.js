@@ -1,17 +1,35 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { getWishlist, removeFromWishlist, proxyImageUrl } from '@/lib/api';
+import { getWishlist, getWishlistMatches, removeFromWishlist, proxyImageUrl } from '@/lib/api';
 import { useAuth } from '@/contexts/AuthContext';
 import { Button } from '@/components/ui/button';
 import { Badge } from '@/components/ui/badge';
 import { toast } from 'sonner';
-import { Heart, Trash2, FolderPlus, LayoutGrid, List, Shirt } from 'lucide-react';
+import { Heart, Trash2, FolderPlus, LayoutGrid, List, Shirt, ShoppingBag } from 'lucide-react';
+
+// Annonces actives pour un item de la wishlist (la moins chère en premier)
+function ForSaleLink({ listings }) {
+  if (!listings?.length) return null;
+  const cheapest = listings.find(l => l.asking_price) || listings[0];
+  return (
+    <Link
+      to={`/marketplace/${cheapest.listing_id}`}
+      onClick={(e) => e.stopPropagation()}
+      className="inline-flex items-center gap-1 text-[10px] font-semibold text-primary hover:underline"
+      style={{ fontFamily: 'DM Sans', textTransform: 'none' }}
+    >
+      <ShoppingBag className="w-3 h-3" />
+      {listings.length} en vente{cheapest.asking_price ? ` dès ${cheapest.asking_price} €` : ''}
+    </Link>
+  );
+}
 
 export default function Wishlist() {
   const { user } = useAuth();
   const [items, setItems] = useState([]);
   const [loading, setLoading] = useState(true);
   const [viewMode, setViewMode] = useState('grid');
+  const [matches, setMatches] = useState({});
 
   const fetchWishlist = async () => {
     setLoading(true);
@@ -21,6 +39,9 @@ export default function Wishlist() {
     } catch { /* ignore */ } finally {
       setLoading(false);
     }
+    getWishlistMatches()
+      .then(r => setMatches(Object.fromEntries(r.data.map(m => [m.wishlist_id, m.listings]))))
+      .catch(() => {});
   };
 
   useEffect(() => { fetchWishlist(); }, []);
@@ -108,6 +129,7 @@ export default function Wishlist() {
                     )}
                   </div>
                 </Link>
+                <div className="px-3 pb-3 -mt-2 empty:hidden"><ForSaleLink listings={matches[item.wishlist_id]} /></div>
                 <div className="absolute top-2 left-2 flex gap-1 opacity-0 group-hover:opacity-100" style={{ transition: 'opacity 0.2s ease' }}>
                   <button onClick={(e) => { e.preventDefault(); e.stopPropagation(); handleRemove(item.wishlist_id); }} className="p-1.5 bg-destructive/90 text-destructive-foreground" data-testid={`remove-wishlist-${item.wishlist_id}`}>
                     <Trash2 className="w-3 h-3" />
@@ -134,6 +156,7 @@ export default function Wishlist() {
                     {item.notes && <p className="text-[10px] text-muted-foreground mt-0.5 truncate" style={{ fontFamily: 'DM Sans', textTransform: 'none' }}>{item.notes}</p>}
                   </div>
                 </Link>
+                <ForSaleLink listings={matches[item.wishlist_id]} />
                 <Badge variant="outline" className="rounded-none text-[10px] shrink-0">{item.version?.model}</Badge>
                 <Heart className="w-4 h-4 text-red-500 fill-red-500 shrink-0" />
                 <div className="flex gap-1 opacity-0 group-hover:opacity-100 shrink-0" style={{ transition: 'opacity 0.2s ease' }}>
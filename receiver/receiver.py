@@ -1,15 +1,34 @@
 from fastapi import FastAPI, UploadFile, File, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from contextlib import contextmanager
 from pathlib import Path
+from typing import List, Optional
 import aiofiles
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
 import uuid
 import os
 
 app = FastAPI()
 
-MEDIA_ROOT = Path("/mnt/Freebox-1/TP_media")
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", "/mnt/Freebox-1/TP_media"))
 BASE_URL = os.getenv("MEDIA_BASE_URL", "https://82.67.103.45")
 SECRET = os.getenv("RECEIVER_SECRET", "changeme")
 
+# Index local des fichiers stockés (chemin, dossier, taille, sha256, date) —
+# source de GET /inventory et de la déduplication par contenu. `created_at` est
+# la date du dernier stockage OU du dernier service par déduplication : un
+# fichier ancien redonné à un nouvel upload repart pour la période de grâce
+# du balayage des orphelins côté backend.
+INDEX_DB = Path(os.getenv("RECEIVER_INDEX_DB", str(MEDIA_ROOT / ".receiver_index.sqlite3")))
+
+# Taille max d'un lot pour DELETE /delete-files
+DELETE_BATCH_MAX = 500
+
 # Types MIME acceptés — on inclut octet-stream comme fallback générique
 ALLOWED_MIME = {
     "image/jpeg",
@@ -36,6 +55,87 @@ FOLDERS = {
 }
 
 
+# ─── Index SQLite ─────────────────────────────────────────────────────────────
+
+@contextmanager
+def _index():
+    conn = sqlite3.connect(INDEX_DB, timeout=10)
+    try:
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _init_index() -> None:
+    INDEX_DB.parent.mkdir(parents=True, exist_ok=True)
+    with _index() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                relative_path TEXT PRIMARY KEY,
+                folder        TEXT NOT NULL,
+                size          INTEGER NOT NULL,
+                sha256        TEXT NOT NULL,
+                created_at    REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256, folder)")
+
+
+def _index_add(relative: str, folder: str, size: int, sha256: str, created_at: float) -> None:
+    with _index() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO files (relative_path, folder, size, sha256, created_at) VALUES (?, ?, ?, ?, ?)",
+            (relative, folder, size, sha256, created_at),
+        )
+
+
+def _index_remove(relative_paths: list[str]) -> None:
+    with _index() as conn:
+        conn.executemany("DELETE FROM files WHERE relative_path = ?", [(p,) for p in relative_paths])
+
+
+def _find_duplicate(sha256: str, folder: str) -> Optional[str]:
+    """Fichier déjà stocké avec le même contenu dans le même dossier (et toujours présent).
+    Sa date d'index est remise à maintenant : il vient d'être servi à un nouvel upload."""
+    with _index() as conn:
+        rows = conn.execute(
+            "SELECT relative_path FROM files WHERE sha256 = ? AND folder = ?", (sha256, folder)
+        ).fetchall()
+    for (relative,) in rows:
+        if (MEDIA_ROOT / relative).is_file():
+            with _index() as conn:
+                conn.execute("UPDATE files SET created_at = ? WHERE relative_path = ?", (time.time(), relative))
+            return relative
+        _index_remove([relative])
+    return None
+
+
+def _backfill_index() -> int:
+    """Indexe les fichiers présents sur disque mais absents de l'index (stock antérieur)."""
+    with _index() as conn:
+        known = {row[0] for row in conn.execute("SELECT relative_path FROM files")}
+    added = 0
+    for folder, directory in FOLDERS.items():
+        if not directory.is_dir():
+            continue
+        for path in directory.rglob("*"):
+            relative = str(path.relative_to(MEDIA_ROOT))
+            if relative in known or not path.is_file():
+                continue
+            stat = path.stat()
+            _index_add(relative, folder, stat.st_size, hashlib.sha256(path.read_bytes()).hexdigest(), stat.st_mtime)
+            added += 1
+    return added
+
+
+@app.on_event("startup")
+async def startup():
+    _init_index()
+    asyncio.create_task(asyncio.to_thread(_backfill_index))
+
+
 @app.post("/receive-upload")
 async def receive_upload(
     file: UploadFile = File(...),
@@ -50,9 +150,24 @@ async def receive_upload(
     if file.content_type not in ALLOWED_MIME:
         raise HTTPException(status_code=400, detail=f"Type non autorisé: {file.content_type}")
 
-    dest = FOLDERS.get(folder, MEDIA_ROOT / "kits" / "masters")
+    # Dossier inconnu (ex: "listing") : stocké avec les master kits, comme avant
+    folder_key = folder if folder in FOLDERS else "master_kit"
+    dest = FOLDERS[folder_key]
     dest.mkdir(parents=True, exist_ok=True)
 
+    contents = await file.read()
+    sha256 = hashlib.sha256(contents).hexdigest()
+
+    # Contenu identique déjà stocké dans ce dossier : on partage le fichier
+    existing = _find_duplicate(sha256, folder_key)
+    if existing:
+        return {
+            "filename": Path(existing).name,
+            "relative_path": existing,
+            "url": f"{BASE_URL}/{existing}",
+            "deduplicated": True,
+        }
+
     ext = Path(file.filename).suffix.lower() or ".jpg"
     uid = uuid.uuid4().hex[:12]
 
@@ -67,19 +182,28 @@ async def receive_upload(
 
     filepath = dest / filename
 
-    contents = await file.read()
     async with aiofiles.open(filepath, "wb") as f:
         await f.write(contents)
 
     relative = str(filepath.relative_to(MEDIA_ROOT))
+    _index_add(relative, folder_key, len(contents), sha256, time.time())
     public_url = f"{BASE_URL}/{relative}"
     return {
         "filename": filename,
         "relative_path": relative,
         "url": public_url,
+        "deduplicated": False,
     }
 
 
+def _resolve_media_path(relative_path: str) -> Optional[Path]:
+    """Chemin absolu sous MEDIA_ROOT, ou None si le chemin en sort."""
+    filepath = (MEDIA_ROOT / relative_path).resolve()
+    if not filepath.is_relative_to(MEDIA_ROOT.resolve()) or filepath == MEDIA_ROOT.resolve():
+        return None
+    return filepath
+
+
 @app.delete("/delete-file")
 async def delete_file(
     relative_path: str = Query(...),
@@ -88,12 +212,66 @@ async def delete_file(
     if x_secret != SECRET:
         raise HTTPException(status_code=403, detail="Forbidden")
 
-    filepath = MEDIA_ROOT / relative_path
-    if not filepath.exists():
-        raise HTTPException(status_code=404, detail="Fichier introuvable")
-
-    if not filepath.resolve().is_relative_to(MEDIA_ROOT.resolve()):
+    filepath = _resolve_media_path(relative_path)
+    if filepath is None:
         raise HTTPException(status_code=400, detail="Chemin invalide")
+    if not filepath.is_file():
+        raise HTTPException(status_code=404, detail="Fichier introuvable")
 
     filepath.unlink()
+    _index_remove([relative_path])
     return {"deleted": relative_path}
+
+
+class DeleteFilesRequest(BaseModel):
+    relative_paths: List[str]
+
+
+@app.delete("/delete-files")
+async def delete_files(body: DeleteFilesRequest, x_secret: str = Header(...)):
+    """Suppression par lot : un appel pour toutes les images d'un kit et de ses versions.
+    Un fichier déjà absent est compté dans `missing` (pas d'erreur : l'appel est rejouable)."""
+    if x_secret != SECRET:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if len(body.relative_paths) > DELETE_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Maximum {DELETE_BATCH_MAX} fichiers par lot")
+
+    result = {"deleted": [], "missing": [], "invalid": []}
+    for relative_path in dict.fromkeys(body.relative_paths):
+        filepath = _resolve_media_path(relative_path)
+        if filepath is None:
+            result["invalid"].append(relative_path)
+        elif not filepath.is_file():
+            result["missing"].append(relative_path)
+        else:
+            filepath.unlink()
+            result["deleted"].append(relative_path)
+    _index_remove(result["deleted"] + result["missing"])
+    return result
+
+
+@app.get("/inventory")
+async def inventory(
+    older_than: int = Query(0, ge=0),   # secondes depuis le stockage
+    x_secret: str = Header(...)
+):
+    """Contenu de l'index en NDJSON (une ligne JSON par fichier) — utilisé par la
+    réconciliation côté backend."""
+    if x_secret != SECRET:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    cutoff = time.time() - older_than
+
+    def _rows():
+        with _index() as conn:
+            cursor = conn.execute(
+                "SELECT relative_path, folder, size, sha256, created_at FROM files WHERE created_at <= ? ORDER BY relative_path",
+                (cutoff,),
+            )
+            for relative, folder, size, sha256, created_at in cursor:
+                yield json.dumps({
+                    "relative_path": relative, "folder": folder, "size": size,
+                    "sha256": sha256, "created_at": created_at,
+                }) + "\n"
+
+    return StreamingResponse(_rows(), media_type="application/x-ndjson")
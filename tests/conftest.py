@@ -57,7 +57,7 @@ async def mock_db(monkeypatch):
     # Les routers font `from ..database import db` (référence directe).
     # Donc on doit aussi patcher la référence locale dans chaque router déjà importé.
     for mod_name in list(sys.modules):
-        if mod_name.startswith("backend.routers.") or mod_name in (
+        if mod_name.startswith(("backend.routers.", "backend.services.")) or mod_name in (
             "backend.auth", "backend.utils", "backend.middleware",
             "backend.image_mirror",
         ):
@@ -86,6 +86,16 @@ def _reset_rate_limit():
     yield
 
 
+# ─── Reset cache des facettes marketplace entre tests ───────────────────────
+@pytest.fixture(autouse=True)
+def _reset_facet_cache():
+    """Le cache des facettes est en mémoire process : sans reset, un test verrait
+    les comptes d'une base mongomock précédente."""
+    from backend.services.marketplace_facets import clear_facet_cache
+    clear_facet_cache()
+    yield
+
+
 # ─── App FastAPI lifecyclée ─────────────────────────────────────────────────
 @pytest_asyncio.fixture
 async def app(mock_db):
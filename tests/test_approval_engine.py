@@ -0,0 +1,381 @@
+"""
+Tests du moteur d'approbation des soumissions (backend/services/approval_engine.py).
+
+Couvre :
+  - Création de master kit + entité liée : FK patchée, version par défaut, statuts
+  - Idempotence : rejouer une approbation (retry après échec) ne duplique rien
+  - Claim abandonné (worker mort en `approving`) : repris une fois périmé ;
+    l'ancien détenteur ne finalise pas et n'applique aucun effet de bord
+  - Mode sans transaction (mongomock) et durées par étape enregistrées
+  - Passage par une transaction quand le client Mongo la supporte
+  - Routes : approbation admin et vote modérateur passent par le moteur
+  - Votes simultanés : une seule cascade, un seul vote compté par utilisateur
+  - Collection submission_votes : projection des listes, `my_vote` / `has_voted`, migration
+"""
+from __future__ import annotations
+
+import pytest
+
+
+def _kit_submission(**data) -> dict:
+    return {
+        "submission_id": "sub_kit",
+        "submission_type": "master_kit",
+        "status": "pending",
+        "submitted_by": "user_sub",
+        "votes_up": 0,
+        "votes_down": 0,
+        "data": {
+            "mode": "create", "club": "FC Test", "season": "1998-1999", "kit_type": "Home",
+            "brand": "Adidas", "front_photo": "/api/images/kit.jpg", **data,
+        },
+    }
+
+
+def _linked_team_submission() -> dict:
+    return {
+        "submission_id": "sub_team",
+        "submission_type": "team",
+        "status": "pending",
+        "submitted_by": "user_sub",
+        "data": {"mode": "create", "name": "FC Test", "parent_submission_id": "sub_kit"},
+    }
+
+
+class TestApprovalEngine:
+    @pytest.mark.asyncio
+    async def test_master_kit_create_with_linked_entity(self, mock_db):
+        from backend.services.approval_engine import approve_submission
+
+        await mock_db.submissions.insert_many([_kit_submission(), _linked_team_submission()])
+
+        result = await approve_submission("sub_kit", approved_by="admin_1")
+        assert result["status"] == "approved"
+        assert result["transactional"] is False  # mongomock : pas de sessions
+        assert set(result["stages_ms"]) == {"claim", "plan", "write", "cleanup", "total"}
+
+        kit = await mock_db.master_kits.find_one({"kit_id": result["kit_id"]})
+        team = await mock_db.teams.find_one({"submission_id": "sub_team"})
+        assert team["status"] == "approved" and team["slug"] == "fc-test"
+        assert kit["team_id"] == team["team_id"]
+        assert kit["season"] == "1998/1999"
+        assert await mock_db.versions.count_documents({"kit_id": result["kit_id"]}) == 1
+
+        sub = await mock_db.submissions.find_one({"submission_id": "sub_kit"})
+        assert sub["status"] == "approved"
+        assert sub["approval"]["approved_by"] == "admin_1"
+        assert sub["approval"]["attempts"] == 1
+        assert sub["approval"]["stages_ms"]["total"] >= 0
+        linked = await mock_db.submissions.find_one({"submission_id": "sub_team"})
+        assert linked["status"] == "approved"
+
+        # Second appel : no-op
+        again = await approve_submission("sub_kit")
+        assert again["status"] == "already_approved"
+        assert await mock_db.master_kits.count_documents({}) == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_after_partial_failure_does_not_duplicate(self, mock_db, monkeypatch):
+        from backend.services import approval_engine
+
+        await mock_db.submissions.insert_many([_kit_submission(), _linked_team_submission()])
+
+        # Échec après l'écriture des entités (sans transaction : écritures partielles)
+        real_execute = approval_engine._execute
+
+        async def failing_execute(plan, finalize, session=None):
+            await mock_db.teams.bulk_write(plan.writes["teams"], ordered=True)
+            raise RuntimeError("network blip")
+
+        monkeypatch.setattr(approval_engine, "_execute", failing_execute)
+        with pytest.raises(RuntimeError):
+            await approval_engine.approve_submission("sub_kit")
+
+        sub = await mock_db.submissions.find_one({"submission_id": "sub_kit"})
+        assert sub["status"] == "pending"
+        assert sub["approval"]["last_error"] == "network blip"
+
+        monkeypatch.setattr(approval_engine, "_execute", real_execute)
+        result = await approval_engine.approve_submission("sub_kit")
+        assert result["status"] == "approved"
+        assert await mock_db.teams.count_documents({}) == 1
+        assert await mock_db.master_kits.count_documents({}) == 1
+        assert await mock_db.versions.count_documents({}) == 1
+        sub = await mock_db.submissions.find_one({"submission_id": "sub_kit"})
+        assert sub["approval"]["attempts"] == 2
+        assert "last_error" not in sub["approval"] and "approving_since" not in sub
+
+    @pytest.mark.asyncio
+    async def test_stale_approving_claim_is_recovered(self, mock_db):
+        from datetime import datetime, timedelta, timezone
+
+        from backend.services import approval_engine
+
+        now = datetime.now(timezone.utc)
+        await mock_db.submissions.insert_many([
+            {**_kit_submission(), "status": "approving",
+             "approving_since": (now - timedelta(hours=1)).isoformat()},  # worker mort
+            {**_kit_submission(), "submission_id": "sub_busy", "status": "approving",
+             "approving_since": now.isoformat()},  # claim en cours ailleurs
+        ])
+
+        assert (await approval_engine.approve_submission("sub_busy"))["status"] == "in_progress"
+        assert await approval_engine.recover_stale_approvals() == {"stale": 1, "approved": 1, "failed": 0}
+        sub = await mock_db.submissions.find_one({"submission_id": "sub_kit"})
+        assert sub["status"] == "approved" and "approving_since" not in sub
+        assert await mock_db.master_kits.count_documents({}) == 1
+        busy = await mock_db.submissions.find_one({"submission_id": "sub_busy"})
+        assert busy["status"] == "approving"
+
+    @pytest.mark.asyncio
+    async def test_uses_transaction_when_supported(self, mock_db, monkeypatch):
+        from backend.services import approval_engine
+
+        class FakeSession:
+            transactions = 0
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def with_transaction(self, callback):
+                FakeSession.transactions += 1
+                return await callback(None)  # mongomock n'accepte pas de vraie session
+
+        class FakeClient:
+            async def start_session(self):
+                return FakeSession()
+
+        monkeypatch.setattr(approval_engine, "client", FakeClient())
+        monkeypatch.setattr(approval_engine, "_transactions_supported", None)
+        await mock_db.submissions.insert_one(_kit_submission())
+
+        result = await approval_engine.approve_submission("sub_kit")
+        assert result["transactional"] is True
+        assert FakeSession.transactions == 1
+        assert await mock_db.master_kits.count_documents({}) == 1
+
+    @pytest.mark.asyncio
+    async def test_version_edit_deletes_replaced_photo_after_commit(self, mock_db, monkeypatch):
+        from backend.services import approval_engine
+
+        deleted = []
+
+        async def fake_delete(urls):
+            deleted.extend(urls)
+
+        monkeypatch.setattr(approval_engine, "_delete_files", fake_delete)
+        await mock_db.versions.insert_one({"version_id": "ver_1", "front_photo": "old.jpg", "model": "Replica"})
+        await mock_db.submissions.insert_one({
+            "submission_id": "sub_ver", "submission_type": "version", "status": "pending",
+            "submitted_by": "user_sub",
+            "data": {"mode": "edit", "version_id": "ver_1", "front_photo": "new.jpg", "model": "Authentic"},
+        })
+
+        await approval_engine.approve_submission("sub_ver")
+        ver = await mock_db.versions.find_one({"version_id": "ver_1"})
+        assert (ver["front_photo"], ver["model"]) == ("new.jpg", "Authentic")
+        assert deleted == ["old.jpg"]
+
+
+    @pytest.mark.asyncio
+    async def test_lost_claim_is_not_finalized(self, mock_db, monkeypatch):
+        from backend.services import approval_engine
+
+        deleted = []
+
+        async def fake_delete(urls):
+            deleted.extend(urls)
+
+        real_build_plan = approval_engine.build_plan
+
+        async def slow_build_plan(sub, now):
+            # Pendant ce temps, un autre worker a repris le claim jugé périmé
+            await mock_db.submissions.update_one(
+                {"submission_id": sub["submission_id"]}, {"$set": {"approving_since": "another-claim"}},
+            )
+            return await real_build_plan(sub, now)
+
+        monkeypatch.setattr(approval_engine, "_delete_files", fake_delete)
+        monkeypatch.setattr(approval_engine, "build_plan", slow_build_plan)
+        await mock_db.versions.insert_one({"version_id": "ver_1", "front_photo": "old.jpg"})
+        await mock_db.submissions.insert_one({
+            "submission_id": "sub_ver", "submission_type": "version", "status": "pending",
+            "submitted_by": "user_sub", "data": {"mode": "edit", "version_id": "ver_1", "front_photo": "new.jpg"},
+        })
+
+        result = await approval_engine.approve_submission("sub_ver")
+        assert result["status"] == "in_progress"
+        assert deleted == []
+        sub = await mock_db.submissions.find_one({"submission_id": "sub_ver"})
+        assert sub["status"] == "approving" and sub["approving_since"] == "another-claim"
+
+
+class TestApprovalRoutes:
+    @pytest.mark.asyncio
+    async def test_admin_approve_route(self, client, mock_db, make_user):
+        _, _, admin_cookies = await make_user(role="admin")
+        await mock_db.submissions.insert_many([_kit_submission(), _linked_team_submission()])
+
+        r = await client.post("/api/admin/submissions/sub_kit/approve", cookies=admin_cookies)
+        assert r.status_code == 200
+        kit = await mock_db.master_kits.find_one({})
+        team = await mock_db.teams.find_one({})
+        assert kit["team_id"] == team["team_id"]
+
+        r = await client.post("/api/admin/submissions/sub_kit/approve", cookies=admin_cookies)
+        assert r.status_code == 400
+        r = await client.post("/api/admin/submissions/missing/approve", cookies=admin_cookies)
+        assert r.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_admin_approve_route_retakes_stale_claim(self, client, mock_db, make_user):
+        from datetime import datetime, timedelta, timezone
+
+        _, _, admin_cookies = await make_user(role="admin")
+        now = datetime.now(timezone.utc)
+        await mock_db.submissions.insert_many([
+            {**_kit_submission(), "status": "approving", "approving_since": (now - timedelta(hours=1)).isoformat()},
+            {**_kit_submission(), "submission_id": "sub_busy", "status": "approving",
+             "approving_since": now.isoformat()},
+        ])
+
+        r = await client.post("/api/admin/submissions/sub_kit/approve", cookies=admin_cookies)
+        assert r.status_code == 200
+        assert (await mock_db.submissions.find_one({"submission_id": "sub_kit"}))["status"] == "approved"
+        assert await mock_db.master_kits.count_documents({}) == 1
+
+        r = await client.post("/api/admin/submissions/sub_busy/approve", cookies=admin_cookies)
+        assert r.status_code == 409
+
+    @pytest.mark.asyncio
+    async def test_moderator_vote_approves(self, client, mock_db, make_user):
+        _, _, mod_cookies = await make_user(role="moderator")
+        await mock_db.submissions.insert_one(_kit_submission())
+
+        r = await client.post("/api/submissions/sub_kit/vote", json={"vote": "up"}, cookies=mod_cookies)
+        assert r.status_code == 200
+        assert r.json()["status"] == "approved"
+        assert await mock_db.master_kits.count_documents({}) == 1
+
+
+class TestConcurrentVotes:
+    @pytest.mark.asyncio
+    async def test_simultaneous_votes_trigger_one_cascade(self, client, mock_db, make_user, monkeypatch):
+        import asyncio
+        from backend.services import approval_engine
+
+        plans = 0
+        real_build_plan = approval_engine.build_plan
+
+        async def counting_build_plan(sub, now):
+            nonlocal plans
+            plans += 1
+            return await real_build_plan(sub, now)
+
+        monkeypatch.setattr(approval_engine, "build_plan", counting_build_plan)
+        moderators = [await make_user(role="moderator") for _ in range(8)]
+        await mock_db.submissions.insert_one(_kit_submission())
+
+        responses = await asyncio.gather(*(
+            client.post("/api/submissions/sub_kit/vote", json={"vote": "up"}, cookies=cookies)
+            for _, _, cookies in moderators
+        ))
+        assert all(r.status_code in (200, 400) for r in responses)
+        assert plans == 1
+        assert await mock_db.master_kits.count_documents({}) == 1
+        assert await mock_db.notifications.count_documents({"type": "submission_approved"}) == 1
+        sub = await mock_db.submissions.find_one({"submission_id": "sub_kit"})
+        assert sub["status"] == "approved"
+
+    @pytest.mark.asyncio
+    async def test_same_user_double_vote_counted_once(self, client, mock_db, make_user):
+        import asyncio
+
+        _, _, cookies = await make_user(role="user")
+        uid = (await mock_db.users.find_one({}))["user_id"]
+        await mock_db.collections.insert_one({"collection_id": "col_1", "user_id": uid})
+        await mock_db.submissions.insert_one(_kit_submission())
+
+        responses = await asyncio.gather(*(
+            client.post("/api/submissions/sub_kit/vote", json={"vote": "up"}, cookies=cookies)
+            for _ in range(5)
+        ))
+        assert sorted(r.status_code for r in responses) == [200, 400, 400, 400, 400]
+        assert {r.json()["detail"] for r in responses if r.status_code == 400} == {"Already voted"}
+        sub = await mock_db.submissions.find_one({"submission_id": "sub_kit"})
+        assert sub["votes_up"] == 1 and "voters" not in sub
+        assert await mock_db.submission_votes.count_documents({"submission_id": "sub_kit"}) == 1
+
+    @pytest.mark.asyncio
+    async def test_entity_reference_cannot_be_voted(self, client, mock_db, make_user):
+        _, _, cookies = await make_user(role="moderator")
+        await mock_db.submissions.insert_one(_linked_team_submission())
+
+        r = await client.post("/api/submissions/sub_team/vote", json={"vote": "up"}, cookies=cookies)
+        assert r.status_code == 400
+        assert "approved automatically" in r.json()["detail"]
+        r = await client.post("/api/submissions/missing/vote", json={"vote": "up"}, cookies=cookies)
+        assert r.status_code == 404
+
+
+class TestSubmissionVotes:
+    @pytest.mark.asyncio
+    async def test_list_projects_fields_and_viewer_vote(self, client, mock_db, make_user):
+        _, _, cookies = await make_user(role="moderator")
+        await mock_db.submissions.insert_one({**_kit_submission(), "voters": ["someone"], "approval": {"attempts": 0}})
+        await mock_db.submission_votes.insert_one({"submission_id": "sub_kit", "user_id": "someone", "vote": "up"})
+
+        r = await client.get("/api/submissions", params={"status": "pending"})
+        assert r.status_code == 200
+        (sub,) = r.json()
+        assert "voters" not in sub and "approval" not in sub
+        assert "my_vote" not in sub and "has_voted" not in sub  # anonyme
+
+        r = await client.post("/api/submissions/sub_kit/vote", json={"vote": "down"}, cookies=cookies)
+        assert r.status_code == 200
+        r = await client.get("/api/submissions", params={"status": "pending"}, cookies=cookies)
+        assert r.json()[0]["my_vote"] == "down" and r.json()[0]["has_voted"] is True
+
+    @pytest.mark.asyncio
+    async def test_migrated_vote_counts_as_voted(self, client, mock_db, make_user):
+        user_id, _, cookies = await make_user(role="moderator")
+        await mock_db.submissions.insert_many([_kit_submission(), {**_kit_submission(), "submission_id": "sub_2"}])
+        await mock_db.submission_votes.insert_one(
+            {"submission_id": "sub_kit", "user_id": user_id, "vote": None, "weight": None, "migrated": True}
+        )
+
+        r = await client.get("/api/submissions", params={"status": "pending"}, cookies=cookies)
+        voted = {s["submission_id"]: (s["my_vote"], s["has_voted"]) for s in r.json()}
+        assert voted == {"sub_kit": (None, True), "sub_2": (None, False)}
+        r = await client.get("/api/submissions/sub_kit", cookies=cookies)
+        assert r.json()["has_voted"] is True
+
+    @pytest.mark.asyncio
+    async def test_legacy_voter_cannot_vote_again(self, client, mock_db, make_user):
+        _, _, cookies = await make_user(role="moderator")
+        uid = (await mock_db.users.find_one({}))["user_id"]
+        await mock_db.submissions.insert_one({**_kit_submission(), "voters": [uid]})
+
+        r = await client.post("/api/submissions/sub_kit/vote", json={"vote": "up"}, cookies=cookies)
+        assert r.status_code == 400 and r.json()["detail"] == "Already voted"
+        assert await mock_db.submission_votes.count_documents({}) == 0
+
+    @pytest.mark.asyncio
+    async def test_migration_moves_voters(self, mock_db):
+        from backend.scripts.migrate_submission_voters import migrate_voters
+
+        await mock_db.submissions.insert_many([
+            {**_kit_submission(), "voters": ["u1", "u2"]},
+            {**_kit_submission(), "submission_id": "sub_2", "voters": []},
+            {**_kit_submission(), "submission_id": "sub_3"},
+        ])
+        assert await migrate_voters(mock_db) == {"submissions": 2, "votes": 2}
+        assert await mock_db.submission_votes.count_documents({}) == 0  # dry-run
+
+        await migrate_voters(mock_db, apply=True)
+        await migrate_voters(mock_db, apply=True)  # idempotent
+        assert await mock_db.submission_votes.count_documents({"submission_id": "sub_kit"}) == 2
+        assert await mock_db.submissions.count_documents({"voters": {"$exists": True}}) == 0
@@ -7,6 +7,7 @@ Couvre :
   - /me : avec session valide / sans session / session expirée / user banni
   - logout : invalide bien la session côté DB
   - bcrypt 72-bytes truncation (régression historique)
+  - dates d'expiration en BSON (+ compatibilité chaînes ISO, migration)
 
 Les emails (Resend) sont mockés pour éviter les appels réseau.
 """
@@ -260,3 +261,68 @@ class TestForgotPassword:
         token_doc = await mock_db.password_resets.find_one({"email": "known@example.com"})
         assert token_doc is not None
         assert token_doc["used"] is False
+
+
+# ─── Dates d'expiration BSON ────────────────────────────────────────────────
+
+class TestBsonExpiryDates:
+    @pytest.mark.asyncio
+    async def test_login_stores_native_dates(self, client, mock_db):
+        await client.post("/api/auth/register", json={
+            "email": "dates@example.com", "password": "longpassword1", "name": "Dates User",
+        })
+        session = await mock_db.user_sessions.find_one({})
+        assert isinstance(session["expires_at"], datetime)
+        assert isinstance(session["created_at"], datetime)
+        verification = await mock_db.email_verifications.find_one({})
+        assert isinstance(verification["expires_at"], datetime)
+
+        r = await client.get("/api/auth/me", cookies={"session_token": session["session_token"]})
+        assert r.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_expired_native_date_rejected(self, client, mock_db):
+        past = datetime.now(timezone.utc) - timedelta(minutes=1)
+        await mock_db.users.insert_one({"user_id": "u_n", "email": "n@x", "name": "N", "role": "user"})
+        await mock_db.user_sessions.insert_one({"user_id": "u_n", "session_token": "tok_n", "expires_at": past})
+        await mock_db.password_resets.insert_one({
+            "token": "reset_n", "user_id": "u_n", "email": "n@x", "expires_at": past, "used": False,
+        })
+
+        r = await client.get("/api/auth/me", cookies={"session_token": "tok_n"})
+        assert r.status_code == 401
+        r = await client.post("/api/auth/reset-password", json={"token": "reset_n", "new_password": "newpassword1"})
+        assert r.status_code == 400
+        # L'index TTL (émulé par mongomock) a déjà retiré les documents expirés
+        assert await mock_db.password_resets.count_documents({}) == 0
+
+    @pytest.mark.asyncio
+    async def test_expiry_helpers_accept_strings_and_dates(self):
+        from backend.utils import as_utc_datetime, is_expired
+
+        now = datetime.now(timezone.utc)
+        assert as_utc_datetime(now.replace(tzinfo=None)) == now
+        assert as_utc_datetime(now.isoformat()) == now
+        assert is_expired((now - timedelta(seconds=1)).isoformat())
+        assert is_expired(now - timedelta(seconds=1))
+        assert not is_expired(now + timedelta(hours=1))
+        assert is_expired(None)
+
+    @pytest.mark.asyncio
+    async def test_migration_converts_iso_strings(self, mock_db):
+        from backend.scripts.migrate_dates_to_bson import migrate_dates
+
+        future = datetime.now(timezone.utc) + timedelta(days=1)
+        await mock_db.user_sessions.insert_many([
+            {"session_token": "a", "expires_at": future.isoformat(), "created_at": future.isoformat()},
+            {"session_token": "b", "expires_at": future},
+        ])
+        await mock_db.password_resets.insert_one({"token": "r", "expires_at": future.isoformat()})
+
+        assert await migrate_dates(mock_db) == {"user_sessions": 1, "password_resets": 1, "email_verifications": 0}
+        assert isinstance((await mock_db.user_sessions.find_one({"session_token": "a"}))["expires_at"], str)
+
+        await migrate_dates(mock_db, apply=True)
+        doc = await mock_db.user_sessions.find_one({"session_token": "a"})
+        assert isinstance(doc["expires_at"], datetime) and isinstance(doc["created_at"], datetime)
+        assert await migrate_dates(mock_db, apply=True) == {"user_sessions": 0, "password_resets": 0, "email_verifications": 0}
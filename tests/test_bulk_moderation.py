@@ -0,0 +1,223 @@
+"""
+Tests de la modération en masse (POST /api/admin/submissions/bulk,
+backend/services/bulk_moderation.py).
+
+Couvre :
+  - Approbation d'un lot via le moteur, résultats et durées par soumission
+  - Rejet d'un lot : cascade sur les références d'entités, `admin_rejected_by`
+  - Ids inconnus / déjà traités / en double, validation du corps
+  - Une notification + un email récapitulatif par auteur
+  - Concurrence bornée par BULK_CONCURRENCY
+  - Accès réservé aux admins
+"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+
+def _team_submission(sub_id: str, submitted_by: str = "user_a", **data) -> dict:
+    return {
+        "submission_id": sub_id,
+        "submission_type": "team",
+        "status": "pending",
+        "submitted_by": submitted_by,
+        "votes_up": 0,
+        "votes_down": 0,
+        "created_at": "2026-01-01T00:00:00+00:00",
+        "data": {"mode": "create", "name": f"Team {sub_id}", **data},
+    }
+
+
+@pytest.fixture
+def sent_digests(monkeypatch):
+    sent = []
+
+    async def _fake(to, name, approved, rejected):
+        sent.append({"to": to, "approved": approved, "rejected": rejected})
+
+    monkeypatch.setattr("backend.services.bulk_moderation.send_moderation_digest", _fake)
+    return sent
+
+
+async def _admin(make_user):
+    _, _, cookies = await make_user(role="admin")
+    return cookies
+
+
+class TestBulkApprove:
+    @pytest.mark.asyncio
+    async def test_approves_every_pending_submission(self, client, mock_db, make_user, sent_digests):
+        cookies = await _admin(make_user)
+        await mock_db.submissions.insert_many([_team_submission(f"sub_{i}") for i in range(5)])
+
+        r = await client.post(
+            "/api/admin/submissions/bulk",
+            json={"submission_ids": [f"sub_{i}" for i in range(5)], "action": "approve"},
+            cookies=cookies,
+        )
+        assert r.status_code == 200
+        body = r.json()
+        assert body["done"] == 5
+        assert body["summary"] == {"approved": 5}
+        assert [res["submission_id"] for res in body["results"]] == [f"sub_{i}" for i in range(5)]
+        assert all(res["ms"] >= 0 and "stages_ms" in res for res in body["results"])
+        assert set(body["timings_ms"]) == {"preload", "moderate", "notify", "total"}
+
+        assert await mock_db.teams.count_documents({"status": "approved"}) == 5
+        assert await mock_db.submissions.count_documents({"status": "approved", "admin_approved_by": {"$exists": True}}) == 5
+        assert await mock_db.submission_votes.count_documents({}) == 5
+
+    @pytest.mark.asyncio
+    async def test_unknown_done_and_duplicate_ids(self, client, mock_db, make_user, sent_digests):
+        cookies = await _admin(make_user)
+        await mock_db.submissions.insert_many([
+            _team_submission("sub_ok"),
+            _team_submission("sub_done") | {"status": "rejected"},
+        ])
+
+        r = await client.post(
+            "/api/admin/submissions/bulk",
+            json={"submission_ids": ["sub_ok", "sub_ok", "sub_done", "sub_missing"], "action": "approve"},
+            cookies=cookies,
+        )
+        assert r.status_code == 200
+        statuses = {res["submission_id"]: res["status"] for res in r.json()["results"]}
+        assert statuses == {"sub_ok": "approved", "sub_done": "not_pending", "sub_missing": "not_found"}
+        assert await mock_db.teams.count_documents({}) == 1
+
+    @pytest.mark.asyncio
+    async def test_engine_failure_is_reported_per_id(self, client, mock_db, make_user, monkeypatch, sent_digests):
+        from backend.services import approval_engine
+
+        cookies = await _admin(make_user)
+        await mock_db.submissions.insert_many([_team_submission("sub_ok"), _team_submission("sub_ko")])
+        real_build_plan = approval_engine.build_plan
+
+        async def _flaky(sub, now):
+            if sub["submission_id"] == "sub_ko":
+                raise RuntimeError("boom")
+            return await real_build_plan(sub, now)
+
+        monkeypatch.setattr(approval_engine, "build_plan", _flaky)
+        r = await client.post(
+            "/api/admin/submissions/bulk",
+            json={"submission_ids": ["sub_ok", "sub_ko"], "action": "approve"},
+            cookies=cookies,
+        )
+        results = {res["submission_id"]: res for res in r.json()["results"]}
+        assert results["sub_ok"]["status"] == "approved"
+        assert results["sub_ko"]["status"] == "error" and "boom" in results["sub_ko"]["error"]
+        ko = await mock_db.submissions.find_one({"submission_id": "sub_ko"})
+        assert ko["status"] == "pending"
+
+
+class TestBulkReject:
+    @pytest.mark.asyncio
+    async def test_rejects_with_linked_entities(self, client, mock_db, make_user, sent_digests):
+        cookies = await _admin(make_user)
+        await mock_db.submissions.insert_many([
+            {
+                "submission_id": "sub_kit", "submission_type": "master_kit", "status": "pending",
+                "submitted_by": "user_a", "data": {"mode": "create", "club": "FC Test"},
+            },
+            _team_submission("sub_team", parent_submission_id="sub_kit"),
+            _team_submission("sub_other"),
+        ])
+
+        r = await client.post(
+            "/api/admin/submissions/bulk",
+            json={"submission_ids": ["sub_kit", "sub_other"], "action": "reject"},
+            cookies=cookies,
+        )
+        assert r.status_code == 200
+        assert r.json()["summary"] == {"rejected": 2}
+        async for sub in mock_db.submissions.find({}):
+            assert sub["status"] == "rejected"
+        kit = await mock_db.submissions.find_one({"submission_id": "sub_kit"})
+        assert kit["admin_rejected_by"].startswith("user_")
+
+
+class TestBulkDigest:
+    @pytest.mark.asyncio
+    async def test_one_notification_and_email_per_submitter(self, client, mock_db, make_user, sent_digests):
+        cookies = await _admin(make_user)
+        alice, _, _ = await make_user(email="alice@example.com")
+        bob, _, _ = await make_user(email="bob@example.com")
+        await mock_db.submissions.insert_many(
+            [_team_submission(f"sub_a{i}", alice) for i in range(3)]
+            + [_team_submission("sub_b0", bob)]
+        )
+
+        r = await client.post(
+            "/api/admin/submissions/bulk",
+            json={"submission_ids": ["sub_a0", "sub_a1", "sub_a2", "sub_b0"], "action": "approve"},
+            cookies=cookies,
+        )
+        assert r.json()["notified"] == 2
+        assert await mock_db.notifications.count_documents({"user_id": alice}) == 1
+        assert await mock_db.notifications.count_documents({"user_id": bob}) == 1
+        notif = await mock_db.notifications.find_one({"user_id": alice})
+        assert notif["type"] == "submissions_moderated"
+        assert "3 approuvée(s)" in notif["message"]
+
+        by_email = {d["to"]: d for d in sent_digests}
+        assert set(by_email) == {"alice@example.com", "bob@example.com"}
+        assert len(by_email["alice@example.com"]["approved"]) == 3
+
+    @pytest.mark.asyncio
+    async def test_notify_false_skips_digest(self, client, mock_db, make_user, sent_digests):
+        cookies = await _admin(make_user)
+        await mock_db.submissions.insert_one(_team_submission("sub_0"))
+
+        r = await client.post(
+            "/api/admin/submissions/bulk",
+            json={"submission_ids": ["sub_0"], "action": "reject", "notify": False},
+            cookies=cookies,
+        )
+        assert r.json()["notified"] == 0
+        assert await mock_db.notifications.count_documents({}) == 0
+        assert sent_digests == []
+
+
+class TestBulkLimits:
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, mock_db, monkeypatch):
+        from backend.services import bulk_moderation
+
+        monkeypatch.setattr(bulk_moderation, "BULK_CONCURRENCY", 3)
+        await mock_db.submissions.insert_many([_team_submission(f"sub_{i}") for i in range(10)])
+        running, peak = 0, 0
+
+        async def _slow_reject(sub_id, set_fields=None):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {"status": "rejected", "submission_id": sub_id}
+
+        monkeypatch.setattr(bulk_moderation, "reject_submission", _slow_reject)
+        result = await bulk_moderation.moderate_submissions(
+            [f"sub_{i}" for i in range(10)], "reject", "admin_1", notify=False,
+        )
+        assert result["done"] == 10
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_validation_and_permissions(self, client, make_user):
+        from backend.models import BULK_MODERATION_MAX_IDS
+
+        cookies = await _admin(make_user)
+        r = await client.post("/api/admin/submissions/bulk", json={"submission_ids": ["a"], "action": "delete"}, cookies=cookies)
+        assert r.status_code == 422
+        r = await client.post("/api/admin/submissions/bulk", json={"submission_ids": [], "action": "approve"}, cookies=cookies)
+        assert r.status_code == 422
+        too_many = [f"sub_{i}" for i in range(BULK_MODERATION_MAX_IDS + 1)]
+        r = await client.post("/api/admin/submissions/bulk", json={"submission_ids": too_many, "action": "approve"}, cookies=cookies)
+        assert r.status_code == 422
+
+        _, _, user_cookies = await make_user(role="user")
+        r = await client.post("/api/admin/submissions/bulk", json={"submission_ids": ["a"], "action": "approve"}, cookies=user_cookies)
+        assert r.status_code == 403
@@ -0,0 +1,198 @@
+"""
+Tests du résumé matérialisé de collection (backend/services/collection_summary.py).
+
+Couvre :
+  - /collections/stats et /category-stats après ajout / modification / suppression
+  - Retrait d'un item portant le min/max → reconstruction
+  - Catégorie "" : groupe distinct de "General" (comme l'ancien calcul), incrémental et rebuild
+  - Utilisateur legacy sans résumé → construit à la lecture
+  - Job de réparation (rebuild_all_summaries)
+  - Agrégation $group : collection de 10k+ items, stats globales admin
+"""
+from __future__ import annotations
+
+import uuid
+import pytest
+
+
+async def _seed_version(mock_db) -> str:
+    version_id = f"ver_{uuid.uuid4().hex[:12]}"
+    await mock_db.versions.insert_one({"version_id": version_id, "kit_id": "kit_x"})
+    return version_id
+
+
+async def _add(client, cookies, version_id: str, price: float | None, category: str = "General") -> dict:
+    r = await client.post("/api/collections", json={
+        "version_id": version_id, "category": category, "estimated_price": price,
+    }, cookies=cookies)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+class TestCollectionSummary:
+    @pytest.mark.asyncio
+    async def test_stats_follow_add_update_remove(self, client, mock_db, make_user):
+        _, _, cookies = await make_user()
+        version_id = await _seed_version(mock_db)
+
+        a = await _add(client, cookies, version_id, 50.0)
+        await _add(client, cookies, version_id, 120.0, category="Match")
+        await _add(client, cookies, version_id, None)
+
+        r = await client.get("/api/collections/stats", cookies=cookies)
+        assert r.json() == {
+            "total_jerseys": 3,
+            "estimated_value": {"low": 150.0, "average": 170.0, "high": 360.0},
+            "items_with_estimates": 2,
+        }
+
+        r = await client.put(f"/api/collections/{a['collection_id']}", json={"estimated_price": 80.0}, cookies=cookies)
+        assert r.status_code == 200
+        stats = (await client.get("/api/collections/stats", cookies=cookies)).json()
+        assert stats["estimated_value"] == {"low": 240.0, "average": 200.0, "high": 360.0}
+
+        r = await client.delete(f"/api/collections/{a['collection_id']}", cookies=cookies)
+        assert r.status_code == 200
+        stats = (await client.get("/api/collections/stats", cookies=cookies)).json()
+        assert stats["total_jerseys"] == 2
+        assert stats["estimated_value"] == {"low": 240.0, "average": 120.0, "high": 240.0}
+
+        cats = (await client.get("/api/collections/category-stats", cookies=cookies)).json()
+        by_name = {c["category"]: c for c in cats}
+        assert by_name["Match"]["estimated_value"] == {"low": 120.0, "average": 120.0, "high": 120.0}
+        assert by_name["General"] == {
+            "category": "General", "count": 1,
+            "estimated_value": {"low": 0, "average": 0, "high": 0},
+        }
+
+    @pytest.mark.asyncio
+    async def test_category_with_dot_is_kept(self, client, mock_db, make_user):
+        _, _, cookies = await make_user()
+        version_id = await _seed_version(mock_db)
+        await _add(client, cookies, version_id, 30.0, category="Saison 98.99")
+
+        cats = (await client.get("/api/collections/category-stats", cookies=cookies)).json()
+        assert cats == [{
+            "category": "Saison 98.99", "count": 1,
+            "estimated_value": {"low": 30.0, "average": 30.0, "high": 30.0},
+        }]
+
+    @pytest.mark.asyncio
+    async def test_empty_category_is_its_own_bucket(self, client, mock_db, make_user):
+        from backend.services.collection_summary import apply_item_added, rebuild_user_summary
+
+        # L'API enregistre "General" à la place de "" : seules des données antérieures portent ""
+        user_id, _, cookies = await make_user()
+        items = [
+            {"collection_id": "col_empty", "user_id": user_id, "version_id": "v", "category": "", "estimated_price": 30.0},
+            {"collection_id": "col_gen", "user_id": user_id, "version_id": "v", "category": "General", "estimated_price": 50.0},
+            {"collection_id": "col_none", "user_id": user_id, "version_id": "v", "category": None},
+        ]
+        await mock_db.collections.insert_many([dict(i) for i in items])
+        for item in items:
+            await apply_item_added(item)
+        expected = {
+            "": {"category": "", "count": 1, "estimated_value": {"low": 30.0, "average": 30.0, "high": 30.0}},
+            "General": {"category": "General", "count": 2, "estimated_value": {"low": 50.0, "average": 50.0, "high": 50.0}},
+        }
+
+        cats = (await client.get("/api/collections/category-stats", cookies=cookies)).json()
+        assert {c["category"]: c for c in cats} == expected
+
+        await rebuild_user_summary(user_id)
+        cats = (await client.get("/api/collections/category-stats", cookies=cookies)).json()
+        assert {c["category"]: c for c in cats} == expected
+
+    @pytest.mark.asyncio
+    async def test_legacy_user_without_summary(self, client, mock_db, make_user):
+        user_id, _, cookies = await make_user()
+        await mock_db.collections.insert_many([
+            {"collection_id": "col_a", "user_id": user_id, "version_id": "v", "value_estimate": 40.0},
+            {"collection_id": "col_b", "user_id": user_id, "version_id": "v", "category": "Match"},
+        ])
+
+        stats = (await client.get("/api/collections/stats", cookies=cookies)).json()
+        assert stats["total_jerseys"] == 2
+        assert stats["items_with_estimates"] == 1
+        assert await mock_db.collection_summaries.count_documents({"user_id": user_id}) == 1
+
+    @pytest.mark.asyncio
+    async def test_rebuild_all_repairs_drift(self, client, mock_db, make_user):
+        from backend.services.collection_summary import rebuild_all_summaries
+
+        user_id, _, cookies = await make_user()
+        version_id = await _seed_version(mock_db)
+        await _add(client, cookies, version_id, 10.0)
+
+        # Écriture hors helpers → dérive
+        await mock_db.collections.insert_one(
+            {"collection_id": "col_raw", "user_id": user_id, "version_id": version_id, "estimated_price": 90.0}
+        )
+        await mock_db.collection_summaries.insert_one({"user_id": "user_gone", "total_count": 4})
+
+        assert await rebuild_all_summaries() == 1
+        stats = (await client.get("/api/collections/stats", cookies=cookies)).json()
+        assert stats["estimated_value"] == {"low": 20.0, "average": 100.0, "high": 180.0}
+        assert await mock_db.collection_summaries.count_documents({"user_id": "user_gone"}) == 0
+
+
+class TestSummaryAggregation:
+    @staticmethod
+    def _legacy_stats(items: list[dict]) -> dict:
+        """Ancien calcul Python de /collections/stats, sans troncature."""
+        values = [
+            v for v in (
+                i.get("estimated_price") or i.get("value_estimate") or i.get("price_estimate") or 0
+                for i in items
+            ) if v and v > 0
+        ]
+        total = len(items)
+        return {
+            "total_jerseys": total,
+            "estimated_value": {
+                "low": round(min(values) * total, 2) if values else 0,
+                "average": round(sum(values), 2) if values else 0,
+                "high": round(max(values) * total, 2) if values else 0,
+            },
+            "items_with_estimates": len(values),
+        }
+
+    @pytest.mark.asyncio
+    async def test_large_collection_matches_legacy_formula(self, client, mock_db, make_user):
+        user_id, _, cookies = await make_user()
+        items = []
+        for n in range(10_050):
+            item = {"collection_id": f"col_{n}", "user_id": user_id, "version_id": "v",
+                    "category": ("Match", "Replica", "", None)[n % 4]}
+            if n % 3 == 0:
+                item["estimated_price"] = 10 + (n % 97) * 1.5
+            elif n % 3 == 1:
+                item["estimated_price"] = 0
+                item["value_estimate"] = 5 + (n % 13)
+            items.append(item)
+        await mock_db.collections.insert_many([dict(i) for i in items])
+
+        stats = (await client.get("/api/collections/stats", cookies=cookies)).json()
+        assert stats == self._legacy_stats(items)
+        assert stats["total_jerseys"] == 10_050
+
+        cats = {c["category"]: c for c in (await client.get("/api/collections/category-stats", cookies=cookies)).json()}
+        assert set(cats) == {"Match", "Replica", "General", ""}
+        assert sum(c["count"] for c in cats.values()) == 10_050
+
+    @pytest.mark.asyncio
+    async def test_admin_collection_stats(self, client, mock_db, make_user):
+        _, _, admin_cookies = await make_user(role="admin")
+        _, _, user_cookies = await make_user()
+        await mock_db.collections.insert_many([
+            {"collection_id": "c1", "user_id": "u1", "version_id": "v", "estimated_price": 20.0},
+            {"collection_id": "c2", "user_id": "u2", "version_id": "v", "price_estimate": 60.0, "category": "Match"},
+        ])
+
+        assert (await client.get("/api/admin/collection-stats", cookies=user_cookies)).status_code == 403
+        r = await client.get("/api/admin/collection-stats", cookies=admin_cookies)
+        assert r.status_code == 200
+        body = r.json()
+        assert body["total_jerseys"] == 2
+        assert body["estimated_value"] == {"low": 40.0, "average": 80.0, "high": 120.0}
+        assert len(body["categories"]) == 2
@@ -0,0 +1,120 @@
+"""
+Tests des compteurs du tableau de bord admin (backend/services/dashboard_stats.py).
+
+Couvre :
+  - GET /api/admin/stats : mêmes clés qu'avant, compteurs et buckets journaliers
+  - Lecture du document précalculé tant qu'il est frais ; périmé, servi puis recalculé en fond
+  - Document absent : un seul calcul partagé par les lecteurs concurrents
+  - Document périmé lu par plusieurs workers : un seul recalcul par période (bail scheduled_jobs)
+  - GET /api/stats (public) lit le même document
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import asyncio
+
+import pytest
+
+
+def _days_ago(days: int) -> str:
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+
+async def _seed(mock_db):
+    await mock_db.master_kits.insert_many([{"kit_id": f"kit_{n}"} for n in range(3)])
+    await mock_db.versions.insert_one({"version_id": "ver_1"})
+    await mock_db.submissions.insert_many([
+        {"submission_id": "s1", "status": "pending", "created_at": _days_ago(0)},
+        {"submission_id": "s2", "status": "approved", "created_at": _days_ago(3)},
+        {"submission_id": "s3", "status": "pending", "created_at": _days_ago(20)},
+    ])
+    await mock_db.reports.insert_one({"report_id": "r1", "status": "pending", "created_at": _days_ago(1)})
+    await mock_db.users.insert_one({"user_id": "old", "role": "user", "is_banned": True, "created_at": _days_ago(40)})
+
+
+class TestAdminStats:
+    @pytest.mark.asyncio
+    async def test_admin_stats_from_precomputed_document(self, client, mock_db, make_user):
+        _, _, admin_cookies = await make_user(role="admin")
+        await _seed(mock_db)
+
+        r = await client.get("/api/admin/stats", cookies=admin_cookies)
+        assert r.status_code == 200
+        stats = r.json()
+        assert stats["kits_total"] == 3
+        assert stats["versions_total"] == 1
+        assert (stats["users_total"], stats["users_banned"], stats["admins_count"]) == (2, 1, 1)
+        assert stats["users_new_7d"] == 1  # l'admin créé par make_user
+        assert (stats["submissions_total"], stats["submissions_pending"]) == (3, 2)
+        assert (stats["submissions_today"], stats["submissions_last_7d"]) == (1, 2)
+        assert (stats["reports_total"], stats["reports_pending"]) == (1, 1)
+        assert await mock_db.dashboard_stats.count_documents({}) == 1
+
+        # Document frais : pas de recalcul
+        await mock_db.master_kits.insert_one({"kit_id": "kit_new"})
+        r = await client.get("/api/admin/stats", cookies=admin_cookies)
+        assert r.json()["kits_total"] == 3
+
+        # Document périmé : servi tel quel, recalculé en fond
+        from backend.services import dashboard_stats
+
+        await mock_db.dashboard_stats.update_one({"key": "global"}, {"$set": {"computed_at": _days_ago(1)}})
+        r = await client.get("/api/admin/stats", cookies=admin_cookies)
+        assert r.json()["kits_total"] == 3
+        await dashboard_stats._refresh_task
+        r = await client.get("/api/admin/stats", cookies=admin_cookies)
+        assert r.json()["kits_total"] == 4
+
+    @pytest.mark.asyncio
+    async def test_missing_document_computed_once(self, mock_db, monkeypatch):
+        from backend.services import dashboard_stats
+
+        await _seed(mock_db)
+        compute, calls = dashboard_stats.compute_dashboard_stats, []
+
+        async def counted():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return await compute()
+
+        monkeypatch.setattr(dashboard_stats, "compute_dashboard_stats", counted)
+        results = await asyncio.gather(*(dashboard_stats.get_dashboard_stats() for _ in range(5)))
+        assert len(calls) == 1
+        assert all(r["totals"]["kits"] == 3 for r in results)
+
+    @pytest.mark.asyncio
+    async def test_stale_document_refreshed_by_one_worker(self, mock_db, monkeypatch):
+        from backend.services import dashboard_stats
+
+        await _seed(mock_db)
+        await mock_db.scheduled_jobs.create_index("job", unique=True)
+        await dashboard_stats.refresh_dashboard_stats()
+        compute, calls = dashboard_stats.compute_dashboard_stats, []
+
+        async def counted():
+            calls.append(1)
+            return await compute()
+
+        monkeypatch.setattr(dashboard_stats, "compute_dashboard_stats", counted)
+        for _ in range(3):
+            # Chaque tour simule un worker distinct (pas de calcul en vol partagé)
+            monkeypatch.setattr(dashboard_stats, "_refresh_task", None)
+            await mock_db.dashboard_stats.update_one({"key": "global"}, {"$set": {"computed_at": _days_ago(1)}})
+            await dashboard_stats.get_dashboard_stats()
+            await dashboard_stats._refresh_task
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_public_stats(self, client, mock_db):
+        await _seed(mock_db)
+        await mock_db.reviews.insert_one({"review_id": "rev_1"})
+
+        r = await client.get("/api/stats")
+        assert r.json() == {"master_kits": 3, "versions": 1, "users": 1, "reviews": 1}
+
+    @pytest.mark.asyncio
+    async def test_admin_stats_requires_admin(self, client, make_user):
+        _, _, cookies = await make_user(role="user")
+        r = await client.get("/api/admin/stats", cookies=cookies)
+        assert r.status_code == 403
@@ -103,7 +103,7 @@ class TestCreatePending:
         assert sub["status"] == "pending"
         assert sub["data"]["entity_id"] == team["team_id"]
         assert sub["votes_up"] == 0
-        assert sub["voters"] == []
+        assert "voters" not in sub
 
     @pytest.mark.asyncio
     async def test_create_team_pending_dedup_returns_existing(self, client, make_user, mock_db):
@@ -0,0 +1,82 @@
+"""
+Tests de l'estimation en lot (backend/services/estimation_batch.py).
+
+Couvre :
+  - `estimate_many` (tables) ≡ `calculate_estimation` item par item (échantillon
+    aléatoire couvrant toutes les grilles de coefficients + valeurs inconnues)
+  - Tables pré-calculées alignées sur les grilles ESTIMATION_*
+  - POST /api/estimate/batch : notes joueurs résolues, identique à POST /estimate
+  - Limite de taille du lot
+"""
+from __future__ import annotations
+
+import pytest
+
+from backend.scripts.bench_estimation_batch import make_items
+from backend.services.estimation_batch import estimate_many, estimation_kwargs
+from backend.utils import calculate_estimation
+
+
+def _reference(item: dict, notes: dict) -> dict:
+    note = notes.get(item.get("flocking_player_id") or "", 0.0)
+    return {**calculate_estimation(**estimation_kwargs(item, note)), "flocking_player_note": note}
+
+
+class TestEstimateMany:
+    def test_matches_single_estimation(self):
+        items, notes = make_items(3000, seed=7)
+        assert estimate_many(items, notes) == [_reference(i, notes) for i in items]
+
+    def test_seed_tables_follow_coefficient_grids(self):
+        from backend.services import estimation_batch
+        from backend.utils import ESTIMATION_COMPETITION_COEFF, ESTIMATION_SIGNED_PROOF_COEFF
+
+        for value, coeff in ESTIMATION_COMPETITION_COEFF.items():
+            assert estimation_batch._COMPETITION_SEED[value][0] == coeff
+        for value, coeff in ESTIMATION_SIGNED_PROOF_COEFF.items():
+            assert estimation_batch._PROOF_SEED[value][0] == coeff
+
+    def test_unknown_values_and_free_text(self):
+        notes = {"p1": 92.0}
+        items = [
+            {"model_type": "Bootleg", "competition": "Friendly", "physical_state": "Mint"},
+            {"model_type": "Authentic", "signed": True, "signed_type": "other",
+             "signed_other_detail": "Coach", "is_rare": True, "rare_reason": "Prototype"},
+            {"model_type": "Authentic", "signed": True, "signed_type": "player_flocked",
+             "flocking_origin": "Official", "flocking_player_id": "p1", "signed_proof": "strong"},
+            {"model_type": "Replica", "signed_proof": None, "mode": None, "season_year": None},
+        ]
+        assert estimate_many(items, notes) == [_reference(i, notes) for i in items]
+
+
+class TestEstimateBatchEndpoint:
+    @pytest.mark.asyncio
+    async def test_batch_matches_single_endpoint(self, client, mock_db):
+        await mock_db.players.insert_many([
+            {"player_id": "p_legend", "slug": "p-legend", "note": 95},
+            {"player_id": "p_star", "slug": "p-star", "note": 60},
+        ])
+        items = [
+            {"model_type": "Authentic", "signed": True, "signed_type": "player_flocked",
+             "flocking_origin": "Official", "flocking_player_id": pid, "season_year": 1998}
+            for pid in ("p_legend", "p_star", "p_unknown", "")
+        ] + [{"model_type": "Replica", "competition": "World Cup", "mode": "basic"}]
+
+        r = await client.post("/api/estimate/batch", json={"items": items})
+        assert r.status_code == 200
+        results = r.json()["results"]
+        assert len(results) == len(items)
+        assert results[0]["flocking_player_note"] == 95.0
+        assert results[2]["flocking_player_note"] == 0.0
+
+        for item, batch_result in zip(items, results):
+            single = await client.post("/api/estimate", json=item)
+            assert single.json() == batch_result
+
+    @pytest.mark.asyncio
+    async def test_batch_size_limit(self, client):
+        from backend.models import ESTIMATION_BATCH_MAX_ITEMS
+
+        items = [{"model_type": "Replica"}] * (ESTIMATION_BATCH_MAX_ITEMS + 1)
+        r = await client.post("/api/estimate/batch", json={"items": items})
+        assert r.status_code == 422
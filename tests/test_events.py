@@ -0,0 +1,126 @@
+"""
+Tests du flux SSE (backend/routers/events.py, backend/services/event_bus.py).
+
+Couvre :
+  - Bus local : distribution aux seules connexions de l'utilisateur, file pleine
+  - Flux : instantané (compteurs, non lues) puis événements publiés par les écritures
+  - Messages de transaction relayés à l'autre partie
+  - Bus Mongo : les événements du worker courant ne sont pas redistribués
+  - GET /api/events sans authentification → 401
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+
+def _parse(chunk: str) -> tuple[str, dict]:
+    lines = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+    return lines["event"], json.loads(lines["data"])
+
+
+async def _not_disconnected() -> bool:
+    return False
+
+
+async def _next_event(stream) -> tuple[str, dict]:
+    return _parse(await asyncio.wait_for(stream.__anext__(), timeout=1))
+
+
+class TestLocalBus:
+    @pytest.mark.asyncio
+    async def test_dispatch_targets_user_and_drops_oldest(self, monkeypatch):
+        from backend.services import event_bus
+
+        monkeypatch.setattr(event_bus, "SUBSCRIBER_QUEUE_SIZE", 2)
+        bus = event_bus.LocalEventBus()
+        mine, other = bus.subscribe("user_a"), bus.subscribe("user_b")
+
+        for i in range(3):
+            await bus.publish("user_a", "notification", {"n": i})
+        assert other.empty()
+        assert [mine.get_nowait()[1]["n"] for _ in range(mine.qsize())] == [1, 2]
+
+        bus.unsubscribe("user_a", mine)
+        assert bus.subscriber_count("user_a") == 0
+        assert bus.dispatch("user_a", "notification", {}) == 0
+
+
+class TestEventStream:
+    @pytest.mark.asyncio
+    async def test_snapshot_then_published_notification(self, client, mock_db, make_user):
+        from backend.routers.events import sse_events
+        from backend.routers.notifications import create_notification
+        from backend.services.event_bus import bus
+
+        user_id, _, _ = await make_user()
+        await mock_db.notifications.insert_one({"notification_id": "n0", "user_id": user_id, "read": False})
+
+        stream = sse_events(user_id, _not_disconnected)
+        try:
+            assert (await stream.__anext__()).startswith("retry:")
+            assert await _next_event(stream) == (
+                "counters", {"unread_total": 0, "unread_by_transaction": {}, "pending_count": 0},
+            )
+            assert await _next_event(stream) == ("notifications", {"unread_count": 1})
+            assert bus.subscriber_count(user_id) == 1
+
+            await create_notification(user_id, "info", "Titre", "Message")
+            event, data = await _next_event(stream)
+            assert event == "notification" and data["title"] == "Titre" and "_id" not in data
+        finally:
+            await stream.aclose()
+        assert bus.subscriber_count(user_id) == 0
+
+    @pytest.mark.asyncio
+    async def test_message_relayed_to_other_party(self, client, mock_db, make_user):
+        from backend.routers.events import sse_events
+        from backend.routers.transactions import create_transaction
+
+        seller_id, _, _ = await make_user()
+        buyer_id, _, buyer = await make_user()
+        txn = await create_transaction(
+            listing={"listing_id": "lst_1", "user_id": seller_id, "collection_id": "col_1"},
+            offer={"offer_id": "off_1", "offerer_id": buyer_id, "offer_type": "buy", "offered_price": 50.0},
+        )
+
+        stream = sse_events(seller_id, _not_disconnected)
+        try:
+            for _ in range(3):  # retry + instantané
+                await stream.__anext__()
+            r = await client.post(
+                f"/api/transactions/{txn['transaction_id']}/messages", json={"content": "Bonjour"}, cookies=buyer,
+            )
+            assert r.status_code == 200, r.text
+
+            received = {}
+            while "message" not in received:
+                event, data = await _next_event(stream)
+                received[event] = data
+            assert received["message"]["content"] == "Bonjour"
+            assert received["counters"]["unread_by_transaction"] == {txn["transaction_id"]: 1}
+        finally:
+            await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_requires_auth(self, client):
+        r = await client.get("/api/events")
+        assert r.status_code == 401
+
+
+class TestMongoBus:
+    @pytest.mark.asyncio
+    async def test_own_events_not_redispatched(self, mock_db):
+        from backend.services.event_bus import MongoChangeStreamBus
+
+        bus = MongoChangeStreamBus()
+        queue = bus.subscribe("user_a")
+        await bus.publish("user_a", "notification", {"n": 1})
+        stored = await mock_db.events.find_one({"user_id": "user_a"})
+        assert stored["origin"] == bus.worker_id and stored["expires_at"]
+
+        bus.handle_change({"fullDocument": stored})
+        bus.handle_change({"fullDocument": {**stored, "origin": "autre_worker", "data": {"n": 2}}})
+        assert [queue.get_nowait()[1]["n"] for _ in range(queue.qsize())] == [1, 2]
@@ -0,0 +1,229 @@
+"""
+Tests du nettoyage des images (backend/services/file_cleanup.py).
+
+Couvre :
+  - Conversion URL → chemin relatif receiver (proxy /api/images, URL absolue, inconnue)
+  - File de suppression : dédoublonnage, vidage par lots, échec rejoué puis abandonné
+  - Suppression d'un kit avec ses versions : images mises en file, pas d'appel HTTP inline
+  - Fichier partagé (déduplication receiver) : conservé tant qu'il est référencé
+    (soumission en cours d'approbation, nom de fichier seul, champ non image :
+    même définition que le balayage), retiré de la file
+    quand un upload le réutilise
+  - Réconciliation avec l'inventaire : références par chemin ou nom de fichier seul,
+    octets récupérables, soumissions rejetées ignorées, garde-fou base vide
+"""
+from __future__ import annotations
+
+import pytest
+
+
+@pytest.fixture
+def receiver(monkeypatch):
+    """Receiver factice : enregistre les lots reçus, répond deleted / missing."""
+    from backend.services import file_cleanup
+
+    state = {"batches": [], "present": set(), "fail": False, "files": []}
+
+    async def _fake_delete(paths):
+        if state["fail"]:
+            raise RuntimeError("receiver injoignable")
+        state["batches"].append(list(paths))
+        return {
+            "deleted": [p for p in paths if p in state["present"]],
+            "missing": [p for p in paths if p not in state["present"]],
+            "invalid": [],
+        }
+
+    async def _fake_inventory(older_than_seconds):
+        return [{"relative_path": p, "folder": "master_kit", "size": 100, "sha256": p, "created_at": 0}
+                for p in state["files"]]
+
+    monkeypatch.setattr(file_cleanup, "_receiver_delete", _fake_delete)
+    monkeypatch.setattr(file_cleanup, "_receiver_inventory", _fake_inventory)
+    return state
+
+
+class TestMediaRelativePath:
+    def test_known_and_unknown_urls(self):
+        from backend.services.file_cleanup import media_relative_path
+
+        assert media_relative_path("/api/images/kits/versions/a.jpg") == "kits/versions/a.jpg"
+        assert media_relative_path("https://82.67.103.45/teams/clubs/b.png") == "teams/clubs/b.png"
+        assert media_relative_path("https://cdn.example.com/c.png") is None
+        assert media_relative_path("") is None
+
+
+class TestDeletionQueue:
+    @pytest.mark.asyncio
+    async def test_enqueue_deduplicates(self, mock_db):
+        from backend.services.file_cleanup import enqueue_file_deletions
+
+        n = await enqueue_file_deletions([
+            "/api/images/kits/masters/a.jpg",
+            "https://82.67.103.45/kits/masters/a.jpg",
+            "https://cdn.example.com/ignored.png",
+            "",
+        ])
+        assert n == 1
+        await enqueue_file_deletions(["/api/images/kits/masters/a.jpg"])
+        assert await mock_db.file_deletions.count_documents({}) == 1
+
+    @pytest.mark.asyncio
+    async def test_flush_sends_batches(self, mock_db, receiver, monkeypatch):
+        from backend.services import file_cleanup
+
+        monkeypatch.setattr(file_cleanup, "FILE_DELETION_BATCH", 2)
+        receiver["present"] = {"kits/versions/v0.jpg", "kits/versions/v1.jpg"}
+        await file_cleanup.enqueue_file_deletions([f"/api/images/kits/versions/v{i}.jpg" for i in range(5)])
+
+        totals = await file_cleanup.drain_file_deletions()
+        assert [len(b) for b in receiver["batches"]] == [2, 2, 1]
+        assert (totals["deleted"], totals["missing"]) == (2, 3)
+        assert await mock_db.file_deletions.count_documents({}) == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_retried_then_dropped(self, mock_db, receiver, monkeypatch):
+        from backend.services import file_cleanup
+
+        monkeypatch.setattr(file_cleanup, "FILE_DELETION_MAX_ATTEMPTS", 2)
+        receiver["fail"] = True
+        await file_cleanup.enqueue_file_deletions(["/api/images/kits/masters/a.jpg"])
+
+        assert (await file_cleanup.flush_file_deletions())["failed"] == 1
+        doc = await mock_db.file_deletions.find_one({})
+        assert doc["attempts"] == 1 and "injoignable" in doc["last_error"]
+
+        await file_cleanup.flush_file_deletions()
+        # Plafond atteint : l'entrée reste pour inspection mais n'est plus envoyée
+        assert (await file_cleanup.flush_file_deletions())["batch"] == 0
+        assert await mock_db.file_deletions.count_documents({"attempts": 2}) == 1
+
+
+class TestSharedFiles:
+    @pytest.mark.asyncio
+    async def test_file_still_referenced_is_kept(self, mock_db, receiver):
+        from backend.services import file_cleanup
+
+        # Deux versions partagent la même photo (upload dédupliqué) ; une seule est supprimée
+        await mock_db.versions.insert_one({"version_id": "ver_2", "front_photo": "https://82.67.103.45/kits/versions/shared.jpg"})
+        await mock_db.submissions.insert_one({
+            "submission_id": "sub_pending", "status": "pending",
+            "data": {"front_photo": "/api/images/kits/versions/pending.jpg"},
+        })
+        await file_cleanup.enqueue_file_deletions([
+            "/api/images/kits/versions/shared.jpg",
+            "/api/images/kits/versions/pending.jpg",
+            "/api/images/kits/versions/gone.jpg",
+        ])
+
+        counts = await file_cleanup.flush_file_deletions()
+        assert counts["kept"] == 2
+        assert receiver["batches"] == [["kits/versions/gone.jpg"]]
+        assert await mock_db.file_deletions.count_documents({}) == 0
+
+    @pytest.mark.asyncio
+    async def test_approving_and_bare_filename_references_are_kept(self, mock_db, receiver):
+        from backend.services import file_cleanup
+
+        await mock_db.submissions.insert_one({
+            "submission_id": "sub_approving", "status": "approving",
+            "data": {"front_photo": "/api/images/kits/versions/approving.jpg"},
+        })
+        await mock_db.versions.insert_one({"version_id": "ver_legacy", "front_photo": "legacy.webp"})
+
+        kept = await file_cleanup.still_referenced([
+            "kits/versions/approving.jpg", "kits/versions/legacy.webp", "kits/versions/gone.jpg",
+        ])
+        assert kept == {"kits/versions/approving.jpg", "kits/versions/legacy.webp"}
+
+    @pytest.mark.asyncio
+    async def test_reference_outside_image_fields_is_kept(self, mock_db, receiver):
+        from backend.services import file_cleanup
+
+        # Même fichier dédupliqué : référencé par une pièce jointe de message, hors champ image connu
+        await mock_db.transaction_messages.insert_one({
+            "message_id": "m1", "attachments": [{"url": "/api/images/kits/versions/shared.jpg"}],
+        })
+        receiver["files"] = ["kits/versions/shared.jpg"]
+        assert (await file_cleanup.sweep_orphan_files())["orphans"] == []
+
+        await file_cleanup.enqueue_file_deletions(["/api/images/kits/versions/shared.jpg"])
+        counts = await file_cleanup.drain_file_deletions()
+        assert counts["kept"] == 1
+        assert receiver["batches"] == []
+
+    @pytest.mark.asyncio
+    async def test_deduplicated_upload_cancels_pending_deletion(self, mock_db, receiver):
+        from backend.services import file_cleanup
+
+        await file_cleanup.enqueue_file_deletions([
+            "/api/images/kits/versions/reused.jpg", "/api/images/kits/versions/gone.jpg",
+        ])
+        assert await file_cleanup.cancel_file_deletions(["kits/versions/reused.jpg"]) == 1
+
+        await file_cleanup.flush_file_deletions()
+        assert receiver["batches"] == [["kits/versions/gone.jpg"]]
+
+
+class TestKitRemovalCleanup:
+    @pytest.mark.asyncio
+    async def test_removal_enqueues_every_image(self, mock_db, receiver):
+        from backend.services.approval_engine import approve_submission
+
+        await mock_db.master_kits.insert_one({"kit_id": "kit_1", "front_photo": "/api/images/kits/masters/k.jpg"})
+        await mock_db.versions.insert_many([
+            {"version_id": f"ver_{i}", "kit_id": "kit_1",
+             "front_photo": f"/api/images/kits/versions/f{i}.jpg",
+             "back_photo": f"/api/images/kits/versions/b{i}.jpg"}
+            for i in range(30)
+        ])
+        await mock_db.submissions.insert_one({
+            "submission_id": "sub_rm", "submission_type": "master_kit", "status": "pending",
+            "submitted_by": "user_sub", "data": {"mode": "removal", "kit_id": "kit_1"},
+        })
+
+        result = await approve_submission("sub_rm")
+        assert result["status"] == "approved"
+        assert await mock_db.master_kits.count_documents({}) == 0
+        assert await mock_db.file_deletions.count_documents({}) == 61
+        assert receiver["batches"] == []  # rien d'inline : la file est vidée en arrière-plan
+
+
+class TestOrphanSweep:
+    @pytest.mark.asyncio
+    async def test_only_unreferenced_files_are_enqueued(self, mock_db, receiver):
+        from backend.services.file_cleanup import sweep_orphan_files
+
+        await mock_db.master_kits.insert_one({"kit_id": "kit_1", "front_photo": "/api/images/kits/masters/used.jpg"})
+        await mock_db.versions.insert_one({"version_id": "ver_1", "front_photo": "version_legacy.webp"})
+        await mock_db.listings.insert_one({"listing_id": "l1", "photos": ["https://82.67.103.45/kits/masters/listing.jpg"]})
+        receiver["files"] = [
+            "kits/masters/used.jpg",
+            "kits/versions/version_legacy.webp",
+            "kits/masters/listing.jpg",
+            "kits/masters/orphan.jpg",
+        ]
+
+        await mock_db.submissions.insert_one({
+            "submission_id": "sub_rej", "status": "rejected",
+            "data": {"front_photo": "/api/images/kits/masters/rejected.jpg"},
+        })
+        receiver["files"].append("kits/masters/rejected.jpg")
+
+        report = await sweep_orphan_files(apply=False)
+        assert report["orphans"] == ["kits/masters/orphan.jpg", "kits/masters/rejected.jpg"]
+        assert report["reclaimable_bytes"] == 200
+        assert await mock_db.file_deletions.count_documents({}) == 0
+
+        report = await sweep_orphan_files(apply=True)
+        assert report["enqueued"] == 2
+        doc = await mock_db.file_deletions.find_one({"relative_path": "kits/masters/orphan.jpg"})
+        assert doc["reason"] == "orphan"
+
+    @pytest.mark.asyncio
+    async def test_empty_database_aborts(self, mock_db, receiver):
+        from backend.services.file_cleanup import sweep_orphan_files
+
+        receiver["files"] = ["kits/masters/a.jpg"]
+        report = await sweep_orphan_files(apply=True)
+        assert report["enqueued"] == 0 and report["orphans"] == []
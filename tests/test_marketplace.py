@@ -6,6 +6,10 @@ Couvre :
   - Quota max 10 listings actifs
   - Impossible de lister un item qui n'est pas dans sa collection
   - Browse listings (GET /api/marketplace)
+  - Instantané dénormalisé : écrit à la création, filtres, propagation des modifications
+  - Facettes (GET /api/marketplace/facets) : comptes disjonctifs, flocage « none »,
+    /filters dérivé, cache court et agrégation partagée entre requêtes concurrentes
+  - Tris (récent, prix, meilleurs vendeurs) et pagination par curseur
   - Détail listing (GET /api/marketplace/{id})
   - Faire une offre (buy / trade)
   - Refus de faire une offre sur son propre listing
@@ -208,8 +212,306 @@ class TestBrowseListings:
         assert all(l["listing_type"] == "trade" for l in results)
 
 
+# ─── Instantané dénormalisé ───────────────────────────────────────────────────
+
+async def _seed_kit(mock_db, version_id: str, club: str = "PSG", season: str = "2012/2013") -> str:
+    kit_id = _kit_id()
+    await mock_db.master_kits.insert_one({
+        "kit_id": kit_id, "club": club, "brand": "Nike", "season": season, "kit_type": "Home",
+        "league": "Ligue 1", "gender": "Men", "entity_type": "club", "front_photo": "/api/images/kits/masters/k.jpg",
+    })
+    await mock_db.versions.insert_one({"version_id": version_id, "kit_id": kit_id, "model": "Replica"})
+    return kit_id
+
+
+async def _list(client, cookies, collection_id: str) -> str:
+    r = await client.post("/api/marketplace", json={
+        "collection_id": collection_id,
+        "listing_type": "sale",
+        "asking_price": 80.0,
+        "listing_photos": ["https://example.com/front.jpg", "https://example.com/back.jpg"],
+    }, cookies=cookies)
+    assert r.status_code == 200, r.text
+    return r.json()["listing_id"]
+
+
+class TestListingSnapshot:
+    @pytest.mark.asyncio
+    async def test_snapshot_written_and_used_by_browse(self, client, mock_db, make_user):
+        user_id, _, cookies = await make_user()
+        psg = await _seed_collection_item(mock_db, user_id)
+        om = await _seed_collection_item(mock_db, user_id)
+        await mock_db.collections.update_one({"collection_id": psg["collection_id"]}, {"$set": {"size": "L", "signed": True}})
+        kit_id = await _seed_kit(mock_db, psg["version_id"])
+        await _seed_kit(mock_db, om["version_id"], club="OM", season="1992/1993")
+        listing_id = await _list(client, cookies, psg["collection_id"])
+        await _list(client, cookies, om["collection_id"])
+
+        stored = await mock_db.listings.find_one({"listing_id": listing_id})
+        assert stored["kit_snapshot"]["kit_id"] == kit_id
+        assert stored["kit_snapshot"]["club"] == "PSG"
+        assert stored["kit_snapshot"]["front_photo"] == "/api/images/kits/masters/k.jpg"
+        assert stored["collection_item"]["size"] == "L"
+        assert stored["seller"]["name"].startswith("Test")
+
+        r = await client.get("/api/marketplace", params={"club": "PSG", "size": "L", "signed": "true"})
+        assert [l["listing_id"] for l in r.json()["results"]] == [listing_id]
+        r = await client.get("/api/marketplace", params={"search": "om", "team_type": "club"})
+        assert [l["kit_snapshot"]["club"] for l in r.json()["results"]] == ["OM"]
+
+        filters = (await client.get("/api/marketplace/filters")).json()
+        assert filters["clubs"] == ["OM", "PSG"]
+        assert filters["seasons"] == ["2012/2013", "1992/1993"]
+        assert filters["sizes"] == ["L"]
+
+    @pytest.mark.asyncio
+    async def test_edits_propagate_through_refresh(self, client, mock_db, make_user):
+        from backend.services.listing_snapshot import refresh_all_stale_snapshots
+
+        user_id, _, cookies = await make_user()
+        col = await _seed_collection_item(mock_db, user_id)
+        await _seed_kit(mock_db, col["version_id"])
+        listing_id = await _list(client, cookies, col["collection_id"])
+
+        r = await client.put(f"/api/collections/{col['collection_id']}", json={"size": "XL"}, cookies=cookies)
+        assert r.status_code == 200
+        stored = await mock_db.listings.find_one({"listing_id": listing_id})
+        assert "snapshot_stale" in stored and stored["collection_item"].get("size") is None
+
+        assert await refresh_all_stale_snapshots() == 1
+        stored = await mock_db.listings.find_one({"listing_id": listing_id})
+        assert "snapshot_stale" not in stored
+        assert stored["collection_item"]["size"] == "XL"
+
+    @pytest.mark.asyncio
+    async def test_kit_edit_approval_marks_listings(self, client, mock_db, make_user):
+        from backend.services.approval_engine import approve_submission
+        from backend.services.listing_snapshot import refresh_all_stale_snapshots
+
+        user_id, _, cookies = await make_user()
+        col = await _seed_collection_item(mock_db, user_id)
+        kit_id = await _seed_kit(mock_db, col["version_id"])
+        listing_id = await _list(client, cookies, col["collection_id"])
+        await mock_db.submissions.insert_one({
+            "submission_id": "sub_edit", "submission_type": "master_kit", "status": "pending",
+            "submitted_by": user_id, "data": {"mode": "edit", "kit_id": kit_id, "brand": "Adidas"},
+        })
+
+        assert (await approve_submission("sub_edit"))["status"] == "approved"
+        await refresh_all_stale_snapshots()
+        stored = await mock_db.listings.find_one({"listing_id": listing_id})
+        assert stored["kit_snapshot"]["brand"] == "Adidas"
+
+    @pytest.mark.asyncio
+    async def test_legacy_listing_backfilled_and_remark_kept(self, mock_db, make_user, monkeypatch):
+        from backend.services import listing_snapshot
+
+        user_id, _, _ = await make_user()
+        col = await _seed_collection_item(mock_db, user_id)
+        await _seed_kit(mock_db, col["version_id"])
+        await mock_db.listings.insert_one({
+            "listing_id": "lst_legacy", "collection_id": col["collection_id"], "user_id": user_id,
+            "version_id": col["version_id"], "status": "active", "created_at": "2026-01-01T00:00:00+00:00",
+        })
+        assert await listing_snapshot.refresh_stale_snapshots() == 1
+        stored = await mock_db.listings.find_one({"listing_id": "lst_legacy"})
+        assert stored["kit_snapshot"]["club"] == "PSG"
+
+        # Marquage reposé pendant une reconstruction : le marqueur n'est pas effacé
+        await listing_snapshot.mark_listing_snapshots_stale(collection_id=col["collection_id"])
+        real_build = listing_snapshot.build_snapshots
+
+        async def _build_then_remark(listings):
+            snapshots = await real_build(listings)
+            await mock_db.listings.update_one({"listing_id": "lst_legacy"}, {"$set": {"snapshot_stale": "later"}})
+            return snapshots
+
+        monkeypatch.setattr(listing_snapshot, "build_snapshots", _build_then_remark)
+        assert await listing_snapshot.refresh_stale_snapshots() == 0
+        assert (await mock_db.listings.find_one({"listing_id": "lst_legacy"}))["snapshot_stale"] == "later"
+
+
 # ─── Offres ───────────────────────────────────────────────────────────────────
 
+def _snapshot_listing(club: str, brand: str, size: str = "M", flocking: str = "", status: str = "active",
+                      price: float | None = 50.0, created_at: str = "2026-01-01T00:00:00+00:00") -> dict:
+    return {
+        "listing_id": f"listing_{uuid.uuid4().hex[:8]}", "status": status, "listing_type": "sale",
+        "asking_price": price, "created_at": created_at,
+        "kit_snapshot": {"club": club, "brand": brand, "season": "2012/2013", "kit_type": "Home",
+                         "league": "Ligue 1", "gender": "Men", "entity_type": "club"},
+        "collection_item": {"size": size, "physical_state": "Very good", "signed": False, "flocking_origin": flocking},
+    }
+
+
+def _counts(body: dict, facet: str) -> dict:
+    return {b["value"]: b["count"] for b in body["facets"][facet]}
+
+
+class TestMarketplaceFacets:
+    @pytest_asyncio.fixture
+    async def seeded(self, mock_db):
+        await mock_db.listings.insert_many([
+            _snapshot_listing("PSG", "Nike", size="L", flocking="Official"),
+            _snapshot_listing("PSG", "Nike", size="XS"),
+            _snapshot_listing("Lyon", "Nike", size="L"),
+            _snapshot_listing("OM", "Adidas", size="XL", flocking="none"),
+            _snapshot_listing("OM", "Adidas", status="cancelled"),
+        ])
+
+    @pytest.mark.asyncio
+    async def test_counts_are_disjunctive(self, client, seeded):
+        r = await client.get("/api/marketplace/facets")
+        assert r.status_code == 200
+        body = r.json()
+        assert body["total"] == 4
+        assert _counts(body, "brands") == {"Adidas": 1, "Nike": 3}
+        assert [b["value"] for b in body["facets"]["sizes"]] == ["XS", "L", "XL"]
+        assert _counts(body, "flocking_origins") == {"Official": 1, "none": 3}
+
+        body = (await client.get("/api/marketplace/facets", params={"brand": "Nike"})).json()
+        assert body["total"] == 3
+        # La facette filtrée garde ses autres valeurs ; les autres facettes se restreignent
+        assert _counts(body, "brands") == {"Adidas": 1, "Nike": 3}
+        assert _counts(body, "clubs") == {"Lyon": 1, "PSG": 2}
+
+        body = (await client.get("/api/marketplace/facets", params={"brand": "Nike", "size": "L"})).json()
+        assert body["total"] == 2
+        assert _counts(body, "sizes") == {"XS": 1, "L": 2}
+        assert _counts(body, "clubs") == {"Lyon": 1, "PSG": 1}
+
+    @pytest.mark.asyncio
+    async def test_total_matches_browse(self, client, seeded):
+        params = {"club": "OM", "flocking_origin": "none"}
+        facets = (await client.get("/api/marketplace/facets", params=params)).json()
+        listings = (await client.get("/api/marketplace", params=params)).json()
+        assert facets["total"] == listings["total"] == 1
+
+    @pytest.mark.asyncio
+    async def test_filters_endpoint_lists_values(self, client, seeded):
+        r = await client.get("/api/marketplace/filters")
+        assert r.status_code == 200
+        body = r.json()
+        assert body["clubs"] == ["Lyon", "OM", "PSG"]
+        assert body["sizes"] == ["XS", "L", "XL"]
+        assert body["flocking_origins"] == ["Official"]
+
+    @pytest.mark.asyncio
+    async def test_cache_serves_until_ttl(self, client, mock_db, seeded, monkeypatch):
+        from backend.services import marketplace_facets
+
+        first = (await client.get("/api/marketplace/facets", params={"brand": " Nike"})).json()
+        assert first["cached"] is False
+        await mock_db.listings.insert_one(_snapshot_listing("PSG", "Nike"))
+
+        # Même jeu de filtres une fois normalisé : servi depuis le cache
+        second = (await client.get("/api/marketplace/facets", params={"brand": "Nike", "club": ""})).json()
+        assert second["cached"] is True and second["total"] == 3
+
+        monkeypatch.setattr(marketplace_facets, "FACET_CACHE_TTL", 0)
+        third = (await client.get("/api/marketplace/facets", params={"brand": "Nike"})).json()
+        assert third["cached"] is False and third["total"] == 4
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_aggregation(self, mock_db, seeded, monkeypatch):
+        import asyncio
+        from backend.services import marketplace_facets
+
+        calls = []
+        real_aggregate = marketplace_facets._aggregate
+
+        async def _counting_aggregate(filters):
+            calls.append(filters)
+            await asyncio.sleep(0.01)
+            return await real_aggregate(filters)
+
+        monkeypatch.setattr(marketplace_facets, "_aggregate", _counting_aggregate)
+        results = await asyncio.gather(*(marketplace_facets.facet_counts({"brand": "Nike"}) for _ in range(5)))
+        assert len(calls) == 1
+        assert {r["total"] for r in results} == {3}
+        assert marketplace_facets.facet_cache_stats()["shared"] == 4
+
+
+async def _all_pages(client, sort: str, limit: int = 2) -> list[dict]:
+    pages, cursor = [], None
+    while True:
+        params = {"sort": sort, "limit": limit, **({"cursor": cursor} if cursor else {})}
+        body = (await client.get("/api/marketplace", params=params)).json()
+        pages.extend(body["results"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            return pages
+
+
+class TestListingSorts:
+    @pytest.mark.asyncio
+    async def test_price_sorts_page_through_ties(self, client, mock_db):
+        prices = [30.0, 10.0, 30.0, 20.0, 30.0, None]
+        await mock_db.listings.insert_many([_snapshot_listing("PSG", "Nike", price=p) for p in prices])
+
+        first = (await client.get("/api/marketplace", params={"sort": "price_asc", "limit": 2})).json()
+        assert first["total"] == 5  # échange sans prix exclu des tris par prix
+        assert first["next_cursor"]
+
+        asc = await _all_pages(client, "price_asc")
+        assert [l["asking_price"] for l in asc] == [10.0, 20.0, 30.0, 30.0, 30.0]
+        assert len({l["listing_id"] for l in asc}) == 5
+        desc = await _all_pages(client, "price_desc")
+        assert [l["listing_id"] for l in desc] == [l["listing_id"] for l in reversed(asc)]
+
+    @pytest.mark.asyncio
+    async def test_newest_cursor_skips_count(self, client, mock_db):
+        await mock_db.listings.insert_many([
+            _snapshot_listing("PSG", "Nike", created_at=f"2026-01-0{d}T00:00:00+00:00") for d in range(1, 6)
+        ])
+        first = (await client.get("/api/marketplace", params={"limit": 3})).json()
+        second = (await client.get("/api/marketplace", params={"limit": 3, "cursor": first["next_cursor"]})).json()
+        assert [l["created_at"][:10] for l in first["results"] + second["results"]] == [
+            "2026-01-05", "2026-01-04", "2026-01-03", "2026-01-02", "2026-01-01",
+        ]
+        assert second["total"] is None and second["next_cursor"] is None
+
+    @pytest.mark.asyncio
+    async def test_best_seller_uses_completed_sales(self, client, mock_db, make_user):
+        user_id, _, cookies = await make_user()
+        await mock_db.transactions.insert_many([
+            {"transaction_id": f"txn_{i}", "seller_id": user_id, "status": status}
+            for i, status in enumerate(["completed", "completed", "disputed"])
+        ])
+        item = await _seed_collection_item(mock_db, user_id)
+        await _seed_kit(mock_db, item["version_id"])
+        listing_id = await _list(client, cookies, item["collection_id"])
+        await mock_db.listings.insert_one(_snapshot_listing("OM", "Adidas", created_at="2027-01-01T00:00:00+00:00"))
+
+        stored = await mock_db.listings.find_one({"listing_id": listing_id})
+        assert stored["seller"]["completed_sales"] == 2
+
+        body = (await client.get("/api/marketplace", params={"sort": "best_seller"})).json()
+        assert body["results"][0]["listing_id"] == listing_id
+
+    @pytest.mark.asyncio
+    async def test_legacy_snapshot_gets_sales_count(self, mock_db):
+        from backend.services.listing_snapshot import refresh_stale_snapshots
+
+        await mock_db.users.insert_one({"user_id": "user_s", "username": "seller"})
+        await mock_db.transactions.insert_one({"transaction_id": "txn_1", "seller_id": "user_s", "status": "completed"})
+        await mock_db.listings.insert_one({
+            **_snapshot_listing("PSG", "Nike"), "user_id": "user_s", "collection_id": "col_x",
+            "seller": {"username": "seller"},
+        })
+        assert await refresh_stale_snapshots() == 1
+        assert (await mock_db.listings.find_one({}))["seller"]["completed_sales"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_sort_and_cursor(self, client, mock_db):
+        from backend.services.listing_pagination import encode_cursor
+
+        assert (await client.get("/api/marketplace", params={"sort": "cheapest"})).status_code == 422
+        assert (await client.get("/api/marketplace", params={"cursor": "%%%"})).status_code == 400
+        other = encode_cursor("price_asc", {"asking_price": 10.0, "listing_id": "l1"})
+        assert (await client.get("/api/marketplace", params={"cursor": other})).status_code == 400
+
+
 class TestOffers:
     @pytest_asyncio.fixture
     async def listing(self, client, mock_db, make_user):
@@ -0,0 +1,95 @@
+"""
+Tests de la file de modération (backend/services/moderation_queue.py).
+
+Couvre :
+  - GET /api/submissions/queue : page, compteurs par type, curseur suivant
+  - Pagination par curseur de GET /api/submissions (stable sur created_at égaux)
+  - Hydratation des usernames en une requête
+  - /api/pending/refs et /api/pending filtrés sur un master kit
+"""
+from __future__ import annotations
+
+import pytest
+
+
+def _sub(n: int, submission_type: str = "master_kit", **extra) -> dict:
+    return {
+        "submission_id": f"sub_{n:03d}",
+        "submission_type": submission_type,
+        "status": "pending",
+        "submitted_by": "user_sub",
+        "votes_up": 0,
+        "votes_down": 0,
+        "created_at": f"2026-01-{1 + n // 4:02d}T00:00:00+00:00",  # created_at partagés par 4
+        "data": {"mode": "create"},
+        **extra,
+    }
+
+
+class TestModerationQueue:
+    @pytest.mark.asyncio
+    async def test_queue_pages_with_cursor_and_counts(self, client, mock_db):
+        await mock_db.users.insert_one({"user_id": "user_sub", "username": "sub_author"})
+        await mock_db.submissions.insert_many(
+            [_sub(n) for n in range(10)]
+            + [_sub(n, "version") for n in range(10, 13)]
+            + [_sub(99, status="approved")]
+        )
+
+        seen, params = [], {"limit": 5}
+        while True:
+            r = await client.get("/api/submissions/queue", params=params)
+            assert r.status_code == 200
+            page = r.json()
+            assert page["counts"] == {"master_kit": 10, "version": 3}
+            assert page["total"] == 13
+            seen += [s["submission_id"] for s in page["items"]]
+            if not page["next_cursor"]:
+                break
+            params = {"limit": 5, **page["next_cursor"]}
+
+        assert seen == sorted((f"sub_{n:03d}" for n in range(13)), reverse=True)
+        assert all("voters" not in s for s in page["items"])
+        assert page["items"][0]["submitter_username"] == "sub_author"
+
+        r = await client.get("/api/submissions/queue", params={"submission_type": "version"})
+        assert [s["submission_id"] for s in r.json()["items"]] == ["sub_012", "sub_011", "sub_010"]
+
+    @pytest.mark.asyncio
+    async def test_list_submissions_cursor(self, client, mock_db):
+        await mock_db.submissions.insert_many([_sub(n) for n in range(8)])
+
+        r = await client.get("/api/submissions", params={"limit": 3})
+        first = r.json()
+        assert [s["submission_id"] for s in first] == ["sub_007", "sub_006", "sub_005"]
+        last = first[-1]
+        r = await client.get("/api/submissions", params={
+            "limit": 3, "before": last["created_at"], "before_id": last["submission_id"],
+        })
+        assert [s["submission_id"] for s in r.json()] == ["sub_004", "sub_003", "sub_002"]
+
+
+class TestPendingRefs:
+    @pytest.mark.asyncio
+    async def test_refs_and_pending_entities_for_master_kit(self, client, mock_db, make_user):
+        _, _, mod_cookies = await make_user(role="moderator")
+        await mock_db.teams.insert_one({"team_id": "team_1", "name": "FC Ref", "slug": "fc-ref", "status": "for_review"})
+        await mock_db.brands.insert_one({"brand_id": "brand_1", "name": "Other", "slug": "other", "status": "for_review"})
+        await mock_db.submissions.insert_many([
+            _sub(1, "team", data={"mode": "create", "name": "FC Ref", "entity_id": "team_1",
+                                  "parent_submission_id": "sub_kit"}),
+            _sub(2, "player", data={"mode": "create", "full_name": "Jo Ref", "parent_submission_id": "sub_kit"}),
+            _sub(3, "brand", data={"mode": "create", "name": "Other", "entity_id": "brand_1",
+                                   "parent_submission_id": "sub_other"}),
+        ])
+
+        r = await client.get("/api/pending/refs", params={"master_kit_submission_id": "sub_kit"})
+        assert r.json() == {
+            "team": [{"submission_id": "sub_001", "name": "FC Ref", "status": "pending", "entity_type": "team"}],
+            "player": [{"submission_id": "sub_002", "name": "Jo Ref", "status": "pending", "entity_type": "player"}],
+        }
+
+        r = await client.get("/api/pending", params={"master_kit_submission_id": "sub_kit"}, cookies=mod_cookies)
+        pending = r.json()
+        assert [t["team_id"] for t in pending["team"]] == ["team_1"]
+        assert pending["brand"] == [] and pending["player"] == []
@@ -0,0 +1,116 @@
+"""
+Tests de la boîte de notifications (backend/services/notification_inbox.py).
+
+Couvre :
+  - Compteur de non lues tenu à l'écriture (création, lecture, tout lire, suppression)
+  - Compteur absent (données antérieures) : initialisé à la première lecture
+  - Pagination par curseur au-delà de la première page, curseur invalide → 400
+  - Rétention : `expires_at` posé à la lecture, jamais sur les non lues
+  - Backfill des notifications déjà lues (dry-run puis --apply)
+"""
+from __future__ import annotations
+
+import pytest
+
+
+async def _notify(user_id: str, n: int = 1) -> list[dict]:
+    from backend.routers.notifications import create_notification
+
+    return [await create_notification(user_id, "info", f"Titre {i}", "Message") for i in range(n)]
+
+
+async def _inbox(client, cookies, **params) -> dict:
+    r = await client.get("/api/notifications", params=params, cookies=cookies)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+class TestUnreadCounter:
+    @pytest.mark.asyncio
+    async def test_maintained_on_write(self, client, mock_db, make_user):
+        user_id, _, cookies = await make_user()
+        assert (await _inbox(client, cookies))["unread_count"] == 0  # initialise le compteur
+
+        notifs = await _notify(user_id, 4)
+        doc = await mock_db.user_counters.find_one({"user_id": user_id})
+        assert doc["notifications_unread"] == 4
+
+        first, second = notifs[0]["notification_id"], notifs[1]["notification_id"]
+        await client.patch(f"/api/notifications/{first}/read", cookies=cookies)
+        await client.patch(f"/api/notifications/{first}/read", cookies=cookies)  # déjà lue : sans effet
+        assert (await _inbox(client, cookies))["unread_count"] == 3
+
+        await client.delete(f"/api/notifications/{first}", cookies=cookies)  # lue : sans effet
+        await client.delete(f"/api/notifications/{second}", cookies=cookies)
+        assert (await _inbox(client, cookies))["unread_count"] == 2
+
+        await client.patch("/api/notifications/read-all", cookies=cookies)
+        assert (await _inbox(client, cookies))["unread_count"] == 0
+        assert await mock_db.notifications.count_documents({"user_id": user_id, "read": False}) == 0
+
+    @pytest.mark.asyncio
+    async def test_legacy_user_counted_once(self, client, mock_db, make_user):
+        user_id, _, cookies = await make_user()
+        await mock_db.notifications.insert_many([
+            {"notification_id": f"n{i}", "user_id": user_id, "read": i == 0, "created_at": f"2025-01-0{i + 1}"}
+            for i in range(3)
+        ])
+        await _notify(user_id)  # compteur absent : pas d'incrément à l'aveugle
+        assert await mock_db.user_counters.find_one({"user_id": user_id}) is None
+
+        assert (await _inbox(client, cookies))["unread_count"] == 3
+        await _notify(user_id)
+        assert (await _inbox(client, cookies))["unread_count"] == 4
+
+
+class TestPagination:
+    @pytest.mark.asyncio
+    async def test_cursor_walks_all_notifications(self, client, mock_db, make_user):
+        user_id, _, cookies = await make_user()
+        await mock_db.notifications.insert_many([
+            {"notification_id": f"n{i:02d}", "user_id": user_id, "read": False,
+             "created_at": f"2025-01-01T00:00:{i // 3:02d}"}  # horodatages partagés
+            for i in range(12)
+        ])
+
+        page = await _inbox(client, cookies, limit=5)
+        seen = [n["notification_id"] for n in page["notifications"]]
+        while page["next_cursor"]:
+            page = await _inbox(client, cookies, limit=5, cursor=page["next_cursor"])
+            seen += [n["notification_id"] for n in page["notifications"]]
+        assert seen == [f"n{i:02d}" for i in reversed(range(12))]
+
+        r = await client.get("/api/notifications", params={"cursor": "%%%"}, cookies=cookies)
+        assert r.status_code == 400
+
+
+class TestRetention:
+    @pytest.mark.asyncio
+    async def test_expiry_set_on_read_only(self, client, mock_db, make_user):
+        user_id, _, cookies = await make_user()
+        read, unread = await _notify(user_id, 2)
+        await client.patch(f"/api/notifications/{read['notification_id']}/read", cookies=cookies)
+
+        docs = {d["notification_id"]: d async for d in mock_db.notifications.find({"user_id": user_id})}
+        assert docs[read["notification_id"]]["expires_at"]
+        assert "expires_at" not in docs[unread["notification_id"]]
+        assert "expires_at" not in (await _inbox(client, cookies))["notifications"][0]
+
+    @pytest.mark.asyncio
+    async def test_backfill_read_notifications(self, mock_db):
+        from backend.scripts.backfill_notification_expiry import backfill_expiry
+
+        await mock_db.notifications.insert_many([
+            {"notification_id": "old", "user_id": "u", "read": True, "created_at": "2020-01-01T00:00:00+00:00"},
+            {"notification_id": "recent", "user_id": "u", "read": True, "created_at": "2099-01-01T00:00:00+00:00"},
+            {"notification_id": "unread", "user_id": "u", "read": False, "created_at": "2020-01-01T00:00:00+00:00"},
+        ])
+
+        assert await backfill_expiry(mock_db) == {"notifications": 2}
+        assert await mock_db.notifications.count_documents({"expires_at": {"$exists": True}}) == 0
+
+        assert await backfill_expiry(mock_db, apply=True) == {"notifications": 2}
+        docs = {d["notification_id"]: d async for d in mock_db.notifications.find({})}
+        assert docs["old"]["expires_at"] < docs["recent"]["expires_at"]
+        assert "expires_at" not in docs["unread"]
+        assert await backfill_expiry(mock_db) == {"notifications": 0}
@@ -0,0 +1,193 @@
+"""
+Tests du job de rappel des offres en attente (backend/services/offer_reminders.py).
+
+Couvre :
+  - Un email par vendeur, toutes annonces confondues ; offres non éligibles ignorées
+  - Offres marquées `reminder_sent` : un second passage n'envoie rien
+  - Envoi en échec : offres non marquées, retentées au passage suivant
+  - Annonce inactive ou disparue : offres écartées (`reminder_skipped`), plus réexaminées
+  - Pas de plafond : toutes les offres éligibles sont traitées, lot par lot
+  - RateLimitedSender : concurrence et débit bornés
+  - Bail du job (scheduled_jobs) : un seul passage par intervalle, même réveillé localement
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import timedelta
+
+import pytest
+
+OLD = "2025-01-01T00:00:00+00:00"
+
+
+def _offer(offer_id: str, listing_id: str, **overrides) -> dict:
+    return {"offer_id": offer_id, "listing_id": listing_id, "status": "pending", "created_at": OLD, **overrides}
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    from backend.services import offer_reminders
+
+    calls = []
+
+    async def fake_send(to, seller_name, listing_url, offer_count, listing_count=1):
+        calls.append({"to": to, "url": listing_url, "offers": offer_count, "listings": listing_count})
+
+    monkeypatch.setattr(offer_reminders, "send_offer_reminder", fake_send)
+    return calls
+
+
+def _fast_sender():
+    from backend.services.offer_reminders import RateLimitedSender
+
+    return RateLimitedSender(concurrency=8, per_second=10_000)
+
+
+class TestOfferReminders:
+    @pytest.mark.asyncio
+    async def test_one_email_per_seller(self, mock_db, sent):
+        from backend.services.offer_reminders import send_offer_reminders
+
+        await mock_db.users.insert_many([
+            {"user_id": "alice", "email": "alice@example.com", "name": "Alice"},
+            {"user_id": "bob", "email": "bob@example.com", "name": "Bob"},
+        ])
+        await mock_db.listings.insert_many([
+            {"listing_id": "lst_a1", "user_id": "alice", "status": "active"},
+            {"listing_id": "lst_a2", "user_id": "alice", "status": "active"},
+            {"listing_id": "lst_b1", "user_id": "bob", "status": "active"},
+            {"listing_id": "lst_sold", "user_id": "bob", "status": "sold"},
+        ])
+        await mock_db.offers.insert_many([
+            _offer("o1", "lst_a1"), _offer("o2", "lst_a1"), _offer("o3", "lst_a2"),
+            _offer("o4", "lst_b1"),
+            _offer("recent", "lst_b1", created_at="2999-01-01T00:00:00+00:00"),
+            _offer("reminded", "lst_b1", reminder_sent=True),
+            _offer("accepted", "lst_b1", status="accepted"),
+            _offer("sold", "lst_sold"),
+            _offer("orphan", "lst_deleted"),
+        ])
+
+        result = await send_offer_reminders(_fast_sender())
+        assert result == {"sellers": 2, "offers": 4, "emails": 2, "skipped": 2}
+        by_seller = {c["to"]: c for c in sent}
+        assert by_seller["alice@example.com"]["offers"] == 3 and by_seller["alice@example.com"]["listings"] == 2
+        assert by_seller["alice@example.com"]["url"].endswith("/collection")
+        assert by_seller["bob@example.com"]["url"].endswith("/marketplace/lst_b1")
+
+        marked = await mock_db.offers.distinct("offer_id", {"reminder_sent": True})
+        assert sorted(marked) == ["o1", "o2", "o3", "o4", "reminded"]
+        skipped = await mock_db.offers.distinct("offer_id", {"reminder_skipped": True})
+        assert sorted(skipped) == ["orphan", "sold"]
+        assert await send_offer_reminders(_fast_sender()) == {"sellers": 0, "offers": 0, "emails": 0, "skipped": 0}
+
+    @pytest.mark.asyncio
+    async def test_failed_send_is_retried(self, mock_db, sent, monkeypatch):
+        from backend.services import offer_reminders
+
+        await mock_db.users.insert_many([
+            {"user_id": "alice", "email": "alice@example.com"},
+            {"user_id": "bob", "email": "bob@example.com"},
+        ])
+        await mock_db.listings.insert_many([
+            {"listing_id": "lst_a", "user_id": "alice", "status": "active"},
+            {"listing_id": "lst_b", "user_id": "bob", "status": "active"},
+        ])
+        await mock_db.offers.insert_many([_offer("oa", "lst_a"), _offer("ob", "lst_b")])
+
+        async def flaky_send(to, seller_name, listing_url, offer_count, listing_count=1):
+            if to == "bob@example.com":
+                raise RuntimeError("SMTP indisponible")
+            sent.append({"to": to})
+
+        monkeypatch.setattr(offer_reminders, "send_offer_reminder", flaky_send)
+        result = await offer_reminders.send_offer_reminders(_fast_sender())
+        assert result == {"sellers": 2, "offers": 1, "emails": 1, "skipped": 0}
+        assert await mock_db.offers.distinct("offer_id", {"reminder_sent": True}) == ["oa"]
+
+        monkeypatch.setattr(offer_reminders, "send_offer_reminder", lambda *a, **k: asyncio.sleep(0))
+        result = await offer_reminders.send_offer_reminders(_fast_sender())
+        assert result == {"sellers": 1, "offers": 1, "emails": 1, "skipped": 0}
+
+    @pytest.mark.asyncio
+    async def test_no_cap_and_batched(self, mock_db, sent, monkeypatch):
+        from backend.services import offer_reminders
+
+        monkeypatch.setattr(offer_reminders, "REMINDER_BATCH", 3)
+        sellers = [f"seller_{i}" for i in range(7)]
+        await mock_db.users.insert_many([{"user_id": s, "email": f"{s}@example.com"} for s in sellers])
+        await mock_db.listings.insert_many([{"listing_id": f"lst_{s}", "user_id": s, "status": "active"} for s in sellers])
+        await mock_db.offers.insert_many([_offer(f"o{i}", f"lst_{sellers[i % 7]}") for i in range(700)])
+
+        result = await offer_reminders.send_offer_reminders(_fast_sender())
+        assert result == {"sellers": 7, "offers": 700, "emails": 7, "skipped": 0}
+        assert await mock_db.offers.count_documents({"reminder_sent": True}) == 700
+
+
+class TestRateLimitedSender:
+    @pytest.mark.asyncio
+    async def test_bounds_concurrency_and_rate(self):
+        from backend.services.offer_reminders import RateLimitedSender
+
+        sender = RateLimitedSender(concurrency=2, per_second=50)
+        running = peak = 0
+
+        async def send():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(sender.send(send) for _ in range(6)), sender.send(fail))
+        assert results == [True] * 6 + [False]
+        assert peak <= 2
+        assert time.monotonic() - started >= 6 * 0.02 - 0.005  # 7 démarrages espacés de 20 ms
+
+
+class TestScheduledJobs:
+    @pytest.mark.asyncio
+    async def test_single_claim_per_interval(self, mock_db):
+        from backend.services.scheduled_jobs import claim_job_run
+        from backend.utils import utcnow
+
+        await mock_db.scheduled_jobs.create_index("job", unique=True)
+        interval = timedelta(hours=24)
+        assert await claim_job_run("offer_reminders", interval) is True
+        assert await claim_job_run("offer_reminders", interval) is False  # autre worker, même période
+        assert await claim_job_run("autre_job", interval) is True
+
+        await mock_db.scheduled_jobs.update_one(
+            {"job": "offer_reminders"}, {"$set": {"next_run_at": utcnow() - timedelta(minutes=1)}},
+        )
+        assert await claim_job_run("offer_reminders", interval) is True
+
+    @pytest.mark.asyncio
+    async def test_wakeup_runs_only_when_lease_is_due(self, mock_db):
+        from backend.services.scheduled_jobs import scheduled_loop
+
+        runs = []
+
+        async def run():
+            runs.append(1)
+            return {}
+
+        # Deux workers, réveillés en boucle : un seul passage sur l'intervalle
+        wakeups = [asyncio.Event(), asyncio.Event()]
+        tasks = [
+            asyncio.create_task(scheduled_loop("file_deletions", timedelta(hours=1), run, poll_seconds=0.01, wakeup=w))
+            for w in wakeups
+        ]
+        for _ in range(5):
+            for w in wakeups:
+                w.set()
+            await asyncio.sleep(0.02)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert len(runs) == 1
@@ -0,0 +1,181 @@
+"""
+Tests de la ré-estimation des prix de collection (backend/services/reestimation.py).
+
+Couvre :
+  - Job complet : prix recalculés, version de grille enregistrée, progression
+  - Streaming par lots (taille de lot réduite)
+  - Items jamais estimés ou aux critères incomplets : ignorés et comptés
+  - Changement de note joueur → seuls les items floqués au joueur
+  - Boot : ré-estimation uniquement si ESTIMATION_VERSION a changé, un seul
+    worker à la fois, version enregistrée seulement après un job terminé
+"""
+from __future__ import annotations
+
+import pytest
+
+from backend.services.estimation_batch import estimation_kwargs
+from backend.utils import ESTIMATION_VERSION, calculate_estimation
+
+
+async def _seed_catalog(mock_db):
+    await mock_db.master_kits.insert_one({"kit_id": "kit_1", "season": "1998/1999"})
+    await mock_db.versions.insert_one({
+        "version_id": "ver_1", "kit_id": "kit_1", "model": "Authentic", "competition": "World Cup",
+    })
+
+
+def _expected(item: dict, note: float = 0.0) -> float:
+    inputs = {**item, "model_type": "Authentic", "competition": "World Cup",
+              "season_year": 1998, "mode": item["estimation_mode"]}
+    return calculate_estimation(**estimation_kwargs(inputs, note))["estimated_price"]
+
+
+def _item(n: int, user_id: str = "user_a", **extra) -> dict:
+    return {
+        "collection_id": f"col_{n}", "user_id": user_id, "version_id": "ver_1",
+        "physical_state": "Very good", "estimated_price": 1.0,
+        "estimation_version": "old", "estimation_mode": "advanced", **extra,
+    }
+
+
+class TestReestimationJob:
+    @pytest.mark.asyncio
+    async def test_admin_job_reprices_everything(self, client, mock_db, make_user):
+        _, _, admin_cookies = await make_user(role="admin")
+        await _seed_catalog(mock_db)
+        items = [
+            _item(1),
+            _item(2, condition_origin="Match Worn", patch=True),
+            _item(3, estimation_mode="basic", is_rare=True),
+        ]
+        await mock_db.collections.insert_many([dict(i) for i in items])
+
+        r = await client.post("/api/admin/reestimation", cookies=admin_cookies)
+        assert r.status_code == 200
+        job_id = r.json()["job_id"]
+
+        r = await client.get(f"/api/admin/reestimation/{job_id}", cookies=admin_cookies)
+        job = r.json()
+        assert job["status"] == "done"
+        assert (job["total"], job["processed"], job["updated"]) == (3, 3, 3)
+        assert job["estimation_version"] == ESTIMATION_VERSION
+
+        for item in items:
+            stored = await mock_db.collections.find_one({"collection_id": item["collection_id"]})
+            assert stored["estimated_price"] == stored["value_estimate"] == _expected(item)
+            assert stored["estimation_version"] == ESTIMATION_VERSION
+
+        # Résumé de collection aligné sur les nouveaux prix
+        summary = await mock_db.collection_summaries.find_one({"user_id": "user_a"})
+        assert summary["value_sum"] == pytest.approx(sum(_expected(i) for i in items))
+
+    @pytest.mark.asyncio
+    async def test_streams_in_batches_and_skips_up_to_date(self, mock_db, monkeypatch):
+        from backend.services import reestimation
+
+        monkeypatch.setattr(reestimation, "REESTIMATION_BATCH_SIZE", 3)
+        await _seed_catalog(mock_db)
+        fresh = _item(0)
+        fresh.update(estimated_price=_expected(fresh), estimation_version=ESTIMATION_VERSION)
+        await mock_db.collections.insert_many([fresh] + [_item(n) for n in range(1, 8)])
+
+        job = await reestimation.create_job("all", "test")
+        done = await reestimation.run_job(job["job_id"])
+        assert (done["processed"], done["updated"]) == (8, 7)
+
+    @pytest.mark.asyncio
+    async def test_skips_unestimated_and_incomplete_items(self, mock_db):
+        from backend.services import reestimation
+
+        await _seed_catalog(mock_db)
+        await mock_db.versions.insert_one({"version_id": "ver_nomodel", "kit_id": "kit_1"})
+        await mock_db.collections.insert_many([
+            _item(1),
+            _item(2, estimated_price=None, estimation_version=""),  # jamais estimé
+            {"collection_id": "col_3", "user_id": "user_a", "version_id": "ver_1",
+             "estimated_price": 1.0},  # antérieur aux critères
+            _item(4, estimation_mode=""),  # mode inconnu
+            _item(5, version_id="ver_nomodel"),
+        ])
+
+        job = await reestimation.create_job("all", "test")
+        done = await reestimation.run_job(job["job_id"])
+        assert (done["total"], done["updated"], done["skipped"]) == (5, 1, 4)
+        async for stored in mock_db.collections.find({"collection_id": {"$ne": "col_1"}}):
+            assert stored["estimated_price"] in (None, 1.0)
+            assert stored.get("estimation_version") != ESTIMATION_VERSION
+
+    @pytest.mark.asyncio
+    async def test_player_note_change_reprices_flocked_items(self, client, mock_db):
+        await _seed_catalog(mock_db)
+        await mock_db.players.insert_one({"player_id": "p_1", "slug": "p-1", "full_name": "P One", "note": 0.0})
+        flocked = _item(1, flocking_origin="Official", flocking_player_id="p_1",
+                        signed=True, signed_type="player_flocked")
+        other = _item(2)
+        await mock_db.collections.insert_many([dict(flocked), dict(other)])
+
+        r = await client.patch("/api/scoring/players/p_1/aura", params={"aura": 100})
+        assert r.status_code == 200
+        note = r.json()["note"]
+        assert note > 0
+
+        stored = await mock_db.collections.find_one({"collection_id": "col_1"})
+        assert stored["estimated_price"] == _expected(flocked, note)
+        untouched = await mock_db.collections.find_one({"collection_id": "col_2"})
+        assert untouched["estimated_price"] == 1.0
+        assert await mock_db.reestimation_jobs.count_documents({"scope": "player", "player_id": "p_1"}) == 1
+
+
+class TestReestimateOnBoot:
+    @pytest.mark.asyncio
+    async def test_only_when_tables_changed(self, mock_db):
+        from backend.services.reestimation import reestimate_if_tables_changed
+
+        await _seed_catalog(mock_db)
+        await mock_db.collections.insert_one(_item(1))
+
+        # 1er boot : on enregistre la version sans toucher aux prix
+        assert await reestimate_if_tables_changed() is None
+        assert (await mock_db.collections.find_one({"collection_id": "col_1"}))["estimated_price"] == 1.0
+
+        await mock_db.config.update_one({"key": "estimation_version"}, {"$set": {"value": "old"}})
+        job = await reestimate_if_tables_changed()
+        assert job["status"] == "done" and job["updated"] == 1
+        assert (await mock_db.config.find_one({"key": "estimation_version"}))["value"] == ESTIMATION_VERSION
+
+    @pytest.mark.asyncio
+    async def test_failed_job_is_retried_on_next_boot(self, mock_db, monkeypatch):
+        from backend.services import reestimation
+
+        await _seed_catalog(mock_db)
+        await mock_db.collections.insert_one(_item(1))
+        await mock_db.config.insert_one({"key": "estimation_version", "value": "old"})
+
+        real_run_job = reestimation.run_job
+
+        async def crashing_run_job(job_id):
+            raise RuntimeError("worker tué")
+
+        monkeypatch.setattr(reestimation, "run_job", crashing_run_job)
+        assert await reestimation.reestimate_if_tables_changed() is None
+        config = await mock_db.config.find_one({"key": "estimation_version"})
+        assert config["value"] == "old" and "claim" not in config
+
+        monkeypatch.setattr(reestimation, "run_job", real_run_job)
+        job = await reestimation.reestimate_if_tables_changed()
+        assert job["status"] == "done" and job["updated"] == 1
+        assert (await mock_db.config.find_one({"key": "estimation_version"}))["value"] == ESTIMATION_VERSION
+
+    @pytest.mark.asyncio
+    async def test_concurrent_boots_run_one_job(self, mock_db):
+        import asyncio
+
+        from backend.services.reestimation import reestimate_if_tables_changed
+
+        await _seed_catalog(mock_db)
+        await mock_db.collections.insert_one(_item(1))
+        await mock_db.config.insert_one({"key": "estimation_version", "value": "old"})
+
+        results = await asyncio.gather(*(reestimate_if_tables_changed() for _ in range(4)))
+        assert sum(1 for r in results if r) == 1
+        assert await mock_db.reestimation_jobs.count_documents({"scope": "all"}) == 1
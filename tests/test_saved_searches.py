@@ -0,0 +1,155 @@
+"""
+Tests des recherches marketplace sauvegardées (backend/services/saved_searches.py).
+
+Couvre :
+  - CRUD /api/marketplace/saved-searches : filtres normalisés, au moins un filtre,
+    doublon après normalisation (y compris en concurrence), suppression limitée au propriétaire
+  - Clé d'appariement : version_id > club > brand > « * »
+  - Évaluation des filtres sur une annonce (prix, recherche, flocage « none »)
+  - Création d'annonce : alerte des recherches correspondantes uniquement,
+    jamais le vendeur, notifications regroupées tant qu'elles ne sont pas lues
+"""
+from __future__ import annotations
+
+import uuid
+
+import pytest
+
+
+async def _list_kit(client, mock_db, user_id: str, cookies: dict, club: str, price: float = 80.0) -> str:
+    """Crée un maillot (kit + version + item de collection) et le met en vente."""
+    kit_id, version_id, col_id = (f"{p}_{uuid.uuid4().hex[:8]}" for p in ("kit", "ver", "col"))
+    await mock_db.master_kits.insert_one({
+        "kit_id": kit_id, "club": club, "brand": "Nike", "season": "2012/2013",
+        "kit_type": "Home", "entity_type": "club",
+    })
+    await mock_db.versions.insert_one({"version_id": version_id, "kit_id": kit_id})
+    await mock_db.collections.insert_one({
+        "collection_id": col_id, "user_id": user_id, "version_id": version_id, "physical_state": "Very good",
+    })
+    r = await client.post("/api/marketplace", json={
+        "collection_id": col_id, "listing_type": "sale", "asking_price": price,
+        "listing_photos": ["https://example.com/f.jpg", "https://example.com/b.jpg"],
+    }, cookies=cookies)
+    assert r.status_code == 200, r.text
+    return r.json()["listing_id"]
+
+
+class TestSavedSearchCrud:
+    @pytest.mark.asyncio
+    async def test_create_list_delete(self, client, make_user):
+        _, _, cookies = await make_user()
+        r = await client.post("/api/marketplace/saved-searches",
+                              json={"name": "PSG pas cher", "club": " PSG ", "max_price": 100, "brand": ""},
+                              cookies=cookies)
+        assert r.status_code == 200, r.text
+        search = r.json()
+        assert search["filters"] == {"club": "PSG", "max_price": 100}
+
+        # Même jeu de filtres une fois normalisé
+        r = await client.post("/api/marketplace/saved-searches", json={"max_price": 100, "club": "PSG"}, cookies=cookies)
+        assert r.status_code == 400
+
+        r = await client.get("/api/marketplace/saved-searches", cookies=cookies)
+        assert [s["search_id"] for s in r.json()] == [search["search_id"]]
+
+        _, _, other = await make_user()
+        r = await client.delete(f"/api/marketplace/saved-searches/{search['search_id']}", cookies=other)
+        assert r.status_code == 404
+        r = await client.delete(f"/api/marketplace/saved-searches/{search['search_id']}", cookies=cookies)
+        assert r.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicate_is_rejected(self, client, mock_db, make_user, monkeypatch):
+        await mock_db.saved_searches.create_index([("user_id", 1), ("filters_key", 1)], unique=True)
+        _, _, cookies = await make_user()
+        r = await client.post("/api/marketplace/saved-searches", json={"club": "PSG"}, cookies=cookies)
+        assert r.status_code == 200
+
+        # Requête concurrente : la vérification préalable ne voit pas encore le doublon
+        collection_cls = type(mock_db.saved_searches)
+        find_one = collection_cls.find_one
+
+        async def not_yet_visible(self, query=None, *args, **kwargs):
+            if self.name == "saved_searches" and "filters_key" in (query or {}):
+                return None
+            return await find_one(self, query, *args, **kwargs)
+
+        monkeypatch.setattr(collection_cls, "find_one", not_yet_visible)
+        r = await client.post("/api/marketplace/saved-searches", json={"club": "PSG"}, cookies=cookies)
+        assert r.status_code == 400
+        assert r.json()["detail"] == "Search already saved"
+        assert await mock_db.saved_searches.count_documents({}) == 1
+
+    @pytest.mark.asyncio
+    async def test_requires_a_filter(self, client, make_user):
+        _, _, cookies = await make_user()
+        r = await client.post("/api/marketplace/saved-searches", json={"name": "tout", "listing_type": "auction"}, cookies=cookies)
+        assert r.status_code == 422
+
+
+class TestMatching:
+    def test_match_key_prefers_most_selective_field(self):
+        from backend.services.saved_searches import listing_match_keys, match_key
+
+        assert match_key({"brand": "Nike", "club": "PSG", "version_id": "ver_1"}) == "version_id:ver_1"
+        assert match_key({"brand": "Nike", "club": "PSG"}) == "club:PSG"
+        assert match_key({"brand": "Nike", "size": "L"}) == "brand:Nike"
+        assert match_key({"max_price": 50}) == "*"
+        listing = {"version_id": "ver_1", "kit_snapshot": {"club": "PSG", "brand": ""}}
+        assert listing_match_keys(listing) == ["*", "version_id:ver_1", "club:PSG"]
+
+    def test_filters_evaluated_like_browse(self):
+        from backend.services.saved_searches import listing_matches
+
+        listing = {
+            "status": "active", "listing_type": "sale", "asking_price": 80.0,
+            "kit_snapshot": {"club": "Paris Saint-Germain", "brand": "Nike", "season": "2012/2013", "entity_type": "club"},
+            "collection_item": {"size": "L", "signed": False, "flocking_origin": ""},
+        }
+        assert listing_matches({"search": "paris", "max_price": 100}, listing)
+        assert not listing_matches({"min_price": 90}, listing)
+        assert listing_matches({"flocking_origin": "none", "size": "L"}, listing)
+        assert not listing_matches({"flocking_origin": "Official"}, listing)
+        assert not listing_matches({"team_type": "national"}, listing)
+        assert listing_matches({"search": "2012/("}, listing) is False  # regex invalide : recherche littérale
+        assert not listing_matches({"brand": "Nike"}, {**listing, "status": "reserved"})
+
+
+class TestListingAlerts:
+    @pytest.mark.asyncio
+    async def test_new_listing_notifies_matching_searches(self, client, mock_db, make_user):
+        buyer_id, _, buyer = await make_user()
+        other_id, _, other = await make_user()
+        seller_id, _, seller = await make_user()
+        await client.post("/api/marketplace/saved-searches", json={"name": "PSG", "club": "PSG", "max_price": 100}, cookies=buyer)
+        await client.post("/api/marketplace/saved-searches", json={"club": "OM"}, cookies=other)
+        # Le vendeur surveille aussi le PSG : il n'est pas alerté de sa propre annonce
+        await client.post("/api/marketplace/saved-searches", json={"club": "PSG"}, cookies=seller)
+
+        listing_id = await _list_kit(client, mock_db, seller_id, seller, "PSG")
+        await _list_kit(client, mock_db, seller_id, seller, "PSG", price=250.0)
+
+        notifs = await mock_db.notifications.find({"type": "saved_search_match"}).to_list(None)
+        assert [n["user_id"] for n in notifs] == [buyer_id]
+        assert notifs[0]["target_type"] == "listing" and notifs[0]["target_id"] == listing_id
+        search = await mock_db.saved_searches.find_one({"user_id": buyer_id})
+        assert search["match_count"] == 1 and search["last_match_at"]
+
+    @pytest.mark.asyncio
+    async def test_unread_alerts_are_grouped(self, client, mock_db, make_user):
+        buyer_id, _, buyer = await make_user()
+        seller_id, _, seller = await make_user()
+        await client.post("/api/marketplace/saved-searches", json={"name": "PSG", "club": "PSG"}, cookies=buyer)
+
+        await _list_kit(client, mock_db, seller_id, seller, "PSG")
+        latest = await _list_kit(client, mock_db, seller_id, seller, "PSG")
+        notifs = await mock_db.notifications.find({"user_id": buyer_id}).to_list(None)
+        assert len(notifs) == 1
+        assert notifs[0]["match_count"] == 2 and notifs[0]["target_id"] == latest
+        assert notifs[0]["message"].startswith("2 nouvelles annonces")
+
+        # Une fois lue, la correspondance suivante crée une nouvelle notification
+        await mock_db.notifications.update_many({}, {"$set": {"read": True}})
+        await _list_kit(client, mock_db, seller_id, seller, "PSG")
+        assert await mock_db.notifications.count_documents({"user_id": buyer_id}) == 2
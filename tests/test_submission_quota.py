@@ -0,0 +1,89 @@
+"""
+Tests du quota de soumissions glissant sur 24h (utils.check_user_quota).
+
+Couvre :
+  - Limite atteinte → 429, modérateurs exemptés
+  - Soumissions concurrentes : jamais plus que la limite
+  - Soumission refusée (400) : la réservation est rendue
+  - Edit d'une soumission déjà en attente (upsert) : pas de quota consommé
+  - Heures sorties de la fenêtre ignorées puis purgées
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+def _version_payload(n: int) -> dict:
+    return {"submission_type": "version", "data": {"kit_id": "kit_1", "model": f"Replica {n}"}}
+
+
+@pytest.fixture
+def small_quota(monkeypatch):
+    from backend import utils
+    monkeypatch.setitem(utils.QUOTA_PER_TYPE, "version", 3)
+    monkeypatch.setitem(utils.QUOTA_PER_TYPE, "master_kit", 3)
+
+
+class TestSubmissionQuota:
+    @pytest.mark.asyncio
+    async def test_limit_then_429(self, client, mock_db, make_user, small_quota):
+        _, _, cookies = await make_user(role="user")
+        for n in range(3):
+            r = await client.post("/api/submissions", json=_version_payload(n), cookies=cookies)
+            assert r.status_code == 200
+        r = await client.post("/api/submissions", json=_version_payload(3), cookies=cookies)
+        assert r.status_code == 429
+
+        _, _, mod_cookies = await make_user(role="moderator")
+        for n in range(4):
+            r = await client.post("/api/submissions", json=_version_payload(n), cookies=mod_cookies)
+            assert r.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_concurrent_submissions_cannot_exceed_limit(self, client, mock_db, make_user, small_quota):
+        _, _, cookies = await make_user(role="user")
+        responses = await asyncio.gather(*(
+            client.post("/api/submissions", json=_version_payload(n), cookies=cookies) for n in range(10)
+        ))
+        assert sorted(r.status_code for r in responses) == [200] * 3 + [429] * 7
+        assert await mock_db.submissions.count_documents({"submission_type": "version"}) == 3
+
+    @pytest.mark.asyncio
+    async def test_rejected_submission_releases_quota(self, client, mock_db, make_user, small_quota):
+        _, _, cookies = await make_user(role="user")
+        for _ in range(5):
+            r = await client.post("/api/submissions", cookies=cookies, json={
+                "submission_type": "master_kit", "data": {"mode": "create", "club": "FC Test"},
+            })
+            assert r.status_code == 400
+        quota = await mock_db.submission_quotas.find_one({"submission_type": "master_kit"})
+        assert sum(quota["hours"].values()) == 0
+
+    @pytest.mark.asyncio
+    async def test_edit_of_pending_submission_does_not_consume_quota(self, client, mock_db, make_user, small_quota):
+        _, _, cookies = await make_user(role="user")
+        for n in range(5):
+            r = await client.post("/api/submissions", cookies=cookies, json={
+                "submission_type": "master_kit", "data": {"mode": "edit", "kit_id": "kit_1", "club": f"FC {n}"},
+            })
+            assert r.status_code == 200
+            assert r.json()["data"]["club"] == f"FC {n}"
+        assert await mock_db.submissions.count_documents({"submission_type": "master_kit"}) == 1
+        quota = await mock_db.submission_quotas.find_one({"submission_type": "master_kit"})
+        assert sum(quota["hours"].values()) == 1
+
+    @pytest.mark.asyncio
+    async def test_hours_outside_window_are_ignored_and_purged(self, mock_db, small_quota):
+        from backend.utils import check_user_quota
+
+        old_hour = (datetime.now(timezone.utc) - timedelta(hours=30)).strftime("%Y%m%d%H")
+        await mock_db.submission_quotas.insert_one({
+            "user_id": "u1", "submission_type": "version", "hours": {old_hour: 3},
+        })
+        await check_user_quota(mock_db, "u1", "version")
+        quota = await mock_db.submission_quotas.find_one({"user_id": "u1"})
+        assert old_hour not in quota["hours"]
+        assert sum(quota["hours"].values()) == 1
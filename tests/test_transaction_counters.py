@@ -0,0 +1,132 @@
+"""
+Tests des compteurs transactions (backend/services/transaction_counters.py).
+
+Couvre :
+  - Règles « action en attente » : calcul Python identique au filtre Mongo `$or`
+  - /pending-action suivi au fil du cycle vente (envoi, réception, approbation)
+  - /unread-messages-count : incrément à l'envoi, remise à zéro à la lecture
+  - Données antérieures aux compteurs : reconstruction au premier appel
+"""
+from __future__ import annotations
+
+import itertools
+
+import pytest
+
+
+def _txn(txn_id: str, seller_id: str, buyer_id: str, **overrides) -> dict:
+    return {
+        "transaction_id": txn_id, "transaction_type": "sale", "status": "awaiting_shipment",
+        "seller_id": seller_id, "buyer_id": buyer_id,
+        "seller_shipped": False, "buyer_shipped": False,
+        "buyer_received": False, "seller_received": False,
+        "buyer_approved": False, "seller_approved": False,
+        **overrides,
+    }
+
+
+async def _start_sale(seller_id: str, buyer_id: str) -> str:
+    from backend.routers.transactions import create_transaction
+
+    txn = await create_transaction(
+        listing={"listing_id": "lst_1", "user_id": seller_id, "collection_id": "col_1"},
+        offer={"offer_id": "off_1", "offerer_id": buyer_id, "offer_type": "buy", "offered_price": 50.0},
+    )
+    return txn["transaction_id"]
+
+
+async def _pending(client, cookies) -> int:
+    r = await client.get("/api/transactions/pending-action", cookies=cookies)
+    assert r.status_code == 200, r.text
+    return r.json()["count"]
+
+
+class TestPendingRules:
+    @pytest.mark.asyncio
+    async def test_python_and_mongo_rules_agree(self, mock_db):
+        from backend.services.transaction_counters import pending_action_filter, pending_parties
+
+        flags = ("seller_shipped", "buyer_shipped", "buyer_received", "buyer_approved", "seller_approved")
+        txns = []
+        for i, (kind, status, values) in enumerate(itertools.product(
+            ("sale", "trade"),
+            ("awaiting_shipment", "shipped", "delivered", "completed", "disputed"),
+            itertools.product((False, True), repeat=len(flags)),
+        )):
+            txns.append(_txn(f"txn_{i}", "seller", "buyer", transaction_type=kind, status=status, **dict(zip(flags, values))))
+        await mock_db.transactions.insert_many([dict(t) for t in txns])
+
+        for user_id in ("seller", "buyer"):
+            from_mongo = set(await mock_db.transactions.distinct("transaction_id", pending_action_filter(user_id)))
+            from_python = {t["transaction_id"] for t in txns if user_id in pending_parties(t)}
+            assert from_mongo == from_python and from_python
+
+
+class TestPendingActionCounter:
+    @pytest.mark.asyncio
+    async def test_follows_sale_lifecycle(self, client, mock_db, make_user):
+        seller_id, _, seller = await make_user()
+        buyer_id, _, buyer = await make_user()
+        txn_id = await _start_sale(seller_id, buyer_id)
+        assert (await _pending(client, seller), await _pending(client, buyer)) == (1, 0)
+
+        r = await client.post(f"/api/transactions/{txn_id}/ship", json={"tracking": "XX"}, cookies=seller)
+        assert r.status_code == 200, r.text
+        assert (await _pending(client, seller), await _pending(client, buyer)) == (0, 1)
+
+        await client.post(f"/api/transactions/{txn_id}/confirm-receipt", cookies=buyer)
+        assert await _pending(client, buyer) == 1  # reste l'approbation
+
+        await client.post(f"/api/transactions/{txn_id}/approve", cookies=buyer)
+        assert (await _pending(client, seller), await _pending(client, buyer)) == (0, 0)
+        assert (await mock_db.transactions.find_one({"transaction_id": txn_id}))["status"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_dispute_clears_pending(self, client, mock_db, make_user):
+        seller_id, _, seller = await make_user()
+        buyer_id, _, _ = await make_user()
+        txn_id = await _start_sale(seller_id, buyer_id)
+
+        await client.post(f"/api/transactions/{txn_id}/dispute", json={"reason": "Jamais reçu"}, cookies=seller)
+        assert await _pending(client, seller) == 0
+
+
+class TestUnreadCounter:
+    @pytest.mark.asyncio
+    async def test_incremented_on_send_and_cleared_on_read(self, client, mock_db, make_user):
+        seller_id, _, seller = await make_user()
+        buyer_id, _, buyer = await make_user()
+        txn_id = await _start_sale(seller_id, buyer_id)
+
+        for content in ("Bonjour", "Envoyé ?"):
+            r = await client.post(f"/api/transactions/{txn_id}/messages", json={"content": content}, cookies=buyer)
+            assert r.status_code == 200, r.text
+
+        r = await client.get("/api/transactions/unread-messages-count", cookies=seller)
+        assert r.json() == {"total": 2, "by_transaction": {txn_id: 2}}
+        r = await client.get("/api/transactions/unread-messages-count", cookies=buyer)
+        assert r.json()["total"] == 0
+
+        await client.get(f"/api/transactions/{txn_id}/messages", cookies=seller)
+        r = await client.get("/api/transactions/unread-messages-count", cookies=seller)
+        assert r.json() == {"total": 0, "by_transaction": {}}
+
+    @pytest.mark.asyncio
+    async def test_legacy_data_rebuilt_on_first_read(self, client, mock_db, make_user):
+        seller_id, _, seller = await make_user()
+        await mock_db.transactions.insert_many([
+            _txn("txn_a", seller_id, "user_b"),
+            _txn("txn_b", seller_id, "user_c", status="completed", read_marks={seller_id: "2025-01-02T00:00:00"}),
+        ])
+        await mock_db.transaction_messages.insert_many([
+            {"message_id": "m1", "transaction_id": "txn_a", "sender_id": "user_b", "created_at": "2025-01-01T00:00:00"},
+            {"message_id": "m2", "transaction_id": "txn_b", "sender_id": "user_c", "created_at": "2025-01-02T00:00:00"},
+            {"message_id": "m3", "transaction_id": "txn_b", "sender_id": "user_c", "created_at": "2025-01-03T00:00:00"},
+            {"message_id": "m4", "transaction_id": "txn_b", "sender_id": seller_id, "created_at": "2025-01-04T00:00:00"},
+        ])
+
+        r = await client.get("/api/transactions/unread-messages-count", cookies=seller)
+        assert r.json() == {"total": 2, "by_transaction": {"txn_a": 1, "txn_b": 1}}
+        assert await _pending(client, seller) == 1
+        doc = await mock_db.user_counters.find_one({"user_id": seller_id})
+        assert doc["pending"] == ["txn_a"] and doc["rebuilt_at"]
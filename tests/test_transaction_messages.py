@@ -0,0 +1,152 @@
+"""
+Tests de l'historique des messages (backend/services/transaction_messages.py).
+
+Couvre :
+  - Page par défaut : derniers messages, ordre chronologique, curseur `before`
+  - `before` / `after` : parcours complet sans doublon ni trou (created_at égaux)
+  - `since` : rafraîchissement incrémental, seulement les nouveaux messages
+  - Paramètres invalides (curseur illisible, plusieurs sens) → 400
+  - Filigrane de lecture : non lus recomptés, une page ancienne ne marque rien
+  - Migration read_by → read_marks (dry-run puis --apply)
+"""
+from __future__ import annotations
+
+import pytest
+
+
+async def _conversation(mock_db, make_user, n: int):
+    seller_id, _, seller = await make_user()
+    buyer_id, _, buyer = await make_user()
+    await mock_db.transactions.insert_one({
+        "transaction_id": "txn_1", "transaction_type": "sale", "status": "shipped",
+        "seller_id": seller_id, "buyer_id": buyer_id,
+    })
+    # Deux messages par horodatage : le tri doit départager par message_id
+    await mock_db.transaction_messages.insert_many([
+        {
+            "message_id": f"msg_{i:03d}", "transaction_id": "txn_1",
+            "sender_id": buyer_id if i % 2 else seller_id, "content": f"m{i}",
+            "created_at": f"2025-01-01T00:00:{i // 2:02d}",
+        }
+        for i in range(n)
+    ])
+    return seller, buyer
+
+
+async def _page(client, cookies, **params):
+    r = await client.get("/api/transactions/txn_1/messages", params=params, cookies=cookies)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _ids(page) -> list[str]:
+    return [m["message_id"] for m in page["messages"]]
+
+
+class TestMessagePages:
+    @pytest.mark.asyncio
+    async def test_default_page_then_walk_back(self, client, mock_db, make_user):
+        seller, _ = await _conversation(mock_db, make_user, 11)
+
+        page = await _page(client, seller, limit=4)
+        assert _ids(page) == ["msg_007", "msg_008", "msg_009", "msg_010"]
+        assert page["has_more"] and page["prev_cursor"]
+
+        seen = _ids(page)
+        while page["prev_cursor"]:
+            page = await _page(client, seller, before=page["prev_cursor"], limit=4)
+            seen = _ids(page) + seen
+        assert seen == [f"msg_{i:03d}" for i in range(11)]
+
+    @pytest.mark.asyncio
+    async def test_after_cursor_walks_forward(self, client, mock_db, make_user):
+        seller, _ = await _conversation(mock_db, make_user, 7)
+        first = await _page(client, seller, limit=2, before=(await _page(client, seller, limit=5))["prev_cursor"])
+        assert _ids(first) == ["msg_000", "msg_001"] and not first["has_more"]
+
+        page, seen = first, _ids(first)
+        while True:
+            page = await _page(client, seller, after=page["next_cursor"], limit=2)
+            seen += _ids(page)
+            if not page["has_more"]:
+                break
+        assert seen == [f"msg_{i:03d}" for i in range(7)]
+
+    @pytest.mark.asyncio
+    async def test_since_returns_only_new_messages(self, client, mock_db, make_user):
+        seller, buyer = await _conversation(mock_db, make_user, 4)
+        page = await _page(client, seller)
+        assert len(page["messages"]) == 4
+
+        r = await client.post("/api/transactions/txn_1/messages", json={"content": "Nouveau"}, cookies=buyer)
+        assert r.status_code == 200, r.text
+        assert "read_by" not in r.json()
+
+        fresh = await _page(client, seller, since=page["messages"][-1]["created_at"])
+        assert [m["content"] for m in fresh["messages"]] == ["Nouveau"]
+        assert (await _page(client, seller, after=fresh["next_cursor"]))["messages"] == []
+
+    @pytest.mark.asyncio
+    async def test_invalid_params(self, client, mock_db, make_user):
+        seller, _ = await _conversation(mock_db, make_user, 2)
+        r = await client.get("/api/transactions/txn_1/messages", params={"before": "pas-un-curseur"}, cookies=seller)
+        assert r.status_code == 400
+        r = await client.get(
+            "/api/transactions/txn_1/messages", params={"since": "2025", "before": "x"}, cookies=seller,
+        )
+        assert r.status_code == 400
+
+
+class TestReadWatermark:
+    @pytest.mark.asyncio
+    async def test_older_page_does_not_mark_read(self, client, mock_db, make_user):
+        seller, _ = await _conversation(mock_db, make_user, 6)
+
+        async def unread() -> int:
+            r = await client.get("/api/transactions/unread-messages-count", cookies=seller)
+            return r.json()["total"]
+
+        assert await unread() == 3  # messages impairs : acheteur
+        page = await _page(client, seller, limit=2)
+        await _page(client, seller, before=page["prev_cursor"], limit=2)
+        assert await unread() == 0
+
+        txn = await mock_db.transactions.find_one({"transaction_id": "txn_1"})
+        seller_id = next(uid for uid in txn["read_marks"])
+        assert txn["read_marks"] == {seller_id: "2025-01-01T00:00:02"}
+
+        # Une page ancienne ne touche pas au filigrane ; /read l'avance au dernier message
+        await mock_db.transaction_messages.insert_one({
+            "message_id": "msg_100", "transaction_id": "txn_1", "sender_id": txn["buyer_id"],
+            "content": "Tard", "created_at": "2025-01-02T00:00:00",
+        })
+        await _page(client, seller, before=page["prev_cursor"], limit=2)
+        txn = await mock_db.transactions.find_one({"transaction_id": "txn_1"})
+        assert txn["read_marks"][seller_id] == "2025-01-01T00:00:02"
+
+        r = await client.post("/api/transactions/txn_1/messages/read", cookies=seller)
+        assert r.status_code == 200
+        txn = await mock_db.transactions.find_one({"transaction_id": "txn_1"})
+        assert txn["read_marks"][seller_id] == "2025-01-02T00:00:00"
+
+
+class TestReadMarksMigration:
+    @pytest.mark.asyncio
+    async def test_read_by_arrays_become_watermarks(self, mock_db):
+        from backend.scripts.migrate_message_read_marks import migrate_read_marks
+
+        await mock_db.transactions.insert_one({"transaction_id": "txn_1", "seller_id": "s", "buyer_id": "b"})
+        await mock_db.transaction_messages.insert_many([
+            {"message_id": "m1", "transaction_id": "txn_1", "sender_id": "b", "created_at": "2025-01-01", "read_by": ["b", "s"]},
+            {"message_id": "m2", "transaction_id": "txn_1", "sender_id": "s", "created_at": "2025-01-02", "read_by": ["s"]},
+            {"message_id": "m3", "transaction_id": "txn_1", "sender_id": "b", "created_at": "2025-01-03", "read_by": ["b"]},
+        ])
+
+        result = await migrate_read_marks(mock_db)
+        assert result == {"messages": 3, "read_marks": 1, "transactions": 1}
+        assert await mock_db.transaction_messages.count_documents({"read_by": {"$exists": True}}) == 3
+
+        await migrate_read_marks(mock_db, apply=True)
+        txn = await mock_db.transactions.find_one({"transaction_id": "txn_1"})
+        assert txn["read_marks"] == {"s": "2025-01-01"}
+        assert await mock_db.transaction_messages.count_documents({"read_by": {"$exists": True}}) == 0
@@ -0,0 +1,88 @@
+"""
+Tests de la distribution de prix par version (backend/services/version_price_stats.py).
+
+Couvre :
+  - GET /versions/{id}/estimates : low / average / high / count identiques à l'ancien calcul
+  - Quantiles p25 / p50 / p75 approchés (erreur relative bornée par l'histogramme)
+  - Maintenance incrémentale à l'ajout / modification / suppression d'item
+  - Liste brute triée et paginée (raw=true)
+"""
+from __future__ import annotations
+
+import random
+import statistics
+import pytest
+
+from backend.services.version_price_stats import HISTOGRAM_RATIO
+
+
+async def _seed_version(mock_db, version_id: str = "ver_stats") -> str:
+    await mock_db.versions.insert_one({"version_id": version_id, "kit_id": "kit_x"})
+    return version_id
+
+
+class TestVersionEstimates:
+    @pytest.mark.asyncio
+    async def test_summary_and_quantiles(self, client, mock_db):
+        version_id = await _seed_version(mock_db)
+        rng = random.Random(3)
+        values = [round(rng.uniform(20, 400), 2) for _ in range(1500)]
+        await mock_db.collections.insert_many(
+            [{"collection_id": f"c{n}", "user_id": "u", "version_id": version_id, "estimated_price": v}
+             for n, v in enumerate(values)]
+            + [{"collection_id": "c_none", "user_id": "u", "version_id": version_id, "estimated_price": None}]
+        )
+
+        r = await client.get(f"/api/versions/{version_id}/estimates")
+        assert r.status_code == 200
+        body = r.json()
+        assert body["count"] == len(values)
+        assert body["low"] == round(min(values), 2)
+        assert body["high"] == round(max(values), 2)
+        assert body["average"] == round(sum(values) / len(values), 2)
+        assert "estimates" not in body
+
+        q25, q50, q75 = statistics.quantiles(values, n=4, method="inclusive")
+        for key, exact in (("p25", q25), ("p50", q50), ("p75", q75)):
+            assert abs(body[key] - exact) / exact <= HISTOGRAM_RATIO - 1
+
+    @pytest.mark.asyncio
+    async def test_empty_version(self, client, mock_db):
+        r = await client.get("/api/versions/ver_unknown/estimates")
+        assert r.json() == {"low": 0, "average": 0, "high": 0, "count": 0}
+
+    @pytest.mark.asyncio
+    async def test_incremental_updates(self, client, mock_db, make_user):
+        _, _, cookies = await make_user()
+        version_id = await _seed_version(mock_db)
+
+        ids = []
+        for price in (50.0, 100.0, 150.0):
+            r = await client.post("/api/collections", json={"version_id": version_id, "estimated_price": price},
+                                  cookies=cookies)
+            ids.append(r.json()["collection_id"])
+
+        body = (await client.get(f"/api/versions/{version_id}/estimates")).json()
+        assert (body["low"], body["average"], body["high"], body["count"]) == (50.0, 100.0, 150.0, 3)
+        assert body["p50"] == pytest.approx(100.0, rel=HISTOGRAM_RATIO - 1)
+
+        await client.put(f"/api/collections/{ids[1]}", json={"estimated_price": 130.0}, cookies=cookies)
+        await client.delete(f"/api/collections/{ids[2]}", cookies=cookies)
+
+        body = (await client.get(f"/api/versions/{version_id}/estimates")).json()
+        assert (body["low"], body["average"], body["high"], body["count"]) == (50.0, 90.0, 130.0, 2)
+        stats = await mock_db.version_price_stats.find_one({"version_id": version_id})
+        assert sum(stats["histogram"].values()) == 2
+
+    @pytest.mark.asyncio
+    async def test_raw_list_is_sorted_and_paged(self, client, mock_db):
+        version_id = await _seed_version(mock_db)
+        await mock_db.collections.insert_many([
+            {"collection_id": f"c{n}", "user_id": "u", "version_id": version_id, "value_estimate": float(v)}
+            for n, v in enumerate([30, 10, 50, 20, 40])
+        ])
+
+        r = await client.get(f"/api/versions/{version_id}/estimates", params={"raw": True, "skip": 1, "limit": 3})
+        body = r.json()
+        assert body["estimates"] == [20.0, 30.0, 40.0]
+        assert (body["skip"], body["limit"]) == (1, 3)
@@ -0,0 +1,104 @@
+"""
+Tests du rapprochement wishlist ↔ marketplace (backend/services/wishlist_matches.py).
+
+Couvre :
+  - GET /api/wishlist/matches : annonces actives par item de wishlist, moins chères
+    d'abord, annonces inactives et propres annonces exclues, items sans annonce omis
+  - Création d'annonce : notification des détenteurs de la version en wishlist
+    (vendeur exclu), insertion par lots
+"""
+from __future__ import annotations
+
+import uuid
+
+import pytest
+
+
+async def _wish(mock_db, user_id: str, version_id: str, added_at: str = "2026-01-01T00:00:00+00:00"):
+    await mock_db.wishlists.insert_one({
+        "wishlist_id": f"wish_{uuid.uuid4().hex[:8]}", "user_id": user_id,
+        "version_id": version_id, "notes": "", "added_at": added_at,
+    })
+
+
+def _listing(version_id: str, user_id: str = "user_seller", price: float = 50.0, status: str = "active") -> dict:
+    return {
+        "listing_id": f"lst_{uuid.uuid4().hex[:8]}", "version_id": version_id, "user_id": user_id,
+        "status": status, "listing_type": "sale", "asking_price": price,
+        "snapshot_stale": "2026-01-01T00:00:00+00:00",
+    }
+
+
+class TestWishlistMatches:
+    @pytest.mark.asyncio
+    async def test_matches_grouped_by_wishlist_item(self, client, mock_db, make_user):
+        user_id, _, cookies = await make_user()
+        await _wish(mock_db, user_id, "ver_a", added_at="2026-01-02T00:00:00+00:00")
+        await _wish(mock_db, user_id, "ver_b")
+        await _wish(mock_db, user_id, "ver_none")
+        await mock_db.listings.insert_many([
+            _listing("ver_a", price=90.0),
+            _listing("ver_a", price=40.0),
+            _listing("ver_a", status="cancelled"),
+            _listing("ver_b", price=20.0),
+            _listing("ver_b", user_id=user_id),  # sa propre annonce
+            _listing("ver_c"),
+        ])
+
+        r = await client.get("/api/wishlist/matches", cookies=cookies)
+        assert r.status_code == 200, r.text
+        body = r.json()
+        assert [m["version_id"] for m in body] == ["ver_a", "ver_b"]
+        assert [l["asking_price"] for l in body[0]["listings"]] == [40.0, 90.0]
+        assert len(body[1]["listings"]) == 1
+        assert "snapshot_stale" not in body[0]["listings"][0]
+
+    @pytest.mark.asyncio
+    async def test_requires_auth(self, client):
+        r = await client.get("/api/wishlist/matches")
+        assert r.status_code == 401
+
+
+class TestWishlistFanout:
+    @pytest.mark.asyncio
+    async def test_new_listing_notifies_holders(self, client, mock_db, make_user):
+        seller_id, _, seller = await make_user()
+        holder_id, _, _ = await make_user()
+        await mock_db.versions.insert_one({"version_id": "ver_a", "kit_id": "kit_a"})
+        await mock_db.master_kits.insert_one({"kit_id": "kit_a", "club": "PSG", "season": "2012/2013", "kit_type": "Home"})
+        await mock_db.collections.insert_one({"collection_id": "col_a", "user_id": seller_id, "version_id": "ver_a"})
+        await _wish(mock_db, holder_id, "ver_a")
+        await _wish(mock_db, seller_id, "ver_a")
+        await _wish(mock_db, holder_id, "ver_other")
+
+        r = await client.post("/api/marketplace", json={
+            "collection_id": "col_a", "listing_type": "sale", "asking_price": 75.0,
+            "listing_photos": ["https://example.com/f.jpg", "https://example.com/b.jpg"],
+        }, cookies=seller)
+        assert r.status_code == 200, r.text
+
+        notifs = await mock_db.notifications.find({"type": "wishlist_listing"}).to_list(None)
+        assert [n["user_id"] for n in notifs] == [holder_id]
+        assert notifs[0]["target_id"] == r.json()["listing_id"]
+        assert notifs[0]["message"] == "PSG 2012/2013 Home est en vente à 75 €."
+
+    @pytest.mark.asyncio
+    async def test_fanout_is_batched(self, mock_db, monkeypatch):
+        from backend.services import wishlist_matches
+
+        monkeypatch.setattr(wishlist_matches, "WISHLIST_FANOUT_BATCH", 2)
+        for i in range(5):
+            await _wish(mock_db, f"user_{i}", "ver_a")
+
+        batches = []
+        real_flush = wishlist_matches._flush
+
+        async def _recording_flush(batch):
+            batches.append(len(batch))
+            return await real_flush(batch)
+
+        monkeypatch.setattr(wishlist_matches, "_flush", _recording_flush)
+        sent = await wishlist_matches.notify_wishlist_holders(_listing("ver_a"))
+        assert sent == 5
+        assert batches == [2, 2, 1]
+        assert await mock_db.notifications.count_documents({"type": "wishlist_listing"}) == 5